@@ -15,16 +15,50 @@ AI_MODEL=$(bashio::config 'ai_model')
 OPENAI_API_KEY=$(bashio::config 'openai_api_key')
 ANTHROPIC_API_KEY=$(bashio::config 'anthropic_api_key')
 CUSTOM_API_URL=$(bashio::config 'custom_api_url')
+OPENAI_API_URL=$(bashio::config 'openai_api_url')
+ANTHROPIC_API_URL=$(bashio::config 'anthropic_api_url')
 
 # Performance Settings
 MAX_CONTEXT_LENGTH=$(bashio::config 'max_context_length')
 TEMPERATURE=$(bashio::config 'temperature')
 MAX_TOKENS=$(bashio::config 'max_tokens')
+HAILO_TOP_K=$(bashio::config 'hailo_top_k')
+HAILO_TOP_P=$(bashio::config 'hailo_top_p')
+HAILO_MODELS=$(bashio::config 'hailo_models')
+HAILO_MODEL_MEMORY_MB=$(bashio::config 'hailo_model_memory_mb')
+HAILO_BATCH_SIZE=$(bashio::config 'hailo_batch_size')
+HAILO_BATCH_WINDOW_MS=$(bashio::config 'hailo_batch_window_ms')
+HAILO_PRIORITY_CLASSES=$(bashio::config 'hailo_priority_classes')
+STREAM_RESPONSES=$(bashio::config 'stream_responses')
+AI_WORKERS=$(bashio::config 'ai_workers')
+AI_QUEUE_SIZE=$(bashio::config 'ai_queue_size')
+AI_QUEUE_PER_CLIENT=$(bashio::config 'ai_queue_per_client')
+CONVERSATION_SESSIONS=$(bashio::config 'conversation_sessions')
+CONVERSATION_MESSAGES=$(bashio::config 'conversation_messages')
+CONVERSATION_RECENT=$(bashio::config 'conversation_recent')
+CONVERSATION_SUMMARY_BACKEND=$(bashio::config 'conversation_summary_backend')
+AI_ROUTING=$(bashio::config 'ai_routing')
+AI_FALLBACK=$(bashio::config 'ai_fallback')
+AI_BACKEND_TIMEOUT=$(bashio::config 'ai_backend_timeout')
+AI_HEDGE=$(bashio::config 'ai_hedge')
+AI_CLASS_LIMITS=$(bashio::config 'ai_class_limits')
+AI_SYSTEM_PROMPT=$(bashio::config 'ai_system_prompt')
+OLLAMA_KEEP_ALIVE=$(bashio::config 'ollama_keep_alive')
+AI_ENTITY_CONTEXT=$(bashio::config 'ai_entity_context')
+ENTITY_INDEX_INT8=$(bashio::config 'entity_index_int8')
+AI_TOKEN_COSTS=$(bashio::config 'ai_token_costs')
+HEALTH_CHECK_INTERVAL=$(bashio::config 'health_check_interval')
+AI_CACHE_SIZE=$(bashio::config 'ai_cache_size')
+AI_CACHE_TTL=$(bashio::config 'ai_cache_ttl')
+AI_CACHE_PERSIST=$(bashio::config 'ai_cache_persist')
+AI_DEDUP=$(bashio::config 'ai_dedup')
 
 # Application Settings
 LOG_LEVEL=$(bashio::config 'log_level')
 ENABLE_TERMINAL=$(bashio::config 'enable_terminal')
 TERMINAL_PORT=$(bashio::config 'terminal_port')
+SERVER_MODE=$(bashio::config 'server_mode')
+JSON_SERIALIZER=$(bashio::config 'json_serializer')
 ENABLE_MONITORING=$(bashio::config 'enable_monitoring')
 MONITOR_INTERVAL=$(bashio::config 'monitor_interval')
 
@@ -37,6 +71,7 @@ bashio::log.info "AI Model: ${AI_MODEL}"
 bashio::log.info "Log level: ${LOG_LEVEL}"
 bashio::log.info "Terminal enabled: ${ENABLE_TERMINAL}"
 bashio::log.info "Terminal port: ${TERMINAL_PORT}"
+bashio::log.info "Server mode: ${SERVER_MODE}"
 bashio::log.info "Monitoring enabled: ${ENABLE_MONITORING}"
 
 # Log API key status (without revealing keys)
@@ -142,16 +177,50 @@ export AI_MODEL="${AI_MODEL}"
 export OPENAI_API_KEY="${OPENAI_API_KEY}"
 export ANTHROPIC_API_KEY="${ANTHROPIC_API_KEY}"
 export CUSTOM_API_URL="${CUSTOM_API_URL}"
+export OPENAI_API_URL="${OPENAI_API_URL}"
+export ANTHROPIC_API_URL="${ANTHROPIC_API_URL}"
 
 # Performance settings
 export MAX_CONTEXT_LENGTH="${MAX_CONTEXT_LENGTH}"
 export TEMPERATURE="${TEMPERATURE}"
 export MAX_TOKENS="${MAX_TOKENS}"
+export HAILO_TOP_K="${HAILO_TOP_K}"
+export HAILO_TOP_P="${HAILO_TOP_P}"
+export HAILO_MODELS="${HAILO_MODELS}"
+export HAILO_MODEL_MEMORY_MB="${HAILO_MODEL_MEMORY_MB}"
+export HAILO_BATCH_SIZE="${HAILO_BATCH_SIZE}"
+export HAILO_BATCH_WINDOW_MS="${HAILO_BATCH_WINDOW_MS}"
+export HAILO_PRIORITY_CLASSES="${HAILO_PRIORITY_CLASSES}"
+export STREAM_RESPONSES="${STREAM_RESPONSES}"
+export AI_WORKERS="${AI_WORKERS}"
+export AI_QUEUE_SIZE="${AI_QUEUE_SIZE}"
+export AI_QUEUE_PER_CLIENT="${AI_QUEUE_PER_CLIENT}"
+export CONVERSATION_SESSIONS="${CONVERSATION_SESSIONS}"
+export CONVERSATION_MESSAGES="${CONVERSATION_MESSAGES}"
+export CONVERSATION_RECENT="${CONVERSATION_RECENT}"
+export CONVERSATION_SUMMARY_BACKEND="${CONVERSATION_SUMMARY_BACKEND}"
+export AI_ROUTING="${AI_ROUTING}"
+export AI_FALLBACK="${AI_FALLBACK}"
+export AI_BACKEND_TIMEOUT="${AI_BACKEND_TIMEOUT}"
+export AI_HEDGE="${AI_HEDGE}"
+export AI_CLASS_LIMITS="${AI_CLASS_LIMITS}"
+export AI_SYSTEM_PROMPT="${AI_SYSTEM_PROMPT}"
+export OLLAMA_KEEP_ALIVE="${OLLAMA_KEEP_ALIVE}"
+export AI_ENTITY_CONTEXT="${AI_ENTITY_CONTEXT}"
+export ENTITY_INDEX_INT8="${ENTITY_INDEX_INT8}"
+export AI_TOKEN_COSTS="${AI_TOKEN_COSTS}"
+export HEALTH_CHECK_INTERVAL="${HEALTH_CHECK_INTERVAL}"
+export AI_CACHE_SIZE="${AI_CACHE_SIZE}"
+export AI_CACHE_TTL="${AI_CACHE_TTL}"
+export AI_CACHE_PERSIST="${AI_CACHE_PERSIST}"
+export AI_DEDUP="${AI_DEDUP}"
 
 # Application settings
 export LOG_LEVEL="${LOG_LEVEL}"
 export ENABLE_TERMINAL="${ENABLE_TERMINAL}"
 export TERMINAL_PORT="${TERMINAL_PORT}"
+export SERVER_MODE="${SERVER_MODE}"
+export JSON_SERIALIZER="${JSON_SERIALIZER}"
 export ENABLE_MONITORING="${ENABLE_MONITORING}"
 export MONITOR_INTERVAL="${MONITOR_INTERVAL}"
 
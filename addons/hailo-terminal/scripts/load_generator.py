@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Load Generator for Hailo AI Terminal
+
+Sends ``ai_query`` events over Socket.IO at a target rate and reports
+throughput and latency percentiles, for benchmarking backend changes,
+for example against mock_llm_server.py:
+
+    python3 load_generator.py --url http://localhost:8080 --qps 5 \\
+        --duration 30 --connections 16 --json results.json
+
+Load is open-loop: query ``i`` is due at ``i / qps`` seconds whether or
+not earlier ones have finished. Every connection has at most one query
+in flight (the terminal answers on the client's own session). A query
+that finds every connection busy waits for one, and its latencies still
+count from when it was due, so a slow server cannot hide its queueing
+behind a slower send rate.
+
+Reported latencies:
+
+- ``ttft``: from when the query was due to its first ``ai_token`` frame
+  (streamed queries only)
+- ``latency``: from when the query was due to its ``ai_response``
+- ``send_delay``: how long a due query waited for a free connection
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import socketio
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERIES = (
+    'Is the kitchen light on?',
+    'What is the temperature in the bedroom?',
+    'Suggest an automation for the porch light at sunset',
+    'Which doors are open?',
+    'Why is the CPU usage high?'
+)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (0-100) of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    """Latency summary in milliseconds."""
+    return {
+        'count': len(values),
+        'avg_ms': round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+        'p50_ms': round(percentile(values, 50) * 1000, 2),
+        'p90_ms': round(percentile(values, 90) * 1000, 2),
+        'p99_ms': round(percentile(values, 99) * 1000, 2),
+        'max_ms': round(max(values) * 1000, 2) if values else 0.0
+    }
+
+
+@dataclass
+class PendingQuery:
+    """A query in flight on one connection."""
+    query: str
+    due: float
+    sent: Optional[float] = None
+    first_token: Optional[float] = None
+    done: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+class Connection:
+    """One Socket.IO client carrying one query at a time."""
+
+    def __init__(self, url: str, transports: List[str], socketio_path: str):
+        self.url = url
+        self.transports = transports
+        self.socketio_path = socketio_path
+        self.pending: Optional[PendingQuery] = None
+        self.client = socketio.AsyncClient(reconnection=False)
+        self.client.on('ai_token', self._on_token)
+        self.client.on('ai_response', self._on_response)
+
+    async def connect(self):
+        await self.client.connect(self.url, transports=self.transports,
+                                  socketio_path=self.socketio_path)
+
+    async def close(self):
+        if self.client.connected:
+            await self.client.disconnect()
+
+    def _on_token(self, data):
+        pending = self.pending
+        if pending is not None and pending.first_token is None and (data or {}).get('text'):
+            pending.first_token = time.monotonic()
+
+    def _on_response(self, data):
+        pending = self.pending
+        data = data or {}
+        # Responses carry the query; anything else is left over from
+        # an earlier query
+        if pending is not None and data.get('query') == pending.query and not pending.done.done():
+            pending.done.set_result(data)
+
+    async def ask(self, pending: PendingQuery, stream: bool, timeout: float) -> Dict[str, Any]:
+        """Send a query and wait for its response."""
+        self.pending = pending
+        pending.sent = time.monotonic()
+        try:
+            await self.client.emit('ai_query', {'query': pending.query, 'stream': stream})
+            return await asyncio.wait_for(pending.done, timeout)
+        finally:
+            self.pending = None
+
+
+@dataclass
+class LoadResult:
+    """Outcome of a load run."""
+    target_qps: float
+    duration: float = 0.0
+    sent: int = 0
+    completed: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    latency: List[float] = field(default_factory=list)
+    ttft: List[float] = field(default_factory=list)
+    send_delay: List[float] = field(default_factory=list)
+    error_messages: Dict[str, int] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'target_qps': self.target_qps,
+            'achieved_qps': round(self.completed / self.duration, 2) if self.duration else 0.0,
+            'duration_s': round(self.duration, 2),
+            'sent': self.sent,
+            'completed': self.completed,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'latency': summarize(self.latency),
+            'ttft': summarize(self.ttft),
+            'send_delay': summarize(self.send_delay),
+            'error_messages': dict(sorted(self.error_messages.items(),
+                                          key=lambda item: -item[1])[:10])
+        }
+
+
+async def run_load(url: str, qps: float, duration: float, connections: int = 8,
+                   queries: Optional[List[str]] = None, stream: bool = True,
+                   timeout: float = 60.0, unique: bool = True,
+                   transports: Optional[List[str]] = None,
+                   socketio_path: str = 'socket.io') -> LoadResult:
+    """Drive ``ai_query`` at ``qps`` for ``duration`` seconds.
+
+    Args:
+        url: Terminal base URL
+        qps: Queries per second to send
+        duration: Seconds to send for; in-flight queries are then awaited
+        connections: Socket.IO clients, the most queries in flight
+        queries: Query texts, used in turn
+        stream: Ask for streamed tokens
+        timeout: Seconds a query may take before it counts as timed out
+        unique: Number every query so response caches do not answer it
+        transports: Engine.IO transports, websocket by default
+        socketio_path: Socket.IO endpoint path
+    """
+    transports = transports or ['websocket']
+    texts = itertools.cycle(queries or DEFAULT_QUERIES)
+    result = LoadResult(target_qps=qps)
+
+    idle: asyncio.Queue = asyncio.Queue()
+    pool = [Connection(url, transports, socketio_path) for _ in range(max(1, connections))]
+    await asyncio.gather(*(connection.connect() for connection in pool))
+    for connection in pool:
+        idle.put_nowait(connection)
+
+    async def send(number: int, due: float):
+        connection = await idle.get()
+        text = next(texts)
+        pending = PendingQuery(f'{text} (#{number})' if unique else text, due)
+        result.sent += 1
+        try:
+            response = await connection.ask(pending, stream, timeout)
+        except asyncio.TimeoutError:
+            result.timeouts += 1
+            # Late events of the abandoned query must not reach the next one
+            await connection.close()
+            connection = Connection(url, transports, socketio_path)
+            await connection.connect()
+            return
+        except Exception as e:
+            result.errors += 1
+            result.error_messages[str(e)] = result.error_messages.get(str(e), 0) + 1
+            return
+        finally:
+            idle.put_nowait(connection)
+            result.send_delay.append(pending.sent - due)
+
+        finished = time.monotonic()
+        if response.get('error'):
+            result.errors += 1
+            message = str(response['error'])[:120]
+            result.error_messages[message] = result.error_messages.get(message, 0) + 1
+            return
+        result.completed += 1
+        result.latency.append(finished - due)
+        if pending.first_token is not None:
+            result.ttft.append(pending.first_token - due)
+
+    started = time.monotonic()
+    tasks = []
+    total = int(qps * duration)
+    try:
+        for number in range(total):
+            due = started + number / qps
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(number, due)))
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        result.duration = time.monotonic() - started
+        connections_left = []
+        while not idle.empty():
+            connections_left.append(idle.get_nowait())
+        await asyncio.gather(*(c.close() for c in connections_left), return_exceptions=True)
+    return result
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"Target {report['target_qps']} qps, achieved {report['achieved_qps']} qps "
+          f"over {report['duration_s']} s")
+    print(f"Sent {report['sent']}, completed {report['completed']}, "
+          f"errors {report['errors']}, timeouts {report['timeouts']}")
+    for name in ('latency', 'ttft', 'send_delay'):
+        stats = report[name]
+        if stats['count']:
+            print(f"  {name:<10} p50 {stats['p50_ms']:>9.1f} ms  p90 {stats['p90_ms']:>9.1f} ms  "
+                  f"p99 {stats['p99_ms']:>9.1f} ms  max {stats['max_ms']:>9.1f} ms")
+    for message, count in report['error_messages'].items():
+        print(f"  {count:>5} x {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Socket.IO load generator for ai_query")
+    parser.add_argument('--url', default='http://localhost:8080')
+    parser.add_argument('--qps', type=float, default=2.0)
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--connections', type=int, default=8,
+                        help="Socket.IO clients, the most queries in flight")
+    parser.add_argument('--query', action='append',
+                        help="Query text; repeat for several (default: built-in set)")
+    parser.add_argument('--no-stream', action='store_true', help="Ask for unstreamed responses")
+    parser.add_argument('--repeat-queries', action='store_true',
+                        help="Send query texts unchanged, allowing cache hits")
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--polling', action='store_true',
+                        help="Use long-polling instead of WebSocket")
+    parser.add_argument('--json', help="Write the report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    result = asyncio.run(run_load(
+        args.url, args.qps, args.duration, args.connections, args.query,
+        stream=not args.no_stream, timeout=args.timeout, unique=not args.repeat_queries,
+        transports=['polling'] if args.polling else ['websocket']
+    ))
+    report = result.to_dict()
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
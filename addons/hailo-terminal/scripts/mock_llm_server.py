@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Mock LLM Server for Hailo AI Terminal
+
+Answers the OpenAI chat completions, Anthropic messages and Ollama
+generate APIs locally, streamed or not, so the AI backends can be
+exercised and benchmarked without network access or a GPU. Replies are
+deterministic filler text. Latency before the first token, tokens per
+second and error injection are configurable:
+
+    python3 mock_llm_server.py --port 8808 --tokens-per-second 40 \\
+        --latency lognormal:150,0.5 --error-rate 0.02 --stream-error-rate 0.01
+
+Latency distributions, in milliseconds:
+
+- ``constant:MS`` (or just ``MS``)
+- ``uniform:LOW-HIGH``
+- ``normal:MEAN,STDDEV``
+- ``lognormal:MEDIAN,SIGMA``
+- ``exponential:MEAN``
+
+Point the add-on at it with:
+
+    openai_api_url: http://localhost:8808/v1/chat/completions
+    anthropic_api_url: http://localhost:8808/v1/messages
+    custom_api_url: http://localhost:8808        (Ollama; the custom
+                                                  backend posts to /)
+
+``GET /stats`` reports requests, streams, injected errors and the
+number of requests in flight.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+WORDS = ('the', 'light', 'sensor', 'kitchen', 'is', 'on', 'off', 'door', 'garage',
+         'temperature', 'automation', 'motion', 'will', 'turn', 'at', 'sunset',
+         'bedroom', 'humidity', 'porch', 'scene', 'and', 'when', 'home', 'away')
+
+
+class Latency:
+    """A latency distribution parsed from a spec such as ``lognormal:150,0.5``."""
+
+    KINDS = ('constant', 'uniform', 'normal', 'lognormal', 'exponential')
+
+    def __init__(self, spec: str = '0', seed: Optional[int] = None):
+        self.spec = spec
+        kind, _, args = str(spec).partition(':')
+        if not args:
+            kind, args = 'constant', kind
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution '{kind}'")
+        separator = '-' if kind == 'uniform' else ','
+        self.kind = kind
+        self.args = [float(value) for value in args.split(separator)]
+        self._random = random.Random(seed)
+
+    def sample(self) -> float:
+        """One latency, in seconds."""
+        kind, args, rng = self.kind, self.args, self._random
+        if kind == 'constant':
+            millis = args[0]
+        elif kind == 'uniform':
+            millis = rng.uniform(args[0], args[1])
+        elif kind == 'normal':
+            millis = rng.gauss(args[0], args[1])
+        elif kind == 'lognormal':
+            millis = args[0] * rng.lognormvariate(0, args[1])
+        else:
+            millis = rng.expovariate(1 / args[0]) if args[0] > 0 else 0
+        return max(0.0, millis) / 1000
+
+
+@dataclass
+class MockProfile:
+    """How the mock server behaves."""
+    tokens_per_second: float = 50.0  # 0 sends every token at once
+    latency: Latency = field(default_factory=Latency)  # Before the first token
+    reply_tokens: int = 32  # Capped by the request's max_tokens
+    error_rate: float = 0.0  # Requests answered with an error status
+    error_statuses: Tuple[int, ...] = (500, 503, 429)
+    stream_error_rate: float = 0.0  # Streams broken off halfway
+    model: str = ''  # Reported model; defaults to the requested one
+    seed: Optional[int] = None
+
+
+def count_tokens(text: str) -> int:
+    """Whitespace token count, standing in for a tokenizer."""
+    return len(text.split())
+
+
+def reply_words(prompt: str, count: int) -> List[str]:
+    """Deterministic filler reply to a prompt."""
+    start = zlib.crc32(prompt.encode('utf-8'))
+    return [WORDS[(start + i * 7) % len(WORDS)] for i in range(count)]
+
+
+def _word_id(word: str) -> int:
+    return zlib.crc32(word.encode('utf-8')) % 32000
+
+
+class MockLLMServer:
+    """aiohttp application serving the mocked LLM APIs."""
+
+    def __init__(self, profile: Optional[MockProfile] = None):
+        self.profile = profile or MockProfile()
+        self._random = random.Random(self.profile.seed)
+        self.requests: Dict[str, int] = {'openai': 0, 'anthropic': 0, 'ollama': 0}
+        self.streams = 0
+        self.errors = 0
+        self.stream_errors = 0
+        self.active = 0
+
+        self.app = web.Application()
+        self.app.router.add_post('/v1/chat/completions', self.openai)
+        self.app.router.add_post('/', self.openai)
+        self.app.router.add_post('/v1/messages', self.anthropic)
+        self.app.router.add_post('/api/generate', self.ollama)
+        self.app.router.add_get('/api/tags', self.tags)
+        self.app.router.add_get('/stats', self.stats)
+
+    # Shared behaviour
+
+    def _inject_error(self) -> Optional[int]:
+        """Status of an injected error, or None."""
+        if self.profile.error_rate and self._random.random() < self.profile.error_rate:
+            self.errors += 1
+            return self._random.choice(self.profile.error_statuses)
+        return None
+
+    def _break_stream(self) -> bool:
+        if self.profile.stream_error_rate and self._random.random() < self.profile.stream_error_rate:
+            self.stream_errors += 1
+            return True
+        return False
+
+    def _reply(self, prompt: str, max_tokens: Optional[int]) -> List[str]:
+        count = self.profile.reply_tokens
+        if max_tokens:
+            count = min(count, int(max_tokens))
+        return reply_words(prompt, count)
+
+    async def _tokens(self, words: List[str]):
+        """Yield reply tokens at the configured rate, after the first-token latency."""
+        await asyncio.sleep(self.profile.latency.sample())
+        interval = 1 / self.profile.tokens_per_second if self.profile.tokens_per_second > 0 else 0
+        for index, word in enumerate(words):
+            if index and interval:
+                await asyncio.sleep(interval)
+            yield index, f'{word} ' if index < len(words) - 1 else word
+
+    async def _generation_time(self, words: List[str]):
+        """Wait as long as streaming the reply would take."""
+        rate = self.profile.tokens_per_second
+        await asyncio.sleep(self.profile.latency.sample()
+                            + (max(0, len(words) - 1) / rate if rate > 0 else 0))
+
+    @staticmethod
+    async def _start_stream(request: web.Request, content_type: str) -> web.StreamResponse:
+        response = web.StreamResponse(headers={'Content-Type': content_type,
+                                               'Cache-Control': 'no-cache'})
+        await response.prepare(request)
+        return response
+
+    @staticmethod
+    def _sse(data: Any, event: Optional[str] = None) -> bytes:
+        prefix = f'event: {event}\n' if event else ''
+        payload = data if isinstance(data, str) else json.dumps(data)
+        return f'{prefix}data: {payload}\n\n'.encode('utf-8')
+
+    def _model(self, body: Dict[str, Any]) -> str:
+        return self.profile.model or body.get('model') or 'mock'
+
+    async def _serve(self, protocol: str, request: web.Request, handler) -> web.StreamResponse:
+        self.requests[protocol] += 1
+        self.active += 1
+        try:
+            body = await request.json()
+            status = self._inject_error()
+            if status is not None:
+                return self._error_response(protocol, status)
+            if body.get('stream', protocol == 'ollama'):
+                self.streams += 1
+            return await handler(request, body)
+        finally:
+            self.active -= 1
+
+    @staticmethod
+    def _error_response(protocol: str, status: int) -> web.Response:
+        message = f'Injected error {status}'
+        if protocol == 'anthropic':
+            body = {'type': 'error', 'error': {'type': 'api_error', 'message': message}}
+        elif protocol == 'ollama':
+            body = {'error': message}
+        else:
+            body = {'error': {'message': message, 'type': 'server_error'}}
+        headers = {'Retry-After': '1'} if status == 429 else None
+        return web.json_response(body, status=status, headers=headers)
+
+    # OpenAI chat completions
+
+    async def openai(self, request: web.Request) -> web.StreamResponse:
+        return await self._serve('openai', request, self._openai)
+
+    async def _openai(self, request: web.Request, body: Dict[str, Any]) -> web.StreamResponse:
+        messages = body.get('messages') or []
+        prompt = '\n'.join(str(message.get('content', '')) for message in messages)
+        words = self._reply(prompt, body.get('max_tokens'))
+        usage = {'prompt_tokens': count_tokens(prompt), 'completion_tokens': len(words),
+                 'total_tokens': count_tokens(prompt) + len(words)}
+        model = self._model(body)
+        created = int(time.time())
+
+        if not body.get('stream'):
+            await self._generation_time(words)
+            return web.json_response({
+                'id': f'chatcmpl-mock{created}', 'object': 'chat.completion',
+                'created': created, 'model': model,
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': ' '.join(words)}}],
+                'usage': usage
+            })
+
+        response = await self._start_stream(request, 'text/event-stream')
+        async for index, text in self._tokens(words):
+            if index == len(words) // 2 and self._break_stream():
+                # Dropped connection, as when a proxy or the server dies
+                if request.transport is not None:
+                    request.transport.close()
+                return response
+            await response.write(self._sse({
+                'id': f'chatcmpl-mock{created}', 'object': 'chat.completion.chunk',
+                'created': created, 'model': model,
+                'choices': [{'index': 0, 'delta': {'content': text}, 'finish_reason': None}]
+            }))
+        if (body.get('stream_options') or {}).get('include_usage'):
+            await response.write(self._sse({'model': model, 'choices': [], 'usage': usage}))
+        await response.write(self._sse('[DONE]'))
+        return response
+
+    # Anthropic messages
+
+    async def anthropic(self, request: web.Request) -> web.StreamResponse:
+        return await self._serve('anthropic', request, self._anthropic)
+
+    async def _anthropic(self, request: web.Request, body: Dict[str, Any]) -> web.StreamResponse:
+        messages = body.get('messages') or []
+        prompt = '\n'.join([str(body.get('system', ''))]
+                           + [str(message.get('content', '')) for message in messages])
+        words = self._reply(prompt, body.get('max_tokens'))
+        model = self._model(body)
+        message_id = f'msg_mock{int(time.time())}'
+
+        if not body.get('stream'):
+            await self._generation_time(words)
+            return web.json_response({
+                'id': message_id, 'type': 'message', 'role': 'assistant', 'model': model,
+                'content': [{'type': 'text', 'text': ' '.join(words)}],
+                'stop_reason': 'end_turn',
+                'usage': {'input_tokens': count_tokens(prompt), 'output_tokens': len(words)}
+            })
+
+        response = await self._start_stream(request, 'text/event-stream')
+        await response.write(self._sse({'type': 'message_start', 'message': {
+            'id': message_id, 'type': 'message', 'role': 'assistant', 'model': model,
+            'content': [], 'usage': {'input_tokens': count_tokens(prompt), 'output_tokens': 0}
+        }}, 'message_start'))
+        await response.write(self._sse({'type': 'content_block_start', 'index': 0,
+                                        'content_block': {'type': 'text', 'text': ''}},
+                                       'content_block_start'))
+        async for index, text in self._tokens(words):
+            if index == len(words) // 2 and self._break_stream():
+                await response.write(self._sse({'type': 'error', 'error': {
+                    'type': 'overloaded_error', 'message': 'Injected stream error'}}, 'error'))
+                return response
+            await response.write(self._sse({'type': 'content_block_delta', 'index': 0,
+                                            'delta': {'type': 'text_delta', 'text': text}},
+                                           'content_block_delta'))
+        await response.write(self._sse({'type': 'content_block_stop', 'index': 0},
+                                       'content_block_stop'))
+        await response.write(self._sse({'type': 'message_delta',
+                                        'delta': {'stop_reason': 'end_turn'},
+                                        'usage': {'output_tokens': len(words)}},
+                                       'message_delta'))
+        await response.write(self._sse({'type': 'message_stop'}, 'message_stop'))
+        return response
+
+    # Ollama generate
+
+    async def ollama(self, request: web.Request) -> web.StreamResponse:
+        return await self._serve('ollama', request, self._ollama)
+
+    async def _ollama(self, request: web.Request, body: Dict[str, Any]) -> web.StreamResponse:
+        prompt = str(body.get('prompt', ''))
+        options = body.get('options') or {}
+        words = self._reply(prompt, options.get('num_predict'))
+        model = self._model(body)
+        # Context tokens the caller evaluated before, then this prompt and reply
+        context = list(body.get('context') or []) + [_word_id(w) for w in prompt.split()]
+        prompt_tokens = count_tokens(prompt)
+        started = time.perf_counter()
+
+        def final(text: str) -> Dict[str, Any]:
+            elapsed = int((time.perf_counter() - started) * 1e9)
+            return {
+                'model': model, 'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'response': text, 'done': True, 'done_reason': 'stop',
+                'context': context + [_word_id(w) for w in words],
+                'total_duration': elapsed,
+                'prompt_eval_count': prompt_tokens,
+                'prompt_eval_duration': prompt_tokens * 100_000,
+                'eval_count': len(words),
+                'eval_duration': elapsed
+            }
+
+        if not body.get('stream', True):
+            await self._generation_time(words)
+            return web.json_response(final(' '.join(words)))
+
+        response = await self._start_stream(request, 'application/x-ndjson')
+        async for index, text in self._tokens(words):
+            if index == len(words) // 2 and self._break_stream():
+                await response.write(b'{"error": "Injected stream error"}\n')
+                return response
+            await response.write((json.dumps({'model': model, 'response': text,
+                                               'done': False}) + '\n').encode('utf-8'))
+        await response.write((json.dumps(final('')) + '\n').encode('utf-8'))
+        return response
+
+    async def tags(self, request: web.Request) -> web.Response:
+        return web.json_response({'models': [{'name': self.profile.model or 'mock'}]})
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.get_stats())
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'requests': dict(self.requests),
+            'streams': self.streams,
+            'errors': self.errors,
+            'stream_errors': self.stream_errors,
+            'active': self.active
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline OpenAI/Anthropic/Ollama mock server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8808)
+    parser.add_argument('--tokens-per-second', type=float, default=50.0,
+                        help="Streaming rate (0 sends every token at once)")
+    parser.add_argument('--latency', default='0',
+                        help="Time to first token in ms, e.g. 200 or lognormal:150,0.5")
+    parser.add_argument('--reply-tokens', type=int, default=32)
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help="Fraction of requests answered with an error status")
+    parser.add_argument('--error-status', default='500,503,429',
+                        help="Error statuses injected, comma separated")
+    parser.add_argument('--stream-error-rate', type=float, default=0.0,
+                        help="Fraction of streams broken off halfway")
+    parser.add_argument('--model', default='')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    profile = MockProfile(
+        tokens_per_second=args.tokens_per_second,
+        latency=Latency(args.latency, args.seed),
+        reply_tokens=args.reply_tokens,
+        error_rate=args.error_rate,
+        error_statuses=tuple(int(s) for s in args.error_status.split(',') if s.strip()),
+        stream_error_rate=args.stream_error_rate,
+        model=args.model,
+        seed=args.seed
+    )
+    logger.info(f"Mock LLM server on http://{args.host}:{args.port}: "
+                f"{profile.tokens_per_second} tokens/s, latency {profile.latency.spec} ms, "
+                f"{profile.error_rate:.0%} errors")
+    web.run_app(MockLLMServer(profile).app, host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,14 +11,32 @@ Supports multiple AI backends:
 """
 
 import os
+import time
 import logging
 import json
-import requests
 import asyncio
-from typing import Optional, Dict, Any, List
-from dataclasses import dataclass
+import threading
+import aiohttp
+from typing import Optional, Dict, Any, List, AsyncIterator, Callable, Set
+from dataclasses import dataclass, replace
 from abc import ABC, abstractmethod
 
+from response_cache import fingerprint
+from backend_accounting import BackendAccounting, GenerationTiming, connection_tracing, usage_tokens
+from completion_cache import CompletionCache
+from inflight_requests import InflightRequests
+from backend_health import HealthProber
+from backend_router import BackendRouter, RouteFailure
+from conversation_memory import ConversationStore, fit_messages
+from conversation_summary import ConversationSummarizer, DEFAULT_KEEP_RECENT
+from inference_queue import InferenceQueue, INTERACTIVE, BACKGROUND
+from prompt_prefix import PromptPrefix, PrefixStats
+from hailo_tokenizer import Tokenizer, load_tokenizer
+from hailo_decoder import (HailoDecoder, GenerationResult, SamplingParams,
+                           DEFAULT_TOP_K, DEFAULT_TOP_P)
+from hailo_scheduler import DEFAULT_PRIORITIES
+from hailo_models import HailoModelManager, HEFLoader, ResidentModel, DEFAULT_MEMORY_BUDGET_MB
+
 # Import Hailo runtime (if available)
 try:
     from hailo_platform import HEF, VDevice, HailoStreamInterface, InferVStreams, ConfigureParams
@@ -38,10 +56,83 @@ class AIResponse:
     model: Optional[str] = None
     backend: Optional[str] = None
     error: Optional[str] = None
+    ttft: Optional[float] = None  # Seconds to first streamed token
+    cached: bool = False
+    shared: bool = False  # Generated once for identical concurrent requests
+
+
+@dataclass
+class StreamChunk:
+    """One increment of a streamed AI response.
+    
+    The last chunk of a stream may carry only usage and model details.
+    """
+    text: str = ""
+    usage: Optional[Dict[str, int]] = None
+    model: Optional[str] = None
+    error: Optional[str] = None
+
+
+# Longest gap allowed between streamed chunks
+STREAM_READ_TIMEOUT = 60
+
+# Idle keep-alive connections are kept this long for reuse
+KEEPALIVE_TIMEOUT = 30
+
+# Backends running on this machine, preferred for housekeeping work
+LOCAL_BACKENDS = ('hailo', 'ollama')
+
+
+async def iter_sse_events(response: aiohttp.ClientResponse) -> AsyncIterator[tuple]:
+    """Parse a server-sent events body into ``(event, data)`` pairs."""
+    event, data_lines = None, []
+    async for raw_line in response.content:
+        line = raw_line.decode('utf-8').rstrip('\r\n')
+        if not line:
+            if data_lines:
+                yield event or 'message', '\n'.join(data_lines)
+            event, data_lines = None, []
+            continue
+        if line.startswith(':'):
+            continue
+        field, _, value = line.partition(':')
+        if value.startswith(' '):
+            value = value[1:]
+        if field == 'event':
+            event = value
+        elif field == 'data':
+            data_lines.append(value)
+    if data_lines:
+        yield event or 'message', '\n'.join(data_lines)
+
+
+async def iter_ndjson(response: aiohttp.ClientResponse) -> AsyncIterator[Dict[str, Any]]:
+    """Parse a newline-delimited JSON body into objects."""
+    async for raw_line in response.content:
+        line = raw_line.strip()
+        if line:
+            yield json.loads(line)
+
+
+async def _http_error(response: aiohttp.ClientResponse) -> str:
+    """Describe a failed HTTP response for a stream error chunk."""
+    body = await response.text()
+    return f"HTTP {response.status}: {body[:200]}"
 
 
 class AIBackend(ABC):
-    """Abstract base class for AI backends."""
+    """Abstract base class for AI backends.
+    
+    HTTP backends share one pooled aiohttp session per backend, with
+    keep-alive connections and at most ``max_connections`` requests in
+    flight to that backend. Requests run on the caller's event loop and
+    are aborted when the calling task is cancelled.
+    """
+    
+    # Concurrent connections to this backend's API
+    max_connections = 4
+    # Total time allowed for a non-streamed completion
+    request_timeout = 30
     
     def __init__(self, config: Dict[str, Any]):
         self.config = config
@@ -49,17 +140,110 @@ class AIBackend(ABC):
         self.max_tokens = config.get('max_tokens', 512)
         self.temperature = config.get('temperature', 0.7)
         self.max_context_length = config.get('max_context_length', 4096)
+        self.prefix_stats = PrefixStats()
+        self._session: Optional[aiohttp.ClientSession] = None
     
     @abstractmethod
-    async def generate_response(self, prompt: str, context: List[Dict[str, str]] = None) -> AIResponse:
-        """Generate AI response for the given prompt."""
+    async def generate_response(self, prompt: str, context: List[Dict[str, str]] = None,
+                                priority: Optional[str] = None) -> AIResponse:
+        """Generate AI response for the given prompt.
+        
+        ``priority`` is the scheduling class of the request on backends
+        that share a device between requests (Hailo); others ignore it.
+        """
+        pass
+    
+    async def stream_response(self, prompt: str,
+                              context: List[Dict[str, str]] = None,
+                              priority: Optional[str] = None
+                              ) -> AsyncIterator[StreamChunk]:
+        """Generate AI response as a stream of text chunks.
+        
+        Backends without native streaming yield the full completion as a
+        single chunk.
+        """
+        response = await self.generate_response(prompt, context, priority)
+        yield StreamChunk(text=response.content, usage=response.usage,
+                          model=response.model, error=response.error)
+    
+    async def switch_model(self, model: str) -> bool:
+        """Use another model for subsequent requests."""
+        self.model = model
+        return True
+    
+    def set_prompt_prefix(self, prefix: PromptPrefix):
+        """Called when the shared prompt prefix changes.
+        
+        Backends that keep evaluated prompt state drop it here. The prefix
+        itself always arrives as the first, system, context message.
+        """
         pass
     
+    def sampling_params(self) -> Dict[str, Any]:
+        """Parameters that change the completion for a given prompt."""
+        return {'temperature': self.temperature, 'max_tokens': self.max_tokens}
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Get or create the pooled aiohttp session for this backend."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=300
+            )
+            # Streams may run long; only connect and inter-chunk gaps are
+            # bounded by default
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(
+                    total=None, sock_connect=10, sock_read=STREAM_READ_TIMEOUT
+                ),
+                trace_configs=[connection_tracing()]
+            )
+        return self._session
+    
+    async def _post_json(self, url: str, data: Dict[str, Any],
+                         headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """POST a JSON request and return the decoded JSON response.
+        
+        Raises:
+            aiohttp.ClientError: On connection errors and non-2xx statuses
+            asyncio.TimeoutError: If ``request_timeout`` is exceeded
+        """
+        session = await self._get_session()
+        async with session.post(
+            url, json=data, headers=headers,
+            timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+        ) as response:
+            if response.status >= 400:
+                raise aiohttp.ClientResponseError(
+                    response.request_info, response.history,
+                    status=response.status, message=(await response.text())[:200]
+                )
+            return await response.json(content_type=None)
+    
+    async def close(self):
+        """Close the HTTP session."""
+        if self._session and not self._session.closed:
+            await self._session.close()
+    
     @abstractmethod
     def is_available(self) -> bool:
-        """Check if backend is available and properly configured."""
+        """Check if backend is available and properly configured.
+        
+        Must not block: it is called from status endpoints.
+        """
         pass
     
+    async def probe(self) -> bool:
+        """Check whether the backend can serve requests right now.
+        
+        Run periodically by the health prober. Backends that depend on a
+        remote service override this to contact it; the default only
+        repeats the local configuration check.
+        """
+        return self.is_available()
+    
     @abstractmethod
     def get_status(self) -> Dict[str, Any]:
         """Get current backend status and configuration."""
@@ -69,6 +253,9 @@ class AIBackend(ABC):
 class HailoBackend(AIBackend):
     """Hailo AI accelerator backend for local inference."""
     
+    # Input sequence length when the model does not report one
+    DEFAULT_SEQ_LEN = 512
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.device_id = config.get('device_id', '0000:03:00.0')
@@ -76,6 +263,21 @@ class HailoBackend(AIBackend):
         self.hef_file = None
         self.vdevice = None
         self.infer_model = None
+        self.tokenizer = load_tokenizer(self.model_path, self.model)
+        self.seq_len = self.DEFAULT_SEQ_LEN
+        self.decoder: Optional[HailoDecoder] = None
+        self.sampling = SamplingParams(
+            temperature=self.temperature,
+            top_k=int(config.get('hailo_top_k', DEFAULT_TOP_K)),
+            top_p=float(config.get('hailo_top_p', DEFAULT_TOP_P))
+        )
+        self.batch_size = int(config.get('hailo_batch_size', 0))
+        self.batch_window = float(config.get('hailo_batch_window_ms', 2)) / 1000.0
+        self.priorities = tuple(config.get('hailo_priority_classes') or DEFAULT_PRIORITIES)
+        self.preload_models = list(config.get('hailo_models') or [])
+        self.model_memory = int(config.get('hailo_model_memory_mb', DEFAULT_MEMORY_BUDGET_MB)) * 1048576
+        self.models: Optional[HailoModelManager] = None
+        self.prefix_text = ''
         self._initialize_hailo()
     
     def _initialize_hailo(self):
@@ -85,24 +287,15 @@ class HailoBackend(AIBackend):
             return
         
         try:
-            # Find model file
-            model_file = f"{self.model_path}/{self.model}.hef"
-            if not os.path.exists(model_file):
-                logger.error(f"Hailo model not found: {model_file}")
-                return
-            
-            # Load HEF file
-            self.hef_file = HEF(model_file)
-            
             # Create VDevice
             self.vdevice = VDevice(device_id=self.device_id)
             
-            # Configure network group
-            network_group = self.vdevice.configure(self.hef_file)[0]
-            network_group_params = network_group.create_params()
-            
-            # Create input/output streams
-            self.infer_model = self.vdevice.create_infer_model(self.hef_file)
+            # Models are parsed and configured on demand and kept resident
+            self.models = HailoModelManager(
+                self.model_path, HEFLoader(self.vdevice), self._build_runtime,
+                self.model_memory, preload=self.preload_models
+            )
+            self._activate(self.models.switch(self.model))
             
             logger.info(f"Hailo model loaded successfully: {self.model}")
             
@@ -111,185 +304,174 @@ class HailoBackend(AIBackend):
             self.hef_file = None
             self.vdevice = None
     
-    async def generate_response(self, prompt: str, context: List[Dict[str, str]] = None) -> AIResponse:
+    def _build_runtime(self, name: str, infer_model: Any) -> HailoDecoder:
+        """Tokenizer and decoder of a newly configured model."""
+        tokenizer = load_tokenizer(self.model_path, name)
+        decoder = self._create_decoder(infer_model, tokenizer)
+        decoder.set_prefix(self.prefix_text)
+        return decoder
+    
+    def _activate(self, resident: ResidentModel):
+        """Serve requests from a resident model."""
+        self.model = resident.name
+        self.hef_file = resident.hef
+        self.infer_model = resident.infer_model
+        self.decoder = resident.runtime
+        self.tokenizer = self.decoder.tokenizer
+        self.seq_len = self.decoder.seq_len
+    
+    async def switch_model(self, model: str) -> bool:
+        """Switch to another HEF without restarting, loading it if needed."""
+        if self.models is None:
+            return False
+        try:
+            resident = await asyncio.to_thread(self.models.switch, model)
+        except Exception as e:
+            logger.error(f"Failed to switch Hailo model to {model}: {e}")
+            return False
+        self._activate(resident)
+        return True
+    
+    def set_prompt_prefix(self, prefix: PromptPrefix):
+        """Snapshot the KV cache of the new prefix on its next prefill."""
+        message = prefix.message()
+        self.prefix_text = self._format_message(message) + "\n" if message else ''
+        decoders = self.models.runtimes() if self.models else [self.decoder]
+        for decoder in decoders:
+            if decoder is not None:
+                decoder.set_prefix(self.prefix_text)
+    
+    async def generate_response(self, prompt: str, context: List[Dict[str, str]] = None,
+                                priority: Optional[str] = None) -> AIResponse:
         """Generate response using Hailo-accelerated model."""
-        if not self.is_available():
-            return AIResponse(
-                content="",
-                error="Hailo backend not available",
-                backend="hailo"
-            )
+        parts = []
+        usage = None
+        error = None
+        async for chunk in self.stream_response(prompt, context, priority):
+            if chunk.error:
+                error = chunk.error
+            if chunk.text:
+                parts.append(chunk.text)
+            if chunk.usage:
+                usage = chunk.usage
+        return AIResponse(
+            content=''.join(parts),
+            model=self.model,
+            backend="hailo",
+            usage=usage,
+            error=error
+        )
+    
+    async def stream_response(self, prompt: str,
+                              context: List[Dict[str, str]] = None,
+                              priority: Optional[str] = None
+                              ) -> AsyncIterator[StreamChunk]:
+        """Stream the response as the decode loop produces text."""
+        if not self.is_available() or self.decoder is None:
+            yield StreamChunk(error="Hailo backend not available")
+            return
         
+        input_text = self._prepare_input(prompt, context)
         try:
-            # Prepare input for the model
-            input_text = self._prepare_input(prompt, context)
-            
-            # Run inference (simplified - actual implementation depends on model format)
-            # This is a placeholder - real implementation would depend on the specific
-            # Hailo model format and preprocessing requirements
-            result = await self._run_inference(input_text)
-            
-            return AIResponse(
-                content=result,
-                model=self.model,
-                backend="hailo",
-                usage={"prompt_tokens": len(prompt.split()), "completion_tokens": len(result.split())}
-            )
-            
+            result = None
+            async for item in self._stream_inference(input_text, priority):
+                if isinstance(item, GenerationResult):
+                    result = item
+                else:
+                    yield StreamChunk(text=item)
         except Exception as e:
             logger.error(f"Hailo inference error: {e}")
-            return AIResponse(
-                content="",
-                error=str(e),
-                backend="hailo"
-            )
+            yield StreamChunk(error=str(e))
+            return
+        
+        if result is not None and result.prefix_tokens:
+            self.prefix_stats.record(result.prefill_time,
+                                     result.prompt_tokens - result.reused_tokens,
+                                     result.prefix_reused)
+        yield StreamChunk(model=self.model, usage=result.usage() if result else None)
     
-    async def _run_inference(self, input_text: str) -> str:
-        """Run inference on Hailo device."""
-        if not self.infer_model:
-            return "Hailo model not loaded"
+    async def _stream_inference(self, input_text: str,
+                                priority: Optional[str] = None) -> AsyncIterator[Any]:
+        """Run the decode loop off the event loop.
         
+        Yields text as it is decoded, then the :class:`GenerationResult`.
+        Device calls are scheduled in ``priority``'s class, by default the
+        first (most urgent) configured class.
+        Closing the iterator stops the decode loop after its current step.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        
+        def on_text(text: str):
+            loop.call_soon_threadsafe(queue.put_nowait, text)
+        
+        decoder = self.decoder
+        # A model switch must not evict the model mid-generation
+        resident = self.models.acquire(self.model) if self.models else None
+        
+        def run():
+            return decoder.generate(input_text, self.max_tokens, self.sampling,
+                                    on_text, stop, priority or self.priorities[0])
+        
+        def finished(_):
+            if resident is not None:
+                self.models.release(resident)
+            queue.put_nowait(None)
+        
+        task = asyncio.ensure_future(asyncio.to_thread(run))
+        task.add_done_callback(finished)
         try:
-            # This is a more realistic implementation for text generation
-            # The exact implementation depends on the specific model format
-            
-            # 1. Tokenize input (simplified - real tokenization would use
-            # model-specific tokenizer)
-            tokens = self._tokenize_input(input_text)
-            
-            # 2. Prepare input tensor
-            input_data = self._prepare_input_tensor(tokens)
-            
-            # 3. Run inference using Hailo runtime
-            # Note: This is pseudo-code - actual Hailo API calls depend
-            # on model
-            with self.infer_model.create_bindings() as bindings:
-                # Set input data
-                for input_name, data in input_data.items():
-                    bindings.input(input_name)[:] = data
-                
-                # Run inference
-                bindings.infer()
-                
-                # Get output
-                output_data = {}
-                for output_name in bindings.output_names():
-                    output_data[output_name] = bindings.output(output_name)[:]
-            
-            # 4. Post-process and decode output
-            result = self._decode_output(output_data)
-            
-            return result
-            
-        except Exception as e:
-            logger.error(f"Hailo inference failed: {e}")
-            # Fallback to a helpful response
-            return self._generate_fallback_response(input_text)
-    
-    def _tokenize_input(self, text: str) -> List[int]:
-        """Tokenize input text (simplified implementation)."""
-        # This would use a proper tokenizer for the specific model
-        # For now, use a basic word-based tokenization
-        words = text.lower().split()
-        # Map to dummy token IDs (real implementation would use model
-        # vocabulary)
-        return [hash(word) % 10000 for word in words]
-    
-    def _prepare_input_tensor(self, tokens: List[int]) -> Dict[str, Any]:
-        """Prepare input tensor for Hailo model."""
-        try:
-            import numpy as np
-            # Pad or truncate to model's expected sequence length
-            max_length = 512  # Model-specific parameter
-            
-            if len(tokens) > max_length:
-                tokens = tokens[:max_length]
-            else:
-                # Pad with zeros
-                tokens.extend([0] * (max_length - len(tokens)))
-            
-            # Convert to numpy array with correct dtype
-            input_array = np.array(tokens, dtype=np.int32)
-            
-            return {"input_ids": input_array}
-            
-        except ImportError:
-            logger.error("NumPy not available for tensor preparation")
-            return {}
+            while True:
+                text = await queue.get()
+                if text is None:
+                    break
+                yield text
+            # Text is queued ahead of the completion, so none is left here
+            yield task.result()
+        finally:
+            stop.set()
+    
+    def _create_decoder(self, infer_model: Any = None,
+                        tokenizer: Optional[Tokenizer] = None) -> HailoDecoder:
+        """Decoder for a loaded model, batching concurrent generations."""
+        infer_model = infer_model or self.infer_model
+        return HailoDecoder(infer_model, tokenizer or self.tokenizer,
+                            self._model_seq_len(infer_model), self.max_context_length,
+                            batch_size=self.batch_size or None,
+                            batch_window=self.batch_window, priorities=self.priorities)
+    
+    async def close(self):
+        """Stop the batch schedulers and release resident models."""
+        if self.models is not None:
+            self.models.close()
+        elif self.decoder is not None:
+            self.decoder.close()
     
-    def _decode_output(self, output_data: Dict[str, Any]) -> str:
-        """Decode model output to text."""
+    def sampling_params(self) -> Dict[str, Any]:
+        return {'temperature': self.sampling.temperature, 'max_tokens': self.max_tokens,
+                'top_k': self.sampling.top_k, 'top_p': self.sampling.top_p}
+    
+    def _model_seq_len(self, infer_model: Any = None) -> int:
+        """Input sequence length of a loaded model."""
         try:
-            # This would use the model's specific decoding logic
-            # For now, simulate a reasonable response
-            
-            if not output_data:
-                return "Unable to process model output"
-            
-            # Simulate decoding process
-            output_tokens = output_data.get('logits', [])
-            if (hasattr(output_tokens, 'shape') and
-                    len(output_tokens.shape) > 0):
-                # Simplified decoding - real implementation would use
-                # proper vocabulary
-                decoded_text = self._tokens_to_text(output_tokens)
-                return decoded_text
-            
-            return "Model inference completed successfully"
-            
-        except Exception as e:
-            logger.error(f"Output decoding failed: {e}")
-            return "Unable to decode model output"
-    
-    def _tokens_to_text(self, tokens) -> str:
-        """Convert token IDs back to text (simplified)."""
-        # This would use the model's vocabulary and proper decoding
-        # For now, generate a contextual response
-        return ("I'm running on Hailo AI hardware to help you with "
-                "Home Assistant. How can I assist you with your "
-                "automations, configurations, or monitoring?")
-    
-    def _generate_fallback_response(self, input_text: str) -> str:
-        """Generate a helpful fallback response when inference fails."""
-        query_lower = input_text.lower()
-        
-        help_words = ['help', 'assist', 'what', 'how']
-        if any(word in query_lower for word in help_words):
-            return ("I'm your Hailo AI assistant for Home Assistant. "
-                    "I can help with automations, YAML configurations, "
-                    "troubleshooting, and system monitoring. "
-                    "What would you like help with?")
-        
-        resource_words = ['resource', 'cpu', 'memory', 'performance']
-        if any(word in query_lower for word in resource_words):
-            return ("I can monitor your system resources and provide "
-                    "optimization suggestions. Your current system status "
-                    "is available in the monitoring dashboard. "
-                    "Would you like specific performance recommendations?")
-        
-        automation_words = ['automation', 'script', 'yaml']
-        if any(word in query_lower for word in automation_words):
-            return ("I can help you create and optimize Home Assistant "
-                    "automations. What kind of automation are you trying "
-                    "to build? For example: lights, climate control, "
-                    "notifications, or device triggers?")
-        
-        else:
-            preview = input_text[:100]
-            return (f"I understand you're asking about: {preview}... "
-                    "I'm here to help with Home Assistant configurations, "
-                    "automations, and system monitoring. Could you provide "
-                    "more specific details?")
+            shape = (infer_model or self.infer_model).input('input_ids').shape
+            return int(shape[-1])
+        except Exception:
+            return self.DEFAULT_SEQ_LEN
     
     def _prepare_input(self, prompt: str,
                        context: List[Dict[str, str]] = None) -> str:
         """Prepare input text with context."""
         if context:
-            context_text = "\n".join(
-                [f"{msg['role']}: {msg['content']}" for msg in context])
+            context_text = "\n".join([self._format_message(msg) for msg in context])
             return f"{context_text}\nuser: {prompt}\nassistant:"
         return f"user: {prompt}\nassistant:"
     
+    @staticmethod
+    def _format_message(message: Dict[str, str]) -> str:
+        return f"{message['role']}: {message['content']}"
+    
     def is_available(self) -> bool:
         """Check if Hailo backend is available."""
         return (HAILO_AVAILABLE and self.hef_file is not None and
@@ -303,21 +485,28 @@ class HailoBackend(AIBackend):
             "model": self.model,
             "device_id": self.device_id,
             "model_path": self.model_path,
-            "hailo_runtime": HAILO_AVAILABLE
+            "hailo_runtime": HAILO_AVAILABLE,
+            **self.tokenizer.describe(),
+            "decoder": self.decoder.get_stats() if self.decoder else None,
+            "prompt_prefix": self.prefix_stats.to_dict(),
+            "models": self.models.get_stats() if self.models else None
         }
 
 
 class OpenAIBackend(AIBackend):
     """OpenAI API backend."""
     
+    max_connections = 8
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.api_key = config.get('openai_api_key', '')
-        self.base_url = "https://api.openai.com/v1/chat/completions"
+        self.base_url = (config.get('openai_api_url')
+                         or "https://api.openai.com/v1/chat/completions")
     
     async def generate_response(self, prompt: str,
-                                context: List[Dict[str, str]] = None
-                                ) -> AIResponse:
+                                context: List[Dict[str, str]] = None,
+                                priority: Optional[str] = None) -> AIResponse:
         """Generate response using OpenAI API."""
         if not self.is_available():
             return AIResponse(
@@ -327,30 +516,10 @@ class OpenAIBackend(AIBackend):
             )
         
         try:
-            messages = []
-            if context:
-                messages.extend(context)
-            messages.append({"role": "user", "content": prompt})
+            headers = self._headers()
+            data = self._request_body(prompt, context)
             
-            # Truncate messages if too long
-            messages = self._truncate_messages(messages)
-            
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            data = {
-                "model": self.model,
-                "messages": messages,
-                "max_tokens": self.max_tokens,
-                "temperature": self.temperature
-            }
-            
-            response = requests.post(self.base_url, headers=headers, json=data, timeout=30)
-            response.raise_for_status()
-            
-            result = response.json()
+            result = await self._post_json(self.base_url, data, headers)
             
             return AIResponse(
                 content=result['choices'][0]['message']['content'],
@@ -367,29 +536,67 @@ class OpenAIBackend(AIBackend):
                 backend="openai"
             )
     
-    def _truncate_messages(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
-        """Truncate messages to fit context length."""
-        # Simple truncation - keep system message and recent messages
-        total_length = sum(len(msg['content']) for msg in messages)
+    async def stream_response(self, prompt: str,
+                              context: List[Dict[str, str]] = None,
+                              priority: Optional[str] = None
+                              ) -> AsyncIterator[StreamChunk]:
+        """Stream response deltas from the OpenAI API (server-sent events)."""
+        if not self.is_available():
+            yield StreamChunk(error="OpenAI API key not configured")
+            return
         
-        if total_length <= self.max_context_length:
-            return messages
+        data = self._request_body(prompt, context)
+        data["stream"] = True
+        data["stream_options"] = {"include_usage": True}
         
-        # Keep system message if present
-        result = []
-        if messages and messages[0].get('role') == 'system':
-            result.append(messages[0])
-            messages = messages[1:]
+        try:
+            session = await self._get_session()
+            async with session.post(self.base_url, headers=self._headers(),
+                                    json=data) as response:
+                if response.status >= 400:
+                    yield StreamChunk(error=await _http_error(response))
+                    return
+                
+                async for _, payload in iter_sse_events(response):
+                    if payload == '[DONE]':
+                        break
+                    event = json.loads(payload)
+                    choices = event.get('choices') or []
+                    text = choices[0].get('delta', {}).get('content') if choices else None
+                    yield StreamChunk(text=text or "", usage=event.get('usage'),
+                                      model=event.get('model'))
+        
+        except Exception as e:
+            logger.error(f"OpenAI streaming error: {e}")
+            yield StreamChunk(error=str(e))
+    
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+    
+    def _request_body(self, prompt: str,
+                      context: List[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Build the chat completion request body."""
+        messages = []
+        if context:
+            messages.extend(context)
+        messages.append({"role": "user", "content": prompt})
         
-        # Add messages from the end until we hit length limit
-        current_length = sum(len(msg['content']) for msg in result)
-        for msg in reversed(messages):
-            if current_length + len(msg['content']) > self.max_context_length:
-                break
-            result.insert(-1 if result and result[0].get('role') == 'system' else 0, msg)
-            current_length += len(msg['content'])
+        # Truncate messages if too long
+        messages = self._truncate_messages(messages)
         
-        return result
+        return {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature
+        }
+    
+    def _truncate_messages(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Truncate messages to fit the context length in tokens."""
+        return fit_messages(messages, max(self.max_context_length - self.max_tokens, 0))
     
     def is_available(self) -> bool:
         """Check if OpenAI backend is available."""
@@ -408,12 +615,16 @@ class OpenAIBackend(AIBackend):
 class AnthropicBackend(AIBackend):
     """Anthropic Claude API backend."""
     
+    max_connections = 8
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.api_key = config.get('anthropic_api_key', '')
-        self.base_url = "https://api.anthropic.com/v1/messages"
+        self.base_url = (config.get('anthropic_api_url')
+                         or "https://api.anthropic.com/v1/messages")
     
-    async def generate_response(self, prompt: str, context: List[Dict[str, str]] = None) -> AIResponse:
+    async def generate_response(self, prompt: str, context: List[Dict[str, str]] = None,
+                                priority: Optional[str] = None) -> AIResponse:
         """Generate response using Anthropic API."""
         if not self.is_available():
             return AIResponse(
@@ -423,32 +634,10 @@ class AnthropicBackend(AIBackend):
             )
         
         try:
-            messages = []
-            if context:
-                # Convert context to Anthropic format
-                for msg in context:
-                    if msg['role'] in ['user', 'assistant']:
-                        messages.append(msg)
-            
-            messages.append({"role": "user", "content": prompt})
+            headers = self._headers()
+            data = self._request_body(prompt, context)
             
-            headers = {
-                "x-api-key": self.api_key,
-                "Content-Type": "application/json",
-                "anthropic-version": "2023-06-01"
-            }
-            
-            data = {
-                "model": self.model,
-                "messages": messages,
-                "max_tokens": self.max_tokens,
-                "temperature": self.temperature
-            }
-            
-            response = requests.post(self.base_url, headers=headers, json=data, timeout=30)
-            response.raise_for_status()
-            
-            result = response.json()
+            result = await self._post_json(self.base_url, data, headers)
             
             return AIResponse(
                 content=result['content'][0]['text'],
@@ -465,6 +654,84 @@ class AnthropicBackend(AIBackend):
                 backend="anthropic"
             )
     
+    async def stream_response(self, prompt: str,
+                              context: List[Dict[str, str]] = None,
+                              priority: Optional[str] = None
+                              ) -> AsyncIterator[StreamChunk]:
+        """Stream text deltas from the Anthropic Messages API."""
+        if not self.is_available():
+            yield StreamChunk(error="Anthropic API key not configured")
+            return
+        
+        data = self._request_body(prompt, context)
+        data["stream"] = True
+        
+        try:
+            session = await self._get_session()
+            async with session.post(self.base_url, headers=self._headers(),
+                                    json=data) as response:
+                if response.status >= 400:
+                    yield StreamChunk(error=await _http_error(response))
+                    return
+                
+                usage = {}
+                model = None
+                async for event_type, payload in iter_sse_events(response):
+                    event = json.loads(payload)
+                    if event_type == 'message_start':
+                        message = event.get('message', {})
+                        model = message.get('model')
+                        usage.update(message.get('usage') or {})
+                    elif event_type == 'content_block_delta':
+                        delta = event.get('delta', {})
+                        if delta.get('type') == 'text_delta':
+                            yield StreamChunk(text=delta.get('text', ''))
+                    elif event_type == 'message_delta':
+                        usage.update(event.get('usage') or {})
+                    elif event_type == 'error':
+                        yield StreamChunk(error=event.get('error', {}).get('message', payload))
+                        return
+                    elif event_type == 'message_stop':
+                        break
+                
+                yield StreamChunk(usage=usage or None, model=model)
+        
+        except Exception as e:
+            logger.error(f"Anthropic streaming error: {e}")
+            yield StreamChunk(error=str(e))
+    
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "x-api-key": self.api_key,
+            "Content-Type": "application/json",
+            "anthropic-version": "2023-06-01"
+        }
+    
+    def _request_body(self, prompt: str,
+                      context: List[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Build the Messages API request body."""
+        messages = []
+        system = []
+        if context:
+            # Convert context to Anthropic format
+            for msg in context:
+                if msg['role'] in ['user', 'assistant']:
+                    messages.append(msg)
+                elif msg['role'] == 'system':
+                    system.append(msg['content'])
+        
+        messages.append({"role": "user", "content": prompt})
+        
+        data = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature
+        }
+        if system:
+            data["system"] = "\n\n".join(system)
+        return data
+    
     def is_available(self) -> bool:
         """Check if Anthropic backend is available."""
         return bool(self.api_key)
@@ -480,40 +747,45 @@ class AnthropicBackend(AIBackend):
 
 
 class OllamaBackend(AIBackend):
-    """Ollama local model backend."""
+    """Ollama local model backend.
+    
+    Requests ask Ollama to keep the model loaded for ``keep_alive``. The
+    shared prompt prefix is evaluated once per prefix version and model;
+    later requests pass its ``context`` tokens and send only the rest of
+    the prompt, raw, so Ollama does not evaluate the prefix again.
+    """
+    
+    # A local server runs one or two generations at a time; more
+    # connections would only queue inside Ollama
+    max_connections = 2
+    request_timeout = 60
+    probe_timeout = 3
     
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.api_url = config.get('custom_api_url', 'http://localhost:11434')
         self.base_url = f"{self.api_url}/api/generate"
+        self.keep_alive = config.get('ollama_keep_alive', '30m')
+        # Set by probe(); unknown until the first probe completes
+        self.reachable = False
+        self.prefix_text = ''
+        # Context tokens of the evaluated prefix; empty if evaluating failed
+        self._prefix_context: Optional[List[int]] = None
+        self._prefix_model: Optional[str] = None
+        self._priming: Optional[asyncio.Lock] = None
     
-    async def generate_response(self, prompt: str, context: List[Dict[str, str]] = None) -> AIResponse:
+    async def generate_response(self, prompt: str, context: List[Dict[str, str]] = None,
+                                priority: Optional[str] = None) -> AIResponse:
         """Generate response using Ollama."""
-        if not self.is_available():
-            return AIResponse(
-                content="",
-                error="Ollama service not available",
-                backend="ollama"
-            )
-        
+        # No availability pre-check here: the probed state may be stale,
+        # and an unreachable service fails the request just as quickly
         try:
-            # Prepare prompt with context
-            full_prompt = self._prepare_prompt(prompt, context)
-            
-            data = {
-                "model": self.model,
-                "prompt": full_prompt,
-                "stream": False,
-                "options": {
-                    "temperature": self.temperature,
-                    "num_predict": self.max_tokens
-                }
-            }
+            prefix_context = await self._get_prefix_context(context)
+            data = self._request_body(prompt, context, stream=False,
+                                      prefix_context=prefix_context)
             
-            response = requests.post(self.base_url, json=data, timeout=60)
-            response.raise_for_status()
-            
-            result = response.json()
+            result = await self._post_json(self.base_url, data)
+            self._record_prompt_eval(result, context, prefix_context)
             
             return AIResponse(
                 content=result.get('response', ''),
@@ -525,6 +797,13 @@ class OllamaBackend(AIBackend):
                 }
             )
             
+        except aiohttp.ClientConnectionError as e:
+            logger.error(f"Ollama service not available: {e}")
+            return AIResponse(
+                content="",
+                error="Ollama service not available",
+                backend="ollama"
+            )
         except Exception as e:
             logger.error(f"Ollama API error: {e}")
             return AIResponse(
@@ -533,6 +812,130 @@ class OllamaBackend(AIBackend):
                 backend="ollama"
             )
     
+    async def stream_response(self, prompt: str,
+                              context: List[Dict[str, str]] = None,
+                              priority: Optional[str] = None
+                              ) -> AsyncIterator[StreamChunk]:
+        """Stream tokens from Ollama's newline-delimited JSON responses."""
+        try:
+            prefix_context = await self._get_prefix_context(context)
+            data = self._request_body(prompt, context, stream=True,
+                                      prefix_context=prefix_context)
+            session = await self._get_session()
+            async with session.post(self.base_url, json=data) as response:
+                if response.status >= 400:
+                    yield StreamChunk(error=await _http_error(response))
+                    return
+                
+                async for event in iter_ndjson(response):
+                    if event.get('error'):
+                        yield StreamChunk(error=event['error'])
+                        return
+                    if event.get('done'):
+                        self._record_prompt_eval(event, context, prefix_context)
+                        yield StreamChunk(
+                            text=event.get('response', ''),
+                            model=self.model,
+                            usage={
+                                "prompt_tokens": event.get('prompt_eval_count', 0),
+                                "completion_tokens": event.get('eval_count', 0)
+                            }
+                        )
+                        break
+                    yield StreamChunk(text=event.get('response', ''))
+        
+        except Exception as e:
+            logger.error(f"Ollama streaming error: {e}")
+            yield StreamChunk(error=str(e))
+    
+    def _request_body(self, prompt: str, context: List[Dict[str, str]] = None,
+                      stream: bool = False,
+                      prefix_context: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Build the /api/generate request body.
+        
+        With ``prefix_context``, the prefix (the first context message) is
+        replaced by its evaluated context tokens.
+        """
+        data = {
+            "model": self.model,
+            "prompt": self._prepare_prompt(prompt, context),
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": {
+                "temperature": self.temperature,
+                "num_predict": self.max_tokens
+            }
+        }
+        if prefix_context:
+            rest = "".join(f"{msg['role']}: {msg['content']}\n" for msg in context[1:])
+            data["prompt"] = f"{rest}user: {prompt}\nassistant:"
+            data["context"] = prefix_context
+            # The prefix was evaluated raw; the rest must follow it unchanged
+            data["raw"] = True
+        return data
+    
+    def set_prompt_prefix(self, prefix: PromptPrefix):
+        """Forget the evaluated prefix; the new one is evaluated on next use."""
+        message = prefix.message()
+        self.prefix_text = f"system: {message['content']}\n" if message else ''
+        self._prefix_context = None
+    
+    def _starts_with_prefix(self, context: Optional[List[Dict[str, str]]]) -> bool:
+        return bool(self.prefix_text and context and context[0]['role'] == 'system'
+                    and f"system: {context[0]['content']}\n" == self.prefix_text)
+    
+    async def _get_prefix_context(self, context: Optional[List[Dict[str, str]]]
+                                  ) -> Optional[List[int]]:
+        """Context tokens of the prefix the prompt starts with, evaluating it once."""
+        if not self._starts_with_prefix(context):
+            return None
+        if self._priming is None:
+            self._priming = asyncio.Lock()
+        async with self._priming:
+            if self._prefix_context is None or self._prefix_model != self.model:
+                await self._evaluate_prefix()
+        return self._prefix_context or None
+    
+    async def _evaluate_prefix(self):
+        """Evaluate the prefix alone and keep its context tokens."""
+        text, model = self.prefix_text, self.model
+        tokens: List[int] = []
+        try:
+            result = await self._post_json(self.base_url, {
+                "model": model,
+                "prompt": text,
+                "raw": True,
+                "stream": False,
+                "keep_alive": self.keep_alive,
+                "options": {"temperature": 0, "num_predict": 1}
+            })
+            tokens = list(result.get('context') or [])
+            # The context ends with the generated token
+            generated = result.get('eval_count', 0)
+            if generated and tokens:
+                tokens = tokens[:-generated]
+            self.prefix_stats.record(result.get('prompt_eval_duration', 0) / 1e9,
+                                     result.get('prompt_eval_count', 0), False)
+        except aiohttp.ClientConnectionError:
+            # Tried again on the next request
+            return
+        except Exception as e:
+            # Requests send the prefix inline until it changes
+            logger.warning(f"Failed to evaluate the Ollama prompt prefix: {e}")
+        if text == self.prefix_text:
+            self._prefix_context, self._prefix_model = tokens, model
+            if tokens:
+                logger.info(f"Ollama prompt prefix evaluated: {len(tokens)} context tokens")
+    
+    def _record_prompt_eval(self, result: Dict[str, Any],
+                            context: Optional[List[Dict[str, str]]],
+                            prefix_context: Optional[List[int]]):
+        """Record prompt evaluation time of a request that used the prefix."""
+        if 'prompt_eval_duration' in result and self._starts_with_prefix(context):
+            self.prefix_stats.record(result['prompt_eval_duration'] / 1e9,
+                                     result.get('prompt_eval_count', 0),
+                                     bool(prefix_context))
+    
     def _prepare_prompt(self, prompt: str, context: List[Dict[str, str]] = None) -> str:
         """Prepare prompt with context for Ollama."""
         if not context:
@@ -542,12 +945,26 @@ class OllamaBackend(AIBackend):
         return f"{context_text}\nuser: {prompt}\nassistant:"
     
     def is_available(self) -> bool:
-        """Check if Ollama service is available."""
+        """Whether the last probe reached the Ollama service."""
+        return self.reachable
+    
+    async def probe(self) -> bool:
+        """Check the Ollama service answers.
+        
+        Uses its own short-lived connection so the probe does not queue
+        behind long generations holding the pooled connections.
+        """
+        timeout = aiohttp.ClientTimeout(total=self.probe_timeout)
         try:
-            response = requests.get(f"{self.api_url}/api/tags", timeout=5)
-            return response.status_code == 200
-        except:
-            return False
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.get(f"{self.api_url}/api/tags") as response:
+                    if response.status != 200:
+                        raise RuntimeError(await _http_error(response))
+            self.reachable = True
+        except Exception:
+            self.reachable = False
+            raise
+        return self.reachable
     
     def get_status(self) -> Dict[str, Any]:
         """Get Ollama backend status."""
@@ -555,7 +972,12 @@ class OllamaBackend(AIBackend):
             "backend": "ollama",
             "available": self.is_available(),
             "model": self.model,
-            "api_url": self.api_url
+            "api_url": self.api_url,
+            "keep_alive": self.keep_alive,
+            "prompt_prefix": {
+                "context_tokens": len(self._prefix_context or []),
+                **self.prefix_stats.to_dict()
+            }
         }
 
 
@@ -566,7 +988,8 @@ class CustomBackend(AIBackend):
         super().__init__(config)
         self.api_url = config.get('custom_api_url', '')
     
-    async def generate_response(self, prompt: str, context: List[Dict[str, str]] = None) -> AIResponse:
+    async def generate_response(self, prompt: str, context: List[Dict[str, str]] = None,
+                                priority: Optional[str] = None) -> AIResponse:
         """Generate response using custom API."""
         if not self.is_available():
             return AIResponse(
@@ -576,31 +999,10 @@ class CustomBackend(AIBackend):
             )
         
         try:
-            messages = []
-            if context:
-                messages.extend(context)
-            messages.append({"role": "user", "content": prompt})
-            
-            data = {
-                "model": self.model,
-                "messages": messages,
-                "max_tokens": self.max_tokens,
-                "temperature": self.temperature
-            }
+            data = self._request_body(prompt, context)
             
-            response = requests.post(self.api_url, json=data, timeout=30)
-            response.raise_for_status()
-            
-            result = response.json()
-            
-            # Try to parse common response formats
-            content = ""
-            if 'choices' in result and result['choices']:
-                content = result['choices'][0].get('message', {}).get('content', '')
-            elif 'response' in result:
-                content = result['response']
-            elif 'text' in result:
-                content = result['text']
+            result = await self._post_json(self.api_url, data)
+            content = self._extract_text(result)
             
             return AIResponse(
                 content=content,
@@ -617,6 +1019,78 @@ class CustomBackend(AIBackend):
                 backend="custom"
             )
     
+    async def stream_response(self, prompt: str,
+                              context: List[Dict[str, str]] = None,
+                              priority: Optional[str] = None
+                              ) -> AsyncIterator[StreamChunk]:
+        """Stream from the custom API.
+        
+        Server-sent events (OpenAI-compatible deltas) and NDJSON bodies are
+        streamed; a plain JSON body is yielded as a single chunk.
+        """
+        if not self.is_available():
+            yield StreamChunk(error="Custom API URL not configured")
+            return
+        
+        data = self._request_body(prompt, context)
+        data["stream"] = True
+        
+        try:
+            session = await self._get_session()
+            async with session.post(self.api_url, json=data) as response:
+                if response.status >= 400:
+                    yield StreamChunk(error=await _http_error(response))
+                    return
+                
+                content_type = response.content_type
+                if content_type == 'text/event-stream':
+                    async for _, payload in iter_sse_events(response):
+                        if payload == '[DONE]':
+                            break
+                        event = json.loads(payload)
+                        yield StreamChunk(text=self._extract_text(event, delta=True),
+                                          usage=event.get('usage'))
+                elif content_type in ('application/x-ndjson', 'application/jsonl'):
+                    async for event in iter_ndjson(response):
+                        yield StreamChunk(text=self._extract_text(event, delta=True),
+                                          usage=event.get('usage'))
+                else:
+                    result = await response.json(content_type=None)
+                    yield StreamChunk(text=self._extract_text(result),
+                                      usage=result.get('usage'))
+        
+        except Exception as e:
+            logger.error(f"Custom API streaming error: {e}")
+            yield StreamChunk(error=str(e))
+    
+    def _request_body(self, prompt: str,
+                      context: List[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Build an OpenAI-style chat request body."""
+        messages = []
+        if context:
+            messages.extend(context)
+        messages.append({"role": "user", "content": prompt})
+        
+        return {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature
+        }
+    
+    @staticmethod
+    def _extract_text(result: Dict[str, Any], delta: bool = False) -> str:
+        """Try to parse common response formats."""
+        if 'choices' in result and result['choices']:
+            choice = result['choices'][0]
+            message = choice.get('delta' if delta else 'message') or choice.get('message', {})
+            return message.get('content') or choice.get('text') or ''
+        if 'response' in result:
+            return result['response'] or ''
+        if 'text' in result:
+            return result['text'] or ''
+        return ''
+    
     def is_available(self) -> bool:
         """Check if custom API is available."""
         return bool(self.api_url)
@@ -638,8 +1112,41 @@ class AIBackendManager:
         self.config = config
         self.current_backend = config.get('ai_backend', 'hailo')
         self.backends = {}
-        self.conversation_history = []
+        self.memory = ConversationStore(
+            max_sessions=config.get('conversation_sessions', 64),
+            max_messages=config.get('conversation_messages', 20)
+        )
+        self.status_version = 0
+        self.completion_cache = CompletionCache(
+            max_entries=config.get('ai_cache_size', 256),
+            ttl=config.get('ai_cache_ttl', 3600),
+            path=config.get('ai_cache_path') or None
+        )
         self._initialize_backends()
+        self.health = HealthProber(
+            self.backends,
+            interval=config.get('health_check_interval', 30)
+        )
+        self.router = BackendRouter(
+            self.backends,
+            health=self.health,
+            policy=config.get('ai_routing', 'fixed'),
+            fallback=config.get('ai_fallback'),
+            timeout=config.get('ai_backend_timeout', 60),
+            hedge=config.get('ai_hedge', False)
+        )
+        self.jobs = InferenceQueue(config.get('ai_class_limits'))
+        self.accounting = BackendAccounting(config.get('ai_token_costs'))
+        self.inflight = InflightRequests(config.get('ai_dedup', True))
+        # Requests waiting on a possibly shared generation, by job id
+        self._job_requests: Dict[str, Set[asyncio.Task]] = {}
+        self.prefix = PromptPrefix(config.get('ai_system_prompt', ''))
+        self.prefix.subscribe(self._prefix_changed)
+        self._prefix_changed(self.prefix)
+        self.summarizer = ConversationSummarizer(
+            self.memory, self._summarize,
+            keep_recent=config.get('conversation_recent', DEFAULT_KEEP_RECENT)
+        )
     
     def _initialize_backends(self):
         """Initialize all available backends."""
@@ -659,51 +1166,455 @@ class AIBackendManager:
             except Exception as e:
                 logger.error(f"Failed to initialize {backend_name} backend: {e}")
     
-    async def generate_response(self, prompt: str, use_context: bool = True) -> AIResponse:
-        """Generate AI response using current backend."""
-        backend = self.backends.get(self.current_backend)
-        if not backend:
+    @property
+    def conversation_history(self) -> List[Dict[str, str]]:
+        """History of the default session."""
+        return self.memory.messages()
+    
+    async def generate_response(self, prompt: str, use_context: bool = True,
+                                session: Optional[str] = None,
+                                job_class: str = INTERACTIVE,
+                                deadline: Optional[float] = None,
+                                job_id: Optional[str] = None,
+                                extra_context: Optional[List[Dict[str, str]]] = None
+                                ) -> AIResponse:
+        """Generate AI response, routed over the backends.
+        
+        Args:
+            prompt: The user's prompt
+            use_context: Include the session's conversation history
+            session: Conversation session; defaults to a shared session
+            job_class: Priority class in the inference job queue
+            deadline: Seconds the request may take, queueing included
+            job_id: Id to cancel the request with :meth:`cancel`
+            extra_context: Messages for this prompt only, such as retrieved
+                entities; sent after the history and not remembered
+        """
+        names = self.router.plan(prompt, self.current_backend)
+        if not names:
             return AIResponse(
                 content="",
                 error=f"Backend '{self.current_backend}' not available",
                 backend=self.current_backend
             )
         
-        context = self.conversation_history if use_context else None
-        response = await backend.generate_response(prompt, context)
+        context = self._context(names[0], prompt, session, use_context, extra_context)
+        response = await self._generate(names, prompt, context, job_class, deadline, job_id)
+        self._remember(prompt, response, session)
+        return response
+    
+    async def _generate(self, names: List[str], prompt: str,
+                        context: Optional[List[Dict[str, str]]], job_class: str,
+                        deadline: Optional[float], job_id: Optional[str]) -> AIResponse:
+        """Cached or routed completion, each attempt queued by job class.
         
-        # Add to conversation history if successful
-        if response.content and not response.error:
-            self.conversation_history.append({"role": "user", "content": prompt})
-            self.conversation_history.append({"role": "assistant", "content": response.content})
-            
-            # Keep conversation history manageable
-            max_history = 20  # Keep last 20 messages
-            if len(self.conversation_history) > max_history:
-                self.conversation_history = self.conversation_history[-max_history:]
+        The job class is also the request's priority on the backend, so the
+        Hailo batch scheduler serves interactive work first.
+        """
+        response = self._cached_response(names[0], prompt, context)
+        if response is not None:
+            self.accounting.record_cached(response.backend or names[0], response.model or '')
+            return response
+        
+        expires = time.monotonic() + deadline if deadline else None
+        
+        async def generate(publish):
+            name, result = await self.router.generate(names, lambda name: self._run(
+                name, prompt, context, job_class, expires, job_id))
+            response = self._route_response(name, result)
+            self._store_response(name, prompt, context, response)
+            return response
+        
+        response, shared = await self._shared(
+            self._inflight_key('generate', names, prompt, context), generate, None, job_id)
+        return replace(response, shared=True) if shared else response
+    
+    async def _run(self, name: str, prompt: str, context: Optional[List[Dict[str, str]]],
+                   job_class: str, expires: Optional[float],
+                   job_id: Optional[str]) -> AIResponse:
+        """One queued, accounted completion attempt on a backend."""
+        backend = self.backends[name]
+        timing = self.accounting.start(name, backend.model)
+        try:
+            response = await self.jobs.run(
+                name, lambda: timing.run(backend.generate_response(
+                    prompt, context, priority=job_class)),
+                job_class, expires, job_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._account(timing, prompt, context, error=str(e) or type(e).__name__)
+            raise
+        self._account(timing, prompt, context, response.content, response.usage,
+                      response.model, response.error)
+        return response
+    
+    async def _stream(self, name: str, prompt: str, context: Optional[List[Dict[str, str]]],
+                      job_class: str, expires: Optional[float],
+                      job_id: Optional[str]) -> AsyncIterator[StreamChunk]:
+        """One queued, accounted streaming attempt on a backend."""
+        backend = self.backends[name]
+        timing = self.accounting.start(name, backend.model)
+        text, usage, model, error = [], None, None, None
+        try:
+            async for chunk in self.jobs.stream(
+                    name, lambda: timing.stream(backend.stream_response(
+                        prompt, context, priority=job_class)),
+                    job_class, expires, job_id):
+                text.append(chunk.text)
+                usage = chunk.usage or usage
+                model = chunk.model or model
+                error = chunk.error or error
+                yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            raise
+        except Exception as e:
+            self._account(timing, prompt, context, ''.join(text), usage, model,
+                          str(e) or type(e).__name__)
+            raise
+        self._account(timing, prompt, context, ''.join(text), usage, model, error)
+    
+    def _account(self, timing: GenerationTiming, prompt: str,
+                 context: Optional[List[Dict[str, str]]], content: str = '',
+                 usage: Optional[Dict[str, int]] = None, model: Optional[str] = None,
+                 error: Optional[str] = None):
+        """Record an attempt, estimating tokens the backend did not report."""
+        prompt_tokens, completion_tokens = usage_tokens(usage)
+        estimated = prompt_tokens is None or completion_tokens is None
+        if prompt_tokens is None:
+            counter = self.memory.counter
+            prompt_tokens = (counter.message_tokens({'content': prompt})
+                             + sum(counter.message_tokens(msg) for msg in context or []))
+        if completion_tokens is None:
+            completion_tokens = self.memory.counter.message_tokens({'content': content or ''})
+        self.accounting.finish(timing, prompt_tokens, completion_tokens, error, model, estimated)
+    
+    async def stream_response(self, prompt: str, on_token: Callable[[str], None],
+                              use_context: bool = True,
+                              session: Optional[str] = None,
+                              job_class: str = INTERACTIVE,
+                              deadline: Optional[float] = None,
+                              job_id: Optional[str] = None,
+                              extra_context: Optional[List[Dict[str, str]]] = None
+                              ) -> AIResponse:
+        """Generate AI response, streaming tokens from the routed backend.
+        
+        Args:
+            prompt: The user's prompt
+            on_token: Called with each text chunk as it arrives
+            use_context: Include the session's conversation history
+            session: Conversation session; defaults to a shared session
+            job_class: Priority class in the inference job queue
+            deadline: Seconds the request may take, queueing included
+            job_id: Id to cancel the request with :meth:`cancel`
+            extra_context: Messages for this prompt only, such as retrieved
+                entities; sent after the history and not remembered
+        
+        Returns:
+            The complete response, with time to first token in ``ttft``
+        """
+        names = self.router.plan(prompt, self.current_backend)
+        if not names:
+            return AIResponse(
+                content="",
+                error=f"Backend '{self.current_backend}' not available",
+                backend=self.current_backend
+            )
         
+        context = self._context(names[0], prompt, session, use_context, extra_context)
+        cached = self._cached_response(names[0], prompt, context)
+        if cached is not None:
+            on_token(cached.content)
+            cached.ttft = 0.0
+            self.accounting.record_cached(cached.backend or names[0], cached.model or '')
+            self._remember(prompt, cached, session)
+            return cached
+        
+        expires = time.monotonic() + deadline if deadline else None
+        
+        async def generate(publish):
+            name, result = await self.router.stream(names, lambda name: self._stream(
+                name, prompt, context, job_class, expires, job_id), publish)
+            response = self._route_response(name, result)
+            self._store_response(name, prompt, context, response)
+            return response
+        
+        response, shared = await self._shared(
+            self._inflight_key('stream', names, prompt, context), generate, on_token, job_id)
+        if shared:
+            response = replace(response, shared=True)
+        self._remember(prompt, response, session)
         return response
     
+    async def generate_batch(self, prompts: List[str], job_class: str = BACKGROUND,
+                             deadline: Optional[float] = None,
+                             job_id: Optional[str] = None) -> List[AIResponse]:
+        """Generate responses to several prompts, one request at a time.
+        
+        Each prompt queues again, so higher priority work waiting for the
+        backend runs between the requests of a long batch. No
+        conversation history is used or kept; the prompt prefix is.
+        """
+        responses = []
+        for prompt in prompts:
+            names = self.router.plan(prompt, self.current_backend)
+            if not names:
+                responses.append(AIResponse(
+                    content="",
+                    error=f"Backend '{self.current_backend}' not available",
+                    backend=self.current_backend
+                ))
+                continue
+            responses.append(await self._generate(names, prompt, self._prefix_context(),
+                                                  job_class, deadline, job_id))
+        return responses
+    
+    def cancel(self, job_id: str) -> bool:
+        """Cancel the queued or running backend requests of a job.
+        
+        A job's requests wait on generations that identical requests may
+        share, so the requests are cancelled rather than the generation;
+        it stops once no request waits on it.
+        """
+        tasks = self._job_requests.get(job_id)
+        if tasks:
+            for task in list(tasks):
+                task.cancel()
+            return True
+        return self.jobs.cancel(job_id)
+    
+    def get_job_stats(self) -> Dict[str, Any]:
+        """Inference job queue depth, limits and latency per class and backend."""
+        return self.jobs.get_stats()
+    
+    def _route_response(self, name: str, result: Any) -> AIResponse:
+        """Turn a router result into the response returned to callers."""
+        if isinstance(result, AIResponse):
+            return result
+        if isinstance(result, RouteFailure):
+            return AIResponse(content="", error=result.error, backend=name)
+        return AIResponse(
+            content=result.content,
+            usage=result.usage,
+            model=result.model or self.backends[name].model,
+            backend=name,
+            error=result.error,
+            ttft=result.ttft
+        )
+    
+    def _cache_key(self, name: str, prompt: str,
+                   context: Optional[List[Dict[str, str]]]) -> str:
+        """Completion cache key for a prompt on a backend."""
+        backend = self.backends[name]
+        return CompletionCache.make_key(name, backend.model, backend.sampling_params(),
+                                        prompt, context)
+    
+    async def _shared(self, key: str, generate: Callable[..., Any],
+                      on_token: Optional[Callable[[str], None]],
+                      job_id: Optional[str]) -> Any:
+        """Run or join a generation, cancellable by the request's job id."""
+        task = asyncio.current_task()
+        if job_id is not None:
+            self._job_requests.setdefault(job_id, set()).add(task)
+        try:
+            return await self.inflight.run(key, generate, on_token)
+        finally:
+            if job_id is not None:
+                tasks = self._job_requests.get(job_id)
+                if tasks is not None:
+                    tasks.discard(task)
+                    if not tasks:
+                        del self._job_requests[job_id]
+    
+    def _inflight_key(self, mode: str, names: List[str], prompt: str,
+                      context: Optional[List[Dict[str, str]]]) -> str:
+        """Identity of a generation for sharing it with identical requests.
+        
+        The cache key covers the first backend, its model and sampling
+        parameters, the prompt and the context; the fallback chain and
+        whether tokens are streamed must match too.
+        """
+        return f"{mode}:{','.join(names)}:{self._cache_key(names[0], prompt, context)}"
+    
+    def _cached_response(self, name: str, prompt: str,
+                         context: Optional[List[Dict[str, str]]]) -> Optional[AIResponse]:
+        """Look up a cached completion from a backend."""
+        cached = self.completion_cache.get(self._cache_key(name, prompt, context), name)
+        if cached is None:
+            return None
+        return AIResponse(cached=True, **cached)
+    
+    def _store_response(self, name: str, prompt: str,
+                        context: Optional[List[Dict[str, str]]], response: AIResponse):
+        """Cache a successful completion from a backend."""
+        if response.content and not response.error:
+            self.completion_cache.put(self._cache_key(name, prompt, context), name, {
+                'content': response.content,
+                'usage': response.usage,
+                'model': response.model,
+                'backend': response.backend
+            })
+    
+    def _context(self, name: str, prompt: str, session: Optional[str],
+                 use_history: bool = True,
+                 extra: Optional[List[Dict[str, str]]] = None
+                 ) -> Optional[List[Dict[str, str]]]:
+        """Prompt prefix, the session history that fits the backend's
+        context with the prompt, then any extra messages."""
+        backend = self.backends[name]
+        prefix = self._prefix_context() or []
+        extra = extra or []
+        if not use_history:
+            return (prefix + extra) or None
+        budget = (backend.max_context_length - backend.max_tokens
+                  - self.memory.counter.message_tokens({'content': prompt})
+                  - sum(self.memory.counter.message_tokens(msg) for msg in prefix + extra))
+        return prefix + self.memory.context(session, budget) + extra
+    
+    def _prefix_context(self) -> Optional[List[Dict[str, str]]]:
+        """The prompt prefix as context, if one is configured."""
+        message = self.prefix.message()
+        return [message] if message else None
+    
+    def set_home_context(self, home_context: str) -> bool:
+        """Update the home description in the prompt prefix.
+        
+        Returns whether the prefix changed; backends then drop their
+        cached prefix state.
+        """
+        return self.prefix.set_home_context(home_context)
+    
+    def _prefix_changed(self, prefix: PromptPrefix):
+        for name, backend in self.backends.items():
+            try:
+                backend.set_prompt_prefix(prefix)
+            except Exception as e:
+                logger.warning(f"Failed to update the prompt prefix of {name}: {e}")
+    
+    def get_prefix_stats(self) -> Dict[str, Any]:
+        """Prefix version and prompt evaluation time with and without reuse."""
+        return {
+            'version': self.prefix.version,
+            'key': self.prefix.key,
+            'characters': len(self.prefix.text),
+            'backends': {
+                name: backend.prefix_stats.to_dict()
+                for name, backend in self.backends.items()
+                if backend.prefix_stats.cold.count or backend.prefix_stats.warm.count
+            }
+        }
+    
+    def _remember(self, prompt: str, response: AIResponse,
+                  session: Optional[str] = None):
+        """Add a successful exchange to the session's history.
+        
+        Older messages are then folded into the session summary in the
+        background.
+        """
+        if response.content and not response.error:
+            self.memory.append(session, "user", prompt)
+            self.memory.append(session, "assistant", response.content)
+            self.summarizer.schedule(session)
+    
+    def summary_backend(self) -> Optional[str]:
+        """Backend writing conversation summaries.
+        
+        The configured one, else the first available local backend, else
+        the current backend.
+        """
+        configured = self.config.get('conversation_summary_backend')
+        if configured:
+            return configured if configured in self.backends else None
+        for name in LOCAL_BACKENDS:
+            if self.health.is_available(name):
+                return name
+        return self.current_backend
+    
+    async def _summarize(self, prompt: str) -> str:
+        """Complete a summary prompt as background work."""
+        name = self.summary_backend()
+        if name is None:
+            raise RuntimeError("No backend for conversation summaries")
+        # Accounted like queries, so summaries show up in usage and cost
+        response = await self._run(name, prompt, None, BACKGROUND, None, None)
+        if response.error:
+            raise RuntimeError(response.error)
+        return response.content
+    
+    def get_usage_stats(self) -> Dict[str, Any]:
+        """Latency histograms, tokens, rates and cost per backend and model."""
+        return self.accounting.get_stats()
+    
+    def start_health_checks(self):
+        """Start background availability probes on the running loop."""
+        self.health.start()
+    
+    def get_streaming_stats(self) -> Dict[str, Any]:
+        """Time-to-first-token summaries per backend."""
+        return {
+            name: stats['ttft']
+            for name, stats in self.router.get_stats()['backends'].items()
+            if stats['ttft']['count']
+        }
+    
+    def get_routing_stats(self) -> Dict[str, Any]:
+        """Routing policy with per-backend latency and error statistics."""
+        return self.router.get_stats()
+    
+    async def close(self):
+        """Stop health probes and summaries, save the completion cache and
+        close backend HTTP sessions."""
+        await self.health.stop()
+        await self.summarizer.close()
+        await self.completion_cache.close()
+        for backend in self.backends.values():
+            await backend.close()
+    
     def switch_backend(self, backend_name: str) -> bool:
         """Switch to different AI backend."""
-        if backend_name in self.backends and self.backends[backend_name].is_available():
+        if self.health.is_available(backend_name):
             self.current_backend = backend_name
+            self.status_version += 1
             logger.info(f"Switched to {backend_name} backend")
             return True
         return False
     
+    async def switch_model(self, model: str, backend_name: Optional[str] = None) -> bool:
+        """Switch the model of a backend (the current one by default)."""
+        backend = self.backends.get(backend_name or self.current_backend)
+        if backend is None or not await backend.switch_model(model):
+            return False
+        self.status_version += 1
+        logger.info(f"Switched {backend_name or self.current_backend} model to {model}")
+        return True
+    
     def get_available_backends(self) -> List[str]:
-        """Get list of available backends."""
-        return [name for name, backend in self.backends.items() if backend.is_available()]
+        """Get list of available backends, as last probed."""
+        return self.health.available()
+    
+    def get_status_version(self) -> str:
+        """Get a version string that changes whenever backend status does."""
+        availability = fingerprint(
+            (name, self.health.get(name).available) for name in self.backends
+        )
+        return f"{self.status_version}:{self.accounting.version}:{availability}"
     
     def get_backend_status(self) -> Dict[str, Any]:
-        """Get status of all backends."""
+        """Get status of all backends.
+        
+        Availability comes from the cached health state, so this never
+        waits on the network.
+        """
         return {
             "current_backend": self.current_backend,
-            "backends": {name: backend.get_status() for name, backend in self.backends.items()}
+            "backends": {
+                name: {**backend.get_status(), **self.health.get(name).to_dict(),
+                       'usage': self.accounting.get_stats(name)}
+                for name, backend in self.backends.items()
+            }
         }
     
-    def clear_conversation_history(self):
-        """Clear conversation history."""
-        self.conversation_history = []
-        logger.info("Conversation history cleared")
\ No newline at end of file
+    def clear_conversation_history(self, session: Optional[str] = None):
+        """Clear the conversation history of a session."""
+        self.memory.drop(session)
+        logger.info(f"Conversation history cleared for session {session or 'default'}")
\ No newline at end of file
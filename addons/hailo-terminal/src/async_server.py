@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Async Server Mode for Hailo AI Terminal
+
+Serves the same REST routes, Socket.IO events and templates as the Flask
+server, but on aiohttp with python-socketio in async mode. Route handlers,
+socket handlers, the Home Assistant client and the AI backends all run on
+a single event loop instead of per-request threads and event loops.
+
+Enable with ``server_mode: async`` in the add-on configuration.
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict
+
+import socketio
+from aiohttp import web
+
+from entity_store import EntityQuery, QUERY_PARAMS as ENTITY_QUERY_PARAMS
+from serialization import MIN_COMPRESS_SIZE, choose_encoding, compress
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTerminalServer:
+    """aiohttp + python-socketio front end for a HailoTerminal instance."""
+
+    def __init__(self, terminal):
+        """Initialize the async server.
+
+        Args:
+            terminal: HailoTerminal instance providing the AI backend
+                manager, Home Assistant client and automation manager
+        """
+        self.terminal = terminal
+        self.config = terminal.config
+        self.template_dir = os.path.join(os.path.dirname(__file__), 'templates')
+
+        self.serializer = terminal.serializer
+        self.sio = socketio.AsyncServer(
+            async_mode='aiohttp',
+            cors_allowed_origins='*',
+            json=self.serializer
+        )
+        self.app = web.Application(middlewares=[self._compression_middleware])
+        self.sio.attach(self.app)
+
+        # Subscription frames go out through this server's Socket.IO
+        terminal.subscriptions.set_transport(self._emit_with_ack, self.sio.disconnect)
+        self._update_task = None
+
+        self._setup_routes()
+        self._setup_socket_handlers()
+        self.app.on_startup.append(self._on_startup)
+        self.app.on_cleanup.append(self._on_cleanup)
+
+    def _json(self, data: Any, status: int = 200) -> web.Response:
+        """Build a JSON response."""
+        return web.Response(body=self.serializer.dumps_bytes(data), status=status,
+                            content_type='application/json')
+
+    def _cached_response(self, request: web.Request, status: int, etag: str,
+                         entry) -> web.Response:
+        """Build a response from a response cache lookup."""
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+        if status == 304:
+            return web.Response(status=304, headers=headers)
+
+        cache = self.terminal.response_cache
+        body, encoding = cache.encoded_body(entry, request.headers.get('Accept-Encoding'))
+        headers['ETag'] = cache.encoded_etag(etag, encoding)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return web.Response(body=body, status=status, headers=headers,
+                            content_type='application/json')
+
+    @web.middleware
+    async def _compression_middleware(self, request: web.Request, handler):
+        """Compress large JSON responses the client accepts encoded."""
+        response = await handler(request)
+        if (response.status != 200 or response.content_type != 'application/json' or
+                'Content-Encoding' in response.headers or
+                not isinstance(response.body, bytes) or
+                len(response.body) < MIN_COMPRESS_SIZE):
+            return response
+
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding:
+            response.body = compress(response.body, encoding)
+            response.headers['Content-Encoding'] = encoding
+            response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+    @staticmethod
+    async def _read_json(request: web.Request) -> Dict[str, Any]:
+        """Read a JSON request body, tolerating empty or invalid bodies."""
+        try:
+            data = await request.json()
+        except Exception:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _setup_routes(self):
+        """Setup aiohttp routes mirroring the Flask route surface."""
+        terminal = self.terminal
+        routes = web.RouteTableDef()
+
+        @routes.get('/')
+        async def index(request):
+            return web.FileResponse(os.path.join(self.template_dir, 'index.html'))
+
+        @routes.get('/api/health')
+        async def health(request):
+            backend_status = terminal.ai_backend_manager.get_backend_status()
+            return self._json({
+                'status': 'healthy',
+                'ai_backends': backend_status,
+                'ai_cache': terminal.ai_backend_manager.completion_cache.get_stats(),
+                'monitoring': terminal.resource_monitor.monitoring,
+                'timestamp': datetime.now().isoformat()
+            })
+
+        @routes.get('/api/resources')
+        async def resources(request):
+            resource_data = terminal.resource_monitor.get_current_data()
+
+            if terminal.ha_client:
+                resource_data.update(await terminal.ha_resources())
+
+            return self._json(resource_data)
+
+        @routes.get('/api/metrics')
+        async def metrics(request):
+            return self._json(terminal.get_metrics())
+
+        @routes.get('/api/backends')
+        async def backends(request):
+            return self._cached_response(request, *await terminal.backends_response(
+                request.headers.get('If-None-Match')
+            ))
+
+        @routes.post('/api/switch_backend')
+        async def switch_backend(request):
+            data = await self._read_json(request)
+            backend_name = data.get('backend', '')
+
+            if not backend_name:
+                return self._json({'error': 'No backend specified'}, 400)
+
+            if terminal.ai_backend_manager.switch_backend(backend_name):
+                return self._json({
+                    'success': True,
+                    'current_backend': backend_name
+                })
+            return self._json({
+                'error': f'Backend {backend_name} not available'
+            }, 400)
+
+        @routes.post('/api/switch_model')
+        async def switch_model(request):
+            data = await self._read_json(request)
+            model = data.get('model', '')
+
+            if not model:
+                return self._json({'error': 'No model specified'}, 400)
+
+            if await terminal.ai_backend_manager.switch_model(model, data.get('backend')):
+                return self._json({
+                    'success': True,
+                    'model': model
+                })
+            return self._json({
+                'error': f'Model {model} could not be loaded'
+            }, 400)
+
+        @routes.post('/api/automation/recommendations')
+        async def get_automation_recommendations(request):
+            data = await self._read_json(request)
+            user_request = data.get('request', '')
+
+            if not user_request:
+                return self._json({'error': 'No request provided'}, 400)
+
+            recommendations = await terminal.automation_manager.get_automation_recommendations(
+                user_request, []
+            )
+            return self._json({
+                'recommendations': recommendations,
+                'count': len(recommendations)
+            })
+
+        @routes.post('/api/automation/generate')
+        async def generate_automation(request):
+            data = await self._read_json(request)
+            template_id = data.get('template_id', '')
+            parameters = data.get('parameters', {})
+
+            if not template_id:
+                return self._json({'error': 'No template ID provided'}, 400)
+
+            try:
+                yaml_content, automation_dict = terminal.automation_manager.generate_automation_yaml(
+                    template_id, parameters
+                )
+                return self._json({
+                    'success': True,
+                    'yaml': yaml_content,
+                    'automation': automation_dict
+                })
+            except Exception as e:
+                return self._json({'error': str(e)}, 400)
+
+        @routes.post('/api/automation/validate')
+        async def validate_automation(request):
+            data = await self._read_json(request)
+            automation_dict = data.get('automation', {})
+
+            if not automation_dict:
+                return self._json({'error': 'No automation provided'}, 400)
+
+            try:
+                is_valid, errors = await terminal.automation_manager.validate_automation(
+                    automation_dict
+                )
+                return self._json({'valid': is_valid, 'errors': errors})
+            except Exception as e:
+                return self._json({'error': str(e)}, 500)
+
+        @routes.post('/api/automation/test')
+        async def test_automation(request):
+            data = await self._read_json(request)
+            automation_dict = data.get('automation', {})
+
+            if not automation_dict:
+                return self._json({'error': 'No automation provided'}, 400)
+
+            try:
+                success, message = await terminal.automation_manager.test_automation(
+                    automation_dict
+                )
+                return self._json({'success': success, 'message': message})
+            except Exception as e:
+                return self._json({'error': str(e)}, 500)
+
+        @routes.post('/api/automation/save')
+        async def save_automation(request):
+            data = await self._read_json(request)
+            automation_dict = data.get('automation', {})
+            test_first = data.get('test_first', True)
+
+            if not automation_dict:
+                return self._json({'error': 'No automation provided'}, 400)
+
+            try:
+                success, message = await terminal.automation_manager.save_automation(
+                    automation_dict, test_first
+                )
+                return self._json({'success': success, 'message': message})
+            except Exception as e:
+                return self._json({'error': str(e)}, 500)
+
+        @routes.get('/api/automation/suggestions')
+        async def get_automation_suggestions(request):
+            query = request.query.get('q', '')
+            suggestions = terminal.automation_manager.get_automation_suggestions(query)
+            return self._json({'suggestions': suggestions})
+
+        @routes.get('/api/entities/discovery')
+        async def get_entity_discovery(request):
+            if not terminal.ha_client:
+                return self._json({
+                    'success': False,
+                    'error': 'Home Assistant client not available'
+                }, 503)
+
+            try:
+                if any(param in request.query for param in ENTITY_QUERY_PARAMS):
+                    return await self._entity_page(request, summary=True)
+
+                return self._cached_response(request, *await terminal.entity_discovery_response(
+                    request.headers.get('If-None-Match')
+                ))
+            except Exception as e:
+                logger.error(f"Error getting entity discovery: {e}")
+                return self._json({'success': False, 'error': str(e)}, 500)
+
+        @routes.get('/api/entities/by-domain/{domain}')
+        async def get_entities_by_domain(request):
+            domain = request.match_info['domain']
+            if not terminal.ha_client:
+                return self._json({
+                    'success': False,
+                    'error': 'Home Assistant client not available'
+                }, 503)
+
+            try:
+                if any(param in request.query for param in ENTITY_QUERY_PARAMS):
+                    return await self._entity_page(request, domain=domain)
+
+                return self._cached_response(request, *await terminal.entities_by_domain_response(
+                    domain, request.headers.get('If-None-Match')
+                ))
+            except Exception as e:
+                logger.error(f"Error getting entities for domain {domain}: {e}")
+                return self._json({'success': False, 'error': str(e)}, 500)
+
+        @routes.get('/api/automation/relevant-entities/{template_id}')
+        async def get_relevant_entities(request):
+            template_id = request.match_info['template_id']
+            try:
+                relevant_entities = await terminal.automation_manager.get_relevant_entities_for_automation(
+                    template_id
+                )
+                return self._json({
+                    'success': True,
+                    'template_id': template_id,
+                    'relevant_entities': relevant_entities
+                })
+            except Exception as e:
+                logger.error(f"Error getting relevant entities for {template_id}: {e}")
+                return self._json({'success': False, 'error': str(e)}, 500)
+
+        self.app.add_routes(routes)
+
+    async def _entity_page(self, request: web.Request, domain: str = None,
+                           summary: bool = False) -> web.Response:
+        """Answer a paged entity query."""
+        try:
+            query = EntityQuery.from_args(request.query, domain=domain)
+        except ValueError as e:
+            return self._json({'success': False, 'error': str(e)}, 400)
+
+        return self._cached_response(request, *await self.terminal.entity_page_response(
+            query, request.headers.get('If-None-Match'), summary=summary
+        ))
+
+    def _setup_socket_handlers(self):
+        """Setup Socket.IO handlers mirroring the Flask-SocketIO events."""
+        terminal = self.terminal
+
+        @self.sio.event
+        async def connect(sid, environ, auth=None):
+            logger.info(f"Client connected: {sid}")
+            backend_status = terminal.ai_backend_manager.get_backend_status()
+            await self.sio.emit('status', {
+                'message': 'Connected to Hailo AI Terminal',
+                'backends': backend_status,
+                'current_backend': terminal.ai_backend_manager.current_backend
+            }, to=sid)
+            terminal.client_connected(sid)
+
+        @self.sio.event
+        async def disconnect(sid):
+            logger.info(f"Client disconnected: {sid}")
+            terminal.client_disconnected(sid)
+
+        @self.sio.on('subscribe')
+        async def handle_subscribe(sid, data):
+            await self.sio.emit('subscriptions', terminal.update_subscriptions(
+                sid, data, True
+            ), to=sid)
+
+        @self.sio.on('unsubscribe')
+        async def handle_unsubscribe(sid, data):
+            await self.sio.emit('subscriptions', terminal.update_subscriptions(
+                sid, data, False
+            ), to=sid)
+
+        @self.sio.on('ai_query')
+        async def handle_ai_query(sid, data):
+            query = (data or {}).get('query', '')
+            logger.info(f"Received AI query: {query}")
+
+            if not query.strip():
+                await self.sio.emit('ai_response', {
+                    'error': 'Empty query received',
+                    'timestamp': datetime.now().isoformat()
+                }, to=sid)
+                return
+
+            await terminal.enqueue_ai_query(sid, query, data.get('session'),
+                                            data.get('stream'))
+
+        @self.sio.on('ai_cancel')
+        async def handle_ai_cancel(sid, data=None):
+            terminal.cancel_ai_query(sid, data)
+
+    async def _emit_with_ack(self, sid: str, event: str, data: Any, on_ack):
+        """Subscription transport: emit and report the client's ack."""
+        await self.sio.emit(event, data, to=sid, callback=lambda *args: on_ack())
+
+    async def _on_startup(self, app: web.Application):
+        """Start loop-bound background tasks."""
+        self.terminal.ai_backend_manager.start_health_checks()
+        self._update_task = asyncio.create_task(self.terminal.publish_updates())
+
+    async def _on_cleanup(self, app: web.Application):
+        """Cancel background tasks and release shared sessions."""
+        if self._update_task:
+            self._update_task.cancel()
+            await asyncio.gather(self._update_task, return_exceptions=True)
+        await self.terminal.ai_query_pool.stop()
+        await self.terminal.subscriptions.close()
+        await self.terminal.ai_backend_manager.close()
+
+        if self.terminal.ha_client:
+            await self.terminal.ha_client.close()
+
+    def run(self, host: str = '0.0.0.0', port: int = 8080):
+        """Run the server until interrupted."""
+        web.run_app(self.app, host=host, port=port, print=None)
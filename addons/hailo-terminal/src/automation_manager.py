@@ -7,10 +7,12 @@ Handles automation recommendations, YAML generation, validation, and deployment
 import yaml
 import logging
 import asyncio
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 import re
 
+from intent_classifier import Intent, IntentClassifier
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,6 +27,8 @@ class AutomationManager:
         """
         self.ha_client = ha_client
         self.automation_templates = self._load_automation_templates()
+        # Keyword matcher shared with the AI query path
+        self.intents = IntentClassifier(self.automation_templates)
         self.validation_cache = {}
         self._discovered_entities = None
         self._discovery_cache_time = None
@@ -324,48 +328,31 @@ class AutomationManager:
         }
     
     async def get_automation_recommendations(self, user_request: str,
-                                             available_entities: List[str] = None
+                                             available_entities: List[str] = None,
+                                             intent: Optional[Intent] = None
                                              ) -> List[Dict]:
         """Get smart automation recommendations based on user request and discovered entities.
         
         Args:
             user_request: User's natural language request
             available_entities: List of available Home Assistant entities (legacy)
+            intent: The request's intent, if already classified
             
         Returns:
             List of recommended automation templates with feasibility scores
         """
         recommendations = []
-        request_lower = user_request.lower()
+        intent = intent or self.intents.classify(user_request)
         
         # Get discovered entities for smarter recommendations
         discovered = await self._get_discovered_entities()
         capabilities = discovered.get('automation_capabilities', {})
         
-        # Keywords for different automation types
-        keywords = {
-            "lighting": ["light", "lamp", "brightness", "motion"],
-            "climate": ["temperature", "thermostat", "heating", "hvac"],
-            "security": ["security", "alarm", "door", "camera", "lock"],
-            "energy": ["energy", "save", "power", "consumption"],
-            "monitoring": ["monitor", "alert", "notification", "offline"]
-        }
-        
         # Score templates based on keyword matches
         for template_id, template in self.automation_templates.items():
-            score = 0
-            category = template["category"]
-            
-            # Check category keywords
-            if category in keywords:
-                for keyword in keywords[category]:
-                    if keyword in request_lower:
-                        score += 2
-            
-            # Check template description
-            for word in template["description"].lower().split():
-                if word in request_lower:
-                    score += 1
+            # Category keywords count double, template description words once
+            score = (2 * intent.categories.get(template["category"], 0)
+                     + intent.descriptions.get(template_id, 0))
             
             # Check if required entities are available
             entity_compatibility = 1.0
@@ -445,37 +432,21 @@ class AutomationManager:
         
         return yaml_content, automation_dict
 
-    def suggest_automations_for_query(self, query: str) -> List[Dict]:
+    def suggest_automations_for_query(self, query: str,
+                                      intent: Optional[Intent] = None) -> List[Dict]:
         """Suggest automations based on user query using keyword matching.
         
         Args:
             query: User's natural language query
+            intent: The query's intent, if already classified
             
         Returns:
             List of suggested automation templates
         """
-        query_lower = query.lower()
         suggestions = []
         
-        # Keywords mapping to templates
-        keyword_map = {
-            "motion_light": ["motion", "light", "turn on", "detect",
-                             "movement"],
-            "schedule_thermostat": ["schedule", "thermostat", "temperature",
-                                    "morning", "evening", "time"],
-            "device_offline": ["offline", "notify", "device", "down",
-                               "unavailable"],
-            "security_lights": ["security", "night", "protect", "alert",
-                                "alarm"],
-            "energy_saver": ["energy", "away", "save", "power", "efficiency"]
-        }
-        
-        # Score each template based on keyword matches
-        template_scores = {}
-        for template_id, keywords in keyword_map.items():
-            score = sum(1 for keyword in keywords if keyword in query_lower)
-            if score > 0:
-                template_scores[template_id] = score
+        # Template scores are the number of template keywords matched
+        template_scores = (intent or self.intents.classify(query)).templates
         
         # Sort by score and return matching templates
         sorted_templates = sorted(template_scores.items(),
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Backend Accounting for Hailo AI Terminal
+
+Every backend attempt is timed and its tokens counted, per backend and
+model:
+
+- queue wait: from entering the inference job queue until the request
+  starts
+- connect: establishing a new HTTP connection (0 when a pooled
+  connection is reused, absent for local inference)
+- time to first token: from the request starting until the first text
+  of a stream
+- total: from entering the queue until the last chunk
+
+Latencies go into HDR-style histograms, log-linear buckets covering
+microseconds to hours at about 3% relative error, kept for the lifetime
+of the process at a fixed memory cost. Tokens go into totals and rolling
+one-minute rates. Backends that do not report usage have their tokens
+estimated with the shared token counter. Optional prices per million
+tokens turn tokens into a cost estimate.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+import aiohttp
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Seconds covered by the rolling rates
+RATE_WINDOW = 60.0
+
+# Timing of the attempt running in the current task, for the HTTP tracer
+current_timing: contextvars.ContextVar = contextvars.ContextVar('current_timing', default=None)
+
+
+class HdrHistogram:
+    """Log-linear latency histogram with bounded relative error.
+
+    Values are counted in whole microseconds. Below ``2 ** precision``
+    every value has its own bucket; above, each power of two is split
+    into ``2 ** precision`` linear buckets.
+    """
+
+    def __init__(self, precision: int = 5, max_seconds: float = 3600.0):
+        self.precision = precision
+        self.sub_buckets = 1 << precision
+        octaves = max(1, int(max_seconds * 1e6).bit_length() - precision)
+        self._counts = np.zeros(self.sub_buckets * (octaves + 1), dtype=np.int64)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.min = 0.0
+        self.max = 0.0
+
+    def _index(self, micros: int) -> int:
+        if micros < self.sub_buckets:
+            return micros
+        shift = micros.bit_length() - 1 - self.precision
+        index = (shift + 1) * self.sub_buckets + (micros >> shift) - self.sub_buckets
+        return min(index, len(self._counts) - 1)
+
+    def _value(self, index: int) -> float:
+        """Middle of a bucket, in seconds."""
+        if index < self.sub_buckets:
+            return index / 1e6
+        shift = index // self.sub_buckets - 1
+        low = (index % self.sub_buckets + self.sub_buckets) << shift
+        return (low + ((1 << shift) - 1) / 2) / 1e6
+
+    def record(self, seconds: float):
+        micros = max(0, int(seconds * 1e6))
+        with self._lock:
+            self._counts[self._index(micros)] += 1
+            self.min = seconds if not self.count else min(self.min, seconds)
+            self.max = max(self.max, seconds)
+            self.count += 1
+            self.total += seconds
+
+    def percentile(self, q: float) -> float:
+        """Percentile (0-100) of every recorded value, in seconds."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = max(1, int(np.ceil(q / 100.0 * self.count)))
+            index = int(np.searchsorted(np.cumsum(self._counts), rank))
+            return min(max(self._value(index), self.min), self.max)
+
+    def summary(self) -> Dict[str, Any]:
+        """Summary in milliseconds."""
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            'min_ms': round(self.min * 1000, 2),
+            'p50_ms': round(self.percentile(50) * 1000, 2),
+            'p90_ms': round(self.percentile(90) * 1000, 2),
+            'p99_ms': round(self.percentile(99) * 1000, 2),
+            'p999_ms': round(self.percentile(99.9) * 1000, 2),
+            'max_ms': round(self.max * 1000, 2)
+        }
+
+
+class RollingRate:
+    """Sum of amounts per second over a sliding window."""
+
+    def __init__(self, window: float = RATE_WINDOW):
+        self.window = window
+        self._buckets: Deque[List[float]] = deque()
+        self._first: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def add(self, amount: float, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        second = int(now)
+        with self._lock:
+            if self._first is None:
+                self._first = now
+            if self._buckets and self._buckets[-1][0] == second:
+                self._buckets[-1][1] += amount
+            else:
+                self._buckets.append([second, amount])
+            self._trim(now)
+
+    def _trim(self, now: float):
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            self._buckets.popleft()
+
+    def total(self, now: Optional[float] = None) -> float:
+        """Sum of the amounts within the window."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._trim(now)
+            return sum(amount for _, amount in self._buckets)
+
+    def rate(self, now: Optional[float] = None) -> float:
+        """Amount per second over the window, or since the first amount."""
+        now = time.monotonic() if now is None else now
+        total = self.total(now)
+        if self._first is None:
+            return 0.0
+        return total / max(1.0, min(self.window, now - self._first))
+
+
+def usage_tokens(usage: Optional[Dict[str, Any]]) -> Tuple[Optional[int], Optional[int]]:
+    """Prompt and completion tokens of a usage report, in any backend's naming."""
+    if not usage:
+        return None, None
+    prompt = usage.get('prompt_tokens', usage.get('input_tokens'))
+    completion = usage.get('completion_tokens', usage.get('output_tokens'))
+    return (int(prompt) if prompt is not None else None,
+            int(completion) if completion is not None else None)
+
+
+def parse_costs(spec: Any) -> Dict[str, Tuple[float, float]]:
+    """Parse prices such as ``openai=2.5/10,anthropic.claude-3-haiku=0.25/1.25``.
+
+    Prices are per million prompt/completion tokens, keyed by backend or
+    ``backend.model``.
+    """
+    if isinstance(spec, dict):
+        entries = [f'{key}={value}' for key, value in spec.items()]
+    else:
+        entries = [entry.strip() for entry in str(spec or '').split(',') if entry.strip()]
+
+    costs = {}
+    for entry in entries:
+        key, _, value = entry.partition('=')
+        prompt, _, completion = value.partition('/')
+        try:
+            costs[key.strip()] = (float(prompt), float(completion or prompt))
+        except ValueError:
+            logger.warning(f"Ignoring invalid token price: {entry}")
+    return costs
+
+
+@dataclass
+class GenerationTiming:
+    """Timestamps of one backend attempt."""
+    backend: str
+    model: str
+    enqueued_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+    first_token_at: Optional[float] = None
+    connect: Optional[float] = None
+    _connecting_since: Optional[float] = None
+
+    @property
+    def queue_wait(self) -> Optional[float]:
+        return self.started_at - self.enqueued_at if self.started_at is not None else None
+
+    @property
+    def ttft(self) -> Optional[float]:
+        if self.first_token_at is None or self.started_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    def start(self):
+        """Mark the request as leaving the queue, in the task running it."""
+        self.started_at = time.monotonic()
+        current_timing.set(self)
+
+    async def run(self, call: Any) -> Any:
+        """Await a backend call started now."""
+        self.start()
+        return await call
+
+    async def stream(self, chunks: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        """Pass a backend stream through, marking its first text."""
+        self.start()
+        try:
+            async for chunk in chunks:
+                if self.first_token_at is None and getattr(chunk, 'text', None):
+                    self.first_token_at = time.monotonic()
+                yield chunk
+        finally:
+            aclose = getattr(chunks, 'aclose', None)
+            if aclose is not None:
+                await aclose()
+
+
+async def _on_connection_create_start(session, context, params):
+    timing = current_timing.get()
+    if timing is not None:
+        timing._connecting_since = time.monotonic()
+
+
+async def _on_connection_create_end(session, context, params):
+    timing = current_timing.get()
+    if timing is not None and timing._connecting_since is not None:
+        timing.connect = (timing.connect or 0.0) + time.monotonic() - timing._connecting_since
+        timing._connecting_since = None
+
+
+async def _on_connection_reuseconn(session, context, params):
+    timing = current_timing.get()
+    if timing is not None and timing.connect is None:
+        timing.connect = 0.0
+
+
+def connection_tracing() -> aiohttp.TraceConfig:
+    """aiohttp tracing that records connect time into the current timing."""
+    trace = aiohttp.TraceConfig()
+    trace.on_connection_create_start.append(_on_connection_create_start)
+    trace.on_connection_create_end.append(_on_connection_create_end)
+    trace.on_connection_reuseconn.append(_on_connection_reuseconn)
+    return trace
+
+
+class UsageStats:
+    """Latency histograms, token counts and rates of one backend and model."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.cached = 0
+        self.estimated = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.queue_wait = HdrHistogram()
+        self.connect = HdrHistogram()
+        self.ttft = HdrHistogram()
+        self.total = HdrHistogram()
+        self.completion_rate = RollingRate()
+        self.prompt_rate = RollingRate()
+        self.busy = RollingRate()
+
+    def to_dict(self) -> Dict[str, Any]:
+        busy = self.busy.total()
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'cached': self.cached,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'estimated_usage': self.estimated,
+            'cost': round(self.cost, 6),
+            'queue_wait': self.queue_wait.summary(),
+            'connect': self.connect.summary(),
+            'ttft': self.ttft.summary(),
+            'total': self.total.summary(),
+            # Throughput over the last minute, and while generating
+            'prompt_tokens_per_second': round(self.prompt_rate.rate(), 2),
+            'completion_tokens_per_second': round(self.completion_rate.rate(), 2),
+            'generation_tokens_per_second': round(
+                self.completion_rate.total() / busy, 2) if busy > 0 else 0.0
+        }
+
+
+class BackendAccounting:
+    """Per backend and model accounting of every attempt."""
+
+    def __init__(self, costs: Any = None):
+        self.costs = parse_costs(costs)
+        self._stats: Dict[str, Dict[str, UsageStats]] = {}
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def stats(self, backend: str, model: str) -> UsageStats:
+        with self._lock:
+            return self._stats.setdefault(backend, {}).setdefault(model or '', UsageStats())
+
+    def start(self, backend: str, model: str) -> GenerationTiming:
+        """Timing for an attempt entering the queue now."""
+        return GenerationTiming(backend, model or '')
+
+    def price(self, backend: str, model: str) -> Tuple[float, float]:
+        return self.costs.get(f'{backend}.{model}') or self.costs.get(backend) or (0.0, 0.0)
+
+    def finish(self, timing: GenerationTiming, prompt_tokens: Optional[int],
+               completion_tokens: Optional[int], error: Optional[str] = None,
+               model: Optional[str] = None, estimated: bool = False):
+        """Record a finished (or failed) attempt."""
+        now = time.monotonic()
+        model = model or timing.model
+        stats = self.stats(timing.backend, model)
+        stats.requests += 1
+        self.version += 1
+        if error:
+            stats.errors += 1
+        if timing.queue_wait is not None:
+            stats.queue_wait.record(timing.queue_wait)
+        if timing.connect is not None:
+            stats.connect.record(timing.connect)
+        if timing.ttft is not None:
+            stats.ttft.record(timing.ttft)
+        stats.total.record(now - timing.enqueued_at)
+        if timing.started_at is not None:
+            stats.busy.add(now - timing.started_at, now)
+
+        prompt_tokens = prompt_tokens or 0
+        completion_tokens = completion_tokens or 0
+        stats.estimated += estimated
+        stats.prompt_tokens += prompt_tokens
+        stats.completion_tokens += completion_tokens
+        stats.prompt_rate.add(prompt_tokens, now)
+        stats.completion_rate.add(completion_tokens, now)
+        prompt_price, completion_price = self.price(timing.backend, model)
+        stats.cost += (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+
+    def record_cached(self, backend: str, model: str):
+        """Count a completion served from the cache."""
+        self.stats(backend, model).cached += 1
+        self.version += 1
+
+    def get_stats(self, backend: Optional[str] = None) -> Dict[str, Any]:
+        """Stats per model of one backend, or per backend and model."""
+        with self._lock:
+            selected = {name: dict(models) for name, models in self._stats.items()
+                        if backend is None or name == backend}
+        result = {name: {model: stats.to_dict() for model, stats in models.items()}
+                  for name, models in selected.items()}
+        return result.get(backend, {}) if backend is not None else result
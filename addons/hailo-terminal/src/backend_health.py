@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+AI Backend Health Probing for Hailo AI Terminal
+
+Backend availability used to be checked inline: every status request and
+every Ollama query made a blocking HTTP probe, and a stopped Ollama
+service stalled them for seconds. Availability is now probed in the
+background on the event loop and kept as cached state with the time it
+was last checked, so status endpoints never do network I/O.
+
+Healthy backends are re-probed every ``interval`` seconds. Failing ones
+are retried after ``retry`` seconds, doubling per consecutive failure up
+to ``max_backoff``. Completed queries also count as a successful check,
+and a failed query schedules an immediate probe.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 30.0
+DEFAULT_RETRY = 5.0
+DEFAULT_MAX_BACKOFF = 300.0
+DEFAULT_PROBE_TIMEOUT = 5.0
+
+
+@dataclass
+class BackendHealth:
+    """Cached availability of one backend."""
+    available: bool = False
+    last_checked: Optional[float] = None
+    last_error: Optional[str] = None
+    failures: int = 0
+    next_check: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'available': self.available,
+            'last_checked': (datetime.fromtimestamp(self.last_checked).isoformat()
+                             if self.last_checked else None),
+            'last_error': self.last_error,
+            'consecutive_failures': self.failures
+        }
+
+
+class HealthProber:
+    """Probes AI backends in the background and caches their availability.
+
+    Reads are safe from any thread. :meth:`start`, :meth:`request_probe`
+    and :meth:`stop` must be called on the event loop running the probes.
+    """
+
+    def __init__(self, backends: Dict[str, Any], interval: float = DEFAULT_INTERVAL,
+                 retry: float = DEFAULT_RETRY, max_backoff: float = DEFAULT_MAX_BACKOFF,
+                 timeout: float = DEFAULT_PROBE_TIMEOUT):
+        """Initialize the prober.
+
+        Args:
+            backends: Backends by name; each has ``is_available()``, which
+                must not block, and an async ``probe()``
+            interval: Seconds between probes of a healthy backend
+            retry: Seconds before the first retry of a failing backend
+            max_backoff: Upper bound of the retry delay
+            timeout: Seconds a single probe may take
+        """
+        self.backends = backends
+        self.interval = interval
+        self.retry = retry
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+        self._states: Dict[str, BackendHealth] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.probes = 0
+
+    def get(self, name: str) -> BackendHealth:
+        """Cached health of a backend, seeded from its local checks."""
+        state = self._states.get(name)
+        if state is None:
+            backend = self.backends.get(name)
+            state = BackendHealth(available=bool(backend and backend.is_available()))
+            self._states[name] = state
+        return state
+
+    def is_available(self, name: str) -> bool:
+        return name in self.backends and self.get(name).available
+
+    def available(self) -> List[str]:
+        """Names of backends currently considered available."""
+        return [name for name in self.backends if self.get(name).available]
+
+    def _delay(self, failures: int) -> float:
+        """Seconds until the next probe after ``failures`` failed probes."""
+        if not failures:
+            return self.interval
+        return min(self.retry * 2 ** (failures - 1), self.max_backoff)
+
+    def _update(self, name: str, available: bool, error: Optional[str] = None):
+        state = self.get(name)
+        if available != state.available:
+            if available:
+                logger.info(f"AI backend {name} is available")
+            else:
+                logger.warning(f"AI backend {name} is unavailable"
+                               + (f": {error}" if error else ""))
+        state.available = available
+        state.last_checked = time.time()
+        state.last_error = error
+        state.failures = 0 if available else state.failures + 1
+        state.next_check = time.monotonic() + self._delay(state.failures)
+
+    def record_success(self, name: str):
+        """Count a completed query as a successful check."""
+        if name in self.backends:
+            self._update(name, True)
+
+    def request_probe(self, name: str):
+        """Probe a backend as soon as possible, e.g. after a failed query."""
+        if name not in self.backends:
+            return
+        self.get(name).next_check = 0.0
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def probe(self, name: str) -> bool:
+        """Probe one backend now and update its cached state."""
+        self.probes += 1
+        try:
+            available = bool(await asyncio.wait_for(self.backends[name].probe(),
+                                                    self.timeout))
+            self._update(name, available)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self._update(name, False, f"probe timed out after {self.timeout:g}s")
+        except Exception as e:
+            self._update(name, False, str(e) or type(e).__name__)
+        return self.get(name).available
+
+    async def probe_all(self):
+        """Probe every backend concurrently."""
+        await asyncio.gather(*(self.probe(name) for name in list(self.backends)))
+
+    def start(self):
+        """Start probing on the running loop."""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            due = [name for name in list(self.backends) if self.get(name).next_check <= now]
+            if due:
+                await asyncio.gather(*(self.probe(name) for name in due))
+
+            self._wakeup.clear()
+            next_check = min((self.get(name).next_check for name in self.backends),
+                             default=time.monotonic() + self.interval)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(),
+                                       max(next_check - time.monotonic(), 0.0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self):
+        """Stop background probing."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'running': self._task is not None and not self._task.done(),
+            'interval': self.interval,
+            'probes': self.probes,
+            'backends': {name: self.get(name).to_dict() for name in self.backends}
+        }
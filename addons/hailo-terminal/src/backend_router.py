@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+AI Backend Router for Hailo AI Terminal
+
+Picks which backends answer a query and in what order, instead of always
+sending it to the selected backend and returning its error.
+
+Routing policies:
+
+- ``fixed``: the selected backend first, then the configured fallback
+  chain
+- ``auto``: short factual and automation queries go to the local backends
+  (Hailo, Ollama) first; long or reasoning queries go to the cloud
+  backends first. The other group is the fallback.
+
+Each attempt is bounded by ``timeout`` (time to first token for streamed
+queries); a timeout or error moves on to the next backend in the chain.
+A streamed query only falls back before its first token, since tokens
+already sent cannot be taken back.
+
+With hedging enabled, the next backend in the chain is started once the
+first has been running longer than its p95 latency, and whichever answers
+first wins; the other request is cancelled.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from metrics import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ('fixed', 'auto')
+
+LOCAL_BACKENDS = ('hailo', 'ollama', 'local')
+CLOUD_BACKENDS = ('anthropic', 'openai')
+
+# Only local backends by default, so a failing local model never sends
+# queries to a cloud service the user did not select
+DEFAULT_FALLBACK = ('hailo', 'ollama')
+
+DEFAULT_TIMEOUT = 60.0
+HEDGE_MIN_SAMPLES = 10
+
+# Queries up to this many words without reasoning cues count as short
+SHORT_QUERY_WORDS = 24
+REASONING_CUES = re.compile(
+    r'\b(why|explain|compare|analy[sz]e|plan|design|write|summari[sz]e|'
+    r'step by step|pros and cons|difference between)\b'
+)
+
+
+@dataclass
+class RouteFailure:
+    """An attempt that raised or timed out instead of answering."""
+    backend: str
+    error: str
+    content: str = ""
+
+
+class RouteStats:
+    """Latency and outcome counters of one backend."""
+
+    def __init__(self):
+        self.latency = LatencyStats()
+        self.ttft = LatencyStats()
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.fallbacks = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'cancelled': self.cancelled,
+            'fallbacks': self.fallbacks,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'error_rate': round((self.errors + self.timeouts) / self.requests, 3)
+            if self.requests else 0.0,
+            'latency': self.latency.summary(),
+            'ttft': self.ttft.summary()
+        }
+
+
+class StreamAttempt:
+    """One backend's token stream, read up to its first token while racing."""
+
+    def __init__(self, backend: str, chunks: AsyncIterator[Any]):
+        self.backend = backend
+        self._chunks = chunks
+        self._started = time.monotonic()
+        self.parts: List[str] = []
+        self.usage: Optional[Dict[str, int]] = None
+        self.model: Optional[str] = None
+        self.error: Optional[str] = None
+        self.ttft: Optional[float] = None
+
+    @property
+    def content(self) -> str:
+        return ''.join(self.parts)
+
+    def _absorb(self, chunk: Any) -> bool:
+        """Take in a chunk; True when it carried text."""
+        if chunk.error:
+            self.error = chunk.error
+            return False
+        self.usage = chunk.usage or self.usage
+        self.model = chunk.model or self.model
+        if not chunk.text:
+            return False
+        if self.ttft is None:
+            self.ttft = time.monotonic() - self._started
+        self.parts.append(chunk.text)
+        return True
+
+    async def first_token(self) -> 'StreamAttempt':
+        """Read until the first text, an error or the end of the stream."""
+        async for chunk in self._chunks:
+            if self._absorb(chunk) or self.error:
+                break
+        if not self.parts and not self.error:
+            self.error = "Empty response"
+        return self
+
+    async def finish(self, on_token: Callable[[str], None]):
+        """Deliver the text read so far, then stream the rest."""
+        for text in self.parts:
+            on_token(text)
+        if self.error:
+            return
+        async for chunk in self._chunks:
+            if self._absorb(chunk):
+                on_token(chunk.text)
+            elif self.error:
+                break
+
+    async def aclose(self):
+        close = getattr(self._chunks, 'aclose', None)
+        if close is not None:
+            await close()
+
+
+class BackendRouter:
+    """Routes AI queries over backends with fallback and optional hedging."""
+
+    def __init__(self, backends: Dict[str, Any], health: Any = None,
+                 policy: str = 'fixed', fallback: Optional[List[str]] = None,
+                 timeout: float = DEFAULT_TIMEOUT, hedge: bool = False,
+                 hedge_min_samples: int = HEDGE_MIN_SAMPLES):
+        """Initialize the router.
+
+        Args:
+            backends: Backends by name
+            health: Optional HealthProber; unavailable backends are skipped
+                and attempt outcomes are reported to it
+            policy: ``fixed`` or ``auto``
+            fallback: Backends tried in order after the preferred one
+            timeout: Seconds allowed per attempt
+            hedge: Start the next backend after the p95 latency
+            hedge_min_samples: Latency samples needed before hedging
+        """
+        if policy not in POLICIES:
+            logger.warning(f"Unknown routing policy {policy!r}, using 'fixed'")
+            policy = 'fixed'
+        self.backends = backends
+        self.health = health
+        self.policy = policy
+        self.fallback = list(DEFAULT_FALLBACK if fallback is None else fallback)
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self._stats: Dict[str, RouteStats] = {}
+
+    def stats(self, name: str) -> RouteStats:
+        return self._stats.setdefault(name, RouteStats())
+
+    @staticmethod
+    def classify(prompt: str) -> str:
+        """Classify a query as ``local`` (short) or ``cloud`` (reasoning)."""
+        text = prompt.lower()
+        if len(text.split()) > SHORT_QUERY_WORDS or REASONING_CUES.search(text):
+            return 'cloud'
+        return 'local'
+
+    def _available(self, name: str) -> bool:
+        if name not in self.backends:
+            return False
+        return self.health.is_available(name) if self.health else True
+
+    def plan(self, prompt: str, preferred: str) -> List[str]:
+        """Backends to try for a query, in order.
+
+        The preferred backend leads a ``fixed`` plan even when it looks
+        unavailable, so its own error is reported if nothing else works.
+        """
+        if self.policy == 'auto':
+            local = [name for name in LOCAL_BACKENDS if name in self.backends]
+            cloud = [name for name in CLOUD_BACKENDS if name in self.backends]
+            order = local + cloud if self.classify(prompt) == 'local' else cloud + local
+            order = [name for name in order if self._available(name)]
+            if not order and preferred in self.backends:
+                order = [preferred]
+            return order
+
+        order = [preferred] if preferred in self.backends else []
+        for name in self.fallback:
+            if name not in order and self._available(name):
+                order.append(name)
+        return order
+
+    def hedge_delay(self, name: str, streaming: bool = False) -> Optional[float]:
+        """Seconds to wait on a backend before hedging, or None."""
+        if not self.hedge:
+            return None
+        series = self.stats(name).ttft if streaming else self.stats(name).latency
+        if series.count < self.hedge_min_samples:
+            return None
+        return min(series.percentile(95), self.timeout)
+
+    async def _attempt(self, name: str, run: Callable[[str], Awaitable[Any]],
+                       streaming: bool) -> Any:
+        """Run one backend with the attempt timeout and record the outcome."""
+        stats = self.stats(name)
+        stats.requests += 1
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(run(name), self.timeout)
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            raise
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            result = RouteFailure(name, f"{name} timed out after {self.timeout:g}s")
+        except Exception as e:
+            stats.errors += 1
+            result = RouteFailure(name, str(e) or type(e).__name__)
+        else:
+            if result.error:
+                stats.errors += 1
+            else:
+                (stats.ttft if streaming else stats.latency).record(
+                    time.monotonic() - started)
+
+        if self.health:
+            if result.error:
+                self.health.request_probe(name)
+            else:
+                self.health.record_success(name)
+        return result
+
+    @staticmethod
+    async def _discard(result: Any):
+        if isinstance(result, StreamAttempt):
+            await result.aclose()
+
+    async def _first_success(self, names: List[str], run: Callable[[str], Awaitable[Any]],
+                             streaming: bool) -> Tuple[str, Any]:
+        """Try backends in order, hedging when enabled, until one succeeds.
+
+        Returns:
+            The backend name and its result, or the last failure
+        """
+        queue = list(names)
+        tasks: Dict[asyncio.Task, str] = {}
+        last: Tuple[str, Any] = (names[0], RouteFailure(names[0], "No AI backend available"))
+        hedge_at: Optional[float] = None
+        hedges = set()
+
+        def start(name: str, hedge: bool = False):
+            nonlocal hedge_at
+            tasks[asyncio.create_task(self._attempt(name, run, streaming))] = name
+            # At most one hedge per attempt
+            delay = self.hedge_delay(name, streaming) if queue and not hedge else None
+            hedge_at = time.monotonic() + delay if delay is not None else None
+            if hedge:
+                hedges.add(name)
+
+        try:
+            while queue or tasks:
+                if not tasks:
+                    if last[0] != queue[0]:
+                        self.stats(last[0]).fallbacks += 1
+                    start(queue.pop(0))
+
+                timeout = max(hedge_at - time.monotonic(), 0.0) if hedge_at is not None else None
+                done, _ = await asyncio.wait(tasks, timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = queue.pop(0)
+                    self.stats(hedged).hedges += 1
+                    logger.debug(f"Hedging {', '.join(tasks.values())} with {hedged}")
+                    start(hedged, hedge=True)
+                    continue
+
+                winner = None
+                for task in done:
+                    name = tasks.pop(task)
+                    result = task.result()
+                    if winner is None and not result.error:
+                        winner = (name, result)
+                    else:
+                        await self._discard(result)
+                        last = (name, result)
+                        if not tasks:
+                            hedge_at = None
+                if winner is not None:
+                    if winner[0] in hedges:
+                        self.stats(winner[0]).hedge_wins += 1
+                    return winner
+            return last
+        finally:
+            for task in tasks:
+                task.cancel()
+            for result in await asyncio.gather(*tasks, return_exceptions=True):
+                if not isinstance(result, BaseException):
+                    await self._discard(result)
+
+    async def generate(self, names: List[str],
+                       call: Callable[[str], Awaitable[Any]]) -> Tuple[str, Any]:
+        """Get a complete response from the first backend that answers.
+
+        Args:
+            names: Backends in order, as returned by :meth:`plan`
+            call: ``call(name)`` returns a coroutine producing a response
+                with an ``error`` attribute
+
+        Returns:
+            The answering backend and its response, or the last failure
+        """
+        return await self._first_success(names, call, streaming=False)
+
+    async def stream(self, names: List[str],
+                     open_stream: Callable[[str], AsyncIterator[Any]],
+                     on_token: Callable[[str], None]) -> Tuple[str, Any]:
+        """Stream a response from the first backend to produce a token.
+
+        Args:
+            names: Backends in order, as returned by :meth:`plan`
+            open_stream: ``open_stream(name)`` returns the backend's chunk
+                iterator
+            on_token: Receives the winning backend's text chunks
+
+        Returns:
+            The answering backend and its finished StreamAttempt, or the
+            last failure
+        """
+        async def first_token(name: str) -> StreamAttempt:
+            attempt = StreamAttempt(name, open_stream(name))
+            try:
+                return await attempt.first_token()
+            except BaseException:
+                await attempt.aclose()
+                raise
+
+        name, result = await self._first_success(names, first_token, streaming=True)
+        if isinstance(result, StreamAttempt):
+            try:
+                await result.finish(on_token)
+            finally:
+                await result.aclose()
+        return name, result
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'policy': self.policy,
+            'fallback': self.fallback,
+            'timeout': self.timeout,
+            'hedge': self.hedge,
+            'backends': {name: stats.to_dict() for name, stats in self._stats.items()}
+        }
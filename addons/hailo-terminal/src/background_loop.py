@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Background Event Loop for Hailo AI Terminal
+
+In Flask mode request handlers run on Werkzeug threads. Long-lived async
+components (the AI query pool and anything else that must outlive a single
+request) run on one shared event loop hosted in a daemon thread, and
+handlers hand coroutines to it instead of creating throwaway loops.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Coroutine, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundEventLoop:
+    """An asyncio event loop running forever in a daemon thread."""
+
+    def __init__(self, name: str = 'hailo-event-loop'):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The running loop, started on first use."""
+        self.start()
+        return self._loop
+
+    def start(self):
+        """Start the loop thread if it is not running yet."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._run, name=self.name, daemon=True
+            )
+            self._thread.start()
+            logger.debug(f"Background event loop '{self.name}' started")
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Schedule a coroutine on the loop from any thread."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and block until it finishes."""
+        return self.submit(coro).result(timeout)
+
+    def call(self, fn: Callable[..., Any], *args) -> Any:
+        """Call a plain function on the loop thread and return its result.
+
+        For loop-bound objects that are not thread-safe.
+        """
+        async def invoke():
+            return fn(*args)
+        return self.run(invoke())
+
+    def stop(self):
+        """Stop the loop and wait for its thread to exit."""
+        with self._lock:
+            if self._loop is None or self._thread is None:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+AI Completion Cache for Hailo AI Terminal
+
+Users ask the same questions again and again, and every miss costs a cloud
+call or seconds of local inference. Completions are cached in an LRU with
+a time-to-live, keyed on the backend, model, sampling parameters, the
+normalised prompt and a hash of the conversation context sent with it.
+The cache can optionally be persisted to disk so it survives restarts.
+Writes to disk are deferred: a change marks the cache dirty and one save
+runs in a worker thread a moment later, whatever the number of changes,
+and ``close()`` (or ``flush()``) writes what is left on shutdown.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL = 3600
+# Seconds changes are collected before the cache is written to disk
+SAVE_DELAY = 2.0
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalise_prompt(prompt: str) -> str:
+    """Normalise a prompt so trivially different phrasings share a key.
+
+    Case, surrounding and repeated whitespace and trailing punctuation are
+    ignored.
+    """
+    return _WHITESPACE.sub(' ', prompt.lower()).strip().rstrip('?!. ')
+
+
+def context_hash(context: Optional[List[Dict[str, str]]]) -> str:
+    """Hash the conversation context sent along with a prompt."""
+    digest = hashlib.sha1()
+    for message in context or []:
+        digest.update(message.get('role', '').encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(message.get('content', '').encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class CompletionCache:
+    """Thread-safe LRU+TTL cache of AI completions."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl: float = DEFAULT_TTL, path: Optional[str] = None,
+                 save_delay: float = SAVE_DELAY):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of completions kept; 0 disables
+                the cache
+            ttl: Seconds a completion stays valid
+            path: Optional JSON file the cache is loaded from and saved to
+            save_delay: Seconds changes are collected before a save
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.save_delay = save_delay
+        self._entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._dirty = False
+        self._save_lock = threading.Lock()
+        self._save_handle: Optional[asyncio.TimerHandle] = None
+        self._save_task: Optional[asyncio.Future] = None
+        self.saves = 0
+
+        if self.path:
+            self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def make_key(backend: str, model: str, params: Dict[str, Any], prompt: str,
+                 context: Optional[List[Dict[str, str]]] = None) -> str:
+        """Build the cache key for a completion request."""
+        material = json.dumps([
+            backend, model, sorted(params.items()),
+            normalise_prompt(prompt), context_hash(context)
+        ], default=str)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _record(self, backend: str, outcome: str):
+        stats = self._stats.setdefault(backend, {'hits': 0, 'misses': 0})
+        stats[outcome] += 1
+
+    def get(self, key: str, backend: str) -> Optional[Dict[str, Any]]:
+        """Get a cached completion, counting a hit or miss for ``backend``.
+
+        Returns:
+            The cached response fields, or None
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry['created'] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._record(backend, 'misses')
+                return None
+            self._entries.move_to_end(key)
+            self._record(backend, 'hits')
+            return dict(entry['response'])
+
+    def put(self, key: str, backend: str, response: Dict[str, Any]):
+        """Store a completion."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = {
+                'backend': backend,
+                'created': time.time(),
+                'response': response
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self._schedule_save()
+
+    def clear(self):
+        """Drop all cached completions."""
+        with self._lock:
+            self._entries.clear()
+        self._schedule_save()
+
+    def _schedule_save(self):
+        """Mark the cache changed and save it a little later.
+
+        Without a running event loop the cache is saved right away.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            self._dirty = True
+        if self._save_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+            return
+        self._save_handle = loop.call_later(self.save_delay, self._save_later)
+
+    def _save_later(self):
+        self._save_handle = None
+        self._save_task = asyncio.ensure_future(asyncio.to_thread(self.save))
+
+    def flush(self):
+        """Write pending changes now. Blocking."""
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        if self._dirty:
+            self.save()
+
+    async def close(self):
+        """Write pending changes before shutdown, off the event loop."""
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        if self._save_task is not None:
+            await asyncio.gather(self._save_task, return_exceptions=True)
+            self._save_task = None
+        if self._dirty:
+            await asyncio.to_thread(self.save)
+
+    def _load(self):
+        """Load unexpired entries from disk."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Could not load completion cache from {self.path}: {e}")
+            return
+
+        now = time.time()
+        for key, entry in entries[-self.max_entries:] if self.max_entries else []:
+            if now - entry.get('created', 0) <= self.ttl:
+                self._entries[key] = entry
+        logger.info(f"Loaded {len(self._entries)} cached completions")
+
+    def save(self):
+        """Write the cache to disk atomically. Blocking."""
+        with self._save_lock:
+            with self._lock:
+                entries = list(self._entries.items())
+                self._dirty = False
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(entries, f)
+                os.replace(tmp_path, self.path)
+                self.saves += 1
+            except Exception as e:
+                with self._lock:
+                    self._dirty = True
+                logger.warning(f"Could not save completion cache to {self.path}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache size and per-backend hit rates."""
+        with self._lock:
+            backends = {
+                backend: {
+                    'hits': stats['hits'],
+                    'misses': stats['misses'],
+                    'hit_rate': round(stats['hits'] / (stats['hits'] + stats['misses']), 3)
+                }
+                for backend, stats in self._stats.items()
+            }
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'persistent': bool(self.path),
+                'unsaved_changes': self._dirty,
+                'backends': backends
+            }
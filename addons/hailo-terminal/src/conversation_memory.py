@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Conversation Memory for Hailo AI Terminal
+
+Conversation history used to be one global list shared by every browser
+and trimmed by character count. Each session (a Socket.IO client or a
+named AI session) now has its own bounded history, idle sessions are
+evicted, and prompts are assembled within a token budget measured with
+tiktoken when it is installed.
+
+Token counts are cached per message, and the context window is built by
+one pass from the newest message back, so assembling a prompt is linear
+in the number of messages kept.
+
+Older turns can be folded into a running summary of the session (see
+``conversation_summary``). The summary is sent ahead of the recent
+messages and the folded messages are dropped.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION = 'default'
+DEFAULT_MAX_SESSIONS = 64
+DEFAULT_MAX_MESSAGES = 20
+DEFAULT_IDLE_TTL = 3600
+
+# Tokens added per chat message for role and separators
+MESSAGE_OVERHEAD = 4
+
+# Fallback when tiktoken or its encoding is unavailable: words and
+# punctuation marks are a close stand-in for BPE tokens
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken, or a word-based estimate without it."""
+
+    def __init__(self, encoding: str = 'cl100k_base', cache_size: int = 4096):
+        self._encoding = None
+        if TIKTOKEN_AVAILABLE:
+            try:
+                self._encoding = tiktoken.get_encoding(encoding)
+            except Exception as e:
+                # The encoding file is downloaded on first use
+                logger.warning(f"tiktoken encoding {encoding} unavailable, estimating tokens: {e}")
+        self.count = lru_cache(maxsize=cache_size)(self._count)
+
+    @property
+    def exact(self) -> bool:
+        return self._encoding is not None
+
+    def _count(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return len(_TOKEN_PATTERN.findall(text))
+
+    def message_tokens(self, message: Dict[str, str]) -> int:
+        return self.count(message.get('content', '')) + MESSAGE_OVERHEAD
+
+
+_default_counter: Optional[TokenCounter] = None
+
+
+def get_token_counter() -> TokenCounter:
+    """Shared token counter."""
+    global _default_counter
+    if _default_counter is None:
+        _default_counter = TokenCounter()
+    return _default_counter
+
+
+def fit_messages(messages: List[Dict[str, str]], budget: int,
+                 counter: Optional[TokenCounter] = None) -> List[Dict[str, str]]:
+    """Trim chat messages to a token budget in linear time.
+
+    A leading system message and the final message (the new prompt) are
+    always kept; older messages are dropped first.
+    """
+    if not messages:
+        return messages
+    counter = counter or get_token_counter()
+
+    head = 1 if messages[0].get('role') == 'system' and len(messages) > 1 else 0
+    used = counter.message_tokens(messages[-1])
+    if head:
+        used += counter.message_tokens(messages[0])
+
+    start = len(messages) - 1
+    while start > head:
+        tokens = counter.message_tokens(messages[start - 1])
+        if used + tokens > budget:
+            break
+        used += tokens
+        start -= 1
+    return messages[:head] + messages[start:]
+
+
+class Conversation:
+    """History of one session with cached per-message token counts."""
+
+    def __init__(self, max_messages: int = DEFAULT_MAX_MESSAGES):
+        self.messages: Deque[Dict[str, str]] = deque(maxlen=max_messages)
+        self.tokens: Deque[int] = deque(maxlen=max_messages)
+        self.last_used = time.monotonic()
+        # Position of messages[0] among every message of the session
+        self.start = 0
+        self.summary = ''
+        self.summary_tokens = 0
+        self.summarized = 0
+
+    def append(self, role: str, content: str, counter: TokenCounter):
+        message = {'role': role, 'content': content}
+        if len(self.messages) == self.messages.maxlen:
+            self.start += 1
+        self.messages.append(message)
+        self.tokens.append(counter.message_tokens(message))
+        self.last_used = time.monotonic()
+
+    def summary_message(self) -> Optional[Dict[str, str]]:
+        if not self.summary:
+            return None
+        return {'role': 'system',
+                'content': f"Summary of the earlier conversation: {self.summary}"}
+
+    def fold(self, summary: str, end: int, counter: TokenCounter) -> int:
+        """Replace the messages before position ``end`` with a summary.
+
+        Returns the number of messages removed.
+        """
+        removed = 0
+        while self.messages and self.start < end:
+            self.messages.popleft()
+            self.tokens.popleft()
+            self.start += 1
+            removed += 1
+        self.summary = summary.strip()
+        message = self.summary_message()
+        self.summary_tokens = counter.message_tokens(message) if message else 0
+        self.summarized += removed
+        return removed
+
+    def window(self, budget: int) -> List[Dict[str, str]]:
+        """Most recent messages whose tokens fit the budget, oldest first."""
+        used = 0
+        keep = 0
+        for tokens in reversed(self.tokens):
+            if used + tokens > budget:
+                break
+            used += tokens
+            keep += 1
+        self.last_used = time.monotonic()
+        if not keep:
+            return []
+        return list(self.messages)[-keep:]
+
+    @property
+    def token_count(self) -> int:
+        return sum(self.tokens) + self.summary_tokens
+
+
+class ConversationStore:
+    """Per-session conversations with a bound on sessions and idle time."""
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS,
+                 max_messages: int = DEFAULT_MAX_MESSAGES,
+                 idle_ttl: float = DEFAULT_IDLE_TTL,
+                 counter: Optional[TokenCounter] = None):
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.idle_ttl = idle_ttl
+        self.counter = counter or get_token_counter()
+        self._sessions: 'OrderedDict[str, Conversation]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def _evict(self):
+        """Drop idle sessions and the least recently used beyond the cap."""
+        now = time.monotonic()
+        while self._sessions:
+            session, conversation = next(iter(self._sessions.items()))
+            if (len(self._sessions) <= self.max_sessions
+                    and now - conversation.last_used <= self.idle_ttl):
+                break
+            del self._sessions[session]
+            self.evicted += 1
+
+    def get(self, session: Optional[str] = None,
+            create: bool = True) -> Optional[Conversation]:
+        """Conversation of a session, marking it recently used."""
+        session = session or DEFAULT_SESSION
+        with self._lock:
+            conversation = self._sessions.get(session)
+            if conversation is None:
+                if not create:
+                    return None
+                conversation = Conversation(self.max_messages)
+                self._sessions[session] = conversation
+            else:
+                self._sessions.move_to_end(session)
+            self._evict()
+            return conversation
+
+    def context(self, session: Optional[str], budget: int) -> List[Dict[str, str]]:
+        """Summary and recent history of a session that fit a token budget."""
+        conversation = self.get(session, create=False)
+        if conversation is None or budget <= 0:
+            return []
+        with self._lock:
+            summary = conversation.summary_message()
+            if summary is None or conversation.summary_tokens > budget:
+                return conversation.window(budget)
+            return [summary] + conversation.window(budget - conversation.summary_tokens)
+
+    def older(self, session: Optional[str], keep: int
+              ) -> Optional[Tuple[Conversation, List[Dict[str, str]], int]]:
+        """Messages of a session before its ``keep`` most recent.
+
+        Returns the conversation, the older messages and the position after
+        the last of them, for :meth:`fold`.
+        """
+        conversation = self.get(session, create=False)
+        if conversation is None:
+            return None
+        with self._lock:
+            count = len(conversation.messages) - keep
+            if count <= 0:
+                return None
+            older = list(conversation.messages)[:count]
+            return conversation, older, conversation.start + count
+
+    def fold(self, conversation: Conversation, summary: str, end: int) -> int:
+        """Replace the messages of a conversation before ``end`` with a summary.
+
+        A conversation dropped in the meantime is left alone.
+        """
+        with self._lock:
+            if conversation not in self._sessions.values():
+                return 0
+            return conversation.fold(summary, end, self.counter)
+
+    def append(self, session: Optional[str], role: str, content: str):
+        conversation = self.get(session)
+        with self._lock:
+            conversation.append(role, content, self.counter)
+
+    def messages(self, session: Optional[str] = None) -> List[Dict[str, str]]:
+        """All remembered messages of a session."""
+        conversation = self.get(session, create=False)
+        return list(conversation.messages) if conversation else []
+
+    def drop(self, session: Optional[str] = None):
+        """Forget a session."""
+        with self._lock:
+            self._sessions.pop(session or DEFAULT_SESSION, None)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'max_messages': self.max_messages,
+                'messages': sum(len(c.messages) for c in self._sessions.values()),
+                'tokens': sum(c.token_count for c in self._sessions.values()),
+                'summarized': sum(c.summarized for c in self._sessions.values()),
+                'evicted': self.evicted,
+                'exact_tokens': self.counter.exact
+            }
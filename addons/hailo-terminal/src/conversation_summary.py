@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Conversation Summaries for Hailo AI Terminal
+
+Each session used to resend its history verbatim until the message cap,
+then silently drop the oldest turns, so prompts grew with every turn and
+older facts were lost. The summarizer keeps the most recent messages
+verbatim and, once enough older ones pile up, folds them into a running
+summary of the session in the background. Requests then carry the
+summary and the recent turns, and prompt size stays about constant over
+long sessions.
+
+Summaries are produced by a backend call, queued as background work so
+they never delay interactive queries. A failed summary leaves the
+history as it was; the message cap still applies.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from conversation_memory import ConversationStore
+from metrics import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+# Messages always sent verbatim
+DEFAULT_KEEP_RECENT = 6
+# Older messages folded into the summary at a time
+FOLD_BATCH = 4
+# Length the summary is asked to stay within
+SUMMARY_WORDS = 120
+
+
+def build_summary_prompt(summary: str, messages: List[Dict[str, str]],
+                         max_words: int = SUMMARY_WORDS) -> str:
+    """Prompt asking to fold messages into an existing summary."""
+    turns = '\n'.join(f"{msg['role']}: {msg['content']}" for msg in messages)
+    return (
+        f"Update the summary of a conversation with a Home Assistant assistant. "
+        f"Keep facts, entity ids, decisions and open questions; drop small talk. "
+        f"Reply with the summary only, at most {max_words} words.\n\n"
+        f"Current summary: {summary or '(none)'}\n\n"
+        f"New messages:\n{turns}\n\n"
+        f"Updated summary:"
+    )
+
+
+class ConversationSummarizer:
+    """Folds older messages of each session into a running summary."""
+
+    def __init__(self, store: ConversationStore,
+                 summarize: Callable[[str], Awaitable[str]],
+                 keep_recent: int = DEFAULT_KEEP_RECENT,
+                 fold_batch: int = FOLD_BATCH, max_words: int = SUMMARY_WORDS):
+        """Initialize the summarizer.
+
+        Args:
+            store: Conversations to summarize
+            summarize: Returns the completion of a summary prompt
+            keep_recent: Messages kept verbatim; 0 disables summaries
+            fold_batch: Older messages needed before a summary is made
+            max_words: Length the summary is asked to stay within
+        """
+        self.store = store
+        self.summarize = summarize
+        self.keep_recent = keep_recent
+        self.fold_batch = max(1, fold_batch)
+        self.max_words = max_words
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+        self.runs = 0
+        self.failures = 0
+        self.folded = 0
+        self.latency = LatencyStats()
+
+    @property
+    def enabled(self) -> bool:
+        return self.keep_recent > 0
+
+    def due(self, session: Optional[str]) -> bool:
+        """Whether enough older messages wait to be folded."""
+        older = self.store.older(session, self.keep_recent)
+        return older is not None and len(older[1]) >= self.fold_batch
+
+    def schedule(self, session: Optional[str]) -> Optional[asyncio.Task]:
+        """Summarize a session in the background if it is due.
+
+        Must be called on the event loop. At most one summary runs per
+        session.
+        """
+        key = session or ''
+        if not self.enabled or key in self._tasks or not self.due(session):
+            return None
+        task = asyncio.ensure_future(self.summarize_session(session))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return task
+
+    async def summarize_session(self, session: Optional[str]) -> bool:
+        """Fold the older messages of a session into its summary once."""
+        older = self.store.older(session, self.keep_recent)
+        if older is None:
+            return False
+        conversation, messages, end = older
+
+        started = time.perf_counter()
+        try:
+            summary = await self.summarize(
+                build_summary_prompt(conversation.summary, messages, self.max_words))
+            if not summary or not summary.strip():
+                raise ValueError("empty summary")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Conversation summary of {session or 'default'} failed: {e}")
+            return False
+
+        self.runs += 1
+        self.latency.record(time.perf_counter() - started)
+        self.folded += self.store.fold(conversation, summary, end)
+        logger.debug(f"Folded {len(messages)} messages of {session or 'default'} "
+                     f"into a {conversation.summary_tokens} token summary")
+        return True
+
+    async def close(self):
+        """Cancel running summaries."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'keep_recent': self.keep_recent,
+            'running': len(self._tasks),
+            'runs': self.runs,
+            'failures': self.failures,
+            'folded': self.folded,
+            'latency': self.latency.summary()
+        }
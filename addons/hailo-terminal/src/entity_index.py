@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Entity Retrieval Index for Hailo AI Terminal
+
+Listing every entity in the prompt does not scale past small homes, so
+queries used to reach the model without any entity context. The index
+holds one hashed lexical vector per entity, built from its entity id,
+friendly name, area, device class and domain, and each query is answered
+with the top-k most similar entities, which are then put in the prompt
+with their current states.
+
+Vectors use feature hashing of words and character trigrams (so "temp"
+still matches "temperature") into a fixed number of dimensions, and are
+L2-normalised: the similarity is the cosine, computed for every entity
+with one NumPy matrix-vector product. Optionally rows are stored as int8
+with a per-row scale, a quarter of the memory, and scored in blocks.
+
+Queries are reduced to their known terms before scoring: stopwords and
+words that occur in no indexed entity are dropped, keeping words that
+share a prefix with an indexed word ("lights" for "light"). Otherwise
+the filler words of a long request ("create an automation that turns on
+the ... when ...") dilute the query vector until no cosine clears the
+threshold.
+
+Updates are incremental. Only entities whose indexed text changed are
+re-vectorised; state changes do not touch the index.
+"""
+
+import bisect
+import hashlib
+import logging
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIM = 512
+DEFAULT_TOP_K = 8
+# Weight of a character trigram relative to a whole word
+TRIGRAM_WEIGHT = 0.4
+# Cosine below which a hit is taken to be hash collisions, not relevance
+MIN_SCORE = 0.35
+# Rows dequantised at a time when scoring int8 vectors
+SCORE_BLOCK = 4096
+# Shortest query word matched as the prefix of an indexed word, and
+# shortest indexed word matched as the prefix of a query word
+MIN_PREFIX = 3
+MIN_STEM = 4
+
+# Words of requests that never identify an entity
+STOPWORDS = frozenset("""
+    a about after all also am an and any are as at be before been but by can
+    could create did do does every for from get has have help how i if in into
+    is it its just let make me my need not of off on once or our please set
+    should show so some tell than that the them then there these this those to
+    turn turned turns up us want was we what when whenever where which while
+    who why will with would you your automation automate automatically
+""".split())
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+@lru_cache(maxsize=1 << 16)
+def _slot(feature: str, dim: int) -> Tuple[int, float]:
+    """Dimension and sign a feature hashes to."""
+    # Not CRC32: it is linear, so similar features collide in patterns
+    value = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=4).digest(),
+                           'little')
+    return value % dim, -1.0 if value & 0x80000000 else 1.0
+
+
+def vectorize(text: str, dim: int = DEFAULT_DIM) -> np.ndarray:
+    """Hashed, L2-normalised word and trigram vector of distinct words of a text."""
+    vector = np.zeros(dim, dtype=np.float32)
+    # Words repeated across the entity id, name and area count once
+    for word in words(text):
+        index, sign = _slot(word, dim)
+        vector[index] += sign
+        padded = f'#{word}#'
+        for start in range(len(padded) - 2):
+            index, sign = _slot(padded[start:start + 3], dim)
+            vector[index] += sign * TRIGRAM_WEIGHT
+    norm = float(np.linalg.norm(vector))
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+def words(text: str) -> List[str]:
+    """Distinct lower-case words of a text, in order."""
+    return list(dict.fromkeys(_WORD.findall(text.lower())))
+
+
+def entity_text(record: Dict[str, Any]) -> str:
+    """The text an entity is indexed by."""
+    entity_id = record.get('entity_id', '')
+    return ' '.join(str(part) for part in (
+        entity_id.replace('.', ' ').replace('_', ' '),
+        record.get('friendly_name') or '',
+        record.get('area') or '',
+        record.get('device_class') or '',
+        record.get('domain') or ''
+    ) if part)
+
+
+def format_entities(records: Iterable[Dict[str, Any]]) -> str:
+    """Entities and their current states for the prompt."""
+    lines = []
+    for record in records:
+        unit = record.get('unit_of_measurement')
+        state = f"{record.get('state')}{' ' + unit if unit else ''}"
+        details = ', '.join(part for part in (record.get('friendly_name'), record.get('area'))
+                            if part and part != record['entity_id'])
+        lines.append(f"- {record['entity_id']}{f' ({details})' if details else ''}: {state}")
+    if not lines:
+        return ''
+    return "Home Assistant entities relevant to the question:\n" + '\n'.join(lines)
+
+
+class EntityIndex:
+    """Top-k cosine search over hashed lexical vectors of entities."""
+
+    def __init__(self, dim: int = DEFAULT_DIM, quantize: bool = False,
+                 capacity: int = 1024):
+        """Initialize the index.
+
+        Args:
+            dim: Dimensions features are hashed into
+            quantize: Store int8 vectors with a per-row scale
+            capacity: Rows allocated up front; grows by doubling
+        """
+        self.dim = dim
+        self.quantize = quantize
+        dtype = np.int8 if quantize else np.float32
+        self._vectors = np.zeros((capacity, dim), dtype=dtype)
+        self._scales = np.zeros(capacity, dtype=np.float32)
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._texts: Dict[str, str] = {}
+        # Entities each indexed word occurs in, and the words sorted for
+        # prefix lookups (rebuilt lazily after changes)
+        self._vocab: Dict[str, int] = {}
+        self._sorted_vocab: Optional[List[str]] = None
+        self._lock = threading.Lock()
+
+        self.updates = 0
+        self.removals = 0
+        self.search_stats = LatencyStats()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self._rows
+
+    def _grow(self):
+        capacity = max(1, len(self._vectors)) * 2
+        vectors = np.zeros((capacity, self.dim), dtype=self._vectors.dtype)
+        vectors[:len(self._ids)] = self._vectors[:len(self._ids)]
+        scales = np.zeros(capacity, dtype=np.float32)
+        scales[:len(self._ids)] = self._scales[:len(self._ids)]
+        self._vectors, self._scales = vectors, scales
+
+    def _store(self, row: int, vector: np.ndarray):
+        if self.quantize:
+            peak = float(np.abs(vector).max())
+            scale = peak / 127.0 if peak > 0 else 1.0
+            self._vectors[row] = np.round(vector / scale).astype(np.int8)
+            self._scales[row] = scale
+        else:
+            self._vectors[row] = vector
+
+    def _count_words(self, text: Optional[str], delta: int):
+        """Add or remove the words of an indexed text from the vocabulary."""
+        if not text:
+            return
+        for word in words(text):
+            count = self._vocab.get(word, 0) + delta
+            if count > 0:
+                self._vocab[word] = count
+            else:
+                self._vocab.pop(word, None)
+        self._sorted_vocab = None
+
+    def upsert(self, entity_id: str, record: Dict[str, Any]) -> bool:
+        """Index or re-index an entity. Returns whether its vector changed."""
+        text = entity_text(record)
+        with self._lock:
+            if self._texts.get(entity_id) == text:
+                return False
+            vector = vectorize(text, self.dim)
+            row = self._rows.get(entity_id)
+            if row is None:
+                if len(self._ids) == len(self._vectors):
+                    self._grow()
+                row = len(self._ids)
+                self._ids.append(entity_id)
+                self._rows[entity_id] = row
+            self._store(row, vector)
+            self._count_words(self._texts.get(entity_id), -1)
+            self._count_words(text, 1)
+            self._texts[entity_id] = text
+            self.updates += 1
+            return True
+
+    def remove(self, entity_id: str) -> bool:
+        """Drop an entity, moving the last row into its place."""
+        with self._lock:
+            row = self._rows.pop(entity_id, None)
+            if row is None:
+                return False
+            last = len(self._ids) - 1
+            if row != last:
+                moved = self._ids[last]
+                self._vectors[row] = self._vectors[last]
+                self._scales[row] = self._scales[last]
+                self._ids[row] = moved
+                self._rows[moved] = row
+            self._ids.pop()
+            self._count_words(self._texts.pop(entity_id), -1)
+            self.removals += 1
+            return True
+
+    def sync(self, records: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+        """Bring the index in line with a full list of entity records.
+
+        Returns:
+            Entities re-indexed and entities removed
+        """
+        seen = set()
+        changed = 0
+        for record in records:
+            entity_id = record.get('entity_id')
+            if entity_id:
+                seen.add(entity_id)
+                changed += self.upsert(entity_id, record)
+        removed = 0
+        for entity_id in [e for e in self._ids if e not in seen]:
+            removed += self.remove(entity_id)
+        if changed or removed:
+            logger.debug(f"Entity index synced: {changed} updated, {removed} removed, "
+                         f"{len(self)} entities")
+        return changed, removed
+
+    def _scores(self, query: np.ndarray) -> np.ndarray:
+        count = len(self._ids)
+        if not self.quantize:
+            return self._vectors[:count] @ query
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, SCORE_BLOCK):
+            end = min(start + SCORE_BLOCK, count)
+            block = self._vectors[start:end].astype(np.float32)
+            scores[start:end] = (block @ query) * self._scales[start:end]
+        return scores
+
+    def _known(self, word: str) -> bool:
+        """Whether a query word, or a variant of it, occurs in an indexed entity."""
+        if word in self._vocab:
+            return True
+        if len(word) >= MIN_PREFIX:
+            if self._sorted_vocab is None:
+                self._sorted_vocab = sorted(self._vocab)
+            position = bisect.bisect_left(self._sorted_vocab, word)
+            if (position < len(self._sorted_vocab)
+                    and self._sorted_vocab[position].startswith(word)):
+                return True
+        return any(word[:length] in self._vocab
+                   for length in range(MIN_STEM, len(word)))
+
+    def query_terms(self, text: str) -> List[str]:
+        """Words of a query that can match indexed entities."""
+        with self._lock:
+            return [word for word in words(text)
+                    if word not in STOPWORDS and self._known(word)]
+
+    def search(self, text: str, k: int = DEFAULT_TOP_K,
+               min_score: float = MIN_SCORE) -> List[Tuple[str, float]]:
+        """Entities most similar to the known terms of a text, best first."""
+        started = time.perf_counter()
+        query = vectorize(' '.join(self.query_terms(text)), self.dim)
+        with self._lock:
+            count = len(self._ids)
+            if not count or k <= 0 or not query.any():
+                return []
+            scores = self._scores(query)
+            k = min(k, count)
+            top = np.argpartition(scores, -k)[-k:]
+            top = top[np.argsort(scores[top])[::-1]]
+            results = [(self._ids[row], float(scores[row])) for row in top
+                       if scores[row] >= min_score]
+        self.search_stats.record(time.perf_counter() - started)
+        return results
+
+    @property
+    def memory_bytes(self) -> int:
+        """Bytes held by the vectors of indexed entities."""
+        count = len(self._ids)
+        return self._vectors[:count].nbytes + (self._scales[:count].nbytes if self.quantize else 0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'entities': len(self),
+            'dim': self.dim,
+            'quantized': self.quantize,
+            'memory_kb': round(self.memory_bytes / 1024, 1),
+            'updates': self.updates,
+            'removals': self.removals,
+            'search': self.search_stats.summary()
+        }
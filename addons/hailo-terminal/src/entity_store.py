@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Indexed Entity Store for Hailo AI Terminal
+
+Keeps an immutable, indexed snapshot of Home Assistant entity states so the
+entity endpoints can answer cursor-paginated, filtered and projected
+queries without scanning and serialising every entity on each request.
+The snapshot is rebuilt only when the client's states version or the
+entity area assignments change. Areas are not part of the states feed, so
+they are re-read on their own TTL.
+"""
+
+import base64
+import bisect
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Seconds between re-reads of the entity area assignments
+AREAS_TTL = 60.0
+
+# Fields an entity record exposes for projection
+ENTITY_FIELDS = (
+    'entity_id', 'domain', 'friendly_name', 'state', 'attributes',
+    'device_class', 'unit_of_measurement', 'area', 'last_updated'
+)
+
+# Query parameters that switch an entity endpoint to paged responses
+QUERY_PARAMS = ('cursor', 'limit', 'fields', 'area', 'device_class', 'state', 'q')
+
+
+def encode_cursor(entity_id: str) -> str:
+    """Encode the last entity id of a page as an opaque cursor."""
+    return base64.urlsafe_b64encode(entity_id.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> str:
+    """Decode a cursor produced by :func:`encode_cursor`."""
+    padding = '=' * (-len(cursor) % 4)
+    try:
+        return base64.urlsafe_b64decode(cursor + padding).decode('utf-8')
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+@dataclass
+class EntityQuery:
+    """Filter, projection and paging options for an entity listing."""
+    domain: Optional[str] = None
+    area: Optional[str] = None
+    device_class: Optional[str] = None
+    state: Optional[str] = None
+    text: Optional[str] = None
+    fields: Optional[Tuple[str, ...]] = None
+    after: Optional[str] = None
+    limit: int = DEFAULT_PAGE_SIZE
+
+    @classmethod
+    def from_args(cls, args: Mapping[str, str],
+                  domain: Optional[str] = None) -> 'EntityQuery':
+        """Build a query from request arguments.
+
+        Raises:
+            ValueError: If ``limit``, ``fields`` or ``cursor`` is invalid
+        """
+        try:
+            limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid limit: {args.get('limit')}")
+        if limit < 1:
+            raise ValueError("limit must be positive")
+
+        fields = None
+        if args.get('fields'):
+            fields = tuple(f.strip() for f in args['fields'].split(',') if f.strip())
+            unknown = [f for f in fields if f not in ENTITY_FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+            if 'entity_id' not in fields:
+                fields = ('entity_id',) + fields
+
+        cursor = args.get('cursor')
+        text = args.get('q')
+        return cls(
+            domain=domain,
+            area=args.get('area') or None,
+            device_class=args.get('device_class') or None,
+            state=args.get('state') or None,
+            text=text.lower() if text else None,
+            fields=fields,
+            after=decode_cursor(cursor) if cursor else None,
+            limit=min(limit, MAX_PAGE_SIZE)
+        )
+
+    def cache_key(self) -> str:
+        """Stable key describing this query, for response caching."""
+        return '&'.join(
+            f"{name}={value}" for name, value in (
+                ('domain', self.domain), ('area', self.area),
+                ('device_class', self.device_class), ('state', self.state),
+                ('q', self.text), ('after', self.after), ('limit', self.limit),
+                ('fields', ','.join(self.fields) if self.fields else None)
+            ) if value is not None
+        )
+
+
+class EntitySnapshot:
+    """Immutable, indexed view of entity states at one states version."""
+
+    def __init__(self, states: List[Dict[str, Any]],
+                 areas: Optional[Dict[str, str]] = None, version: Any = None):
+        self.version = version
+        areas = areas or {}
+
+        records = []
+        for state in states:
+            entity_id = state.get('entity_id', '')
+            if not entity_id:
+                continue
+            attributes = state.get('attributes', {}) or {}
+            records.append({
+                'entity_id': entity_id,
+                'domain': entity_id.split('.')[0] if '.' in entity_id else 'unknown',
+                'friendly_name': attributes.get('friendly_name', entity_id),
+                'state': state.get('state'),
+                'attributes': attributes,
+                'device_class': attributes.get('device_class'),
+                'unit_of_measurement': attributes.get('unit_of_measurement'),
+                'area': areas.get(entity_id) or attributes.get('area_id'),
+                'last_updated': state.get('last_updated')
+            })
+        records.sort(key=lambda record: record['entity_id'])
+
+        self.records = records
+        self.entity_ids = [record['entity_id'] for record in records]
+        self._search_text = [
+            f"{record['entity_id']} {record['friendly_name']}".lower()
+            for record in records
+        ]
+
+        # Secondary indexes map a value to ascending record positions
+        self.by_domain = self._build_index('domain')
+        self.by_area = self._build_index('area')
+        self.by_device_class = self._build_index('device_class')
+        self.by_state = self._build_index('state')
+
+    def _build_index(self, field_name: str) -> Dict[Any, List[int]]:
+        """Index record positions by the value of one field."""
+        index: Dict[Any, List[int]] = {}
+        for position, record in enumerate(self.records):
+            value = record[field_name]
+            if value is not None:
+                index.setdefault(str(value), []).append(position)
+        return index
+
+    def get(self, entity_id: str) -> Optional[Dict[str, Any]]:
+        """Record of one entity, if present."""
+        position = bisect.bisect_left(self.entity_ids, entity_id)
+        if position < len(self.entity_ids) and self.entity_ids[position] == entity_id:
+            return self.records[position]
+        return None
+
+    def domain_counts(self) -> Dict[str, int]:
+        """Number of entities per domain."""
+        return {domain: len(positions) for domain, positions in self.by_domain.items()}
+
+    def device_class_counts(self) -> Dict[str, int]:
+        """Number of entities per device class."""
+        return {dc: len(positions) for dc, positions in self.by_device_class.items()}
+
+    def _candidates(self, query: EntityQuery) -> Optional[List[int]]:
+        """Intersect the index lists selected by the query's filters.
+
+        Returns None when no indexed filter applies (all records match).
+        """
+        selected = []
+        for index, value in ((self.by_domain, query.domain),
+                             (self.by_area, query.area),
+                             (self.by_device_class, query.device_class),
+                             (self.by_state, query.state)):
+            if value is not None:
+                selected.append(index.get(value, []))
+        if not selected:
+            return None
+
+        selected.sort(key=len)
+        positions = selected[0]
+        for other in selected[1:]:
+            other_set = set(other)
+            positions = [p for p in positions if p in other_set]
+        return positions
+
+    def _project(self, record: Dict[str, Any],
+                 fields: Optional[Tuple[str, ...]]) -> Dict[str, Any]:
+        """Apply field projection to a record."""
+        if not fields:
+            return record
+        return {name: record[name] for name in fields}
+
+    def query(self, query: EntityQuery) -> Dict[str, Any]:
+        """Run a filtered, projected, cursor-paginated query.
+
+        Returns:
+            Dictionary with the page of entities, the number of matches
+            after this page and the cursor for the next page (None on the
+            last page)
+        """
+        candidates = self._candidates(query)
+        start = 0 if query.after is None else bisect.bisect_right(self.entity_ids, query.after)
+
+        if candidates is None:
+            positions = range(start, len(self.records))
+        else:
+            positions = candidates[bisect.bisect_left(candidates, start):]
+
+        if query.text:
+            positions = [p for p in positions if query.text in self._search_text[p]]
+        total_remaining = len(positions)
+
+        page_positions = list(positions[:query.limit])
+        entities = [self._project(self.records[p], query.fields) for p in page_positions]
+
+        next_cursor = None
+        if total_remaining > len(page_positions) and page_positions:
+            next_cursor = encode_cursor(self.entity_ids[page_positions[-1]])
+
+        return {
+            'entities': entities,
+            'count': len(entities),
+            'remaining': total_remaining - len(entities),
+            'next_cursor': next_cursor
+        }
+
+
+class EntityStore:
+    """Holds the current entity snapshot and refreshes it on state changes."""
+
+    def __init__(self, areas_ttl: float = AREAS_TTL):
+        self.areas_ttl = areas_ttl
+        self.snapshot = EntitySnapshot([], version=None)
+        self._areas: Optional[Dict[str, str]] = None
+        self._areas_version = 0
+        self._areas_time = 0.0
+
+    async def _refresh_areas(self, ha_client) -> int:
+        """Re-read area assignments once they are older than ``areas_ttl``.
+
+        Returns:
+            Version of the area assignments, bumped whenever they change
+        """
+        if (self._areas is not None and
+                time.monotonic() - self._areas_time < self.areas_ttl):
+            return self._areas_version
+
+        areas = await ha_client.get_entity_areas()
+        self._areas_time = time.monotonic()
+        if areas != self._areas:
+            self._areas = areas
+            self._areas_version += 1
+        return self._areas_version
+
+    async def refresh(self, ha_client) -> EntitySnapshot:
+        """Rebuild the snapshot if the states or area assignments moved on."""
+        states_version = await ha_client.get_states_version()
+        areas_version = await self._refresh_areas(ha_client)
+        version = f"{states_version}:{areas_version}"
+        if self.snapshot.version != version:
+            states = await ha_client.get_states()
+            # Build off to the side and swap in one assignment, so readers
+            # in other threads always see a complete snapshot
+            self.snapshot = EntitySnapshot(states, self._areas, version)
+            logger.debug(f"Entity store rebuilt: {len(states)} entities, version {version}")
+        return self.snapshot
@@ -6,22 +6,27 @@ to retrieve system information, entities, and states.
 """
 
 import logging
+import time
 import aiohttp
 import asyncio
 from typing import Dict, List, Any, Optional
 
+from response_cache import fingerprint
+
 logger = logging.getLogger(__name__)
 
 
 class HomeAssistantClient:
     """Client for Home Assistant API integration."""
     
-    def __init__(self, ha_url: str, ha_token: str):
+    def __init__(self, ha_url: str, ha_token: str, states_ttl: float = 2.0):
         """Initialize the Home Assistant client.
         
         Args:
             ha_url: Home Assistant URL (e.g., http://192.168.0.143:8123)
             ha_token: Long-lived access token for authentication
+            states_ttl: Seconds a fetched ``/api/states`` snapshot is reused
+                before Home Assistant is queried again
         """
         self.ha_url = ha_url.rstrip('/')
         self.ha_token = ha_token
@@ -30,6 +35,14 @@ class HomeAssistantClient:
             'Content-Type': 'application/json'
         }
         self._session = None
+        
+        # Short-lived states snapshot and a version that only changes when
+        # the set of entities or any entity's last_updated changes
+        self.states_ttl = states_ttl
+        self._states = None
+        self._states_time = 0.0
+        self._states_fingerprint = None
+        self.states_version = 0
     
     async def _get_session(self) -> aiohttp.ClientSession:
         """Get or create aiohttp session."""
@@ -77,18 +90,48 @@ class HomeAssistantClient:
             return None
     
     async def get_states(self) -> List[Dict[str, Any]]:
-        """Get all entity states from Home Assistant."""
+        """Get all entity states from Home Assistant.
+        
+        Snapshots younger than ``states_ttl`` are served from memory.
+        """
+        if (self._states is not None and
+                time.monotonic() - self._states_time < self.states_ttl):
+            return self._states
+        
         try:
             session = await self._get_session()
             async with session.get(f'{self.ha_url}/api/states') as response:
                 if response.status == 200:
-                    return await response.json()
+                    states = await response.json()
                 else:
                     logger.error(f"Failed to get HA states: {response.status}")
                     return []
         except Exception as e:
             logger.error(f"Error getting HA states: {e}")
             return []
+        
+        self._update_states_snapshot(states)
+        return states
+    
+    def _update_states_snapshot(self, states: List[Dict[str, Any]]):
+        """Store a states snapshot and bump the version if it changed."""
+        states_fingerprint = fingerprint(
+            (state.get('entity_id'), state.get('last_updated'))
+            for state in states
+        )
+        if states_fingerprint != self._states_fingerprint:
+            self._states_fingerprint = states_fingerprint
+            self.states_version += 1
+        self._states = states
+        self._states_time = time.monotonic()
+    
+    async def get_states_version(self) -> int:
+        """Get the current version of the entity states.
+        
+        Refreshes the states snapshot if it is older than ``states_ttl``.
+        """
+        await self.get_states()
+        return self.states_version
     
     async def get_entity_state(self, entity_id: str
                                ) -> Optional[Dict[str, Any]]:
@@ -424,6 +467,38 @@ class HomeAssistantClient:
             logger.error(f"Failed to get areas: {e}")
             return []
 
+    async def get_entity_areas(self) -> Dict[str, str]:
+        """Get the area assigned to each entity.
+        
+        Area assignments are not part of ``/api/states``; they are resolved
+        for every entity in one request by rendering a template.
+        
+        Returns:
+            Dictionary mapping entity_id to area_id for entities with an area
+        """
+        template = (
+            "{% for s in states %}{% set a = area_id(s.entity_id) %}"
+            "{% if a %}{{ s.entity_id }}={{ a }}\n{% endif %}{% endfor %}"
+        )
+        try:
+            session = await self._get_session()
+            async with session.post(f'{self.ha_url}/api/template',
+                                    json={'template': template}) as response:
+                if response.status != 200:
+                    logger.warning(f"Could not resolve entity areas: {response.status}")
+                    return {}
+                text = await response.text()
+        except Exception as e:
+            logger.warning(f"Could not resolve entity areas: {e}")
+            return {}
+        
+        areas = {}
+        for line in text.splitlines():
+            entity_id, _, area_id = line.partition('=')
+            if entity_id and area_id:
+                areas[entity_id.strip()] = area_id.strip()
+        return areas
+
     async def get_entities_by_domain(self, domain: str) -> List[Dict]:
         """Get entities filtered by domain.
         
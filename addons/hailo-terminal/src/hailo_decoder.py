@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+Autoregressive Decoding for Hailo AI Terminal
+
+Runs text generation on a Hailo infer model one token at a time. The
+model contract is:
+
+- inputs ``input_ids`` (int32, ``batch x seq_len``), ``cache_position``
+  (tokens already in each row's KV cache) and ``num_tokens`` (valid
+  entries per row, 0 for an idle row)
+- the KV cache lives in buffers bound to the bindings and is updated by
+  each ``infer()``
+- output ``logits`` (``batch x vocab``) for the last token fed per row
+
+Bindings, and with them the KV cache, are created once and kept across
+decode steps and across turns: a new prompt that starts with the tokens
+already in the cache (the previous turn of the same conversation) only
+feeds the new suffix. Sampling (temperature, top-k, top-p) is done on the
+logits with NumPy.
+
+A prompt prefix shared by every conversation (system instructions and
+the home description) can be registered with ``set_prefix``. After the
+first prefill of a prompt starting with it, the row's KV cache for the
+prefix is copied; a row holding some other conversation gets the copy
+restored instead of prefilling the prefix again.
+
+``SyntheticInferModel`` implements the same contract with scripted
+logits, so the loop can be exercised without a device.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from hailo_scheduler import BatchScheduler, DEFAULT_BATCH_WINDOW, DEFAULT_PRIORITIES
+from hailo_tokenizer import IncrementalDetokenizer, Tokenizer
+from metrics import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP_K = 40
+DEFAULT_TOP_P = 0.9
+
+# Bound buffers holding the KV cache, indexed by row then cache position
+KV_BUFFERS = ('kv_cache',)
+
+# Seconds between checks of the stop event while waiting for a free row
+STOP_POLL_INTERVAL = 0.05
+
+
+@dataclass
+class SamplingParams:
+    """How the next token is picked from the logits."""
+    temperature: float = 0.7
+    top_k: int = DEFAULT_TOP_K
+    top_p: float = DEFAULT_TOP_P
+    seed: Optional[int] = None
+
+
+def sample_token(logits: np.ndarray, params: SamplingParams,
+                 rng: np.random.Generator) -> int:
+    """Sample a token id from the logits of one position.
+
+    A temperature of 0 is greedy. Otherwise the ``top_k`` most likely
+    tokens are kept, then the smallest set of those whose probabilities
+    add up to ``top_p``.
+    """
+    logits = np.asarray(logits, dtype=np.float32).reshape(-1)
+    if params.temperature <= 0:
+        return int(np.argmax(logits))
+
+    if 0 < params.top_k < logits.size:
+        candidates = np.argpartition(logits, -params.top_k)[-params.top_k:]
+    else:
+        candidates = np.arange(logits.size)
+    scores = logits[candidates] / params.temperature
+    order = np.argsort(scores)[::-1]
+    candidates = candidates[order]
+    scores = scores[order]
+
+    probs = np.exp(scores - scores[0])
+    probs /= probs.sum()
+    if params.top_p < 1.0:
+        cutoff = int(np.searchsorted(np.cumsum(probs), params.top_p)) + 1
+        candidates = candidates[:cutoff]
+        probs = probs[:cutoff] / probs[:cutoff].sum()
+
+    index = int(np.searchsorted(np.cumsum(probs), rng.random()))
+    return int(candidates[min(index, len(candidates) - 1)])
+
+
+@dataclass
+class GenerationResult:
+    """Outcome and timing of one generation."""
+    tokens: List[int] = field(default_factory=list)
+    prompt_tokens: int = 0
+    reused_tokens: int = 0
+    prefix_tokens: int = 0  # Length of the shared prefix the prompt starts with
+    prefill_time: float = 0.0
+    decode_time: float = 0.0
+    stop_reason: str = 'max_tokens'
+
+    @property
+    def prefix_reused(self) -> bool:
+        """Whether the shared prefix came from the cache instead of a prefill."""
+        return bool(self.prefix_tokens) and self.reused_tokens >= self.prefix_tokens
+
+    @property
+    def tokens_per_second(self) -> float:
+        return len(self.tokens) / self.decode_time if self.decode_time > 0 else 0.0
+
+    def usage(self) -> Dict[str, int]:
+        return {'prompt_tokens': self.prompt_tokens, 'completion_tokens': len(self.tokens)}
+
+
+class HailoDecoder:
+    """Token-by-token generation over persistent bindings and KV cache.
+
+    Models compiled with a batch dimension hold one KV cache per batch
+    row. Each generation takes a row (preferring the one whose cache
+    shares the longest prefix with its prompt) and concurrent generations
+    share device calls through a :class:`BatchScheduler`. Both rows and
+    device calls go to waiting generations in priority order.
+    """
+
+    def __init__(self, infer_model: Any, tokenizer: Tokenizer, seq_len: int,
+                 context_len: Optional[int] = None, batch_size: Optional[int] = None,
+                 batch_window: float = DEFAULT_BATCH_WINDOW,
+                 priorities: Sequence[str] = DEFAULT_PRIORITIES):
+        """Initialize the decoder.
+
+        Args:
+            infer_model: Hailo infer model (or a stand-in) following the
+                contract in the module docstring
+            tokenizer: The model's tokenizer
+            seq_len: Tokens the model accepts per call and row
+            context_len: Tokens the KV cache holds; defaults to ``seq_len``
+            batch_size: Rows used per device call; defaults to, and is
+                capped at, the model's batch size
+            batch_window: Seconds a device call waits for more rows
+            priorities: Priority classes, highest first
+        """
+        self.infer_model = infer_model
+        self.tokenizer = tokenizer
+        self.seq_len = seq_len
+        self.context_len = context_len or seq_len
+
+        model_batch = self._model_batch_size()
+        self.batch_size = min(batch_size or model_batch, model_batch)
+
+        self._bindings = None
+        self._cached: List[List[int]] = [[] for _ in range(self.batch_size)]
+        self._row_lengths = [seq_len] * self.batch_size
+        self._free = set(range(self.batch_size))
+        self._slots = threading.Condition()
+        self._waiting: List[Tuple[int, int]] = []
+        self._tickets = itertools.count()
+        self.kv_buffers = KV_BUFFERS
+        self._prefix_ids: List[int] = []
+        self._prefix_kv: Optional[Dict[str, np.ndarray]] = None
+        self._prefix_lock = threading.Lock()
+        self.scheduler = BatchScheduler(self._run_batch, self.batch_size, batch_window,
+                                        priorities, expected=self.active)
+
+        self.generations = 0
+        self.tokens_generated = 0
+        self.tokens_reused = 0
+        self.prefix_restores = 0
+        self.cancelled = 0
+        self.step_stats = LatencyStats()
+        self.last_tokens_per_second = 0.0
+
+    def _model_batch_size(self) -> int:
+        """Batch dimension of ``input_ids``, 1 for unbatched models."""
+        try:
+            shape = self.infer_model.input('input_ids').shape
+            return int(shape[0]) if len(shape) > 1 else 1
+        except Exception:
+            return 1
+
+    def active(self) -> int:
+        """Generations currently holding a batch row."""
+        return self.batch_size - len(self._free)
+
+    def _get_bindings(self):
+        """Create bindings once; their buffers back the KV cache."""
+        if self._bindings is None:
+            self._bindings = self.infer_model.create_bindings()
+        return self._bindings
+
+    def reset(self, slot: Optional[int] = None):
+        """Forget the KV cache contents of one row, or all of them."""
+        for index in range(self.batch_size) if slot is None else [slot]:
+            self._cached[index] = []
+
+    def _encode_prompt(self, text: str) -> List[int]:
+        ids = self.tokenizer.encode(text)
+        if self.tokenizer.bos_id is not None:
+            ids = [self.tokenizer.bos_id] + ids
+        return ids
+
+    def set_prefix(self, text: str):
+        """Register the text most prompts start with, dropping any old snapshot."""
+        ids = self._encode_prompt(text) if text else []
+        with self._prefix_lock:
+            if ids != self._prefix_ids:
+                self._prefix_ids = ids
+                self._prefix_kv = None
+
+    def _snapshot_prefix(self, slot: int, prefix_ids: List[int]):
+        """Copy a row's KV cache for the prefix, if it is still current."""
+        bindings = self._get_bindings()
+        length = len(prefix_ids)
+        snapshot = {name: bindings.input(name)[slot, :length].copy()
+                    for name in self.kv_buffers}
+        with self._prefix_lock:
+            if prefix_ids is self._prefix_ids and self._prefix_kv is None:
+                self._prefix_kv = snapshot
+
+    def _restore_prefix(self, slot: int, snapshot: Dict[str, np.ndarray]):
+        """Write a prefix snapshot into a row's KV cache."""
+        bindings = self._get_bindings()
+        for name, values in snapshot.items():
+            bindings.input(name)[slot, :len(values)] = values
+
+    def _acquire(self, prompt_ids: List[int],
+                 priority: Optional[str] = None,
+                 stop: Optional[threading.Event] = None) -> Tuple[Optional[int], int]:
+        """Take the free row sharing the longest prefix with a prompt.
+
+        Generations waiting for a row get one by priority class, then in
+        arrival order.
+
+        Returns:
+            The row and the number of prompt tokens already cached in it;
+            no row if ``stop`` was set first
+        """
+        ticket = (self.scheduler.rank(priority), next(self._tickets))
+        with self._slots:
+            heapq.heappush(self._waiting, ticket)
+            while not self._free or self._waiting[0] != ticket:
+                if stop is not None and stop.is_set():
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self._slots.notify_all()
+                    return None, 0
+                self._slots.wait(STOP_POLL_INTERVAL if stop is not None else None)
+            heapq.heappop(self._waiting)
+            # Another row may be free for the next waiter
+            self._slots.notify_all()
+            best, reused = None, -1
+            for slot in sorted(self._free):
+                cached = self._cached[slot]
+                # At least one token is fed to get logits
+                limit = min(len(cached), len(prompt_ids) - 1)
+                common = 0
+                while common < limit and cached[common] == prompt_ids[common]:
+                    common += 1
+                if common > reused:
+                    best, reused = slot, common
+            self._free.discard(best)
+            return best, reused
+
+    def _release(self, slot: int):
+        with self._slots:
+            self._free.add(slot)
+            self._slots.notify_all()
+
+    def _run_batch(self, requests: List[Tuple[int, Sequence[int], int]]) -> List[np.ndarray]:
+        """Run one device call for ``(row, tokens, position)`` requests."""
+        bindings = self._get_bindings()
+        input_ids = bindings.input('input_ids').reshape(self.batch_size, -1)
+        cache_position = bindings.input('cache_position').reshape(-1)
+        num_tokens = bindings.input('num_tokens').reshape(-1)
+        num_tokens[:] = 0
+        for slot, tokens, position in requests:
+            count = len(tokens)
+            input_ids[slot, :count] = tokens
+            # Only the part written by an earlier, longer call needs padding
+            if self._row_lengths[slot] > count:
+                input_ids[slot, count:self._row_lengths[slot]] = self.tokenizer.pad_id
+            self._row_lengths[slot] = count
+            cache_position[slot] = position
+            num_tokens[slot] = count
+        bindings.infer()
+        logits = bindings.output('logits').reshape(self.batch_size, -1)
+        return [logits[slot].copy() for slot, _, _ in requests]
+
+    def _feed(self, slot: int, tokens: Sequence[int], position: int,
+              priority: Optional[str] = None) -> np.ndarray:
+        """Feed tokens to a row at a cache position and return the last logits."""
+        logits = None
+        for start in range(0, len(tokens), self.seq_len):
+            chunk = tokens[start:start + self.seq_len]
+            logits = self.scheduler.run((slot, chunk, position + start), priority)
+        return logits
+
+    def _fit_prompt(self, prompt_ids: List[int], max_tokens: int) -> List[int]:
+        """Keep the newest prompt tokens that leave room for the reply."""
+        room = max(self.context_len - max_tokens, 1)
+        return prompt_ids[-room:] if len(prompt_ids) > room else prompt_ids
+
+    def generate(self, prompt: str, max_tokens: int, params: SamplingParams,
+                 on_text: Optional[Callable[[str], None]] = None,
+                 stop: Optional[threading.Event] = None,
+                 priority: Optional[str] = None) -> GenerationResult:
+        """Generate a reply to a prompt. Blocking; run it off the event loop.
+
+        Args:
+            prompt: Full prompt text
+            max_tokens: Most tokens to generate
+            params: Sampling parameters
+            on_text: Receives decoded text as tokens are generated
+            stop: Set to stop generation after the current step, or
+                before the prefill when still waiting for a row
+            priority: Priority class of the row and device calls
+        """
+        prompt_ids = self._fit_prompt(self._encode_prompt(prompt), max_tokens)
+        with self._prefix_lock:
+            prefix_ids, prefix_kv = self._prefix_ids, self._prefix_kv
+        if not (prefix_ids and len(prompt_ids) > len(prefix_ids)
+                and prompt_ids[:len(prefix_ids)] == prefix_ids):
+            prefix_ids = []
+
+        rng = np.random.default_rng(params.seed)
+        detokenizer = IncrementalDetokenizer(self.tokenizer)
+        result = GenerationResult(prompt_tokens=len(prompt_ids),
+                                  prefix_tokens=len(prefix_ids))
+
+        slot, reused = self._acquire(prompt_ids, priority, stop)
+        if slot is None:
+            # Cancelled while every row was busy; nothing was prefilled
+            result.stop_reason = 'cancelled'
+            self.cancelled += 1
+            return result
+        cached = self._cached[slot]
+        try:
+            started = time.perf_counter()
+            if prefix_ids and reused < len(prefix_ids) and prefix_kv is not None:
+                self._restore_prefix(slot, prefix_kv)
+                cached[:] = prefix_ids
+                reused = len(prefix_ids)
+                self.prefix_restores += 1
+            result.reused_tokens = reused
+            logits = self._feed(slot, prompt_ids[reused:], reused, priority)
+            cached[:] = prompt_ids
+            result.prefill_time = time.perf_counter() - started
+            if prefix_ids and prefix_kv is None:
+                self._snapshot_prefix(slot, prefix_ids)
+
+            started = time.perf_counter()
+            while len(result.tokens) < max_tokens:
+                if stop is not None and stop.is_set():
+                    result.stop_reason = 'cancelled'
+                    break
+                token = sample_token(logits, params, rng)
+                if token == self.tokenizer.eos_id:
+                    result.stop_reason = 'eos'
+                    break
+                result.tokens.append(token)
+                text = detokenizer.push(token)
+                if text and on_text is not None:
+                    on_text(text)
+                if len(result.tokens) >= max_tokens or len(cached) >= self.context_len:
+                    break
+
+                step_started = time.perf_counter()
+                logits = self._feed(slot, [token], len(cached), priority)
+                cached.append(token)
+                self.step_stats.record(time.perf_counter() - step_started)
+            result.decode_time = time.perf_counter() - started
+        except Exception:
+            # The device cache no longer matches what we recorded
+            self.reset(slot)
+            raise
+        finally:
+            self._release(slot)
+
+        self.generations += 1
+        self.cancelled += result.stop_reason == 'cancelled'
+        self.tokens_generated += len(result.tokens)
+        self.tokens_reused += result.reused_tokens
+        self.last_tokens_per_second = result.tokens_per_second
+        logger.debug(f"Generated {len(result.tokens)} tokens at "
+                     f"{result.tokens_per_second:.1f} tok/s ({result.stop_reason}, "
+                     f"{result.reused_tokens}/{result.prompt_tokens} prompt tokens cached)")
+        return result
+
+    def close(self):
+        self.scheduler.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        step = self.step_stats.summary()
+        return {
+            'generations': self.generations,
+            'cancelled': self.cancelled,
+            'tokens_generated': self.tokens_generated,
+            'tokens_reused': self.tokens_reused,
+            'cached_tokens': sum(len(cached) for cached in self._cached),
+            'prefix_tokens': len(self._prefix_ids),
+            'prefix_restores': self.prefix_restores,
+            'active': self.active(),
+            'last_tokens_per_second': round(self.last_tokens_per_second, 1),
+            'decode_step_ms': step['avg_ms'],
+            'batching': self.scheduler.get_stats()
+        }
+
+
+class _Shape:
+    def __init__(self, *shape: int):
+        self.shape = shape
+
+
+class SyntheticBindings:
+    """Bindings of :class:`SyntheticInferModel` with host buffers."""
+
+    def __init__(self, model: 'SyntheticInferModel'):
+        self.model = model
+        batch = model.batch_size
+        self._inputs = {
+            'input_ids': np.zeros((batch, model.seq_len), dtype=np.int32),
+            'cache_position': np.zeros(batch, dtype=np.int32),
+            'num_tokens': np.zeros(batch, dtype=np.int32),
+            'kv_cache': np.zeros((batch, model.context_len), dtype=np.int32)
+        }
+        self._outputs = {'logits': np.zeros((batch, model.vocab_size), dtype=np.float32)}
+        self._reply_index = [0] * batch
+        self._last_prediction: List[Optional[int]] = [None] * batch
+
+    def input(self, name: str) -> np.ndarray:
+        return self._inputs[name]
+
+    def output(self, name: str) -> np.ndarray:
+        return self._outputs[name]
+
+    def output_names(self) -> List[str]:
+        return list(self._outputs)
+
+    def infer(self):
+        model = self.model
+        model.infer_calls += 1
+        # An accelerator call costs about the same for any batch size
+        if model.step_delay:
+            time.sleep(model.step_delay)
+
+        for row in range(model.batch_size):
+            count = int(self._inputs['num_tokens'][row])
+            if not count:
+                continue
+            position = int(self._inputs['cache_position'][row])
+            fed = self._inputs['input_ids'][row, :count]
+            if position + count > model.context_len:
+                raise RuntimeError("KV cache overflow")
+            self._inputs['kv_cache'][row, position:position + count] = fed
+            model.tokens_processed += count
+            model.rows_processed += 1
+
+            # Feeding back the last prediction continues the reply; anything
+            # else is a new prompt
+            if count == 1 and fed[0] == self._last_prediction[row]:
+                self._reply_index[row] += 1
+            else:
+                self._reply_index[row] = 0
+            reply = model.reply_ids
+            index = self._reply_index[row]
+            token = reply[index] if index < len(reply) else model.eos_id
+
+            logits = self._outputs['logits'][row]
+            logits[:] = 0.0
+            logits[token] = model.confidence
+            self._last_prediction[row] = token
+
+
+class SyntheticInferModel:
+    """Stand-in for a Hailo infer model that replies with scripted text.
+
+    Useful for tests and development without a device. Each ``infer()``
+    sleeps ``step_delay`` whatever the batch size, like one accelerator
+    call. Counts infer calls, rows, bindings created and tokens processed.
+    """
+
+    def __init__(self, tokenizer: Tokenizer, reply: str, seq_len: int = 64,
+                 context_len: int = 512, batch_size: int = 1,
+                 step_delay: float = 0.0, confidence: float = 30.0):
+        self.vocab_size = tokenizer.vocab_size
+        self.eos_id = tokenizer.eos_id
+        self.reply_ids = tokenizer.encode(reply)
+        self.seq_len = seq_len
+        self.context_len = context_len
+        self.batch_size = batch_size
+        self.step_delay = step_delay
+        self.confidence = confidence
+
+        self.infer_calls = 0
+        self.rows_processed = 0
+        self.bindings_created = 0
+        self.tokens_processed = 0
+
+    def input(self, name: str) -> _Shape:
+        shapes = {'input_ids': (self.batch_size, self.seq_len),
+                  'kv_cache': (self.batch_size, self.context_len)}
+        return _Shape(*shapes.get(name, (self.batch_size,)))
+
+    def create_bindings(self) -> SyntheticBindings:
+        self.bindings_created += 1
+        return SyntheticBindings(self)
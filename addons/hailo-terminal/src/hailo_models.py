@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Model Cache for Hailo AI Terminal
+
+The Hailo backend used to load exactly one ``{model}.hef`` at startup, so
+changing models meant restarting the add-on and parsing and configuring
+the HEF again. The model manager keeps several configured models
+resident on the device within a memory budget, evicting the least
+recently used, and switches the active model without a restart.
+
+Switches between models are counted, and after each switch the model
+most often used next is preloaded in the background. Parse, configure
+and switch times are recorded per model.
+
+The HEF file size stands in for the device memory a model needs.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+# Import Hailo runtime (if available)
+try:
+    from hailo_platform import HEF
+    HAILO_AVAILABLE = True
+except ImportError:
+    HAILO_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_BUDGET_MB = 1024
+
+
+class HEFLoader:
+    """Parses HEF files and configures them on a VDevice."""
+
+    def __init__(self, vdevice: Any):
+        self.vdevice = vdevice
+
+    def parse(self, path: str) -> Any:
+        return HEF(path)
+
+    def configure(self, hef: Any) -> Any:
+        return self.vdevice.create_infer_model(hef)
+
+    def release(self, infer_model: Any):
+        release = getattr(infer_model, 'release', None)
+        if callable(release):
+            release()
+
+
+@dataclass
+class ModelStats:
+    """Load and switch timings of one model."""
+    loads: int = 0
+    evictions: int = 0
+    switches: int = 0
+    hits: int = 0
+    preloads: int = 0
+    parse_time: float = 0.0
+    configure_time: float = 0.0
+    switch_time: float = 0.0
+    last_error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'loads': self.loads,
+            'evictions': self.evictions,
+            'switches': self.switches,
+            'hits': self.hits,
+            'preloads': self.preloads,
+            'parse_ms': round(self.parse_time * 1000, 2),
+            'configure_ms': round(self.configure_time * 1000, 2),
+            'last_switch_ms': round(self.switch_time * 1000, 2),
+            'last_error': self.last_error
+        }
+
+
+@dataclass
+class ResidentModel:
+    """A model configured on the device."""
+    name: str
+    hef: Any
+    infer_model: Any
+    runtime: Any
+    size: int
+    loaded_at: float = field(default_factory=time.monotonic)
+    users: int = 0
+
+
+class HailoModelManager:
+    """LRU cache of configured models within a device memory budget."""
+
+    def __init__(self, model_path: str, loader: Any,
+                 build: Optional[Callable[[str, Any], Any]] = None,
+                 memory_budget: int = DEFAULT_MEMORY_BUDGET_MB * 1024 * 1024,
+                 preload: Sequence[str] = ()):
+        """Initialize the manager.
+
+        Args:
+            model_path: Directory holding ``{model}.hef`` files
+            loader: Provides ``parse(path)``, ``configure(hef)`` and
+                ``release(infer_model)``
+            build: Creates per-model runtime state (decoder, tokenizer)
+                from a model name and its infer model
+            memory_budget: Bytes of models kept resident
+            preload: Models preloaded when nothing better is known
+        """
+        self.model_path = model_path
+        self.loader = loader
+        self.build = build
+        self.memory_budget = memory_budget
+        self.preload_order = [name for name in preload if name]
+
+        self.active: Optional[str] = None
+        self._resident: 'OrderedDict[str, ResidentModel]' = OrderedDict()
+        self._loading: Dict[str, threading.Event] = {}
+        # Bytes of models being loaded, counted against the budget
+        self._reserved = 0
+        self._stats: Dict[str, ModelStats] = {}
+        self._transitions: Dict[str, Counter] = {}
+        self._lock = threading.RLock()
+        # Notified when a load finishes and its reservation is released
+        self._loaded = threading.Condition(self._lock)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.model_path, f"{name}.hef")
+
+    def available_models(self) -> List[str]:
+        """Models with a HEF file in the model directory."""
+        try:
+            return sorted(entry[:-4] for entry in os.listdir(self.model_path)
+                          if entry.endswith('.hef'))
+        except OSError:
+            return []
+
+    def stats(self, name: str) -> ModelStats:
+        with self._lock:
+            return self._stats.setdefault(name, ModelStats())
+
+    @property
+    def used_memory(self) -> int:
+        """Bytes of resident models and of models being loaded."""
+        with self._lock:
+            return self._reserved + sum(model.size for model in self._resident.values())
+
+    def is_resident(self, name: str) -> bool:
+        with self._lock:
+            return name in self._resident
+
+    def get(self, name: str) -> ResidentModel:
+        """A resident model, loading it if needed. Marks it recently used."""
+        while True:
+            with self._lock:
+                model = self._resident.get(name)
+                if model is not None:
+                    self._resident.move_to_end(name)
+                    return model
+                loading = self._loading.get(name)
+                if loading is None:
+                    loading = self._loading[name] = threading.Event()
+                    break
+            # Another thread is loading this model
+            loading.wait()
+            with self._lock:
+                if name not in self._resident and self._stats.get(name, ModelStats()).last_error:
+                    raise RuntimeError(f"Loading {name} failed: {self._stats[name].last_error}")
+
+        try:
+            return self._load(name)
+        finally:
+            with self._lock:
+                self._loading.pop(name, None)
+            loading.set()
+
+    def _load(self, name: str) -> ResidentModel:
+        path = self.path(name)
+        stats = self.stats(name)
+        size = 0
+        try:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Hailo model not found: {path}")
+            size = os.path.getsize(path)
+            # Reserve the room so a concurrent load cannot take it too
+            with self._lock:
+                self._make_room(size)
+                self._reserved += size
+
+            started = time.perf_counter()
+            hef = self.loader.parse(path)
+            parsed = time.perf_counter()
+            infer_model = self.loader.configure(hef)
+            runtime = self.build(name, infer_model) if self.build else None
+            configured = time.perf_counter()
+        except Exception as e:
+            with self._lock:
+                self._reserved -= size
+                self._loaded.notify_all()
+            stats.last_error = str(e)
+            raise
+
+        stats.parse_time = parsed - started
+        stats.configure_time = configured - parsed
+        stats.loads += 1
+        stats.last_error = None
+        model = ResidentModel(name, hef, infer_model, runtime, size)
+        with self._lock:
+            self._reserved -= size
+            self._resident[name] = model
+            self._loaded.notify_all()
+        logger.info(f"Loaded Hailo model {name} ({size / 1048576:.1f} MB) in "
+                    f"{stats.parse_time * 1000:.0f} ms parse + "
+                    f"{stats.configure_time * 1000:.0f} ms configure")
+        return model
+
+    def _make_room(self, size: int):
+        """Evict least recently used idle models until ``size`` fits.
+
+        While other models are being loaded their room is reserved; if
+        ``size`` does not fit, wait for those loads and evict again.
+        """
+        while True:
+            for name in list(self._resident):
+                if self.used_memory + size <= self.memory_budget:
+                    return
+                model = self._resident[name]
+                if name == self.active or model.users:
+                    continue
+                self._evict(name)
+            if self.used_memory + size <= self.memory_budget:
+                return
+            if not self._reserved:
+                break
+            self._loaded.wait()
+        logger.warning(f"Hailo models exceed the memory budget "
+                       f"({(self.used_memory + size) / 1048576:.1f} MB)")
+
+    def _evict(self, name: str):
+        model = self._resident.pop(name)
+        self.stats(name).evictions += 1
+        close = getattr(model.runtime, 'close', None)
+        if callable(close):
+            close()
+        try:
+            self.loader.release(model.infer_model)
+        except Exception as e:
+            logger.warning(f"Failed to release Hailo model {name}: {e}")
+        logger.info(f"Evicted Hailo model {name}")
+
+    def switch(self, name: str) -> ResidentModel:
+        """Make a model active, loading it if needed, and preload the next."""
+        started = time.perf_counter()
+        with self._lock:
+            hit = name in self._resident
+        model = self.get(name)
+
+        with self._lock:
+            previous, self.active = self.active, name
+            stats = self.stats(name)
+            stats.switches += 1
+            stats.hits += hit
+            stats.switch_time = time.perf_counter() - started
+            if previous and previous != name:
+                self._transitions.setdefault(previous, Counter())[name] += 1
+        logger.info(f"Switched Hailo model to {name} in {stats.switch_time * 1000:.1f} ms"
+                    f"{' (resident)' if hit else ''}")
+
+        upcoming = self.predict_next(name)
+        if upcoming:
+            self.preload(upcoming)
+        return model
+
+    def predict_next(self, name: str) -> Optional[str]:
+        """Model most often switched to after ``name``."""
+        with self._lock:
+            following = self._transitions.get(name)
+            if following:
+                return following.most_common(1)[0][0]
+        for candidate in self.preload_order:
+            if candidate != name:
+                return candidate
+        return None
+
+    def preload(self, name: str) -> Optional[threading.Thread]:
+        """Load a model in the background if it is not resident."""
+        with self._lock:
+            if name in self._resident or name in self._loading:
+                return None
+
+        def run():
+            try:
+                self.get(name)
+                self.stats(name).preloads += 1
+            except Exception as e:
+                logger.warning(f"Failed to preload Hailo model {name}: {e}")
+
+        thread = threading.Thread(target=run, name=f'hailo-preload-{name}', daemon=True)
+        thread.start()
+        return thread
+
+    def runtimes(self) -> List[Any]:
+        """Runtime state of every resident model."""
+        with self._lock:
+            return [model.runtime for model in self._resident.values()]
+
+    def acquire(self, name: str) -> Optional[ResidentModel]:
+        """Keep a resident model from being evicted until released."""
+        with self._lock:
+            model = self._resident.get(name)
+            if model is not None:
+                model.users += 1
+            return model
+
+    def release(self, model: Optional[ResidentModel]):
+        if model is not None:
+            with self._lock:
+                model.users -= 1
+
+    @contextmanager
+    def hold(self, name: str) -> Iterator[Optional[ResidentModel]]:
+        """Keep a model from being evicted while it is used."""
+        model = self.acquire(name)
+        try:
+            yield model
+        finally:
+            self.release(model)
+
+    def close(self):
+        """Release every resident model."""
+        with self._lock:
+            for name in list(self._resident):
+                self._evict(name)
+            self.active = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'active': self.active,
+                'resident': list(self._resident),
+                'used_mb': round(self.used_memory / 1048576, 1),
+                'loading_mb': round(self._reserved / 1048576, 1),
+                'budget_mb': round(self.memory_budget / 1048576, 1),
+                'models': {name: stats.to_dict() for name, stats in self._stats.items()}
+            }
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Micro-batching Scheduler for Hailo AI Terminal
+
+Concurrent generations each used to drive the accelerator on their own.
+The scheduler collects the device calls they submit (prefill chunks and
+decode steps) for a short window, up to the batch size of the model, and
+runs them as one device call. Results are scattered back to the waiting
+callers.
+
+Decode loops run in worker threads and block on the device, so the
+scheduler is thread based: callers block on a ``concurrent.futures``
+future while one scheduler thread forms and runs batches. Queued requests
+are taken by priority class, then in arrival order. The window ends early
+once every active caller has submitted, so a lone generation is not
+delayed.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from metrics import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRIORITIES = ('interactive', 'background')
+DEFAULT_BATCH_WINDOW = 0.002
+
+
+class BatchScheduler:
+    """Groups requests into batches for a single blocking batch call."""
+
+    def __init__(self, run_batch: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 1,
+                 batch_window: float = DEFAULT_BATCH_WINDOW,
+                 priorities: Sequence[str] = DEFAULT_PRIORITIES,
+                 expected: Optional[Callable[[], int]] = None):
+        """Initialize the scheduler.
+
+        Args:
+            run_batch: Runs a list of requests and returns one result each
+            max_batch_size: Most requests per batch
+            batch_window: Seconds to wait for more requests after the first
+            priorities: Priority classes, highest first
+            expected: Number of callers that may submit; the window closes
+                once this many requests are waiting
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_window = max(0.0, batch_window)
+        self.priorities = tuple(priorities) or DEFAULT_PRIORITIES
+        self.expected = expected
+
+        self._rank = {name: rank for rank, name in enumerate(self.priorities)}
+        self._queue: List[Tuple[int, int, float, Any, Future]] = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        self.batches = 0
+        self.requests = 0
+        self.errors = 0
+        self.queue_wait = LatencyStats()
+        self.batch_time = LatencyStats()
+        self.per_class: Dict[str, int] = {name: 0 for name in self.priorities}
+
+    def rank(self, priority: Optional[str]) -> int:
+        """Rank of a priority class; unknown classes sort last."""
+        if priority is None:
+            return 0
+        return self._rank.get(priority, len(self.priorities))
+
+    def submit(self, request: Any, priority: Optional[str] = None) -> Future:
+        """Queue a request; the future resolves with its result."""
+        future: Future = Future()
+        with self._cond:
+            if not self._running:
+                self._start()
+            heapq.heappush(self._queue, (self.rank(priority), next(self._order),
+                                         time.monotonic(), request, future))
+            name = priority or self.priorities[0]
+            self.per_class[name] = self.per_class.get(name, 0) + 1
+            self._cond.notify()
+        return future
+
+    def run(self, request: Any, priority: Optional[str] = None) -> Any:
+        """Submit a request and wait for its result."""
+        return self.submit(request, priority).result()
+
+    def _start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name='hailo-batch', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop the scheduler thread; queued requests are failed."""
+        with self._cond:
+            self._running = False
+            pending, self._queue = self._queue, []
+            self._cond.notify_all()
+        for *_, future in pending:
+            future.set_exception(RuntimeError("Scheduler closed"))
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def _collect(self) -> List[Tuple[int, int, float, Any, Future]]:
+        """Wait for a batch: the first request opens a short window."""
+        with self._cond:
+            while self._running and not self._queue:
+                self._cond.wait()
+            if not self._running:
+                return []
+
+            deadline = time.monotonic() + self.batch_window
+            while len(self._queue) < self.max_batch_size:
+                expected = self.expected() if self.expected else self.max_batch_size
+                if len(self._queue) >= expected:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            count = min(len(self._queue), self.max_batch_size)
+            return [heapq.heappop(self._queue) for _ in range(count)]
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                if not self._running:
+                    return
+                continue
+
+            started = time.monotonic()
+            for _, _, enqueued, _, _ in batch:
+                self.queue_wait.record(started - enqueued)
+            try:
+                results = self.run_batch([request for _, _, _, request, _ in batch])
+            except Exception as e:
+                self.errors += 1
+                for *_, future in batch:
+                    future.set_exception(e)
+                continue
+            finally:
+                self.batches += 1
+                self.requests += len(batch)
+                self.batch_time.record(time.monotonic() - started)
+
+            results = list(results)
+            for (*_, future), result in zip(batch, results):
+                future.set_result(result)
+            if len(results) != len(batch):
+                # Requests without a result would block their callers forever
+                self.errors += 1
+                error = RuntimeError(f"Batch of {len(batch)} requests returned "
+                                     f"{len(results)} results")
+                logger.error(str(error))
+                for *_, future in batch[len(results):]:
+                    future.set_exception(error)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            queued = len(self._queue)
+        return {
+            'max_batch_size': self.max_batch_size,
+            'batch_window_ms': round(self.batch_window * 1000, 2),
+            'batches': self.batches,
+            'requests': self.requests,
+            'avg_batch_size': round(self.requests / self.batches, 2) if self.batches else 0.0,
+            'errors': self.errors,
+            'queued': queued,
+            'per_class': dict(self.per_class),
+            'queue_wait': self.queue_wait.summary(),
+            'batch_time': self.batch_time.summary()
+        }
@@ -15,91 +15,31 @@ import logging
 import asyncio
 import psutil
 import requests
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 import threading
 import time
-from flask import Flask, jsonify, request, render_template
-from flask_socketio import SocketIO, emit
-
-        @self.app.route('/api/entities/discovery')
-        def get_entity_discovery():
-            \"\"\"Get comprehensive entity discovery information.\"\"\"
-            try:
-                if self.ha_client:
-                    import asyncio
-                    discovery_data = asyncio.run(self.ha_client.get_discovery_summary())
-                    
-                    return jsonify({
-                        'success': True,
-                        'discovery': discovery_data
-                    })
-                else:
-                    return jsonify({
-                        'success': False,
-                        'error': 'Home Assistant client not available'
-                    }), 503
-                    
-            except Exception as e:
-                logger.error(f\"Error getting entity discovery: {e}\")
-                return jsonify({
-                    'success': False,
-                    'error': str(e)
-                }), 500
-
-        @self.app.route('/api/entities/by-domain/<domain>')
-        def get_entities_by_domain(domain):
-            \"\"\"Get entities filtered by domain.\"\"\"
-            try:
-                if self.ha_client:
-                    import asyncio
-                    entities = asyncio.run(self.ha_client.get_entities_by_domain(domain))
-                    
-                    return jsonify({
-                        'success': True,
-                        'domain': domain,
-                        'entities': entities,
-                        'count': len(entities)
-                    })
-                else:
-                    return jsonify({
-                        'success': False,
-                        'error': 'Home Assistant client not available'
-                    }), 503
-                    
-            except Exception as e:
-                logger.error(f\"Error getting entities for domain {domain}: {e}\")
-                return jsonify({
-                    'success': False,
-                    'error': str(e)
-                }), 500
-
-        @self.app.route('/api/automation/relevant-entities/<template_id>')
-        def get_relevant_entities(template_id):
-            \"\"\"Get entities relevant to a specific automation template.\"\"\"
-            try:
-                import asyncio
-                relevant_entities = asyncio.run(
-                    self.automation_manager.get_relevant_entities_for_automation(template_id)
-                )
-                
-                return jsonify({
-                    'success': True,
-                    'template_id': template_id,
-                    'relevant_entities': relevant_entities
-                })
-                
-            except Exception as e:
-                logger.error(f\"Error getting relevant entities for {template_id}: {e}\")
-                return jsonify({
-                    'success': False,
-                    'error': str(e)
-                }), 500
-    late
+import uuid
+from flask import Flask, Response, jsonify, request, render_template
+from flask.json.provider import JSONProvider
 from flask_socketio import SocketIO, emit
 
 # Import our AI backend manager
 from ai_backend_manager import AIBackendManager
+from response_cache import ResponseCache, CachedResponse, fingerprint
+from entity_store import EntityStore, EntityQuery, QUERY_PARAMS as ENTITY_QUERY_PARAMS
+from prompt_prefix import DEFAULT_SYSTEM_PROMPT, describe_home
+from entity_index import EntityIndex, format_entities
+from background_loop import BackgroundEventLoop
+from query_pool import AIQueryPool, QueueFullError
+from subscriptions import SubscriptionHub, TokenRelay, DEFAULT_TOPICS
+from serialization import (
+    MIN_COMPRESS_SIZE, choose_encoding, compress, get_serializer, set_serializer
+)
+
+# Discovery payloads also carry integrations, add-ons and areas, which are
+# not covered by the entity states version; roll their version this often
+DISCOVERY_REFRESH_SECONDS = 60
 
 
 def setup_logging() -> logging.Logger:
@@ -360,6 +300,24 @@ class ResourceMonitor:
 # Removed old HailoAIEngine class - now using AIBackendManager
 
 
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by the shared fast serializer."""
+    
+    mimetype = 'application/json'
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return get_serializer().dumps(obj)
+    
+    def loads(self, s, **kwargs: Any) -> Any:
+        return get_serializer().loads(s)
+    
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            get_serializer().dumps_bytes(obj), mimetype=self.mimetype
+        )
+
+
 class HailoTerminal:
     """Main Hailo AI Terminal application."""
     
@@ -389,11 +347,42 @@ class HailoTerminal:
         from automation_manager import AutomationManager
         self.automation_manager = AutomationManager(self.ha_client)
         
+        # Serialised bodies of heavy JSON endpoints, keyed on data version
+        self.response_cache = ResponseCache()
+        
+        # Indexed entity snapshot backing paged entity queries
+        self.entity_store = EntityStore()
+        
+        # Entities retrieved into the prompt of each AI query
+        self.entity_index = EntityIndex(quantize=self.config.get('entity_index_int8', False))
+        
+        # AI queries run on a bounded worker pool; in Flask mode the pool
+        # lives on a shared background event loop
+        self.background_loop = BackgroundEventLoop()
+        self.ai_query_pool = AIQueryPool(
+            workers=self.config.get('ai_workers', 2),
+            max_queue=self.config.get('ai_queue_size', 32),
+            max_per_client=self.config.get('ai_queue_per_client', 4)
+        )
+        
+        # Topic subscriptions with per-client outbound queues; lives on the
+        # same loop as the query pool
+        self.subscriptions = SubscriptionHub(self._emit_with_ack,
+                                             disconnect=self._disconnect_client)
+        self._entity_topic_versions: Dict[str, Any] = {}
+        # Entity states version the prompt prefix and entity index are from
+        self._home_context_version = None
+        
         # Flask app for web interface
         template_dir = os.path.join(os.path.dirname(__file__), 'templates')
         self.app = Flask(__name__, template_folder=template_dir)
         self.app.config['SECRET_KEY'] = 'hailo-terminal-secret'
-        self.socketio = SocketIO(self.app, cors_allowed_origins="*")
+        
+        # Route jsonify and Socket.IO packets through the fast serializer
+        self.serializer = set_serializer(self.config.get('json_serializer', 'auto'))
+        self.app.json = FastJSONProvider(self.app)
+        self.socketio = SocketIO(self.app, cors_allowed_origins="*",
+                                 json=self.serializer)
         
         self._setup_routes()
         self._setup_socket_handlers()
@@ -421,17 +410,66 @@ class HailoTerminal:
             'openai_api_key': os.getenv('OPENAI_API_KEY', ''),
             'anthropic_api_key': os.getenv('ANTHROPIC_API_KEY', ''),
             'custom_api_url': os.getenv('CUSTOM_API_URL', ''),
+            'openai_api_url': os.getenv('OPENAI_API_URL', ''),
+            'anthropic_api_url': os.getenv('ANTHROPIC_API_URL', ''),
             
             # Performance settings
             'max_context_length': int(os.getenv('MAX_CONTEXT_LENGTH', '4096')),
             'temperature': float(os.getenv('TEMPERATURE', '0.7')),
             'max_tokens': int(os.getenv('MAX_TOKENS', '512')),
+            'hailo_top_k': int(os.getenv('HAILO_TOP_K', '40')),
+            'hailo_top_p': float(os.getenv('HAILO_TOP_P', '0.9')),
+            'hailo_models': [
+                name.strip() for name in os.getenv('HAILO_MODELS', '').split(',')
+                if name.strip()
+            ],
+            'hailo_model_memory_mb': int(os.getenv('HAILO_MODEL_MEMORY_MB', '1024')),
+            'hailo_batch_size': int(os.getenv('HAILO_BATCH_SIZE', '0')),
+            'hailo_batch_window_ms': float(os.getenv('HAILO_BATCH_WINDOW_MS', '2')),
+            'hailo_priority_classes': [
+                name.strip() for name in
+                os.getenv('HAILO_PRIORITY_CLASSES', 'interactive,background').split(',')
+                if name.strip()
+            ],
+            'stream_responses': (
+                os.getenv('STREAM_RESPONSES', 'true').lower() != 'false'
+            ),
+            'ai_workers': int(os.getenv('AI_WORKERS', '2')),
+            'ai_queue_size': int(os.getenv('AI_QUEUE_SIZE', '32')),
+            'ai_queue_per_client': int(os.getenv('AI_QUEUE_PER_CLIENT', '4')),
+            'conversation_sessions': int(os.getenv('CONVERSATION_SESSIONS', '64')),
+            'conversation_messages': int(os.getenv('CONVERSATION_MESSAGES', '20')),
+            'conversation_recent': int(os.getenv('CONVERSATION_RECENT', '6')),
+            'conversation_summary_backend': os.getenv('CONVERSATION_SUMMARY_BACKEND', ''),
+            'ai_routing': os.getenv('AI_ROUTING', 'fixed'),
+            'ai_fallback': [
+                name.strip() for name in os.getenv('AI_FALLBACK', 'hailo,ollama').split(',')
+                if name.strip()
+            ],
+            'ai_backend_timeout': int(os.getenv('AI_BACKEND_TIMEOUT', '60')),
+            'ai_hedge': os.getenv('AI_HEDGE', 'false').lower() == 'true',
+            'ai_class_limits': os.getenv('AI_CLASS_LIMITS', 'interactive=4,background=1'),
+            'ai_system_prompt': os.getenv('AI_SYSTEM_PROMPT') or DEFAULT_SYSTEM_PROMPT,
+            'ollama_keep_alive': os.getenv('OLLAMA_KEEP_ALIVE', '30m'),
+            'ai_entity_context': int(os.getenv('AI_ENTITY_CONTEXT', '8')),
+            'entity_index_int8': os.getenv('ENTITY_INDEX_INT8', 'false').lower() == 'true',
+            'ai_token_costs': os.getenv('AI_TOKEN_COSTS', ''),
+            'health_check_interval': int(os.getenv('HEALTH_CHECK_INTERVAL', '30')),
+            'ai_cache_size': int(os.getenv('AI_CACHE_SIZE', '256')),
+            'ai_cache_ttl': int(os.getenv('AI_CACHE_TTL', '3600')),
+            'ai_cache_path': (
+                os.getenv('AI_CACHE_PATH', '/data/ai_completion_cache.json')
+                if os.getenv('AI_CACHE_PERSIST', 'false').lower() == 'true' else ''
+            ),
+            'ai_dedup': os.getenv('AI_DEDUP', 'true').lower() == 'true',
             
             # Application settings
             'enable_terminal': (
                 os.getenv('ENABLE_TERMINAL', 'true').lower() == 'true'
             ),
             'terminal_port': int(os.getenv('TERMINAL_PORT', '8080')),
+            'server_mode': os.getenv('SERVER_MODE', 'flask'),
+            'json_serializer': os.getenv('JSON_SERIALIZER', 'auto'),
             'enable_monitoring': (
                 os.getenv('ENABLE_MONITORING', 'true').lower() == 'true'
             ),
@@ -441,6 +479,25 @@ class HailoTerminal:
     def _setup_routes(self):
         """Setup Flask routes."""
         
+        @self.app.after_request
+        def compress_response(response):
+            """Compress large JSON responses the client accepts encoded."""
+            if (response.status_code != 200 or response.direct_passthrough or
+                    response.mimetype != 'application/json' or
+                    'Content-Encoding' in response.headers):
+                return response
+            
+            body = response.get_data()
+            if len(body) < MIN_COMPRESS_SIZE:
+                return response
+            
+            encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+            if encoding:
+                response.set_data(compress(body, encoding))
+                response.headers['Content-Encoding'] = encoding
+                response.vary.add('Accept-Encoding')
+            return response
+        
         @self.app.route('/')
         def index():
             return render_template('index.html')
@@ -451,6 +508,7 @@ class HailoTerminal:
             return jsonify({
                 'status': 'healthy',
                 'ai_backends': backend_status,
+                'ai_cache': self.ai_backend_manager.completion_cache.get_stats(),
                 'monitoring': self.resource_monitor.monitoring,
                 'timestamp': datetime.now().isoformat()
             })
@@ -462,24 +520,21 @@ class HailoTerminal:
             
             # Add HA-specific data if client is available
             if self.ha_client:
-                try:
-                    from ha_client import get_system_resources_sync
-                    ha_resources = get_system_resources_sync(self.ha_client)
-                    resource_data.update(ha_resources)
-                except Exception as e:
-                    logger.error(f"Failed to get HA resources: {e}")
-                    resource_data.update(self.ha_client.get_mock_system_info())
+                resource_data.update(self.background_loop.run(self.ha_resources()))
             
             return jsonify(resource_data)
         
+        @self.app.route('/api/metrics')
+        def metrics():
+            """Get AI query pool metrics."""
+            return jsonify(self.get_metrics())
+        
         @self.app.route('/api/backends')
         def backends():
             """Get available AI backends."""
-            return jsonify({
-                'available': self.ai_backend_manager.get_available_backends(),
-                'current': self.ai_backend_manager.current_backend,
-                'status': self.ai_backend_manager.get_backend_status()
-            })
+            return self._cached_json_response(*self.background_loop.run(
+                self.backends_response(request.headers.get('If-None-Match'))
+            ))
         
         @self.app.route('/api/switch_backend', methods=['POST'])
         def switch_backend():
@@ -500,6 +555,29 @@ class HailoTerminal:
                 return jsonify({
                     'error': f'Backend {backend_name} not available'
                 }), 400
+        
+        @self.app.route('/api/switch_model', methods=['POST'])
+        def switch_model():
+            """Switch the model of an AI backend without restarting."""
+            data = request.get_json()
+            model = data.get('model', '')
+            backend_name = data.get('backend')
+            
+            if not model:
+                return jsonify({'error': 'No model specified'}), 400
+            
+            success = self.background_loop.run(
+                self.ai_backend_manager.switch_model(model, backend_name)
+            )
+            if success:
+                return jsonify({
+                    'success': True,
+                    'model': model
+                })
+            else:
+                return jsonify({
+                    'error': f'Model {model} could not be loaded'
+                }), 400
 
         @self.app.route('/api/automation/recommendations', methods=['POST'])
         def get_automation_recommendations():
@@ -519,8 +597,10 @@ class HailoTerminal:
                 except Exception as e:
                     logger.warning(f"Could not get entities: {e}")
             
-            recommendations = self.automation_manager.get_automation_recommendations(
-                user_request, available_entities
+            recommendations = self.background_loop.run(
+                self.automation_manager.get_automation_recommendations(
+                    user_request, available_entities
+                )
             )
             
             return jsonify({
@@ -561,12 +641,9 @@ class HailoTerminal:
                 return jsonify({'error': 'No automation provided'}), 400
             
             try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                is_valid, errors = loop.run_until_complete(
+                is_valid, errors = self.background_loop.run(
                     self.automation_manager.validate_automation(automation_dict)
                 )
-                loop.close()
                 
                 return jsonify({
                     'valid': is_valid,
@@ -585,12 +662,9 @@ class HailoTerminal:
                 return jsonify({'error': 'No automation provided'}), 400
             
             try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                success, message = loop.run_until_complete(
+                success, message = self.background_loop.run(
                     self.automation_manager.test_automation(automation_dict)
                 )
-                loop.close()
                 
                 return jsonify({
                     'success': success,
@@ -610,12 +684,9 @@ class HailoTerminal:
                 return jsonify({'error': 'No automation provided'}), 400
             
             try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                success, message = loop.run_until_complete(
+                success, message = self.background_loop.run(
                     self.automation_manager.save_automation(automation_dict, test_first)
                 )
-                loop.close()
                 
                 return jsonify({
                     'success': success,
@@ -633,6 +704,202 @@ class HailoTerminal:
             return jsonify({
                 'suggestions': suggestions
             })
+
+        @self.app.route('/api/entities/discovery')
+        def get_entity_discovery():
+            """Get comprehensive entity discovery information.
+            
+            With any of the paging, projection or filter query parameters
+            the response is a page of entities plus per-domain and
+            per-device-class counts instead of the full discovery summary.
+            """
+            try:
+                if self.ha_client:
+                    if any(param in request.args for param in ENTITY_QUERY_PARAMS):
+                        return self._entity_page(request.args, summary=True)
+                    
+                    return self._cached_json_response(*self.background_loop.run(
+                        self.entity_discovery_response(
+                            request.headers.get('If-None-Match'))
+                    ))
+                else:
+                    return jsonify({
+                        'success': False,
+                        'error': 'Home Assistant client not available'
+                    }), 503
+
+            except Exception as e:
+                logger.error(f"Error getting entity discovery: {e}")
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+
+        @self.app.route('/api/entities/by-domain/<domain>')
+        def get_entities_by_domain(domain):
+            """Get entities filtered by domain.
+            
+            Supports ``cursor``/``limit`` pagination, ``fields`` projection
+            and ``area``, ``device_class``, ``state`` and ``q`` filters.
+            """
+            try:
+                if self.ha_client:
+                    if any(param in request.args for param in ENTITY_QUERY_PARAMS):
+                        return self._entity_page(request.args, domain=domain)
+                    
+                    return self._cached_json_response(*self.background_loop.run(
+                        self.entities_by_domain_response(
+                            domain, request.headers.get('If-None-Match'))
+                    ))
+                else:
+                    return jsonify({
+                        'success': False,
+                        'error': 'Home Assistant client not available'
+                    }), 503
+
+            except Exception as e:
+                logger.error(f"Error getting entities for domain {domain}: {e}")
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+
+        @self.app.route('/api/automation/relevant-entities/<template_id>')
+        def get_relevant_entities(template_id):
+            """Get entities relevant to a specific automation template."""
+            try:
+                relevant_entities = self.background_loop.run(
+                    self.automation_manager.get_relevant_entities_for_automation(template_id)
+                )
+
+                return jsonify({
+                    'success': True,
+                    'template_id': template_id,
+                    'relevant_entities': relevant_entities
+                })
+
+            except Exception as e:
+                logger.error(f"Error getting relevant entities for {template_id}: {e}")
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+
+    def _cached_json_response(self, status: int, etag: str,
+                              entry: Optional[CachedResponse]) -> Response:
+        """Build a Flask response from a response cache lookup."""
+        if status == 304:
+            response = Response(status=304)
+        else:
+            body, encoding = self.response_cache.encoded_body(
+                entry, request.headers.get('Accept-Encoding')
+            )
+            response = Response(body, status=status,
+                                mimetype='application/json')
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+            etag = self.response_cache.encoded_etag(etag, encoding)
+        response.vary.add('Accept-Encoding')
+        response.headers['ETag'] = etag
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
+    def _entity_page(self, args, domain: Optional[str] = None,
+                     summary: bool = False) -> Response:
+        """Answer a paged entity query from the Flask routes."""
+        try:
+            query = EntityQuery.from_args(args, domain=domain)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        return self._cached_json_response(*self.background_loop.run(
+            self.entity_page_response(query, request.headers.get('If-None-Match'),
+                                      summary=summary)
+        ))
+    
+    async def entity_page_response(self, query: EntityQuery,
+                                   if_none_match: Optional[str] = None,
+                                   summary: bool = False):
+        """Resolve a paged entity query against the entity store.
+        
+        Args:
+            query: Filters, projection and cursor for the page
+            if_none_match: Value of the request's ``If-None-Match`` header
+            summary: Include per-domain and per-device-class counts
+        """
+        snapshot = await self.entity_store.refresh(self.ha_client)
+        
+        async def build():
+            payload = {'success': True}
+            if query.domain:
+                payload['domain'] = query.domain
+            payload.update(snapshot.query(query))
+            if summary:
+                payload['domains'] = snapshot.domain_counts()
+                payload['device_classes'] = snapshot.device_class_counts()
+            return payload
+        
+        key = f"entities:{'summary' if summary else 'page'}?{query.cache_key()}"
+        return await self.response_cache.respond(
+            key, snapshot.version, build, if_none_match
+        )
+    
+    async def ha_resources(self) -> Dict[str, Any]:
+        """Home Assistant system info, or mock data when unreachable."""
+        try:
+            if await self.ha_client.test_connection():
+                return await self.ha_client.get_system_info()
+        except Exception as e:
+            logger.error(f"Failed to get HA resources: {e}")
+        return self.ha_client.get_mock_system_info()
+    
+    async def backends_response(self, if_none_match: Optional[str] = None):
+        """Resolve ``/api/backends`` against the response cache."""
+        manager = self.ai_backend_manager
+        
+        async def build():
+            return {
+                'available': manager.get_available_backends(),
+                'current': manager.current_backend,
+                'status': manager.get_backend_status()
+            }
+        
+        return await self.response_cache.respond(
+            'backends', manager.get_status_version(), build, if_none_match
+        )
+    
+    async def entity_discovery_response(self, if_none_match: Optional[str] = None):
+        """Resolve ``/api/entities/discovery`` against the response cache."""
+        states_version = await self.ha_client.get_states_version()
+        version = f"{states_version}:{int(time.time() // DISCOVERY_REFRESH_SECONDS)}"
+        
+        async def build():
+            return {
+                'success': True,
+                'discovery': await self.ha_client.get_discovery_summary()
+            }
+        
+        return await self.response_cache.respond(
+            'entities:discovery', version, build, if_none_match
+        )
+    
+    async def entities_by_domain_response(self, domain: str,
+                                          if_none_match: Optional[str] = None):
+        """Resolve ``/api/entities/by-domain/<domain>`` against the response cache."""
+        version = await self.ha_client.get_states_version()
+        
+        async def build():
+            entities = await self.ha_client.get_entities_by_domain(domain)
+            return {
+                'success': True,
+                'domain': domain,
+                'entities': entities,
+                'count': len(entities)
+            }
+        
+        return await self.response_cache.respond(
+            f'entities:domain:{domain}', version, build, if_none_match
+        )
     
     def _setup_socket_handlers(self):
         """Setup WebSocket handlers."""
@@ -640,6 +907,7 @@ class HailoTerminal:
         @self.socketio.on('connect')
         def handle_connect():
             logger.info(f"Client connected: {request.sid}")
+            self.background_loop.call(self.client_connected, request.sid)
             # Send initial status
             backend_status = self.ai_backend_manager.get_backend_status()
             emit('status', {
@@ -651,6 +919,21 @@ class HailoTerminal:
         @self.socketio.on('disconnect')
         def handle_disconnect():
             logger.info(f"Client disconnected: {request.sid}")
+            self.background_loop.call(self.client_disconnected, request.sid)
+        
+        @self.socketio.on('subscribe')
+        def handle_subscribe(data):
+            """Subscribe to update topics."""
+            emit('subscriptions', self.background_loop.call(
+                self.update_subscriptions, request.sid, data, True
+            ))
+        
+        @self.socketio.on('unsubscribe')
+        def handle_unsubscribe(data):
+            """Unsubscribe from update topics."""
+            emit('subscriptions', self.background_loop.call(
+                self.update_subscriptions, request.sid, data, False
+            ))
         
         @self.socketio.on('ai_query')
         def handle_ai_query(data):
@@ -665,83 +948,292 @@ class HailoTerminal:
                 })
                 return
             
-            # Process query asynchronously in background
-            def process_query_async():
-                try:
-                    # Create event loop for this thread
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    
-                    # Check if this is an automation-related query
-                    automation_keywords = [
-                        'automation', 'automate', 'trigger', 'schedule', 
-                        'turn on', 'turn off', 'when', 'if', 'notify',
-                        'motion', 'sensor', 'light', 'door', 'temperature'
-                    ]
-                    
-                    query_lower = query.lower()
-                    is_automation_query = any(keyword in query_lower 
-                                            for keyword in automation_keywords)
-                    
-                    # Generate AI response
-                    response = loop.run_until_complete(
-                        self.ai_backend_manager.generate_response(query)
-                    )
-                    
-                    # If it's an automation query, also provide recommendations
-                    automation_recommendations = []
-                    if is_automation_query:
-                        try:
-                            recommendations = self.automation_manager.get_automation_recommendations(query)
-                            automation_recommendations = recommendations[:3]  # Top 3
-                        except Exception as e:
-                            logger.warning(f"Could not get automation recommendations: {e}")
-                    
-                    # Enhanced response with automation features
-                    enhanced_response = response.content
-                    
-                    if automation_recommendations:
-                        enhanced_response += "\n\n🤖 **Automation Recommendations:**\n"
-                        for i, rec in enumerate(automation_recommendations, 1):
-                            enhanced_response += f"\n**{i}. {rec['name']}** ({rec['complexity']})\n"
-                            enhanced_response += f"   {rec['description']}\n"
-                            if rec.get('required_entities'):
-                                entities = ', '.join(rec['required_entities'])
-                                enhanced_response += f"   *Requires: {entities}*\n"
-                        
-                        enhanced_response += "\n💡 *Click 'Create Automation' below to build any of these!*"
-                    
-                    # Send response back
-                    self.socketio.emit('ai_response', {
-                        'query': query,
-                        'response': enhanced_response,
-                        'backend': response.backend,
-                        'model': response.model,
-                        'usage': response.usage,
-                        'error': response.error,
-                        'automation_suggestions': automation_recommendations,
-                        'is_automation_query': is_automation_query,
-                        'timestamp': datetime.now().isoformat()
-                    }, room=request.sid)
-                    
-                    loop.close()
-                    
-                except Exception as e:
-                    logger.error(f"Error processing AI query: {e}")
-                    self.socketio.emit('ai_response', {
-                        'query': query,
-                        'error': f'Processing error: {str(e)}',
-                        'timestamp': datetime.now().isoformat()
-                    }, room=request.sid)
-            
-            # Start processing in background thread
-            thread = threading.Thread(target=process_query_async)
-            thread.daemon = True
-            thread.start()
-    
-    def start_background_services(self):
-        """Start background services."""
-        # Log AI backend status
+            # Hand the query to the worker pool on the shared loop
+            self.background_loop.submit(
+                self.enqueue_ai_query(request.sid, query, data.get('session'),
+                                      data.get('stream'))
+            )
+        
+        @self.socketio.on('ai_cancel')
+        def handle_ai_cancel(data=None):
+            """Stop a running or queued AI query of this client."""
+            self.background_loop.call(self.cancel_ai_query, request.sid, data)
+
+    async def _emit_with_ack(self, sid: str, event: str, data: Any, on_ack):
+        """Subscription transport for Flask-SocketIO.
+        
+        Acknowledgements arrive on a Socket.IO thread and are handed back
+        to the loop running the subscription hub.
+        """
+        loop = asyncio.get_running_loop()
+        self.socketio.emit(event, data, to=sid,
+                           callback=lambda *args: loop.call_soon_threadsafe(on_ack))
+    
+    async def _disconnect_client(self, sid: str):
+        """Subscription disconnect hook for Flask-SocketIO."""
+        self.socketio.server.disconnect(sid)
+    
+    def client_connected(self, sid: str):
+        """Register a new client with its default topics and AI session."""
+        self.subscriptions.connect(sid, DEFAULT_TOPICS + (f'ai:{sid}',))
+    
+    def client_disconnected(self, sid: str):
+        """Cancel a client's AI queries, drop its subscriptions and the
+        conversation of its own session.
+        
+        Conversations under an explicit session id outlive the connection
+        so a reconnecting client can continue them.
+        """
+        self.subscriptions.disconnect(sid)
+        self.ai_query_pool.cancel(sid)
+        self.ai_backend_manager.memory.drop(sid)
+    
+    def cancel_ai_query(self, client_id: str, data: Any = None) -> int:
+        """Cancel a client's AI query, or all of them without a ``query_id``.
+        
+        Returns:
+            Number of queries cancelled
+        """
+        query_id = data.get('query_id') if isinstance(data, dict) else None
+        return self.ai_query_pool.cancel(client_id, query_id)
+    
+    def update_subscriptions(self, sid: str, data: Any,
+                             subscribe: bool = True) -> Dict[str, Any]:
+        """Apply a ``subscribe``/``unsubscribe`` request from a client.
+        
+        Returns:
+            The ``subscriptions`` event payload with the client's topics
+        """
+        topics = (data or {}).get('topics', []) if isinstance(data, dict) else data
+        if isinstance(topics, str):
+            topics = [topics]
+        
+        result = {}
+        try:
+            if subscribe:
+                added = self.subscriptions.subscribe(sid, topics or [])
+                # New entity subscribers get the current domain snapshot
+                for topic in added:
+                    self._entity_topic_versions.pop(topic, None)
+            else:
+                self.subscriptions.unsubscribe(sid, topics or [])
+        except (TypeError, ValueError) as e:
+            result['error'] = str(e)
+        
+        result['topics'] = self.subscriptions.client_topics(sid)
+        return result
+
+    async def enqueue_ai_query(self, client_id: str, query: str,
+                               session: Optional[str] = None,
+                               stream: Optional[bool] = None):
+        """Queue an AI query on the worker pool for a client.
+        
+        Queue positions, automation recommendations, streamed tokens and
+        the response are published on the ``ai:<session>`` topic, which
+        the client is subscribed to. All events of one query carry the same
+        ``query_id``. Tokens may be dropped when the client falls behind;
+        the response is undroppable and carries the full text. The query is
+        cancelled when the client disconnects or sends ``ai_cancel``; the
+        response then has ``cancelled`` set.
+        
+        Args:
+            client_id: Socket.IO session id, used for per-client fairness
+            query: The user's query
+            session: AI session id; defaults to the client's own session
+            stream: Stream tokens as ``ai_token`` events; defaults to the
+                ``stream_responses`` option
+        """
+        topic = f'ai:{session or client_id}'
+        query_id = uuid.uuid4().hex[:12]
+        if stream is None:
+            stream = self.config.get('stream_responses', True)
+        try:
+            self.subscriptions.subscribe(client_id, [topic])
+        except ValueError as e:
+            logger.debug(f"Could not subscribe {client_id} to {topic}: {e}")
+        
+        relay = TokenRelay(self.subscriptions, topic, query_id) if stream else None
+        
+        def on_recommendations(recommendations):
+            self.subscriptions.publish(topic, 'ai_recommendations', {
+                'query_id': query_id,
+                'query': query,
+                'automation_suggestions': recommendations,
+                'timestamp': datetime.now().isoformat()
+            })
+        
+        async def run():
+            payload = await self.process_ai_query(query, on_token=relay,
+                                                  session=session or client_id,
+                                                  job_id=query_id,
+                                                  on_recommendations=on_recommendations)
+            if relay:
+                relay.flush()
+            payload['query_id'] = query_id
+            self.subscriptions.publish(topic, 'ai_response', payload, droppable=False)
+        
+        async def on_position(position):
+            self.subscriptions.publish(topic, 'ai_queue', {
+                'query_id': query_id,
+                'query': query,
+                'position': position,
+                'timestamp': datetime.now().isoformat()
+            }, latest=True)
+        
+        def on_cancel():
+            if relay:
+                relay.close()
+            self.subscriptions.publish(topic, 'ai_response', {
+                'query_id': query_id,
+                'query': query,
+                'error': 'Query cancelled',
+                'cancelled': True,
+                'timestamp': datetime.now().isoformat()
+            }, droppable=False)
+        
+        try:
+            await self.ai_query_pool.submit(client_id, run, on_position,
+                                            query_id=query_id, on_cancel=on_cancel)
+        except QueueFullError as e:
+            logger.warning(f"Rejected AI query from {client_id}: {e}")
+            self.subscriptions.publish(topic, 'ai_response', {
+                'query_id': query_id,
+                'query': query,
+                'error': f'{e}, please retry in {e.retry_after}s',
+                'retry_after': e.retry_after,
+                'timestamp': datetime.now().isoformat()
+            }, droppable=False)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Collect metrics exposed on ``/api/metrics``."""
+        return {
+            'ai_queue': self.ai_query_pool.get_stats(),
+            'subscriptions': self.subscriptions.get_stats(),
+            'ai_ttft': self.ai_backend_manager.get_streaming_stats(),
+            'ai_routing': self.ai_backend_manager.get_routing_stats(),
+            'ai_jobs': self.ai_backend_manager.get_job_stats(),
+            'ai_usage': self.ai_backend_manager.get_usage_stats(),
+            'ai_inflight': self.ai_backend_manager.inflight.get_stats(),
+            'ai_intents': self.automation_manager.intents.get_stats(),
+            'ai_prefix': self.ai_backend_manager.get_prefix_stats(),
+            'entity_index': self.entity_index.get_stats(),
+            'conversations': self.ai_backend_manager.memory.get_stats(),
+            'conversation_summaries': self.ai_backend_manager.summarizer.get_stats(),
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    async def process_ai_query(self, query: str, on_token=None,
+                               session: Optional[str] = None,
+                               job_id: Optional[str] = None,
+                               on_recommendations=None) -> Dict[str, Any]:
+        """Run an AI query and build the ``ai_response`` payload.
+
+        Shared by the Flask and async server modes so both emit the same
+        response shape.
+
+        Args:
+            query: The user's query
+            on_token: Optional callable receiving text chunks as the backend
+                streams them
+            session: Conversation session the query belongs to
+            job_id: Id to cancel the query's backend requests with
+                ``AIBackendManager.cancel``
+            on_recommendations: Optional callable receiving the automation
+                recommendations as soon as they are ready, while the
+                response is still being generated
+        """
+        recommendations_task = None
+        try:
+            # Check if this is an automation-related query
+            intent = self.automation_manager.intents.classify(query)
+            is_automation_query = intent.is_automation
+            
+            # Recommendations do not depend on the response; work them out
+            # while it is generated
+            if is_automation_query:
+                recommendations_task = asyncio.ensure_future(
+                    self._automation_recommendations(query, intent, on_recommendations))
+            
+            # Generate AI response
+            entities = await self._entity_context(query)
+            if on_token is not None:
+                response = await self.ai_backend_manager.stream_response(
+                    query, on_token, session=session, extra_context=entities,
+                    job_id=job_id)
+            else:
+                response = await self.ai_backend_manager.generate_response(
+                    query, session=session, extra_context=entities,
+                    job_id=job_id)
+            
+            # If it's an automation query, also provide recommendations
+            automation_recommendations = []
+            if recommendations_task is not None:
+                automation_recommendations = await recommendations_task
+            
+            # Enhanced response with automation features
+            enhanced_response = response.content
+            
+            if automation_recommendations:
+                enhanced_response += "\n\n🤖 **Automation Recommendations:**\n"
+                for i, rec in enumerate(automation_recommendations, 1):
+                    enhanced_response += f"\n**{i}. {rec['name']}** ({rec['complexity']})\n"
+                    enhanced_response += f"   {rec['description']}\n"
+                    if rec.get('required_entities'):
+                        required = ', '.join(rec['required_entities'])
+                        enhanced_response += f"   *Requires: {required}*\n"
+                
+                enhanced_response += "\n💡 *Click 'Create Automation' below to build any of these!*"
+            
+            return {
+                'query': query,
+                'response': enhanced_response,
+                'backend': response.backend,
+                'model': response.model,
+                'usage': response.usage,
+                'error': response.error,
+                'automation_suggestions': automation_recommendations,
+                'is_automation_query': is_automation_query,
+                'ttft_ms': round(response.ttft * 1000, 1) if response.ttft is not None else None,
+                'cached': response.cached,
+                'shared': response.shared,
+                'timestamp': datetime.now().isoformat()
+            }
+            
+        except Exception as e:
+            logger.error(f"Error processing AI query: {e}")
+            return {
+                'query': query,
+                'error': f'Processing error: {str(e)}',
+                'timestamp': datetime.now().isoformat()
+            }
+        finally:
+            if recommendations_task is not None and not recommendations_task.done():
+                recommendations_task.cancel()
+    
+    async def _automation_recommendations(self, query: str, intent,
+                                          on_ready=None) -> List[Dict[str, Any]]:
+        """Top automation recommendations for a query, handed to
+        ``on_ready`` as soon as they are known."""
+        try:
+            recommendations = await self.automation_manager.get_automation_recommendations(
+                query, intent=intent)
+        except Exception as e:
+            logger.warning(f"Could not get automation recommendations: {e}")
+            return []
+        recommendations = recommendations[:3]  # Top 3
+        if recommendations and on_ready is not None:
+            on_ready(recommendations)
+        return recommendations
+    
+    def start_background_services(self, periodic_updates: bool = True):
+        """Start background services.
+        
+        Args:
+            periodic_updates: Start publishing updates to subscribers and
+                backend health probes on the background loop. The async
+                server runs both on its own loop instead.
+        """
+        # Log AI backend status; remote backends are reported once probed
         available_backends = self.ai_backend_manager.get_available_backends()
         if available_backends:
             logger.info(f"Available AI backends: {', '.join(available_backends)}")
@@ -754,21 +1246,96 @@ class HailoTerminal:
                 self.config.get('monitor_interval', 5)
             )
         
-        # Start real-time updates via WebSocket
-        def send_periodic_updates():
-            while True:
-                try:
-                    if self.config.get('enable_monitoring', True):
-                        data = self.resource_monitor.get_current_data()
-                        self.socketio.emit('resource_update', data, broadcast=True)
-                    time.sleep(self.config.get('monitor_interval', 5))
-                except Exception as e:
-                    logger.error(f"Error in periodic updates: {e}")
-                    time.sleep(10)  # Wait longer on error
+        if not periodic_updates:
+            return
+        
+        # Probe backends and publish updates to subscribed clients from
+        # the shared loop
+        self.background_loop.call(self.ai_backend_manager.start_health_checks)
+        self.background_loop.submit(self.publish_updates())
+    
+    async def publish_updates(self):
+        """Publish resource, metric and entity updates to subscribers."""
+        while True:
+            try:
+                if self.config.get('enable_monitoring', True):
+                    self._publish_resources()
+                if self.ha_client:
+                    await self._refresh_home_context()
+                if self.ha_client and self.subscriptions.topics('entities:'):
+                    await self._publish_entity_updates()
+                await asyncio.sleep(self.config.get('monitor_interval', 5))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in periodic updates: {e}")
+                await asyncio.sleep(10)  # Wait longer on error
+    
+    def _publish_resources(self):
+        """Publish the resource frame and any subscribed metric series."""
+        data = self.resource_monitor.get_current_data()
+        self.subscriptions.publish('resources', 'resource_update', data, latest=True)
         
-        update_thread = threading.Thread(target=send_periodic_updates)
-        update_thread.daemon = True
-        update_thread.start()
+        for topic in self.subscriptions.topics('metrics:'):
+            series = topic.split(':', 1)[1]
+            value = data
+            for part in series.split('.'):
+                value = value.get(part) if isinstance(value, dict) else None
+            self.subscriptions.publish(topic, 'metric_update', {
+                'series': series,
+                'value': value,
+                'timestamp': data.get('last_update')
+            }, latest=True)
+    
+    async def _refresh_home_context(self):
+        """Update the prompt prefix and entity index when entities change."""
+        snapshot = await self.entity_store.refresh(self.ha_client)
+        if snapshot.version == self._home_context_version:
+            return snapshot
+        self._home_context_version = snapshot.version
+        # State changes leave the description, and so the prefix, unchanged
+        self.ai_backend_manager.set_home_context(describe_home(snapshot))
+        # Only entities whose names, areas or classes changed are re-indexed
+        await asyncio.to_thread(self.entity_index.sync, snapshot.records)
+        return snapshot
+    
+    async def _entity_context(self, query: str) -> Optional[List[Dict[str, str]]]:
+        """The entities most relevant to a query, with their states, as context."""
+        top_k = self.config.get('ai_entity_context', 8)
+        if not self.ha_client or top_k <= 0:
+            return None
+        try:
+            snapshot = await self._refresh_home_context()
+            records = [snapshot.get(entity_id)
+                       for entity_id, _ in self.entity_index.search(query, top_k)]
+            text = format_entities(record for record in records if record)
+        except Exception as e:
+            logger.warning(f"Could not retrieve entities for the query: {e}")
+            return None
+        return [{'role': 'system', 'content': text}] if text else None
+    
+    async def _publish_entity_updates(self):
+        """Publish the entities of subscribed domains that changed."""
+        snapshot = await self.entity_store.refresh(self.ha_client)
+        for topic in self.subscriptions.topics('entities:'):
+            known = self._entity_topic_versions.get(topic)
+            if known is not None and known[0] == snapshot.version:
+                continue
+            
+            domain = topic.split(':', 1)[1]
+            records = [snapshot.records[p] for p in snapshot.by_domain.get(domain, [])]
+            version = fingerprint(
+                (record['entity_id'], record['state'], record['last_updated'])
+                for record in records
+            )
+            if known is None or known[1] != version:
+                self.subscriptions.publish(topic, 'entity_update', {
+                    'domain': domain,
+                    'entities': records,
+                    'count': len(records),
+                    'timestamp': datetime.now().isoformat()
+                }, latest=True)
+            self._entity_topic_versions[topic] = (snapshot.version, version)
     
     def create_app(self):
         """Return the Flask app instance for testing."""
@@ -778,27 +1345,39 @@ class HailoTerminal:
         """Main run method."""
         logger.info("Starting Hailo AI Terminal...")
         
+        async_mode = (self.config.get('enable_terminal', True) and
+                      self.config.get('server_mode', 'flask') == 'async')
+        
         # Start background services
-        self.start_background_services()
-        
-        if self.config.get('enable_terminal', True):
-            port = self.config.get('terminal_port', 8080)
-            logger.info(f"Starting web interface on port {port}")
-            self.socketio.run(
-                self.app,
-                host='0.0.0.0',
-                port=port,
-                debug=False,
-                allow_unsafe_werkzeug=True
-            )
-        else:
-            logger.info("Terminal disabled, running background services only")
-            try:
-                while True:
-                    time.sleep(60)
-                    logger.debug("Terminal heartbeat")
-            except KeyboardInterrupt:
-                logger.info("Terminal stopped")
+        self.start_background_services(periodic_updates=not async_mode)
+        
+        try:
+            if async_mode:
+                from async_server import AsyncTerminalServer
+                port = self.config.get('terminal_port', 8080)
+                logger.info(f"Starting async web interface on port {port}")
+                AsyncTerminalServer(self).run(host='0.0.0.0', port=port)
+            elif self.config.get('enable_terminal', True):
+                port = self.config.get('terminal_port', 8080)
+                logger.info(f"Starting web interface on port {port}")
+                self.socketio.run(
+                    self.app,
+                    host='0.0.0.0',
+                    port=port,
+                    debug=False,
+                    allow_unsafe_werkzeug=True
+                )
+            else:
+                logger.info("Terminal disabled, running background services only")
+                try:
+                    while True:
+                        time.sleep(60)
+                        logger.debug("Terminal heartbeat")
+                except KeyboardInterrupt:
+                    logger.info("Terminal stopped")
+        finally:
+            # Completions cached since the last deferred save
+            self.ai_backend_manager.completion_cache.flush()
         
         return True
 
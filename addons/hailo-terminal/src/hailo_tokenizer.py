@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Tokenizer for Hailo AI Terminal
+
+Text models compiled for the Hailo device ship their tokenizer next to the
+HEF file. The tokenizer is loaded once per model directory and kept with
+its vocabulary:
+
+- ``tokenizer.json`` (Hugging Face) through the ``tokenizers`` package when
+  installed, otherwise with the built-in BPE implementation below, which
+  handles byte-level (GPT-2 style) and SentencePiece-style (``▁`` and
+  ``<0xNN>`` byte fallback) vocabularies
+- ``tokenizer.model`` (SentencePiece) through the ``sentencepiece`` package
+
+Without tokenizer files a byte tokenizer is used, which is deterministic
+and reversible but only suits models trained on bytes.
+
+Encoded ids are written straight into preallocated int32 buffers, and
+logits are decoded with a vectorised argmax over the vocabulary.
+"""
+
+import json
+import logging
+import os
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from tokenizers import Tokenizer as HFTokenizer
+    HF_TOKENIZERS_AVAILABLE = True
+except ImportError:
+    HF_TOKENIZERS_AVAILABLE = False
+
+try:
+    import sentencepiece
+    SENTENCEPIECE_AVAILABLE = True
+except ImportError:
+    SENTENCEPIECE_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+EOS_CANDIDATES = ('</s>', '<|endoftext|>', '<|eot_id|>', '<|im_end|>', '<eos>')
+BOS_CANDIDATES = ('<s>', '<|begin_of_text|>', '<bos>')
+PAD_CANDIDATES = ('<pad>', '<unk>')
+
+# GPT-2 style pre-tokenisation, approximated without the ``regex`` module
+_BYTE_LEVEL_SPLIT = re.compile(
+    r"'(?:[sdmt]|ll|ve|re)| ?[^\W\d_]+| ?\d+| ?[^\s\w]+|\s+(?!\S)|\s+"
+)
+_METASPACE_SPLIT = re.compile(r'▁*[^▁]+|▁+')
+_BYTE_TOKEN = re.compile(r'^<0x([0-9A-Fa-f]{2})>$')
+
+
+@lru_cache(maxsize=1)
+def _bytes_to_unicode() -> Dict[int, str]:
+    """The GPT-2 mapping of bytes to printable characters."""
+    printable = (list(range(ord('!'), ord('~') + 1)) + list(range(ord('¡'), ord('¬') + 1))
+                 + list(range(ord('®'), ord('ÿ') + 1)))
+    chars = printable[:]
+    extra = 0
+    for byte in range(256):
+        if byte not in printable:
+            printable.append(byte)
+            chars.append(256 + extra)
+            extra += 1
+    return dict(zip(printable, (chr(c) for c in chars)))
+
+
+class Tokenizer(ABC):
+    """Common interface of the model tokenizers."""
+
+    name = 'base'
+
+    def __init__(self, vocab_size: int, bos_id: Optional[int] = None,
+                 eos_id: Optional[int] = None, pad_id: int = 0):
+        self.vocab_size = vocab_size
+        self.bos_id = bos_id
+        self.eos_id = eos_id
+        self.pad_id = pad_id
+
+    @abstractmethod
+    def encode(self, text: str) -> List[int]:
+        """Token ids of a text."""
+        pass
+
+    @abstractmethod
+    def decode(self, ids: Sequence[int]) -> str:
+        """Text of token ids."""
+        pass
+
+    def encode_into(self, text: str, buffer: np.ndarray, add_bos: bool = True) -> int:
+        """Encode text into a preallocated int32 buffer.
+
+        The most recent tokens are kept when the text is longer than the
+        buffer, and the remainder is filled with the pad id.
+
+        Returns:
+            Number of tokens written
+        """
+        ids = self.encode(text)
+        if add_bos and self.bos_id is not None:
+            ids = [self.bos_id] + ids
+        length = min(len(ids), len(buffer))
+        if length:
+            buffer[:length] = ids[len(ids) - length:]
+        buffer[length:] = self.pad_id
+        return length
+
+    def decode_logits(self, logits: np.ndarray) -> List[int]:
+        """Greedy token ids from logits shaped ``(..., vocab_size)``."""
+        logits = np.asarray(logits)
+        return np.argmax(logits.reshape(-1, logits.shape[-1]), axis=-1).tolist()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'tokenizer': self.name,
+            'vocab_size': self.vocab_size,
+            'bos_id': self.bos_id,
+            'eos_id': self.eos_id
+        }
+
+
+class ByteTokenizer(Tokenizer):
+    """UTF-8 bytes as tokens, after pad, BOS and EOS ids."""
+
+    name = 'bytes'
+    OFFSET = 3
+
+    def __init__(self):
+        super().__init__(256 + self.OFFSET, bos_id=1, eos_id=2, pad_id=0)
+
+    def encode(self, text: str) -> List[int]:
+        return (np.frombuffer(text.encode('utf-8'), dtype=np.uint8).astype(np.int32)
+                + self.OFFSET).tolist()
+
+    def decode(self, ids: Sequence[int]) -> str:
+        ids = np.asarray(ids, dtype=np.int32)
+        data = (ids[ids >= self.OFFSET] - self.OFFSET).astype(np.uint8).tobytes()
+        return data.decode('utf-8', errors='replace')
+
+
+class BPETokenizer(Tokenizer):
+    """Byte-pair encoding from a ``tokenizer.json`` vocabulary and merges."""
+
+    name = 'bpe'
+
+    def __init__(self, vocab: Dict[str, int], merges: List[Tuple[str, str]],
+                 special: Dict[str, int], byte_level: bool,
+                 bos: Optional[str] = None, eos: Optional[str] = None):
+        tokens = {**vocab, **special}
+        self.vocab = tokens
+        self.ranks = {pair: rank for rank, pair in enumerate(merges)}
+        self.special_ids = set(special.values())
+        self.byte_level = byte_level
+        self.id_to_token = [''] * (max(tokens.values()) + 1)
+        for token, token_id in tokens.items():
+            self.id_to_token[token_id] = token
+
+        self._byte_encoder = _bytes_to_unicode()
+        self._byte_decoder = {c: b for b, c in self._byte_encoder.items()}
+        self._byte_ids = [tokens.get(f'<0x{b:02X}>') for b in range(256)]
+        self._unk_id = tokens.get('<unk>', 0)
+        self._encode_word = lru_cache(maxsize=65536)(self._bpe)
+
+        pad = next((tokens[t] for t in PAD_CANDIDATES if t in tokens), 0)
+        super().__init__(len(self.id_to_token), bos_id=tokens.get(bos) if bos else None,
+                         eos_id=tokens.get(eos) if eos else None, pad_id=pad)
+
+    def _bpe(self, word: str) -> Tuple[int, ...]:
+        """Apply merges to one pre-tokenised word."""
+        symbols = list(word)
+        while len(symbols) > 1:
+            best = None
+            best_rank = None
+            for pair in zip(symbols, symbols[1:]):
+                rank = self.ranks.get(pair)
+                if rank is not None and (best_rank is None or rank < best_rank):
+                    best, best_rank = pair, rank
+            if best is None:
+                break
+            merged = []
+            i = 0
+            while i < len(symbols):
+                if i < len(symbols) - 1 and (symbols[i], symbols[i + 1]) == best:
+                    merged.append(symbols[i] + symbols[i + 1])
+                    i += 2
+                else:
+                    merged.append(symbols[i])
+                    i += 1
+            symbols = merged
+
+        ids = []
+        for symbol in symbols:
+            token_id = self.vocab.get(symbol)
+            if token_id is not None:
+                ids.append(token_id)
+            elif self._byte_ids[0] is not None:
+                ids.extend(self._byte_ids[b] for b in symbol.encode('utf-8'))
+            else:
+                ids.append(self._unk_id)
+        return tuple(ids)
+
+    def encode(self, text: str) -> List[int]:
+        ids: List[int] = []
+        if self.byte_level:
+            for word in _BYTE_LEVEL_SPLIT.findall(text):
+                mapped = ''.join(self._byte_encoder[b] for b in word.encode('utf-8'))
+                ids.extend(self._encode_word(mapped))
+        else:
+            text = '▁' + text.replace(' ', '▁')
+            for word in _METASPACE_SPLIT.findall(text):
+                ids.extend(self._encode_word(word))
+        return ids
+
+    def decode(self, ids: Sequence[int]) -> str:
+        tokens = [self.id_to_token[i] for i in ids
+                  if 0 <= i < len(self.id_to_token) and i not in self.special_ids]
+        if self.byte_level:
+            data = bytes(self._byte_decoder.get(c, 0x3F) for c in ''.join(tokens))
+            return data.decode('utf-8', errors='replace')
+
+        data = bytearray()
+        for token in tokens:
+            match = _BYTE_TOKEN.match(token)
+            if match:
+                data.append(int(match.group(1), 16))
+            else:
+                data.extend(token.replace('▁', ' ').encode('utf-8'))
+        text = data.decode('utf-8', errors='replace')
+        return text[1:] if text.startswith(' ') else text
+
+
+class HFTokenizerAdapter(Tokenizer):
+    """``tokenizers`` package wrapper for exact ``tokenizer.json`` encoding."""
+
+    name = 'tokenizers'
+
+    def __init__(self, path: str, bos: Optional[str], eos: Optional[str]):
+        self._tokenizer = HFTokenizer.from_file(path)
+        vocab = self._tokenizer.get_vocab(with_added_tokens=True)
+        pad = next((vocab[t] for t in PAD_CANDIDATES if t in vocab), 0)
+        super().__init__(self._tokenizer.get_vocab_size(with_added_tokens=True),
+                         bos_id=vocab.get(bos) if bos else None,
+                         eos_id=vocab.get(eos) if eos else None, pad_id=pad)
+
+    def encode(self, text: str) -> List[int]:
+        return self._tokenizer.encode(text, add_special_tokens=False).ids
+
+    def decode(self, ids: Sequence[int]) -> str:
+        return self._tokenizer.decode(list(ids), skip_special_tokens=True)
+
+
+class SentencePieceTokenizer(Tokenizer):
+    """``sentencepiece`` model wrapper."""
+
+    name = 'sentencepiece'
+
+    def __init__(self, path: str):
+        self._processor = sentencepiece.SentencePieceProcessor(model_file=path)
+        bos = self._processor.bos_id()
+        eos = self._processor.eos_id()
+        super().__init__(self._processor.get_piece_size(),
+                         bos_id=bos if bos >= 0 else None,
+                         eos_id=eos if eos >= 0 else None,
+                         pad_id=max(self._processor.pad_id(), 0))
+
+    def encode(self, text: str) -> List[int]:
+        return self._processor.encode(text)
+
+    def decode(self, ids: Sequence[int]) -> str:
+        return self._processor.decode(list(ids))
+
+
+class IncrementalDetokenizer:
+    """Turns a growing token sequence into text deltas.
+
+    Only the last few tokens are decoded per step, and text is held back
+    while it ends in an incomplete UTF-8 sequence.
+    """
+
+    def __init__(self, tokenizer: Tokenizer):
+        self.tokenizer = tokenizer
+        self.ids: List[int] = []
+        self._prefix_offset = 0
+        self._read_offset = 0
+
+    def push(self, token_id: int) -> str:
+        """Add a token and return the text it completes, if any."""
+        self.ids.append(token_id)
+        prefix = self.tokenizer.decode(self.ids[self._prefix_offset:self._read_offset])
+        text = self.tokenizer.decode(self.ids[self._prefix_offset:])
+        if len(text) <= len(prefix) or text.endswith('\ufffd'):
+            return ''
+        self._prefix_offset = self._read_offset
+        self._read_offset = len(self.ids)
+        return text[len(prefix):]
+
+
+def _special_token(config: Dict[str, Any], key: str) -> Optional[str]:
+    value = config.get(key)
+    if isinstance(value, dict):
+        return value.get('content')
+    return value
+
+
+def _load_bpe(path: str, bos: Optional[str], eos: Optional[str]) -> Tokenizer:
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    special = {t['content']: t['id'] for t in data.get('added_tokens', [])}
+    if bos is None:
+        bos = next((t for t in BOS_CANDIDATES if t in special), None)
+    if eos is None:
+        eos = next((t for t in EOS_CANDIDATES if t in special), None)
+
+    if HF_TOKENIZERS_AVAILABLE:
+        return HFTokenizerAdapter(path, bos, eos)
+
+    model = data.get('model', {})
+    if model.get('type', 'BPE') != 'BPE':
+        raise ValueError(f"Unsupported tokenizer model {model.get('type')}; "
+                         "install the tokenizers package")
+    merges = [tuple(m.split(' ', 1)) if isinstance(m, str) else tuple(m)
+              for m in model.get('merges', [])]
+    byte_level = 'ByteLevel' in json.dumps([data.get('pre_tokenizer'), data.get('decoder')])
+    return BPETokenizer(model['vocab'], merges, special, byte_level, bos, eos)
+
+
+@lru_cache(maxsize=8)
+def load_tokenizer(model_path: str, model: str = '') -> Tokenizer:
+    """Load the tokenizer of a model, once per model directory.
+
+    Looks in ``<model_path>/<model>/`` and then ``<model_path>/``.
+    """
+    directories = [os.path.join(model_path, model)] if model else []
+    directories.append(model_path)
+
+    for directory in directories:
+        config_path = os.path.join(directory, 'tokenizer_config.json')
+        config: Dict[str, Any] = {}
+        if os.path.exists(config_path):
+            try:
+                with open(config_path, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+            except Exception as e:
+                logger.warning(f"Could not read {config_path}: {e}")
+
+        try:
+            json_path = os.path.join(directory, 'tokenizer.json')
+            if os.path.exists(json_path):
+                tokenizer = _load_bpe(json_path, _special_token(config, 'bos_token'),
+                                      _special_token(config, 'eos_token'))
+                logger.info(f"Loaded {tokenizer.name} tokenizer from {json_path} "
+                            f"({tokenizer.vocab_size} tokens)")
+                return tokenizer
+
+            spm_path = os.path.join(directory, 'tokenizer.model')
+            if os.path.exists(spm_path):
+                if SENTENCEPIECE_AVAILABLE:
+                    tokenizer = SentencePieceTokenizer(spm_path)
+                    logger.info(f"Loaded SentencePiece tokenizer from {spm_path}")
+                    return tokenizer
+                logger.warning(f"Found {spm_path} but sentencepiece is not installed")
+        except Exception as e:
+            logger.error(f"Failed to load tokenizer from {directory}: {e}")
+
+    log = logger.warning if os.path.isdir(model_path) else logger.debug
+    log(f"No tokenizer found for {model or model_path}, using byte tokens")
+    return ByteTokenizer()
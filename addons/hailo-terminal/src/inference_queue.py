@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Inference Job Queue for Hailo AI Terminal
+
+Interactive chat, anomaly explanations and bulk automation generation all
+call the same backends. Every backend request now passes through a job
+queue with priority classes: each backend has a concurrency limit per
+class, waiting jobs are started highest class first (earliest deadline
+first within a class), and a lower class never starts while a higher one
+is waiting for the same backend.
+
+Requests are not interrupted once started. Preemption happens at request
+boundaries: a background job made of several requests queues again for
+each one, so interactive work waiting for the backend goes first. Jobs
+can carry a deadline, covering both queueing and running, and can be
+cancelled by id while queued or running.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+from metrics import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+JOB_CLASSES = (INTERACTIVE, BACKGROUND)
+DEFAULT_LIMITS = {INTERACTIVE: 4, BACKGROUND: 1}
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """Raised when a job's deadline passes while queued or running."""
+
+
+def parse_limits(spec: Any) -> Dict[str, Dict[str, int]]:
+    """Parse per-class limits such as ``interactive=4,background=1,hailo.background=2``.
+
+    Entries without a backend apply to every backend. Returns limits keyed
+    by backend, with ``'*'`` for the defaults.
+    """
+    limits: Dict[str, Dict[str, int]] = {'*': dict(DEFAULT_LIMITS)}
+    if isinstance(spec, dict):
+        entries = [f'{key}={value}' for key, value in spec.items()]
+    else:
+        entries = [entry.strip() for entry in str(spec or '').split(',') if entry.strip()]
+
+    for entry in entries:
+        key, _, value = entry.partition('=')
+        backend, _, job_class = key.strip().rpartition('.')
+        try:
+            limits.setdefault(backend or '*', {})[job_class] = max(1, int(value))
+        except ValueError:
+            logger.warning(f"Ignoring invalid AI concurrency limit: {entry}")
+    return limits
+
+
+@dataclass(eq=False)
+class InferenceJob:
+    """One backend request waiting for, or holding, a concurrency slot."""
+    job_id: str
+    backend: str
+    job_class: str
+    rank: int
+    deadline: Optional[float] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+    admitted: Optional[asyncio.Future] = None
+    task: Optional[asyncio.Task] = None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds until the deadline, if there is one."""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def sort_key(self, seq: int):
+        return (self.rank, self.deadline if self.deadline is not None else math.inf, seq)
+
+
+class ClassStats:
+    """Counters and latencies of one class on one backend."""
+
+    def __init__(self):
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.expired = 0
+        self.wait = LatencyStats()
+        self.latency = LatencyStats()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'running': self.running,
+            'completed': self.completed,
+            'failed': self.failed,
+            'cancelled': self.cancelled,
+            'expired': self.expired,
+            'wait': self.wait.summary(),
+            'latency': self.latency.summary()
+        }
+
+
+class InferenceQueue:
+    """Priority classes, deadlines and per-class limits for backend requests."""
+
+    def __init__(self, limits: Any = None, classes=JOB_CLASSES):
+        """Initialize the queue.
+
+        Args:
+            limits: Concurrency per class, as accepted by :func:`parse_limits`
+            classes: Job classes, highest priority first
+        """
+        self.classes = tuple(classes)
+        self.limits = parse_limits(limits)
+        self._rank = {name: rank for rank, name in enumerate(self.classes)}
+        self._waiting: Dict[str, List[Any]] = {}
+        self._jobs: Dict[str, Set[InferenceJob]] = {}
+        self._order = itertools.count()
+        self._stats: Dict[str, Dict[str, ClassStats]] = {}
+
+    def limit(self, backend: str, job_class: str) -> int:
+        """Concurrency limit of a class on a backend."""
+        for key in (backend, '*'):
+            if job_class in self.limits.get(key, {}):
+                return self.limits[key][job_class]
+        return 1
+
+    def stats(self, backend: str, job_class: str) -> ClassStats:
+        return self._stats.setdefault(backend, {}).setdefault(job_class, ClassStats())
+
+    def rank(self, job_class: str) -> int:
+        if job_class not in self._rank:
+            raise ValueError(f"Unknown job class: {job_class}")
+        return self._rank[job_class]
+
+    def _has_slot(self, job: InferenceJob) -> bool:
+        return self.stats(job.backend, job.job_class).running < self.limit(job.backend, job.job_class)
+
+    def _start(self, job: InferenceJob):
+        job.started_at = time.monotonic()
+        stats = self.stats(job.backend, job.job_class)
+        stats.running += 1
+        stats.wait.record(job.started_at - job.enqueued_at)
+
+    def _dispatch(self, backend: str):
+        """Start waiting jobs in priority order while they have slots."""
+        waiting = self._waiting.get(backend)
+        while waiting:
+            *_, job = waiting[0]
+            if job.admitted.done():
+                # Cancelled or expired while queued
+                heapq.heappop(waiting)
+                continue
+            if not self._has_slot(job):
+                # Lower classes wait behind a blocked higher class
+                break
+            heapq.heappop(waiting)
+            self._start(job)
+            job.admitted.set_result(None)
+
+    async def _acquire(self, job: InferenceJob):
+        """Wait for a slot, honouring priority and the deadline."""
+        backend = job.backend
+        waiting = self._waiting.setdefault(backend, [])
+        ahead = any(not entry[-1].admitted.done() and entry[-1].rank <= job.rank
+                    for entry in waiting)
+        if not ahead and self._has_slot(job):
+            self._start(job)
+            return
+
+        job.admitted = asyncio.get_running_loop().create_future()
+        heapq.heappush(waiting, (*job.sort_key(next(self._order)), job))
+        try:
+            remaining = job.remaining()
+            if remaining is not None and remaining <= 0:
+                raise asyncio.TimeoutError
+            await asyncio.wait_for(asyncio.shield(job.admitted), remaining)
+        except asyncio.TimeoutError:
+            self.stats(backend, job.job_class).expired += 1
+            self._abandon(job)
+            raise DeadlineExceeded(f"Deadline passed waiting for {backend}")
+        except asyncio.CancelledError:
+            self.stats(backend, job.job_class).cancelled += 1
+            self._abandon(job)
+            raise
+
+    def _abandon(self, job: InferenceJob):
+        """Give up a queued job, or its slot if it was just admitted."""
+        if job.admitted.done() and not job.admitted.cancelled():
+            self._release(job)
+        else:
+            job.admitted.cancel()
+            self._dispatch(job.backend)
+
+    def _release(self, job: InferenceJob):
+        self.stats(job.backend, job.job_class).running -= 1
+        self._dispatch(job.backend)
+
+    def _track(self, job: InferenceJob):
+        job.task = asyncio.current_task()
+        self._jobs.setdefault(job.job_id, set()).add(job)
+
+    def _untrack(self, job: InferenceJob):
+        jobs = self._jobs.get(job.job_id)
+        if jobs is not None:
+            jobs.discard(job)
+            if not jobs:
+                del self._jobs[job.job_id]
+
+    def _new_job(self, backend: str, job_class: str, deadline: Optional[float],
+                 job_id: Optional[str]) -> InferenceJob:
+        return InferenceJob(job_id=job_id or f'job-{next(self._order)}', backend=backend,
+                            job_class=job_class, rank=self.rank(job_class), deadline=deadline)
+
+    def _finish(self, job: InferenceJob, outcome: str):
+        stats = self.stats(job.backend, job.job_class)
+        setattr(stats, outcome, getattr(stats, outcome) + 1)
+        if outcome == 'completed':
+            stats.latency.record(time.monotonic() - job.enqueued_at)
+
+    async def run(self, backend: str, call: Callable[[], Awaitable[Any]],
+                  job_class: str = INTERACTIVE, deadline: Optional[float] = None,
+                  job_id: Optional[str] = None) -> Any:
+        """Run one backend request once its class has a free slot.
+
+        Args:
+            backend: Backend the request goes to
+            call: Returns the request coroutine
+            job_class: Priority class
+            deadline: ``time.monotonic()`` by which the request must finish
+            job_id: Id for :meth:`cancel`; attempts of one query share it
+
+        Raises:
+            DeadlineExceeded: If the deadline passes first
+        """
+        job = self._new_job(backend, job_class, deadline, job_id)
+        self._track(job)
+        try:
+            await self._acquire(job)
+            try:
+                result = await asyncio.wait_for(call(), job.remaining())
+            except asyncio.TimeoutError:
+                if job.deadline is None or job.remaining() > 0:
+                    self._finish(job, 'failed')
+                    raise
+                self._finish(job, 'expired')
+                raise DeadlineExceeded(f"Deadline passed running on {backend}")
+            except asyncio.CancelledError:
+                self._finish(job, 'cancelled')
+                raise
+            except Exception:
+                self._finish(job, 'failed')
+                raise
+            finally:
+                self._release(job)
+            self._finish(job, 'completed')
+            return result
+        finally:
+            self._untrack(job)
+
+    async def stream(self, backend: str, open_stream: Callable[[], AsyncIterator[Any]],
+                     job_class: str = INTERACTIVE, deadline: Optional[float] = None,
+                     job_id: Optional[str] = None) -> AsyncIterator[Any]:
+        """Stream a backend response, holding a slot until the stream ends.
+
+        The deadline bounds queueing and the wait for each chunk.
+        :meth:`cancel` cancels the task currently iterating the stream.
+        """
+        job = self._new_job(backend, job_class, deadline, job_id)
+        self._track(job)
+        outcome = 'cancelled'
+        try:
+            await self._acquire(job)
+            stream = open_stream()
+            try:
+                while True:
+                    # Cancel whichever task consumes the stream: a router
+                    # may take the first chunk in one task and the rest in
+                    # another
+                    job.task = asyncio.current_task()
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), job.remaining())
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        if job.deadline is None or job.remaining() > 0:
+                            raise
+                        outcome = 'expired'
+                        raise DeadlineExceeded(f"Deadline passed streaming from {backend}")
+                    yield chunk
+                outcome = 'completed'
+            except (asyncio.CancelledError, GeneratorExit, DeadlineExceeded):
+                raise
+            except Exception:
+                outcome = 'failed'
+                raise
+            finally:
+                self._release(job)
+                self._finish(job, outcome)
+                aclose = getattr(stream, 'aclose', None)
+                if aclose is not None:
+                    await aclose()
+        finally:
+            self._untrack(job)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel the queued or running requests of a job."""
+        jobs = self._jobs.get(job_id)
+        if not jobs:
+            return False
+        for job in list(jobs):
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        backends = {}
+        for backend, classes in self._stats.items():
+            waiting = self._waiting.get(backend, [])
+            backends[backend] = {
+                job_class: {
+                    **stats.to_dict(),
+                    'queued': sum(1 for entry in waiting if entry[-1].job_class == job_class
+                                  and not entry[-1].admitted.done()),
+                    'limit': self.limit(backend, job_class)
+                }
+                for job_class, stats in classes.items()
+            }
+        return {'classes': list(self.classes), 'backends': backends}
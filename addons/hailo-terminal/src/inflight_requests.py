@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+In-flight Request Deduplication for Hailo AI Terminal
+
+A double click, or the same question from several tabs, used to start
+one generation per request, each taking its own turn on the Hailo device
+or its own paid cloud call. Requests that are identical (same backends,
+model, sampling parameters, prompt and context; the completion cache
+key) now attach to the generation already running for that key.
+
+The generation runs in a task of its own. Every request waiting on it
+gets the same response; streamed requests also get every token, those
+joining late first get the text streamed so far in one chunk. A request
+that goes away detaches; the generation is only cancelled when no
+request waits on it any more.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class InflightRequest:
+    """One running generation and the requests waiting on it."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.task: Optional[asyncio.Task] = None
+        self.text: List[str] = []
+        self.subscribers: List[Callable[[str], None]] = []
+        self.waiters = 0
+
+    def publish(self, text: str):
+        """Hand a streamed chunk to every subscriber."""
+        self.text.append(text)
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber(text)
+            except Exception as e:
+                logger.warning(f"Token subscriber of a shared generation failed: {e}")
+
+    @property
+    def live(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+
+class InflightRequests:
+    """Shares running generations between identical requests."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._requests: Dict[str, InflightRequest] = {}
+
+        self.started = 0
+        self.joined = 0
+        self.cancelled = 0
+
+    def __len__(self) -> int:
+        return len(self._requests)
+
+    async def run(self, key: str,
+                  generate: Callable[[Callable[[str], None]], Awaitable[Any]],
+                  on_token: Optional[Callable[[str], None]] = None) -> Tuple[Any, bool]:
+        """Run a generation, or wait on the identical one already running.
+
+        Args:
+            key: Identity of the request
+            generate: Starts the generation; it is given a callable to
+                publish streamed text through
+            on_token: Receives streamed text
+
+        Returns:
+            The generation's result and whether it was shared with an
+            earlier request
+        """
+        if not self.enabled:
+            return await generate(on_token or (lambda text: None)), False
+
+        request = self._requests.get(key)
+        joined = request is not None and request.live
+        if joined:
+            self.joined += 1
+            logger.debug(f"Request joined a running generation ({request.waiters} waiting)")
+        else:
+            request = self._requests[key] = InflightRequest(key)
+            request.task = asyncio.ensure_future(generate(request.publish))
+            request.task.add_done_callback(lambda _: self._forget(request))
+            self.started += 1
+
+        if on_token is not None:
+            if request.text:
+                on_token(''.join(request.text))
+            request.subscribers.append(on_token)
+        request.waiters += 1
+        try:
+            return await asyncio.shield(request.task), joined
+        finally:
+            request.waiters -= 1
+            if on_token is not None:
+                request.subscribers.remove(on_token)
+            if not request.waiters and request.live:
+                # Nobody wants the result any more
+                request.task.cancel()
+                self._forget(request)
+                self.cancelled += 1
+
+    def _forget(self, request: InflightRequest):
+        if self._requests.get(request.key) is request:
+            del self._requests[request.key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'running': len(self._requests),
+            'waiting': sum(request.waiters for request in self._requests.values()),
+            'started': self.started,
+            'joined': self.joined,
+            'cancelled': self.cancelled
+        }
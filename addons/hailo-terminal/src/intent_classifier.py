@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Intent Classifier for Hailo AI Terminal
+
+Queries used to be checked for automation intent with a substring scan
+over a keyword list per call site, so "notify" matched "if", "indoor"
+matched "door", and the automation manager scanned the query again for
+category, template and description keywords.
+
+All keywords are now compiled once into an Aho-Corasick automaton that
+finds every keyword in one pass over the query, whatever the number of
+keywords, in microseconds. Matches must start on a word boundary and
+end on one, or continue only with a plain inflection ("lights",
+"detected", and "scheduling" for "schedule").
+
+The classifier of the automation manager is shared by the AI query path
+and the automation recommendations.
+"""
+
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from metrics import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+# Word endings a keyword may carry and still match
+INFLECTIONS = frozenset({'s', 'es', 'd', 'ed', 'ing'})
+# Endings that replace a final "e" ("-ed" is the "-d" of the whole word)
+E_INFLECTIONS = frozenset({'ing'})
+
+# Words that make a query about automations
+AUTOMATION_KEYWORDS = (
+    'automation', 'automate', 'trigger', 'schedule',
+    'turn on', 'turn off', 'when', 'if', 'notify',
+    'motion', 'sensor', 'light', 'door', 'temperature'
+)
+
+# Keywords of each automation template category
+CATEGORY_KEYWORDS = {
+    'lighting': ('light', 'lamp', 'brightness', 'motion'),
+    'climate': ('temperature', 'thermostat', 'heating', 'hvac'),
+    'security': ('security', 'alarm', 'door', 'camera', 'lock'),
+    'energy': ('energy', 'save', 'power', 'consumption'),
+    'monitoring': ('monitor', 'alert', 'notification', 'offline')
+}
+
+# Keywords of each automation template
+TEMPLATE_KEYWORDS = {
+    'motion_light': ('motion', 'light', 'turn on', 'detect', 'movement'),
+    'schedule_thermostat': ('schedule', 'thermostat', 'temperature',
+                            'morning', 'evening', 'time'),
+    'device_offline_notification': ('offline', 'notify', 'device', 'down', 'unavailable'),
+    'security_lights': ('security', 'night', 'protect', 'alert', 'alarm'),
+    'energy_saver': ('energy', 'away', 'save', 'power', 'efficiency')
+}
+
+# Description words too common to say anything about a template
+STOPWORDS = frozenset({'a', 'an', 'the', 'on', 'off', 'is', 'to', 'when', 'all',
+                       'based', 'goes', 'send', 'turn', 'of', 'and', 'in'})
+
+
+def normalize(text: str) -> str:
+    """Lowercase text with runs of whitespace collapsed to one space."""
+    return ' '.join(text.lower().split())
+
+
+class Match(NamedTuple):
+    """A keyword found in a text, with its span in the normalized text."""
+    start: int
+    end: int
+    pattern: str
+    label: Any
+
+
+class PatternMatcher:
+    """Aho-Corasick automaton over keywords, matching whole words."""
+
+    def __init__(self, patterns: Iterable[Tuple[str, Any]] = ()):
+        """Initialize the matcher.
+
+        Args:
+            patterns: ``(keyword, label)`` pairs; a keyword may carry
+                several labels
+        """
+        self._patterns: List[str] = []
+        self._labels: List[List[Any]] = []
+        # Stems of keywords ending in "e", matching only with an ending
+        self._stems: List[bool] = []
+        self._index: Dict[str, int] = {}
+        self._compiled = False
+        for pattern, label in patterns:
+            self.add(pattern, label)
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def add(self, pattern: str, label: Any):
+        """Add a keyword; the automaton is rebuilt on next use."""
+        pattern = normalize(pattern)
+        if not pattern:
+            return
+        self._add(pattern, label, False)
+        if len(pattern) > 3 and pattern.endswith('e') and pattern[-2].isalpha():
+            self._add(pattern[:-1], label, True)
+        self._compiled = False
+
+    def _add(self, pattern: str, label: Any, stem: bool):
+        index = self._index.get(pattern)
+        if index is None:
+            index = self._index[pattern] = len(self._patterns)
+            self._patterns.append(pattern)
+            self._labels.append([])
+            self._stems.append(stem)
+        elif not stem:
+            self._stems[index] = False
+        if label not in self._labels[index]:
+            self._labels[index].append(label)
+
+    def _compile(self):
+        goto: List[Dict[str, int]] = [{}]
+        output: List[List[int]] = [[]]
+        for index, pattern in enumerate(self._patterns):
+            state = 0
+            for char in pattern:
+                following = goto[state].get(char)
+                if following is None:
+                    following = goto[state][char] = len(goto)
+                    goto.append({})
+                    output.append([])
+                state = following
+            output[state].append(index)
+
+        # Failure links, breadth first, with outputs merged along them
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in goto[state].items():
+                queue.append(following)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[following] = goto[fallback].get(char, 0)
+                output[following] = output[following] + output[fail[following]]
+
+        self._goto, self._fail, self._output = goto, fail, output
+        self._lengths = [len(pattern) for pattern in self._patterns]
+        self._compiled = True
+
+    def find(self, text: str, normalized: bool = False) -> List[Match]:
+        """Every whole-word keyword occurrence in a text."""
+        if not self._compiled:
+            self._compile()
+        if not normalized:
+            text = normalize(text)
+        goto, fail, output, lengths = self._goto, self._fail, self._output, self._lengths
+        matches = []
+        state = 0
+        size = len(text)
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not output[state]:
+                continue
+            end = position + 1
+            # The rest of the word the keyword ends in
+            word_end = end
+            while word_end < size and text[word_end].isalnum():
+                word_end += 1
+            ending = text[end:word_end]
+            if ending and ending not in INFLECTIONS:
+                continue
+            for index in output[state]:
+                start = end - lengths[index]
+                if start and text[start - 1].isalnum():
+                    continue
+                if self._stems[index] and ending not in E_INFLECTIONS:
+                    continue
+                pattern = self._patterns[index] + ('e' if self._stems[index] else '')
+                for label in self._labels[index]:
+                    matches.append(Match(start, word_end, pattern, label))
+        return matches
+
+    def labels(self, text: str) -> Dict[Any, List[str]]:
+        """Distinct keywords found in a text, by label."""
+        found: Dict[Any, List[str]] = {}
+        for match in self.find(text):
+            keywords = found.setdefault(match.label, [])
+            if match.pattern not in keywords:
+                keywords.append(match.pattern)
+        return found
+
+
+@dataclass
+class Intent:
+    """What a query is about."""
+    is_automation: bool = False
+    keywords: List[str] = field(default_factory=list)
+    # Distinct keywords found per category, template and template description
+    categories: Dict[str, int] = field(default_factory=dict)
+    templates: Dict[str, int] = field(default_factory=dict)
+    descriptions: Dict[str, int] = field(default_factory=dict)
+
+
+class IntentClassifier:
+    """Classifies queries with one compiled matcher for every keyword list."""
+
+    def __init__(self, templates: Optional[Dict[str, Dict]] = None,
+                 automation_keywords: Iterable[str] = AUTOMATION_KEYWORDS,
+                 category_keywords: Optional[Dict[str, Iterable[str]]] = None,
+                 template_keywords: Optional[Dict[str, Iterable[str]]] = None):
+        """Initialize the classifier.
+
+        Args:
+            templates: Automation templates whose description words are
+                matched too
+            automation_keywords: Keywords marking an automation query
+            category_keywords: Keywords per template category
+            template_keywords: Keywords per template
+        """
+        patterns = [(keyword, ('automation', None)) for keyword in automation_keywords]
+        for category, keywords in (category_keywords or CATEGORY_KEYWORDS).items():
+            patterns += [(keyword, ('category', category)) for keyword in keywords]
+        for template_id, keywords in (template_keywords or TEMPLATE_KEYWORDS).items():
+            patterns += [(keyword, ('template', template_id)) for keyword in keywords]
+        for template_id, template in (templates or {}).items():
+            for word in normalize(template.get('description', '')).split():
+                word = word.strip('.,!?')
+                if word and word not in STOPWORDS:
+                    patterns.append((word, ('description', template_id)))
+        self.matcher = PatternMatcher(patterns)
+        # Compile now rather than on the first query
+        self.matcher.find('')
+
+        self.classifications = 0
+        self.automation_queries = 0
+        self.latency = LatencyStats()
+
+    def classify(self, query: str) -> Intent:
+        """Intent of a query, from a single pass over it."""
+        started = time.perf_counter()
+        intent = Intent()
+        for (kind, name), keywords in self.matcher.labels(query).items():
+            if kind == 'automation':
+                intent.keywords = keywords
+                intent.is_automation = True
+            elif kind == 'category':
+                intent.categories[name] = len(keywords)
+            elif kind == 'template':
+                intent.templates[name] = len(keywords)
+            else:
+                intent.descriptions[name] = len(keywords)
+
+        self.classifications += 1
+        self.automation_queries += intent.is_automation
+        self.latency.record(time.perf_counter() - started)
+        return intent
+
+    def get_stats(self) -> Dict[str, Any]:
+        latency = self.latency
+        return {
+            'keywords': len(self.matcher),
+            'classifications': self.classifications,
+            'automation_queries': self.automation_queries,
+            # Classification takes microseconds; milliseconds would round to 0
+            'latency_us': {
+                'avg': round(latency.total / latency.count * 1e6, 1) if latency.count else 0.0,
+                'p95': round(latency.percentile(95) * 1e6, 1),
+                'max': round(latency.max * 1e6, 1)
+            }
+        }
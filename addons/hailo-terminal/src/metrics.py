@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Metrics Helpers for Hailo AI Terminal
+
+Small in-process statistics used by the AI query pool and exposed through
+the ``/api/metrics`` endpoint.
+"""
+
+import threading
+from collections import deque
+from typing import Any, Dict
+
+
+class LatencyStats:
+    """Rolling window of latency samples with percentile summaries."""
+
+    def __init__(self, window: int = 1024):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        """Record one latency sample in seconds."""
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """Percentile (0-100) of the samples in the window, in seconds."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return 0.0
+        index = min(len(samples) - 1, int(round(q / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+    def summary(self) -> Dict[str, Any]:
+        """Summary in milliseconds."""
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50) * 1000, 2),
+            'p95_ms': round(self.percentile(95) * 1000, 2),
+            'p99_ms': round(self.percentile(99) * 1000, 2),
+            'max_ms': round(self.max * 1000, 2)
+        }
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Prompt Prefix for Hailo AI Terminal
+
+Every query starts with the same system instructions and description of
+the home. Keeping that prefix byte-for-byte stable lets local backends
+reuse the work of evaluating it: Ollama keeps the prefix's context tokens
+and the model loaded, and the Hailo decoder restores a KV cache snapshot
+of the prefix instead of prefilling it again.
+
+The prefix is versioned. The home description only lists areas, entities
+and domains, never states, so it changes when entities are added, removed
+or renamed, not on every state update. A change bumps the version and
+backends drop their cached prefix state.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from metrics import LatencyStats
+from response_cache import fingerprint
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYSTEM_PROMPT = (
+    "You are the Hailo AI Terminal assistant for Home Assistant. You help with "
+    "automations, YAML configuration, troubleshooting and system monitoring. "
+    "Answer concisely and refer to entities by their entity id."
+)
+
+# Entities listed per area in the home description
+MAX_ENTITIES_PER_AREA = 25
+
+
+def describe_home(snapshot: Any, max_per_area: int = MAX_ENTITIES_PER_AREA) -> str:
+    """Stable description of the home from an entity snapshot.
+
+    Lists domains with entity counts and, per area, the entity ids in the
+    area. Sorted, and without states, so it only changes when entities do.
+    """
+    records = getattr(snapshot, 'records', None) or []
+    if not records:
+        return ''
+
+    domains = ', '.join(f"{domain} ({count})"
+                        for domain, count in sorted(snapshot.domain_counts().items()))
+    lines = [f"The home has {len(records)} entities: {domains}."]
+    for area in sorted(area for area in snapshot.by_area if area):
+        positions = snapshot.by_area[area]
+        entity_ids = [records[p]['entity_id'] for p in positions[:max_per_area]]
+        more = len(positions) - len(entity_ids)
+        lines.append(f"{area}: {', '.join(entity_ids)}" + (f" and {more} more" if more > 0 else ''))
+    return '\n'.join(lines)
+
+
+class PromptPrefix:
+    """System instructions and home context, versioned by content."""
+
+    def __init__(self, system_prompt: str = ''):
+        self.system_prompt = system_prompt.strip()
+        self.home_context = ''
+        self.version = 0
+        self.key = ''
+        self._listeners: List[Callable[['PromptPrefix'], None]] = []
+        self._lock = threading.Lock()
+        self._update()
+
+    @property
+    def text(self) -> str:
+        return '\n\n'.join(part for part in (self.system_prompt, self.home_context) if part)
+
+    def _update(self):
+        key = fingerprint([self.text]) if self.text else ''
+        if key != self.key:
+            self.key = key
+            self.version += 1
+
+    def subscribe(self, listener: Callable[['PromptPrefix'], None]):
+        """Call ``listener`` with the prefix whenever it changes."""
+        self._listeners.append(listener)
+
+    def set_home_context(self, home_context: str) -> bool:
+        """Replace the home description. Returns whether the prefix changed."""
+        with self._lock:
+            home_context = home_context.strip()
+            if home_context == self.home_context:
+                return False
+            self.home_context = home_context
+            previous = self.version
+            self._update()
+            changed = self.version != previous
+        if changed:
+            logger.info(f"Prompt prefix changed to version {self.version} "
+                        f"({len(self.text)} characters)")
+            for listener in self._listeners:
+                try:
+                    listener(self)
+                except Exception as e:
+                    logger.warning(f"Prompt prefix listener failed: {e}")
+        return changed
+
+    def message(self) -> Optional[Dict[str, str]]:
+        """The prefix as a system chat message, if there is one."""
+        text = self.text
+        return {'role': 'system', 'content': text} if text else None
+
+
+class PrefixStats:
+    """Prompt evaluation time with and without a reused prefix."""
+
+    def __init__(self):
+        self.cold = LatencyStats()
+        self.warm = LatencyStats()
+        self.cold_tokens = 0
+        self.warm_tokens = 0
+
+    def record(self, seconds: float, tokens: int, reused: bool):
+        if reused:
+            self.warm.record(seconds)
+            self.warm_tokens += tokens
+        else:
+            self.cold.record(seconds)
+            self.cold_tokens += tokens
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'cold': {**self.cold.summary(), 'tokens': self.cold_tokens},
+            'warm': {**self.warm.summary(), 'tokens': self.warm_tokens}
+        }
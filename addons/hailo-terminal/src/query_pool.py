@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+AI Query Worker Pool for Hailo AI Terminal
+
+Runs AI queries on a fixed number of asyncio workers fed by a bounded
+queue. Each client (Socket.IO session) has its own FIFO and workers take
+from clients round-robin, so one client submitting a burst cannot starve
+the others. Waiting clients are told their queue position as it changes,
+and submissions beyond the queue bounds are rejected with a retry hint.
+
+Queries can be cancelled, all of a client's when it disconnects or one
+the user gave up on: waiting ones leave the queue and running ones have
+their task cancelled, which unwinds the backend request they await.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from metrics import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+# Assumed service time before any query has completed
+DEFAULT_SERVICE_TIME = 5.0
+
+
+class QueueFullError(Exception):
+    """Raised when a query cannot be queued."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class QueuedQuery:
+    """A query waiting for, or running on, a pool worker."""
+    client_id: str
+    run: Callable[[], Awaitable[Any]]
+    on_position: Optional[Callable[[int], Awaitable[None]]] = None
+    query_id: Optional[str] = None
+    on_cancel: Optional[Callable[[], None]] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+    position: int = 0
+    task: Optional[asyncio.Task] = None
+    cancelled: bool = False
+
+
+class AIQueryPool:
+    """Fixed-size worker pool with a bounded, per-client fair queue."""
+
+    def __init__(self, workers: int = 2, max_queue: int = 32,
+                 max_per_client: int = 4):
+        """Initialize the pool.
+
+        Args:
+            workers: Number of queries processed concurrently
+            max_queue: Maximum number of queries waiting across all clients
+            max_per_client: Maximum number of queries waiting per client
+        """
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.max_per_client = max(1, max_per_client)
+
+        self._queues: Dict[str, Deque[QueuedQuery]] = {}
+        self._rotation: Deque[str] = deque()
+        self._pending = 0
+        self._running = 0
+        self._active: List[QueuedQuery] = []
+        self._ready: Optional[asyncio.Semaphore] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+        self.wait_stats = LatencyStats()
+        self.service_stats = LatencyStats()
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.cancelled = 0
+
+    def _ensure_workers(self):
+        """Start the workers on the running loop the first time it is needed."""
+        if self._worker_tasks:
+            return
+        self._ready = asyncio.Semaphore(0)
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(), name=f'ai-query-worker-{i}')
+            for i in range(self.workers)
+        ]
+        logger.info(f"AI query pool started: {self.workers} workers, "
+                    f"queue size {self.max_queue}")
+
+    def retry_after(self) -> int:
+        """Estimate seconds until the queue has room again."""
+        service_time = (self.service_stats.total / self.service_stats.count
+                        if self.service_stats.count else DEFAULT_SERVICE_TIME)
+        backlog = self._pending + self._running
+        return max(1, math.ceil(service_time * backlog / self.workers))
+
+    async def submit(self, client_id: str, run: Callable[[], Awaitable[Any]],
+                     on_position: Optional[Callable[[int], Awaitable[None]]] = None,
+                     query_id: Optional[str] = None,
+                     on_cancel: Optional[Callable[[], None]] = None) -> QueuedQuery:
+        """Queue a query for a client.
+
+        Args:
+            client_id: Client the query belongs to, used for fairness
+            run: Coroutine factory doing the work; runs on a pool worker
+            on_position: Optional coroutine called with the query's queue
+                position when it is queued and whenever it changes
+            query_id: Id to cancel the query with :meth:`cancel`
+            on_cancel: Optional callable called when the query is cancelled
+
+        Raises:
+            QueueFullError: If the pool-wide or per-client queue is full
+        """
+        self._ensure_workers()
+
+        client_queue = self._queues.get(client_id)
+        if self._pending >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError("AI query queue is full", self.retry_after())
+        if client_queue is not None and len(client_queue) >= self.max_per_client:
+            self.rejected += 1
+            raise QueueFullError("Too many queued queries for this client",
+                                 self.retry_after())
+
+        job = QueuedQuery(client_id=client_id, run=run, on_position=on_position,
+                          query_id=query_id, on_cancel=on_cancel)
+        if client_queue is None:
+            client_queue = self._queues[client_id] = deque()
+            self._rotation.append(client_id)
+        client_queue.append(job)
+        self._pending += 1
+
+        self._update_positions()
+        self._ready.release()
+        return job
+
+    def _next_job(self) -> Optional[QueuedQuery]:
+        """Take the next job, rotating through clients."""
+        if not self._rotation:
+            return None
+        client_id = self._rotation.popleft()
+        client_queue = self._queues[client_id]
+        job = client_queue.popleft()
+        if client_queue:
+            self._rotation.append(client_id)
+        else:
+            del self._queues[client_id]
+        self._pending -= 1
+        return job
+
+    def _update_positions(self):
+        """Recompute queue positions and notify clients whose position moved.
+
+        Positions follow dispatch order: one job per client per round, in
+        rotation order.
+        """
+        queues = [self._queues[client_id] for client_id in self._rotation]
+        position = 1
+        depth = 0
+        while True:
+            advanced = False
+            for client_queue in queues:
+                if depth < len(client_queue):
+                    job = client_queue[depth]
+                    if job.position != position:
+                        job.position = position
+                        if job.on_position:
+                            asyncio.create_task(self._notify(job, position))
+                    position += 1
+                    advanced = True
+            if not advanced:
+                break
+            depth += 1
+
+    @staticmethod
+    async def _notify(job: QueuedQuery, position: int):
+        try:
+            await job.on_position(position)
+        except Exception as e:
+            logger.debug(f"Queue position notification failed: {e}")
+
+    async def _worker(self):
+        """Process queued jobs until cancelled."""
+        while True:
+            await self._ready.acquire()
+            job = self._next_job()
+            if job is None:
+                continue
+
+            self._running += 1
+            started = time.monotonic()
+            self.wait_stats.record(started - job.enqueued_at)
+            self._update_positions()
+            # Its own task, so cancelling the query leaves the worker running
+            job.task = asyncio.ensure_future(job.run())
+            self._active.append(job)
+            try:
+                await job.task
+                self.completed += 1
+            except asyncio.CancelledError:
+                if self._worker_cancelled():
+                    raise
+                # Cancelled through the pool, or a cancellation escaping
+                # the query itself; either way the worker carries on
+                if not job.cancelled:
+                    self.failed += 1
+                    logger.error(f"AI query of client {job.client_id} was cancelled unexpectedly")
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"AI query failed for client {job.client_id}: {e}")
+            finally:
+                self._active.remove(job)
+                self._running -= 1
+                self.service_stats.record(time.monotonic() - started)
+
+    def _worker_cancelled(self) -> bool:
+        """Whether the running worker itself is being cancelled."""
+        if self._stopping:
+            return True
+        # Task.cancelling() is only available from Python 3.11
+        cancelling = getattr(asyncio.current_task(), 'cancelling', None)
+        return bool(cancelling and cancelling())
+
+    def cancel(self, client_id: str, query_id: Optional[str] = None) -> int:
+        """Cancel a client's waiting and running queries.
+
+        Args:
+            client_id: Client the queries belong to
+            query_id: Only cancel this query
+
+        Returns:
+            Number of queries cancelled
+        """
+        def matches(job: QueuedQuery) -> bool:
+            return (job.client_id == client_id
+                    and (query_id is None or job.query_id == query_id))
+
+        cancelled = []
+        client_queue = self._queues.get(client_id)
+        if client_queue:
+            cancelled = [job for job in client_queue if matches(job)]
+            if cancelled:
+                self._pending -= len(cancelled)
+                remaining = deque(job for job in client_queue if not matches(job))
+                if remaining:
+                    self._queues[client_id] = remaining
+                else:
+                    del self._queues[client_id]
+                    self._rotation.remove(client_id)
+                # Workers woken for removed queries find nothing and wait again
+                self._update_positions()
+
+        for job in self._active:
+            if matches(job) and not job.cancelled and not job.task.done():
+                job.task.cancel()
+                cancelled.append(job)
+
+        for job in cancelled:
+            job.cancelled = True
+            if job.on_cancel:
+                try:
+                    job.on_cancel()
+                except Exception as e:
+                    logger.debug(f"Query cancel notification failed: {e}")
+        if cancelled:
+            self.cancelled += len(cancelled)
+            logger.info(f"Cancelled {len(cancelled)} AI queries of client {client_id}")
+        return len(cancelled)
+
+    async def stop(self):
+        """Cancel the workers."""
+        self._stopping = True
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._stopping = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth, throughput and wait time metrics."""
+        return {
+            'workers': self.workers,
+            'running': self._running,
+            'queue_depth': self._pending,
+            'max_queue': self.max_queue,
+            'clients_waiting': len(self._rotation),
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'cancelled': self.cancelled,
+            'wait_time': self.wait_stats.summary(),
+            'service_time': self.service_stats.summary()
+        }
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Versioned Response Cache for Hailo AI Terminal
+
+Heavy JSON endpoints (entity discovery, entities by domain, backend status)
+are cached as serialised bodies keyed on the version of the data they were
+built from. Each entry carries an ETag derived from that version, so a
+client presenting a matching ``If-None-Match`` can be answered with a 304
+without rebuilding or re-serialising the payload. Compressed variants of
+each body are produced once per content coding and kept with the entry;
+they carry the ETag with the coding appended (``"<digest>-gzip"``), since a
+strong validator must differ between representations.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from serialization import MIN_COMPRESS_SIZE, choose_encoding, compress, get_serializer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedResponse:
+    """A serialised response body and the data version it was built from."""
+    key: str
+    version: str
+    etag: str
+    body: bytes
+    created_at: float
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+
+class ResponseCache:
+    """Thread-safe cache of serialised responses keyed on data version."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: Dict[str, CachedResponse] = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'not_modified': 0}
+
+    @staticmethod
+    def make_etag(key: str, version: Any) -> str:
+        """Build a strong ETag for a cache key at a given data version."""
+        digest = hashlib.sha1(f"{key}:{version}".encode('utf-8')).hexdigest()
+        return f'"{digest[:20]}"'
+
+    @staticmethod
+    def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+        """ETag of the body of a response in a content coding."""
+        if not encoding:
+            return etag
+        return f'{etag[:-1]}-{encoding}"'
+
+    @staticmethod
+    def matching_etag(etag: str, if_none_match: Optional[str]) -> Optional[str]:
+        """Find the tag of an ``If-None-Match`` header value matching an ETag.
+
+        Tags of any content coding of the response match.
+
+        Returns:
+            The matching tag without a weak prefix, or None
+        """
+        if not if_none_match:
+            return None
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag == '*':
+                return etag
+            if tag.startswith('W/'):
+                tag = tag[2:]
+            # A coding suffix follows the digest: "<digest>-gzip"
+            base = tag[1:-1].rpartition('-')[0]
+            if tag == etag or (base and f'"{base}"' == etag):
+                return tag
+        return None
+
+    @classmethod
+    def etag_matches(cls, etag: str, if_none_match: Optional[str]) -> bool:
+        """Check an ETag against an ``If-None-Match`` header value."""
+        return cls.matching_etag(etag, if_none_match) is not None
+
+    def get(self, key: str, version: Any) -> Optional[CachedResponse]:
+        """Get a cached response if it was built from ``version``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != str(version):
+                return None
+            return entry
+
+    def put(self, key: str, version: Any, body: bytes) -> CachedResponse:
+        """Store a serialised body for ``key`` at ``version``."""
+        entry = CachedResponse(
+            key=key,
+            version=str(version),
+            etag=self.make_etag(key, version),
+            body=body,
+            created_at=time.time()
+        )
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            # Dicts keep insertion order, so the first key is the oldest entry
+            while len(self._entries) > self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+        return entry
+
+    def invalidate(self, prefix: str = ''):
+        """Drop every entry whose key starts with ``prefix``."""
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    async def respond(self, key: str, version: Any,
+                      build: Callable[[], Awaitable[Any]],
+                      if_none_match: Optional[str] = None
+                      ) -> Tuple[int, str, Optional[CachedResponse]]:
+        """Resolve a conditional request against the cache.
+
+        Args:
+            key: Cache key for the endpoint and its arguments
+            version: Current version of the underlying data
+            build: Coroutine factory returning the payload on a cache miss
+            if_none_match: Value of the request's ``If-None-Match`` header
+
+        Returns:
+            Tuple of (HTTP status, ETag, cache entry). Status is 304 when
+            the client's ETag is current; the ETag is then the client's,
+            content coding included, and the entry is None because nothing
+            had to be built. Otherwise the ETag is that of the identity
+            body; see :meth:`encoded_etag`.
+        """
+        etag = self.make_etag(key, version)
+        matched = self.matching_etag(etag, if_none_match)
+        if matched is not None:
+            self.stats['not_modified'] += 1
+            return 304, matched, None
+
+        entry = self.get(key, version)
+        if entry is not None:
+            self.stats['hits'] += 1
+            return 200, etag, entry
+
+        self.stats['misses'] += 1
+        payload = await build()
+        entry = self.put(key, version, get_serializer().dumps_bytes(payload))
+        return 200, etag, entry
+
+    def encoded_body(self, entry: CachedResponse,
+                     accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """Get the body of ``entry`` in the best coding the client accepts.
+
+        Compressed variants are built on first use and reused until the
+        entry is replaced.
+
+        Returns:
+            Tuple of (body, content coding or None for identity)
+        """
+        if len(entry.body) < MIN_COMPRESS_SIZE:
+            return entry.body, None
+
+        encoding = choose_encoding(accept_encoding)
+        if encoding is None:
+            return entry.body, None
+
+        body = entry.encoded.get(encoding)
+        if body is None:
+            body = compress(entry.body, encoding)
+            with self._lock:
+                entry.encoded[encoding] = body
+        return body, encoding
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        with self._lock:
+            entries = len(self._entries)
+            size = sum(
+                len(e.body) + sum(len(b) for b in e.encoded.values())
+                for e in self._entries.values()
+            )
+        return {**self.stats, 'entries': entries, 'bytes': size}
+
+
+def fingerprint(items: Iterable[Any]) -> str:
+    """Build a short, stable fingerprint of an iterable of hashable items."""
+    digest = hashlib.sha1()
+    for item in items:
+        digest.update(repr(item).encode('utf-8'))
+    return digest.hexdigest()[:16]
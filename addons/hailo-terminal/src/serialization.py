@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+JSON Serialisation and Response Compression for Hailo AI Terminal
+
+Provides a pluggable JSON serializer shared by the REST endpoints and the
+Socket.IO servers. orjson is used when it is installed, with the standard
+library encoder as fallback. Also provides Accept-Encoding negotiation and
+gzip/brotli compression for large response bodies.
+"""
+
+import os
+import gzip
+import json
+import logging
+from typing import Any, Optional
+
+# Optional fast serializer
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Optional brotli compression
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+class PreEncoded:
+    """A JSON value serialised once and spliced verbatim into documents.
+
+    Used to fan one payload out to many Socket.IO clients without encoding
+    it per client. Only items of a top-level list are spliced, which is
+    where python-socketio places event arguments.
+    """
+
+    __slots__ = ('data',)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+class JSONSerializer:
+    """JSON serializer backed by orjson or the standard library."""
+
+    def __init__(self, preference: str = 'auto'):
+        """Initialize the serializer.
+
+        Args:
+            preference: 'orjson', 'json' or 'auto' (orjson when installed)
+        """
+        if preference == 'orjson' and not ORJSON_AVAILABLE:
+            logger.warning("orjson requested but not installed - using json")
+        self.use_orjson = ORJSON_AVAILABLE and preference != 'json'
+        self.name = 'orjson' if self.use_orjson else 'json'
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        """Serialise ``obj`` to UTF-8 encoded JSON."""
+        if isinstance(obj, list) and any(isinstance(item, PreEncoded) for item in obj):
+            return b'[' + b','.join(
+                item.data if isinstance(item, PreEncoded) else self.dumps_bytes(item)
+                for item in obj
+            ) + b']'
+        if self.use_orjson:
+            try:
+                return orjson.dumps(
+                    obj, default=str, option=orjson.OPT_NON_STR_KEYS
+                )
+            except TypeError:
+                # e.g. integers wider than 64 bits; let the stdlib handle it
+                pass
+        return json.dumps(
+            obj, default=str, ensure_ascii=False, separators=(',', ':')
+        ).encode('utf-8')
+
+    def pre_encode(self, obj: Any) -> PreEncoded:
+        """Serialise ``obj`` once for splicing into several documents."""
+        return PreEncoded(self.dumps_bytes(obj))
+
+    def dumps(self, obj: Any, *args, **kwargs) -> str:
+        """Serialise ``obj`` to a JSON string.
+
+        Accepts and ignores the stdlib keyword arguments so the serializer
+        can stand in for the ``json`` module in python-socketio.
+        """
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, data, *args, **kwargs) -> Any:
+        """Parse a JSON document."""
+        if self.use_orjson:
+            return orjson.loads(data)
+        return json.loads(data)
+
+
+_default_serializer = JSONSerializer(os.getenv('JSON_SERIALIZER', 'auto'))
+
+
+def get_serializer() -> JSONSerializer:
+    """Get the process-wide serializer."""
+    return _default_serializer
+
+
+def set_serializer(preference: str) -> JSONSerializer:
+    """Replace the process-wide serializer."""
+    global _default_serializer
+    _default_serializer = JSONSerializer(preference)
+    logger.info(f"JSON serializer: {_default_serializer.name}")
+    return _default_serializer
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best supported content coding from an Accept-Encoding header.
+
+    Returns 'br', 'gzip' or None (identity).
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for part in accept_encoding.split(','):
+        fields = part.strip().split(';')
+        coding = fields[0].strip().lower()
+        quality = 1.0
+        for param in fields[1:]:
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            accepted[coding] = quality
+
+    def allowed(coding: str) -> bool:
+        return accepted.get(coding, accepted.get('*', 0.0)) > 0
+
+    if BROTLI_AVAILABLE and allowed('br'):
+        return 'br'
+    if allowed('gzip'):
+        return 'gzip'
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress ``body`` with the given content coding."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    raise ValueError(f"Unsupported content coding: {encoding}")
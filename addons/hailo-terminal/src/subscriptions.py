@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Socket.IO Topic Subscriptions for Hailo AI Terminal
+
+Clients subscribe to topics instead of receiving every broadcast:
+
+- ``resources``: full resource monitor frames (``resource_update``)
+- ``metrics:<series>``: one resource metric, e.g. ``metrics:cpu_percent``
+  or ``metrics:network_io.bytes_recv`` (``metric_update``)
+- ``entities:<domain>``: entity states of one domain (``entity_update``)
+- ``ai:<session>``: AI queue positions, streamed tokens and responses for
+  a session
+
+A published payload is serialised once and the encoded frame is queued for
+each subscriber. Every client has a bounded outbound queue drained by its
+own sender task, which keeps a small window of unacknowledged frames in
+flight. Frames published as ``latest`` replace any queued frame of the same
+topic and event, so a slow client only ever receives the newest resource
+frame and cannot grow server memory or hold up other clients.
+
+When an ordered queue is full the oldest droppable frame is discarded.
+Frames published with ``droppable=False``, such as final AI responses, are
+never discarded: a client whose queue is full of them is disconnected
+instead, so it reconnects and resynchronises rather than silently missing
+an answer.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Set
+
+from serialization import PreEncoded, get_serializer
+
+logger = logging.getLogger(__name__)
+
+STATIC_TOPICS = ('resources',)
+TOPIC_PREFIXES = ('metrics:', 'entities:', 'ai:')
+
+# Topics every client starts with; matches the old broadcast behaviour
+DEFAULT_TOPICS = ('resources',)
+
+MAX_TOPICS_PER_CLIENT = 64
+MAX_QUEUED_FRAMES = 64
+SEND_WINDOW = 4
+ACK_TIMEOUT = 10.0
+
+# emit(sid, event, data, on_ack): send one event and call on_ack() once the
+# client acknowledges it
+Transport = Callable[[str, str, Any, Callable[[], None]], Awaitable[None]]
+
+# disconnect(sid): close a client's connection
+Disconnect = Callable[[str], Awaitable[None]]
+
+
+def is_valid_topic(topic: Any) -> bool:
+    """Check a topic name from a client."""
+    if not isinstance(topic, str):
+        return False
+    if topic in STATIC_TOPICS:
+        return True
+    return any(topic.startswith(prefix) and len(topic) > len(prefix)
+               for prefix in TOPIC_PREFIXES)
+
+
+@dataclass
+class Frame:
+    """An encoded event waiting in a client's outbound queue."""
+    topic: str
+    event: str
+    data: PreEncoded
+    droppable: bool = True
+
+
+class ClientChannel:
+    """Outbound queue and flow control state for one client."""
+
+    def __init__(self, sid: str, max_frames: int = MAX_QUEUED_FRAMES,
+                 window: int = SEND_WINDOW):
+        self.sid = sid
+        self.topics: Set[str] = set()
+        self.max_frames = max_frames
+        self.frames: Deque[Frame] = deque()
+        self.latest: Dict[str, Frame] = {}
+        self.credits = asyncio.Semaphore(window)
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+        self.in_flight = 0
+        self.sent = 0
+        self.dropped = 0
+        self.ack_timeouts = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self.frames) + len(self.latest)
+
+    def push(self, frame: Frame, latest: bool = False) -> bool:
+        """Queue a frame, dropping stale or excess droppable frames.
+
+        Returns:
+            False if the queue is full of frames that must not be dropped
+            and the frame could not be queued
+        """
+        if latest:
+            key = f'{frame.topic}|{frame.event}'
+            if self.latest.pop(key, None) is not None:
+                self.dropped += 1
+            self.latest[key] = frame
+        else:
+            if len(self.frames) >= self.max_frames:
+                victim = next((queued for queued in self.frames if queued.droppable), None)
+                if victim is not None:
+                    self.frames.remove(victim)
+                elif frame.droppable:
+                    self.dropped += 1
+                    return True
+                else:
+                    return False
+                self.dropped += 1
+            self.frames.append(frame)
+        self.wakeup.set()
+        return True
+
+    def pop(self) -> Optional[Frame]:
+        """Take the next frame; ordered frames go before latest-only ones."""
+        if self.frames:
+            return self.frames.popleft()
+        if self.latest:
+            key = next(iter(self.latest))
+            return self.latest.pop(key)
+        return None
+
+
+class SubscriptionHub:
+    """Routes published events to subscribed clients.
+
+    Not thread-safe: all methods must be called on the event loop that runs
+    the sender tasks.
+    """
+
+    def __init__(self, transport: Optional[Transport] = None,
+                 max_frames: int = MAX_QUEUED_FRAMES,
+                 window: int = SEND_WINDOW, ack_timeout: float = ACK_TIMEOUT,
+                 disconnect: Optional[Disconnect] = None):
+        self._transport = transport
+        self._disconnect = disconnect
+        self.max_frames = max_frames
+        self.window = window
+        self.ack_timeout = ack_timeout
+
+        self._channels: Dict[str, ClientChannel] = {}
+        self._subscribers: Dict[str, Set[str]] = {}
+        self._closing: Set[asyncio.Task] = set()
+        self.published = 0
+        self.overflow_disconnects = 0
+
+    def set_transport(self, transport: Transport,
+                      disconnect: Optional[Disconnect] = None):
+        """Set how frames are emitted and clients closed (differs per server mode)."""
+        self._transport = transport
+        self._disconnect = disconnect
+
+    def connect(self, sid: str, topics: Iterable[str] = DEFAULT_TOPICS) -> ClientChannel:
+        """Register a client and start its sender."""
+        channel = self._channels.get(sid)
+        if channel is None:
+            channel = ClientChannel(sid, self.max_frames, self.window)
+            channel.task = asyncio.create_task(self._sender(channel))
+            self._channels[sid] = channel
+        self.subscribe(sid, topics)
+        return channel
+
+    def disconnect(self, sid: str):
+        """Drop a client, its subscriptions and queued frames."""
+        channel = self._channels.pop(sid, None)
+        if channel is None:
+            return
+        for topic in channel.topics:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(sid)
+                if not subscribers:
+                    del self._subscribers[topic]
+        if channel.task:
+            channel.task.cancel()
+
+    def subscribe(self, sid: str, topics: Iterable[str]) -> List[str]:
+        """Subscribe a connected client to topics.
+
+        Returns:
+            The topics newly subscribed
+
+        Raises:
+            ValueError: If a topic is invalid or the client has too many
+        """
+        channel = self._channels.get(sid)
+        if channel is None:
+            raise ValueError(f"Unknown client: {sid}")
+
+        topics = list(topics)
+        invalid = [str(topic) for topic in topics if not is_valid_topic(topic)]
+        if invalid:
+            raise ValueError(f"Invalid topics: {', '.join(invalid)}")
+
+        added = [topic for topic in dict.fromkeys(topics) if topic not in channel.topics]
+        if len(channel.topics) + len(added) > MAX_TOPICS_PER_CLIENT:
+            raise ValueError(f"At most {MAX_TOPICS_PER_CLIENT} topics per client")
+
+        for topic in added:
+            channel.topics.add(topic)
+            self._subscribers.setdefault(topic, set()).add(sid)
+        return added
+
+    def unsubscribe(self, sid: str, topics: Iterable[str]):
+        """Remove subscriptions of a client."""
+        channel = self._channels.get(sid)
+        if channel is None:
+            return
+        for topic in topics:
+            if topic in channel.topics:
+                channel.topics.discard(topic)
+                subscribers = self._subscribers[topic]
+                subscribers.discard(sid)
+                if not subscribers:
+                    del self._subscribers[topic]
+
+    def client_topics(self, sid: str) -> List[str]:
+        """Topics a client is subscribed to."""
+        channel = self._channels.get(sid)
+        return sorted(channel.topics) if channel else []
+
+    def has_subscribers(self, topic: str) -> bool:
+        return topic in self._subscribers
+
+    def topics(self, prefix: str = '') -> List[str]:
+        """Topics with at least one subscriber, optionally by prefix."""
+        return [topic for topic in self._subscribers if topic.startswith(prefix)]
+
+    def publish(self, topic: str, event: str, payload: Any,
+                latest: bool = False, droppable: bool = True) -> int:
+        """Queue an event for every subscriber of a topic.
+
+        Args:
+            topic: Topic to publish on
+            event: Socket.IO event name
+            payload: JSON-serialisable payload, encoded once
+            latest: Replace older queued frames of this topic and event
+                instead of queueing behind them
+            droppable: Whether the frame may be discarded when a client's
+                queue overflows; clients that cannot take an undroppable
+                frame are disconnected
+
+        Returns:
+            Number of clients the frame was queued for
+        """
+        subscribers = self._subscribers.get(topic)
+        if not subscribers:
+            return 0
+
+        frame = Frame(topic, event, get_serializer().pre_encode(payload), droppable)
+        queued = 0
+        for sid in list(subscribers):
+            if self._channels[sid].push(frame, latest):
+                queued += 1
+            else:
+                self._overflow(sid)
+        self.published += 1
+        return queued
+
+    def _overflow(self, sid: str):
+        """Disconnect a client too far behind to take an undroppable frame."""
+        logger.warning(f"Disconnecting {sid}: outbound queue full of undroppable frames")
+        self.overflow_disconnects += 1
+        self.disconnect(sid)
+        if self._disconnect is not None:
+            task = asyncio.create_task(self._close_client(sid))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    async def _close_client(self, sid: str):
+        """Close a client's connection through the server's disconnect hook."""
+        try:
+            await self._disconnect(sid)
+        except Exception as e:
+            logger.debug(f"Failed to disconnect {sid}: {e}")
+
+    async def _sender(self, channel: ClientChannel):
+        """Drain one client's queue, keeping at most ``window`` frames unacked."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await channel.credits.acquire()
+            while not channel.depth:
+                channel.wakeup.clear()
+                await channel.wakeup.wait()
+
+            # Take the frame only once a credit is held, so latest-only
+            # frames keep being replaced while the client is behind
+            frame = channel.pop()
+            channel.in_flight += 1
+            release = self._release_once(channel)
+            timer = loop.call_later(self.ack_timeout, release, True)
+
+            def on_ack(release=release, timer=timer):
+                timer.cancel()
+                release()
+
+            try:
+                await self._transport(channel.sid, frame.event, frame.data, on_ack)
+                channel.sent += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"Failed to send {frame.event} to {channel.sid}: {e}")
+                timer.cancel()
+                release()
+
+    @staticmethod
+    def _release_once(channel: ClientChannel) -> Callable[..., None]:
+        """Credit release for one frame, safe to call more than once."""
+        released = False
+
+        def release(timed_out: bool = False):
+            nonlocal released
+            if released:
+                return
+            released = True
+            channel.in_flight -= 1
+            if timed_out:
+                channel.ack_timeouts += 1
+            channel.credits.release()
+        return release
+
+    async def close(self):
+        """Stop all sender tasks."""
+        tasks = [channel.task for channel in self._channels.values() if channel.task]
+        tasks.extend(self._closing)
+        self._channels.clear()
+        self._subscribers.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-client queue and delivery statistics."""
+        return {
+            'clients': len(self._channels),
+            'topics': {topic: len(sids) for topic, sids in self._subscribers.items()},
+            'published': self.published,
+            'overflow_disconnects': self.overflow_disconnects,
+            'channels': {
+                sid: {
+                    'topics': len(channel.topics),
+                    'queued': channel.depth,
+                    'in_flight': channel.in_flight,
+                    'sent': channel.sent,
+                    'dropped': channel.dropped,
+                    'ack_timeouts': channel.ack_timeouts
+                }
+                for sid, channel in self._channels.items()
+            }
+        }
+
+
+class TokenRelay:
+    """Publishes streamed AI tokens as batched ``ai_token`` frames.
+
+    The first token goes out immediately; later tokens are grouped for
+    ``interval`` seconds so a fast stream does not flood client queues.
+    Each frame carries the character offset of its text, and the final
+    ``ai_response`` holds the complete text, so a client that dropped a
+    frame can still recover.
+    """
+
+    def __init__(self, hub: SubscriptionHub, topic: str, query_id: str,
+                 interval: float = 0.05):
+        self.hub = hub
+        self.topic = topic
+        self.query_id = query_id
+        self.interval = interval
+        self.offset = 0
+        self.frames = 0
+        self._buffer: List[str] = []
+        self._last_flush = 0.0
+        self.closed = False
+
+    def __call__(self, text: str):
+        """Add a streamed chunk."""
+        if self.closed:
+            return
+        self._buffer.append(text)
+        if time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+    def flush(self):
+        """Publish buffered text."""
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        text = ''.join(self._buffer)
+        self._buffer.clear()
+        self.hub.publish(self.topic, 'ai_token', {
+            'query_id': self.query_id,
+            'text': text,
+            'offset': self.offset
+        })
+        self.offset += len(text)
+        self.frames += 1
+
+    def close(self):
+        """Drop buffered text and ignore chunks still arriving."""
+        self.closed = True
+        self._buffer.clear()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Test the async (aiohttp) server mode.
+This script builds the aiohttp app of AsyncTerminalServer against a stub
+completion API, then checks its REST routes and that an ``ai_query`` sent
+over Socket.IO is answered by the configured backend.
+"""
+
+import sys
+import json
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+import socketio
+from aiohttp.test_utils import TestClient, TestServer
+
+
+class StubCompletionAPI:
+    """OpenAI-style completion endpoint for the custom backend, echoing the prompt."""
+
+    def __init__(self):
+        self.prompts = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                prompt = body['messages'][-1]['content']
+                stub.prompts.append(prompt)
+                self._reply({'choices': [{'message': {'content': f'Echo: {prompt}'}}],
+                             'usage': {'prompt_tokens': 3, 'completion_tokens': 4}})
+
+            def do_GET(self):
+                self._reply({})
+
+            def _reply(self, payload):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/v1/chat/completions'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+async def start_app(api):
+    """Serve the async app of a terminal using the stub API."""
+    from hailo_terminal import HailoTerminal
+    from async_server import AsyncTerminalServer
+
+    terminal = HailoTerminal({'ai_backend': 'custom', 'custom_api_url': api.url,
+                              'ai_model': 'stub', 'enable_monitoring': False})
+    client = TestClient(TestServer(AsyncTerminalServer(terminal).app))
+    await client.start_server()
+    return terminal, client
+
+
+def test_rest_routes():
+    """Test health, backends and backend switching routes"""
+    print("🩺 Testing async server REST routes")
+    api = StubCompletionAPI()
+
+    async def run():
+        terminal, client = await start_app(api)
+        try:
+            results = {}
+            response = await client.get('/')
+            results['index'] = (response.status, response.content_type)
+            for path in ('/api/health', '/api/backends'):
+                response = await client.get(path)
+                results[path] = (response.status, await response.json())
+            for name, body in (('missing', {}), ('unknown', {'backend': 'nope'}),
+                               ('custom', {'backend': 'custom'})):
+                response = await client.post('/api/switch_backend', json=body)
+                results[name] = (response.status, await response.json())
+        finally:
+            await client.close()
+        return results
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        api.close()
+
+    assert results['index'] == (200, 'text/html'), results['index']
+
+    status, health = results['/api/health']
+    assert status == 200 and health['status'] == 'healthy', health
+    assert health['ai_backends']['current_backend'] == 'custom'
+    assert health['ai_backends']['backends']['custom']['available']
+
+    status, backends = results['/api/backends']
+    assert status == 200 and backends['current'] == 'custom', backends
+    assert 'custom' in backends['available']
+
+    assert results['missing'][0] == 400 and results['unknown'][0] == 400
+    assert results['custom'] == (200, {'success': True, 'current_backend': 'custom'})
+    print(f"✅ Routes served; available backends: {backends['available']}")
+
+
+def test_ai_query_over_socketio():
+    """Test connect status, empty queries and an answered ai_query"""
+    print("\n💬 Testing Socket.IO events on the async server")
+    api = StubCompletionAPI()
+
+    async def run():
+        terminal, client = await start_app(api)
+        sio = socketio.AsyncClient(reconnection=False)
+        statuses, responses = [], []
+        answered = asyncio.Event()
+
+        def on_response(data):
+            responses.append(data)
+            if len(responses) == 2:
+                answered.set()
+
+        sio.on('status', statuses.append)
+        sio.on('ai_response', on_response)
+        try:
+            await sio.connect(f'http://127.0.0.1:{client.port}', transports=['websocket'])
+            await sio.emit('ai_query', {'query': '   '})
+            await sio.emit('ai_query', {'query': 'Tell me a joke'})
+            await asyncio.wait_for(answered.wait(), 5)
+        finally:
+            await sio.disconnect()
+            await client.close()
+        return statuses, responses
+
+    try:
+        statuses, responses = asyncio.run(run())
+    finally:
+        api.close()
+
+    assert statuses and statuses[0]['current_backend'] == 'custom', statuses
+    empty, answer = sorted(responses, key=lambda data: 'response' in data)
+    assert empty['error'] == 'Empty query received', empty
+    assert answer['response'] == 'Echo: Tell me a joke' and not answer['error'], answer
+    assert answer['backend'] == 'custom'
+    assert api.prompts == ['Tell me a joke'], api.prompts
+    print(f"✅ Answered over Socket.IO: {answer['response']!r}")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Async Server Tests...")
+    test_rest_routes()
+    test_ai_query_over_socketio()
+    print("\n🎉 All async server tests passed!")
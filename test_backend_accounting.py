@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Test per-backend latency, token and cost accounting.
+This script checks the accuracy of the latency histograms and the
+rolling token rates, then streams from a local HTTP server and checks
+that queue wait, connect time, time to first token, tokens and cost are
+recorded per backend and model and show up in the backend status.
+"""
+
+import sys
+import json
+import random
+import asyncio
+from pathlib import Path
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+import numpy as np
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from ai_backend_manager import AIBackendManager
+from backend_accounting import HdrHistogram, RollingRate, parse_costs, usage_tokens
+
+
+def test_histogram_accuracy():
+    """Test histogram percentiles stay within a few percent of exact ones"""
+    print("📊 Testing latency histograms")
+    rng = random.Random(7)
+    values = [rng.lognormvariate(-3, 1.2) for _ in range(20000)]
+    histogram = HdrHistogram()
+    for value in values:
+        histogram.record(value)
+
+    for q in (50, 90, 99, 99.9):
+        exact = float(np.percentile(values, q, method='inverted_cdf'))
+        estimate = histogram.percentile(q)
+        assert abs(estimate - exact) / exact < 0.04, (q, estimate, exact)
+    summary = histogram.summary()
+    assert summary['count'] == 20000
+    assert summary['min_ms'] == round(min(values) * 1000, 2)
+    assert summary['max_ms'] == round(max(values) * 1000, 2)
+    assert histogram._counts.nbytes < 16 * 1024
+    print(f"✅ p50 {summary['p50_ms']} ms, p99 {summary['p99_ms']} ms, "
+          f"{histogram._counts.nbytes} bytes")
+
+
+def test_rates_and_prices():
+    """Test rolling rates, usage naming and price parsing"""
+    print("\n⏱️ Testing rates and prices")
+    rate = RollingRate(window=10)
+    for second in range(20):
+        rate.add(50, now=100.0 + second)
+    assert rate.total(now=119.5) == 500
+    assert rate.rate(now=119.5) == 50
+    assert rate.total(now=200) == 0
+
+    assert usage_tokens({'input_tokens': 3, 'output_tokens': 5}) == (3, 5)
+    assert usage_tokens({'completion_tokens': 5}) == (None, 5)
+    assert usage_tokens(None) == (None, None)
+    assert parse_costs('openai=2.5/10, anthropic.claude-3-haiku=0.25/1.25,bad=x') == {
+        'openai': (2.5, 10.0), 'anthropic.claude-3-haiku': (0.25, 1.25)}
+    print("✅ 50 tokens/s over the window; prices parsed")
+
+
+async def openai_handler(request):
+    response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+    await response.prepare(request)
+    await asyncio.sleep(0.02)
+    for token in ['Porch ', 'light ', 'on']:
+        chunk = {'model': 'gpt-test', 'choices': [{'delta': {'content': token}}]}
+        await response.write(f'data: {json.dumps(chunk)}\n\n'.encode())
+    usage = {'choices': [], 'usage': {'prompt_tokens': 1000, 'completion_tokens': 3}}
+    await response.write(f'data: {json.dumps(usage)}\n\n'.encode())
+    await response.write(b'data: [DONE]\n\n')
+    return response
+
+
+async def custom_handler(request):
+    return web.json_response({'response': 'The porch light is on'})
+
+
+async def failing_handler(request):
+    return web.Response(status=503, text='overloaded')
+
+
+def test_generation_accounting():
+    """Test streamed and plain completions are accounted per backend and model"""
+    print("\n🧾 Testing generation accounting")
+
+    async def run():
+        app = web.Application()
+        app.router.add_post('/openai', openai_handler)
+        app.router.add_post('/custom', custom_handler)
+        app.router.add_post('/failing', failing_handler)
+        server = TestServer(app)
+        await server.start_server()
+        url = f'http://127.0.0.1:{server.port}'
+
+        manager = AIBackendManager({'ai_backend': 'openai', 'openai_api_key': 'k',
+                                    'custom_api_url': url, 'ai_cache_size': 16,
+                                    'ai_token_costs': 'openai=2/10'})
+        manager.backends['openai'].base_url = f'{url}/openai'
+        manager.backends['custom'].api_url = f'{url}/custom'
+        version = manager.get_status_version()
+
+        for prompt in ('porch light', 'garage light'):
+            response = await manager.stream_response(prompt, lambda text: None,
+                                                     use_context=False)
+            assert not response.error, response.error
+        # Served from the completion cache this time
+        await manager.generate_response('porch light', use_context=False)
+
+        manager.current_backend = 'custom'
+        await manager.generate_response('porch light', use_context=False)
+        manager.backends['custom'].api_url = f'{url}/failing'
+        failed = await manager.generate_response('garage door', use_context=False)
+
+        status = manager.get_backend_status()['backends']
+        await manager.close()
+        await server.close()
+        return (status, manager.get_usage_stats(), failed,
+                version != manager.get_status_version())
+
+    status, usage, failed, refreshed = asyncio.run(run())
+    openai = usage['openai']['gpt-test']
+    assert openai['requests'] == 2 and openai['cached'] == 1 and openai['errors'] == 0
+    assert openai['prompt_tokens'] == 2000 and openai['completion_tokens'] == 6
+    assert openai['estimated_usage'] == 0
+    assert abs(openai['cost'] - 2 * (1000 * 2 + 3 * 10) / 1e6) < 1e-9
+    for histogram in ('queue_wait', 'connect', 'ttft', 'total'):
+        assert openai[histogram]['count'] == 2, histogram
+    # A new connection first, then the pooled one
+    assert openai['connect']['max_ms'] > 0 and openai['connect']['min_ms'] == 0
+    assert openai['ttft']['min_ms'] >= 15
+    assert openai['total']['min_ms'] >= openai['ttft']['min_ms']
+    assert openai['completion_tokens_per_second'] > 0
+    assert openai['generation_tokens_per_second'] > openai['completion_tokens_per_second']
+
+    custom = next(iter(usage['custom'].values()))
+    assert failed.error and custom['requests'] == 2 and custom['errors'] == 1
+    assert custom['estimated_usage'] == 2 and custom['completion_tokens'] > 0
+    assert custom['ttft']['count'] == 0 and custom['cost'] == 0
+
+    assert status['openai']['usage'] == usage['openai']
+    assert status['hailo']['usage'] == {}
+    assert refreshed, "accounting changes the backend status version"
+    print(f"✅ openai: connect {openai['connect']['max_ms']} ms, ttft p50 "
+          f"{openai['ttft']['p50_ms']} ms, ${openai['cost']:.6f}; custom usage estimated")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Backend Accounting Tests...")
+    test_histogram_accuracy()
+    test_rates_and_prices()
+    test_generation_accounting()
+    print("\n🎉 All backend accounting tests passed!")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test background health probing of the AI backends.
+This script checks that status calls use cached availability, that the
+prober picks up Ollama going up and down and that failing backends are
+retried with backoff.
+"""
+
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from ai_backend_manager import AIBackendManager
+from backend_health import HealthProber
+
+
+def test_status_does_not_block():
+    """Test status calls never wait on an unreachable backend"""
+    print("⏱️ Testing status calls use cached availability")
+    manager = AIBackendManager({'ai_backend': 'ollama',
+                                'custom_api_url': 'http://10.255.255.1:11434'})
+
+    started = time.monotonic()
+    status = manager.get_backend_status()
+    available = manager.get_available_backends()
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.1, f"status took {elapsed:.2f}s"
+    assert 'ollama' not in available
+    assert status['backends']['ollama']['last_checked'] is None
+    assert not manager.switch_backend('ollama')
+    print(f"✅ Status in {elapsed * 1000:.1f} ms")
+
+
+def test_ollama_probe_and_backoff():
+    """Test the prober tracks Ollama availability with backoff"""
+    print("\n🩺 Testing Ollama probing")
+
+    async def run():
+        async def tags(request):
+            return web.json_response({'models': []})
+
+        app = web.Application()
+        app.router.add_get('/api/tags', tags)
+        server = TestServer(app)
+        await server.start_server()
+
+        manager = AIBackendManager({'ai_backend': 'ollama',
+                                    'custom_api_url': f'http://127.0.0.1:{server.port}'})
+        manager.health.retry = 0.05
+        manager.start_health_checks()
+        await asyncio.sleep(0.1)
+        up = manager.get_backend_status()['backends']['ollama']
+        version_up = manager.get_status_version()
+
+        await server.close()
+        manager.health.request_probe('ollama')
+        await asyncio.sleep(0.3)
+        down = manager.get_backend_status()['backends']['ollama']
+        version_down = manager.get_status_version()
+        await manager.close()
+        return up, down, version_up, version_down
+
+    up, down, version_up, version_down = asyncio.run(run())
+    assert up['available'] and up['last_checked'] and up['consecutive_failures'] == 0
+    assert not down['available'] and down['last_error']
+    assert down['consecutive_failures'] >= 2, "failing backend should be retried"
+    assert version_up != version_down
+    print(f"✅ Ollama up then down after {down['consecutive_failures']} failed probes")
+
+    prober = HealthProber({}, interval=30, retry=5, max_backoff=60)
+    assert [prober._delay(n) for n in range(6)] == [30, 5, 10, 20, 40, 60]
+    print("✅ Backoff 5s doubling to 60s")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Backend Health Tests...")
+    test_status_does_not_block()
+    test_ollama_probe_and_backoff()
+    print("\n🎉 All backend health tests passed!")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test the pooled async HTTP client used by the AI backends.
+This script checks that completions overlap on one event loop, that the
+per-backend connection limit holds and that cancelling a query aborts
+its request.
+"""
+
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from ai_backend_manager import AIBackendManager
+
+DELAY = 0.2
+
+
+class SlowServer:
+    """Completion server that tracks concurrent and aborted requests."""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.cancelled = 0
+        self.peers = set()
+
+    async def handle(self, request):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        self.peers.add(request.transport.get_extra_info('peername'))
+        try:
+            await asyncio.sleep(DELAY)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.active -= 1
+        return web.json_response({'choices': [{'message': {'content': 'ok'}}],
+                                  'response': 'ok'})
+
+    async def start(self):
+        app = web.Application(handler_args={'handler_cancellation': True})
+        app.router.add_post('/openai', self.handle)
+        app.router.add_post('/api/generate', self.handle)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        return f'http://127.0.0.1:{self.server.port}'
+
+
+def make_manager(url):
+    manager = AIBackendManager({'ai_backend': 'openai', 'openai_api_key': 'k',
+                                'custom_api_url': url})
+    manager.backends['openai'].base_url = f'{url}/openai'
+    return manager
+
+
+def test_concurrent_requests_overlap():
+    """Test that completions run concurrently and reuse connections"""
+    print("🔀 Testing concurrent completions")
+
+    async def run():
+        server = SlowServer()
+        manager = make_manager(await server.start())
+        backend = manager.backends['openai']
+
+        started = time.monotonic()
+        responses = await asyncio.gather(*(backend.generate_response('hi') for _ in range(4)))
+        elapsed = time.monotonic() - started
+
+        # A second round reuses the keep-alive connections
+        await asyncio.gather(*(backend.generate_response('hi') for _ in range(4)))
+
+        await manager.close()
+        await server.server.close()
+        return responses, elapsed, server
+
+    responses, elapsed, server = asyncio.run(run())
+    assert all(r.content == 'ok' and r.error is None for r in responses)
+    assert elapsed < DELAY * 2, f"requests did not overlap ({elapsed:.2f}s)"
+    assert server.peak == 4
+    assert len(server.peers) == 4, "keep-alive connections should be reused"
+    print(f"✅ 4 requests in {elapsed:.2f}s over {len(server.peers)} connections")
+
+
+def test_connection_limit_and_cancellation():
+    """Test per-backend connection limits and request cancellation"""
+    print("\n🚦 Testing connection limit and cancellation")
+
+    async def run():
+        server = SlowServer()
+        manager = make_manager(await server.start())
+        ollama = manager.backends['ollama']
+
+        started = time.monotonic()
+        await asyncio.gather(*(ollama.generate_response('hi') for _ in range(4)))
+        limited = time.monotonic() - started
+        peak = server.peak
+
+        task = asyncio.create_task(ollama.generate_response('hi'))
+        await asyncio.sleep(DELAY / 4)
+        task.cancel()
+        try:
+            await task
+            raise AssertionError("cancelled query completed")
+        except asyncio.CancelledError:
+            pass
+        await asyncio.sleep(DELAY / 4)
+
+        await manager.close()
+        await server.server.close()
+        return limited, peak, server.cancelled
+
+    limited, peak, cancelled = asyncio.run(run())
+    assert peak == 2, f"ollama allows 2 connections, saw {peak}"
+    assert limited >= DELAY * 2
+    assert cancelled == 1, "server should see the aborted request"
+    print(f"✅ Peak {peak} connections, cancelled request aborted server-side")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Backend HTTP Tests...")
+    test_concurrent_requests_overlap()
+    test_connection_limit_and_cancellation()
+    print("\n🎉 All backend HTTP tests passed!")
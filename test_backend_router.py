@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test latency-aware routing over the AI backends.
+This script checks routing policies, fallback on errors and timeouts and
+that hedged requests cut tail latency.
+"""
+
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+from ai_backend_manager import AIBackend, AIBackendManager, AIResponse, StreamChunk
+from backend_router import BackendRouter
+
+
+class FakeBackend(AIBackend):
+    """Backend answering after a delay, or failing."""
+
+    def __init__(self, name, delay=0.0, error=None):
+        super().__init__({'ai_model': f'{name}-model'})
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate_response(self, prompt, context=None, priority=None):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            return AIResponse(content='', backend=self.name, error=self.error)
+        return AIResponse(content=f'{self.name} answer', backend=self.name, model=self.model)
+
+    async def stream_response(self, prompt, context=None, priority=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            yield StreamChunk(error=self.error)
+            return
+        for word in ('from ', self.name):
+            yield StreamChunk(text=word)
+
+    def is_available(self):
+        return True
+
+    def get_status(self):
+        return {'available': True}
+
+
+def make_manager(backends, **config):
+    manager = AIBackendManager({'ai_backend': 'hailo', 'ai_cache_size': 0, **config})
+    manager.backends.clear()
+    manager.backends.update({backend.name: backend for backend in backends})
+    return manager
+
+
+def test_routing_policies():
+    """Test fixed and auto routing plans"""
+    print("🧭 Testing routing plans")
+    backends = {name: FakeBackend(name) for name in ('hailo', 'ollama', 'openai', 'anthropic')}
+    router = BackendRouter(backends, policy='auto')
+
+    assert router.classify('turn on the porch light') == 'local'
+    assert router.classify('explain why my heating schedule drifts') == 'cloud'
+    assert router.plan('turn on the porch light', 'openai')[:2] == ['hailo', 'ollama']
+    assert router.plan('compare these two automations', 'hailo')[:2] == ['anthropic', 'openai']
+
+    fixed = BackendRouter(backends, fallback=['ollama', 'hailo'])
+    assert fixed.plan('anything', 'openai') == ['openai', 'ollama', 'hailo']
+    print("✅ Plans follow the policy")
+
+
+def test_fallback_on_error_and_timeout():
+    """Test failing and slow backends fall back through the chain"""
+    print("\n🪂 Testing fallback")
+
+    async def run():
+        hailo = FakeBackend('hailo', error='device busy')
+        ollama = FakeBackend('ollama', delay=1.0)
+        openai = FakeBackend('openai')
+        manager = make_manager([hailo, ollama, openai], ai_fallback=['ollama', 'openai'],
+                               ai_backend_timeout=0.1)
+        response = await manager.generate_response('hello', use_context=False)
+        chunks = []
+        streamed = await manager.stream_response('hello again', chunks.append,
+                                                 use_context=False)
+        await manager.close()
+        return response, streamed, chunks, manager.get_routing_stats()
+
+    response, streamed, chunks, stats = asyncio.run(run())
+    assert response.backend == 'openai' and response.content == 'openai answer'
+    assert streamed.backend == 'openai' and ''.join(chunks) == 'from openai'
+    assert stats['backends']['hailo']['errors'] == 2
+    assert stats['backends']['ollama']['timeouts'] == 2
+    assert stats['backends']['hailo']['fallbacks'] == 2
+    print(f"✅ Answered by {response.backend} after an error and a timeout")
+
+
+def test_hedged_requests():
+    """Test a hedge after the p95 latency beats a slow primary"""
+    print("\n🏁 Testing hedged requests")
+
+    async def run():
+        primary = FakeBackend('hailo', delay=0.02)
+        secondary = FakeBackend('ollama', delay=0.02)
+        manager = make_manager([primary, secondary], ai_fallback=['ollama'], ai_hedge=True)
+        for _ in range(10):
+            await manager.generate_response('warm up', use_context=False)
+
+        primary.delay = 1.0
+        started = time.monotonic()
+        response = await manager.generate_response('slow now', use_context=False)
+        elapsed = time.monotonic() - started
+        await manager.close()
+        return response, elapsed, primary, manager.get_routing_stats()
+
+    response, elapsed, primary, stats = asyncio.run(run())
+    assert response.backend == 'ollama', response
+    assert elapsed < 0.5, f"hedge did not cut latency ({elapsed:.2f}s)"
+    assert primary.cancelled == 1, "losing request should be cancelled"
+    assert stats['backends']['ollama']['hedges'] == 1
+    assert stats['backends']['ollama']['hedge_wins'] == 1
+    print(f"✅ Hedged answer in {elapsed * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Routing Tests...")
+    test_routing_policies()
+    test_fallback_on_error_and_timeout()
+    test_hedged_requests()
+    print("\n🎉 All routing tests passed!")
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Test cancellation of AI queries.
+This script checks that the query pool cancels waiting and running
+queries without losing a worker, that a stopped Hailo generation gives
+up its wait for a batch row and its decode loop, and that ``ai_cancel``
+and client disconnects close the backend's HTTP stream to the mock LLM
+server.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+
+# Add the source and scripts directories to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/scripts"))
+
+import socketio
+from aiohttp.test_utils import TestServer
+
+from query_pool import AIQueryPool
+from hailo_decoder import HailoDecoder, SamplingParams, SyntheticInferModel
+from hailo_tokenizer import ByteTokenizer
+from ai_backend_manager import HailoBackend
+from mock_llm_server import MockLLMServer, MockProfile
+
+REPLY = "Turning off every light in the house, one room at a time. " * 4
+
+
+def test_pool_cancel():
+    """Test waiting and running queries are cancelled, workers survive"""
+    print("🧹 Testing query pool cancellation")
+    events = []
+
+    async def run():
+        pool = AIQueryPool(workers=1, max_queue=8, max_per_client=8)
+
+        def job(name, duration):
+            async def work():
+                try:
+                    await asyncio.sleep(duration)
+                    events.append(f'{name} done')
+                except asyncio.CancelledError:
+                    events.append(f'{name} stopped')
+                    raise
+            return work
+
+        for name in ('a1', 'a2', 'a3'):
+            await pool.submit('a', job(name, 5), query_id=name,
+                              on_cancel=lambda name=name: events.append(f'{name} cancelled'))
+        await pool.submit('b', job('b1', 0.01))
+        await asyncio.sleep(0.01)  # a1 is running
+
+        single = pool.cancel('a', 'a2')
+        rest = pool.cancel('a')
+        missing = pool.cancel('a', 'a9')
+        while pool.get_stats()['completed'] < 1:
+            await asyncio.sleep(0.01)
+        stats = pool.get_stats()
+        await pool.stop()
+        return single, rest, missing, stats
+
+    single, rest, missing, stats = asyncio.run(run())
+    assert (single, rest, missing) == (1, 2, 0)
+    assert events == ['a2 cancelled', 'a3 cancelled', 'a1 cancelled', 'a1 stopped', 'b1 done'], events
+    assert stats['cancelled'] == 3 and stats['failed'] == 0 and stats['queue_depth'] == 0
+    print(f"✅ {stats['cancelled']} cancelled, next client served: {events}")
+
+
+class SyntheticHailoBackend(HailoBackend):
+    """Hailo backend running on the synthetic infer model."""
+
+    def __init__(self, config, **model_options):
+        super().__init__(config)
+        self.infer_model = SyntheticInferModel(self.tokenizer, REPLY, **model_options)
+        self.seq_len = self._model_seq_len()
+        self.max_context_length = self.infer_model.context_len
+        self.decoder = self._create_decoder()
+
+    def is_available(self):
+        return True
+
+
+def test_hailo_stop():
+    """Test stopping a generation waiting for a row and a running one"""
+    print("\n🛑 Testing Hailo decode loop cancellation")
+    tokenizer = ByteTokenizer()
+    model = SyntheticInferModel(tokenizer, REPLY, seq_len=16, step_delay=0.002)
+    decoder = HailoDecoder(model, tokenizer, 16, model.context_len)
+    params = SamplingParams(temperature=0)
+
+    first = threading.Thread(target=decoder.generate,
+                             args=('user: lights off\nassistant:', 256, params))
+    first.start()
+    time.sleep(0.02)  # the only row is taken
+    stop = threading.Event()
+    threading.Timer(0.05, stop.set).start()
+    started = time.monotonic()
+    waiting = decoder.generate('user: fan off\nassistant:', 256, params, stop=stop)
+    waited = time.monotonic() - started
+    first.join()
+    assert waiting.stop_reason == 'cancelled' and not waiting.tokens
+    assert waited < 0.2, waited
+    assert decoder.get_stats()['cancelled'] == 1
+
+    backend = SyntheticHailoBackend({'ai_model': 'test', 'model_path': '/nonexistent',
+                                     'max_tokens': 1024}, step_delay=0.002)
+
+    async def run():
+        chunks = []
+
+        async def consume():
+            async for chunk in backend.stream_response('lights off'):
+                chunks.append(chunk)
+
+        task = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # The decode thread stops after its current step
+        await asyncio.sleep(0.05)
+        return chunks
+
+    chunks = asyncio.run(run())
+    stats = backend.decoder.get_stats()
+    assert 0 < len(chunks) < len(REPLY)
+    assert stats['cancelled'] == 1 and stats['tokens_generated'] < len(REPLY), stats
+    print(f"✅ Waiting generation gave up after {waited * 1000:.0f} ms; "
+          f"running one stopped after {stats['tokens_generated']} tokens")
+
+
+def test_cancel_over_socketio():
+    """Test ai_cancel and disconnects close the backend HTTP stream"""
+    print("\n🔌 Testing cancellation from Socket.IO clients")
+
+    async def run():
+        # 200 tokens at 20 tokens/s: ten seconds unless cancelled
+        mock = MockLLMServer(MockProfile(tokens_per_second=20, reply_tokens=200))
+        llm = TestServer(mock.app)
+        await llm.start_server()
+        url = f'http://127.0.0.1:{llm.port}'
+
+        env = {'AI_BACKEND': 'openai', 'OPENAI_API_KEY': 'k', 'MAX_TOKENS': '200',
+               'OPENAI_API_URL': f'{url}/v1/chat/completions', 'AI_CACHE_SIZE': '0'}
+        saved = {key: os.environ.get(key) for key in env}
+        os.environ.update(env)
+        try:
+            from hailo_terminal import HailoTerminal
+            from async_server import AsyncTerminalServer
+            terminal = HailoTerminal()
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+        server = TestServer(AsyncTerminalServer(terminal).app)
+        await server.start_server()
+
+        async def client_streaming():
+            client = socketio.AsyncClient(reconnection=False)
+            streaming = asyncio.Event()
+            responses = []
+            client.on('ai_token', lambda data: streaming.set())
+            client.on('ai_response', responses.append)
+            await client.connect(f'http://127.0.0.1:{server.port}', transports=['websocket'])
+            await client.emit('ai_query', {'query': 'Turn everything off'})
+            await asyncio.wait_for(streaming.wait(), 5)
+            return client, responses
+
+        async def closed_within(seconds):
+            deadline = time.monotonic() + seconds
+            while mock.active and time.monotonic() < deadline:
+                await asyncio.sleep(0.02)
+            return not mock.active
+
+        client, responses = await client_streaming()
+        started = time.monotonic()
+        await client.emit('ai_cancel', {})
+        cancelled_closed = await closed_within(2)
+        elapsed = time.monotonic() - started
+        await asyncio.sleep(0.1)
+        await client.disconnect()
+
+        client, _ = await client_streaming()
+        await client.disconnect()
+        disconnect_closed = await closed_within(2)
+
+        stats = terminal.get_metrics()['ai_queue']
+        await server.close()
+        await llm.close()
+        return cancelled_closed, disconnect_closed, responses, elapsed, stats
+
+    cancelled_closed, disconnect_closed, responses, elapsed, stats = asyncio.run(run())
+    assert cancelled_closed and disconnect_closed, "the backend stream must be closed"
+    assert len(responses) == 1 and responses[0]['cancelled'], responses
+    assert stats['cancelled'] == 2 and stats['completed'] == 0, stats
+    print(f"✅ Backend stream closed {elapsed * 1000:.0f} ms after ai_cancel and on disconnect")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Cancellation Tests...")
+    test_pool_cancel()
+    test_hailo_stop()
+    test_cancel_over_socketio()
+    print("\n🎉 All cancellation tests passed!")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test the AI completion cache.
+This script checks key normalisation, TTL expiry, the LRU bound, disk
+persistence with deferred saves and that the backend manager serves
+repeated prompts from the cache.
+"""
+
+import sys
+import time
+import asyncio
+import tempfile
+from pathlib import Path
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+from completion_cache import CompletionCache
+from ai_backend_manager import AIBackend, AIBackendManager, AIResponse
+
+PARAMS = {'temperature': 0.7, 'max_tokens': 512}
+
+
+def test_cache_keys_and_eviction():
+    """Test normalised keys, TTL expiry and the LRU bound"""
+    print("🗝️ Testing completion cache keys and eviction")
+    key = CompletionCache.make_key('openai', 'gpt', PARAMS, 'Is the porch light on?')
+    assert key == CompletionCache.make_key('openai', 'gpt', PARAMS, '  is the PORCH light on ')
+    assert key != CompletionCache.make_key('ollama', 'gpt', PARAMS, 'Is the porch light on?')
+    assert key != CompletionCache.make_key('openai', 'gpt', {**PARAMS, 'temperature': 0.1},
+                                           'Is the porch light on?')
+    assert key != CompletionCache.make_key('openai', 'gpt', PARAMS, 'Is the porch light on?',
+                                           [{'role': 'user', 'content': 'hello'}])
+
+    cache = CompletionCache(max_entries=2, ttl=60)
+    for i in range(3):
+        cache.put(f'k{i}', 'openai', {'content': str(i)})
+    assert cache.get('k0', 'openai') is None, "oldest entry should be evicted"
+    assert cache.get('k2', 'openai') == {'content': '2'}
+
+    cache.ttl = 0.01
+    time.sleep(0.02)
+    assert cache.get('k2', 'openai') is None, "expired entry should be dropped"
+
+    stats = cache.get_stats()
+    assert stats['backends']['openai'] == {'hits': 1, 'misses': 2, 'hit_rate': 0.333}
+    print(f"✅ {stats['entries']} entries left, hit rate {stats['backends']['openai']['hit_rate']}")
+
+
+def test_cache_persistence():
+    """Test the cache survives a restart when persisted"""
+    print("\n💾 Testing completion cache persistence")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / 'cache.json')
+        cache = CompletionCache(path=path)
+        cache.put('k', 'hailo', {'content': 'cached'})
+
+        restored = CompletionCache(path=path)
+        assert restored.get('k', 'hailo') == {'content': 'cached'}
+
+        expired = CompletionCache(path=path, ttl=-1)
+        assert expired.get_stats()['entries'] == 0
+    print("✅ Cached completion restored from disk")
+
+
+def test_deferred_saves():
+    """Test completions stored on the event loop are saved together"""
+    print("\n⏱️ Testing deferred cache saves")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'cache.json'
+
+        async def run():
+            cache = CompletionCache(path=str(path), save_delay=0.05)
+            for i in range(50):
+                cache.put(f'k{i}', 'hailo', {'content': f'cached {i}'})
+            written_at_once = path.exists()
+            await asyncio.sleep(0.2)
+            after_delay = cache.saves
+            cache.put('last', 'hailo', {'content': 'cached last'})
+            await cache.close()
+            return cache, written_at_once, after_delay
+
+        cache, written_at_once, after_delay = asyncio.run(run())
+        assert not written_at_once, "the event loop must not write the file"
+        assert after_delay == 1 and cache.saves == 2
+        assert not cache.get_stats()['unsaved_changes']
+        restored = CompletionCache(path=str(path))
+        assert restored.get_stats()['entries'] == 51
+    print(f"✅ 51 completions written in {cache.saves} saves")
+
+
+class CountingBackend(AIBackend):
+    """Backend that counts completions it generates."""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.calls = 0
+
+    async def generate_response(self, prompt, context=None, priority=None):
+        self.calls += 1
+        if prompt == 'fail':
+            return AIResponse(content='', backend='test', model=self.model, error='boom')
+        return AIResponse(content=f'answer {self.calls}', backend='test', model=self.model)
+
+    def is_available(self):
+        return True
+
+    def get_status(self):
+        return {'available': True, 'model': self.model}
+
+
+def test_manager_uses_cache():
+    """Test repeated prompts are answered from the cache"""
+    print("\n🤖 Testing manager completion caching")
+
+    async def run():
+        manager = AIBackendManager({'ai_backend': 'test'})
+        backend = CountingBackend({'ai_model': 'counting'})
+        manager.backends['test'] = backend
+        manager.current_backend = 'test'
+
+        first = await manager.generate_response('Turn on the lights', use_context=False)
+        second = await manager.generate_response('turn on the lights!', use_context=False)
+        chunks = []
+        streamed = await manager.stream_response('Turn on the lights', chunks.append,
+                                                 use_context=False)
+        await manager.generate_response('fail', use_context=False)
+        await manager.generate_response('fail', use_context=False)
+        await manager.close()
+        return backend.calls, first, second, streamed, chunks, manager.completion_cache.get_stats()
+
+    calls, first, second, streamed, chunks, stats = asyncio.run(run())
+    assert calls == 3, "cached prompts must not reach the backend"
+    assert not first.cached and second.cached and streamed.cached
+    assert second.content == streamed.content == first.content
+    assert chunks == [first.content]
+    assert stats['backends']['test']['hits'] == 2
+    print(f"✅ {calls} backend calls, hit rate {stats['backends']['test']['hit_rate']}")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Completion Cache Tests...")
+    test_cache_keys_and_eviction()
+    test_cache_persistence()
+    test_deferred_saves()
+    test_manager_uses_cache()
+    print("\n🎉 All completion cache tests passed!")
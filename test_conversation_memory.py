@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test per-session conversation memory.
+This script checks that sessions keep separate histories, that stores
+stay within their caps and that prompts are trimmed to a token budget
+in linear time.
+"""
+
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+from conversation_memory import ConversationStore, fit_messages, get_token_counter
+from ai_backend_manager import AIBackend, AIBackendManager, AIResponse, OpenAIBackend
+
+
+class EchoBackend(AIBackend):
+    """Backend recording the context it receives."""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.contexts = []
+
+    async def generate_response(self, prompt, context=None, priority=None):
+        self.contexts.append(list(context or []))
+        return AIResponse(content=f'echo {prompt}', backend='echo')
+
+    def is_available(self):
+        return True
+
+    def get_status(self):
+        return {'available': True}
+
+
+def test_sessions_are_separate():
+    """Test each session keeps its own history"""
+    print("🗂️ Testing per-session history")
+
+    async def run():
+        manager = AIBackendManager({'ai_backend': 'echo', 'ai_cache_size': 0})
+        backend = EchoBackend({})
+        manager.backends['echo'] = backend
+        manager.current_backend = 'echo'
+
+        await manager.generate_response('kitchen lights', session='alice')
+        await manager.generate_response('garage door', session='bob')
+        await manager.generate_response('and the hallway?', session='alice')
+        await manager.close()
+        return manager, backend.contexts
+
+    manager, contexts = asyncio.run(run())
+    assert contexts[1] == [], "bob must not see alice's history"
+    assert [m['content'] for m in contexts[2]] == ['kitchen lights', 'echo kitchen lights']
+    assert manager.conversation_history == [], "default session stays empty"
+    manager.clear_conversation_history('alice')
+    assert manager.memory.messages('alice') == []
+    print("✅ Sessions isolated")
+
+
+def test_store_caps():
+    """Test message and session caps"""
+    print("\n📦 Testing memory caps")
+    store = ConversationStore(max_sessions=3, max_messages=4)
+    for i in range(10):
+        store.append(f'session-{i}', 'user', f'message {i}')
+        store.append('busy', 'user', f'message {i}')
+
+    stats = store.get_stats()
+    assert stats['sessions'] == 3
+    assert len(store.messages('busy')) == 4
+    assert store.messages('busy')[-1]['content'] == 'message 9'
+
+    idle = ConversationStore(idle_ttl=0.01)
+    idle.append('old', 'user', 'hi')
+    time.sleep(0.02)
+    idle.append('new', 'user', 'hi')
+    assert idle.messages('old') == [] and idle.get_stats()['sessions'] == 1
+    print(f"✅ {stats['sessions']} sessions kept, {stats['evicted']} evicted")
+
+
+def test_token_budget():
+    """Test prompts are trimmed by tokens, keeping system and prompt"""
+    print("\n✂️ Testing token budget truncation")
+    counter = get_token_counter()
+    history = [{'role': 'system', 'content': 'You help with Home Assistant.'}]
+    history += [{'role': 'user' if i % 2 else 'assistant', 'content': f'turn {i} ' * 20}
+                for i in range(2000)]
+    history.append({'role': 'user', 'content': 'what now?'})
+
+    started = time.perf_counter()
+    fitted = fit_messages(history, 1000, counter)
+    elapsed = time.perf_counter() - started
+
+    assert fitted[0]['role'] == 'system' and fitted[-1]['content'] == 'what now?'
+    assert sum(counter.message_tokens(m) for m in fitted) <= 1000
+    assert fitted[-2] is history[-2], "newest history is kept first"
+    assert elapsed < 0.5
+
+    backend = OpenAIBackend({'openai_api_key': 'k', 'max_context_length': 200,
+                             'max_tokens': 100})
+    body = backend._request_body('x ' * 500, history[1:50])
+    assert body['messages'][-1]['content'] == 'x ' * 500, "the prompt is never dropped"
+    print(f"✅ Kept {len(fitted)} of {len(history)} messages in {elapsed * 1000:.1f} ms "
+          f"({'tiktoken' if counter.exact else 'estimated'} tokens)")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Conversation Memory Tests...")
+    test_sessions_are_separate()
+    test_store_caps()
+    test_token_budget()
+    print("\n🎉 All conversation memory tests passed!")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test rolling conversation summaries.
+This script runs long sessions against recording backends and checks
+that older turns are folded into a summary in the background, that the
+summary is written by the configured summary backend, and that prompt
+tokens per request stay flat instead of growing with the session.
+"""
+
+import sys
+import asyncio
+from pathlib import Path
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+from ai_backend_manager import AIBackend, AIBackendManager, AIResponse
+from conversation_memory import get_token_counter
+
+
+class ChatBackend(AIBackend):
+    """Backend with wordy replies, recording prompt tokens per request."""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.prompt_tokens = []
+
+    async def generate_response(self, prompt, context=None, priority=None):
+        counter = get_token_counter()
+        self.prompt_tokens.append(sum(counter.message_tokens(m) for m in context or [])
+                                  + counter.message_tokens({'content': prompt}))
+        reply = f"The {prompt} is handled by automation.{prompt.split()[-1]} " * 4
+        return AIResponse(content=reply, backend='chat')
+
+    def is_available(self):
+        return True
+
+    def get_status(self):
+        return {'available': True}
+
+
+class SummaryBackend(AIBackend):
+    """Backend answering summary prompts with a short summary."""
+
+    def __init__(self, config, fail=False):
+        super().__init__(config)
+        self.fail = fail
+        self.prompts = []
+
+    async def generate_response(self, prompt, context=None, priority=None):
+        self.prompts.append(prompt)
+        if self.fail:
+            return AIResponse(content='', error='summary model offline', backend='cheap')
+        return AIResponse(content=f'User asked about {len(self.prompts)} rooms.',
+                          backend='cheap')
+
+    def is_available(self):
+        return True
+
+    def get_status(self):
+        return {'available': True}
+
+
+def run_session(turns, recent, fail=False):
+    """Prompt tokens per turn of one long session, and the manager stats."""
+    async def run():
+        manager = AIBackendManager({'ai_backend': 'chat', 'ai_cache_size': 0,
+                                    'conversation_messages': 20,
+                                    'conversation_recent': recent,
+                                    'conversation_summary_backend': 'cheap'})
+        manager.backends['chat'] = chat = ChatBackend({})
+        manager.backends['cheap'] = cheap = SummaryBackend({}, fail)
+        manager.current_backend = 'chat'
+
+        for turn in range(turns):
+            response = await manager.generate_response(f'room {turn} lights',
+                                                       session='s')
+            assert not response.error
+            # Summaries run in the background between turns
+            await asyncio.sleep(0.001)
+        context = manager._context('chat', 'next', 's')
+        await manager.close()
+        stats = manager.summarizer.get_stats()
+        # Summary generations are accounted on the summary backend
+        stats['usage'] = manager.accounting.get_stats('cheap')
+        return chat.prompt_tokens, cheap.prompts, context, stats
+
+    return asyncio.run(run())
+
+
+def test_prompt_tokens_stay_flat():
+    """Test prompt size stops growing once older turns are summarized"""
+    print("📝 Testing prompt tokens over a long session")
+    verbatim, _, _, _ = run_session(30, recent=0)
+    summarized, prompts, context, stats = run_session(30, recent=6)
+
+    assert stats['runs'] >= 5 and stats['failures'] == 0, stats
+    usage = list(stats['usage'].values())
+    assert sum(model['requests'] for model in usage) == len(prompts)
+    assert sum(model['prompt_tokens'] for model in usage) > 0
+    assert context[0]['role'] == 'system' and 'Summary' in context[0]['content']
+    assert len(context) <= 1 + 6 + 4, "summary plus the recent turns"
+    assert 'room 0 lights' in prompts[0] and 'Current summary: (none)' in prompts[0]
+    assert 'User asked about 1 rooms.' in prompts[1], "summaries are incremental"
+
+    late = summarized[10:]
+    assert max(late) - min(late) < max(late) * 0.5, late
+    assert max(late) < max(verbatim[10:]) * 0.6, (max(late), max(verbatim))
+    print(f"✅ Prompt tokens {min(late)}-{max(late)} with summaries vs up to "
+          f"{max(verbatim)} verbatim; {stats['folded']} messages folded in {stats['runs']} summaries")
+
+
+def test_failed_summary_keeps_history():
+    """Test a failing summary backend leaves the history untouched"""
+    print("\n🛟 Testing summary failures")
+    tokens, prompts, context, stats = run_session(12, recent=6, fail=True)
+    assert stats['failures'] >= 1 and stats['folded'] == 0
+    assert sum(model['errors'] for model in stats['usage'].values()) == stats['failures']
+    assert all(message['role'] != 'system' for message in context)
+    assert len(context) == 20 and len(tokens) == 12
+    print(f"✅ {stats['failures']} failed summaries, history kept")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Conversation Summary Tests...")
+    test_prompt_tokens_stay_flat()
+    test_failed_summary_keeps_history()
+    print("\n🎉 All conversation summary tests passed!")
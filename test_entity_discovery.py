@@ -13,6 +13,7 @@ sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
 
 from ha_client import HomeAssistantClient
 from automation_manager import AutomationManager
+from entity_store import EntitySnapshot, EntityQuery, EntityStore
 
 async def test_entity_discovery():
     """Test the entity discovery system"""
@@ -94,11 +95,103 @@ async def test_entity_discovery():
     
     return True
 
+
+def test_entity_store_queries():
+    """Test paged, filtered and projected queries on the entity store"""
+    print("\n📚 Testing Indexed Entity Store")
+    states = [
+        {
+            'entity_id': f'{domain}.device_{i:04d}',
+            'state': 'on' if i % 2 else 'off',
+            'attributes': {
+                'friendly_name': f'Kitchen {i}' if i % 10 == 0 else f'Hall {i}',
+                'device_class': 'motion' if domain == 'binary_sensor' else None
+            }
+        }
+        for domain in ('light', 'binary_sensor')
+        for i in range(1000)
+    ]
+    snapshot = EntitySnapshot(states, areas={'light.device_0010': 'kitchen'}, version=1)
+    
+    # Walk every page of one domain and check nothing is skipped or repeated
+    seen = []
+    cursor = None
+    while True:
+        args = {'limit': '128', 'fields': 'state'}
+        if cursor:
+            args['cursor'] = cursor
+        page = snapshot.query(EntityQuery.from_args(args, domain='light'))
+        assert all(set(e) == {'entity_id', 'state'} for e in page['entities'])
+        seen.extend(e['entity_id'] for e in page['entities'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert len(seen) == 1000 and seen == sorted(set(seen))
+    print(f"   ✅ Paged through {len(seen)} lights")
+    
+    page = snapshot.query(EntityQuery.from_args(
+        {'state': 'off', 'q': 'kitchen', 'device_class': 'motion'}))
+    assert page['count'] == 100
+    assert all(e['domain'] == 'binary_sensor' for e in page['entities'])
+    print(f"   ✅ Filtered to {page['count']} off kitchen motion sensors")
+    
+    page = snapshot.query(EntityQuery.from_args({'area': 'kitchen'}))
+    assert [e['entity_id'] for e in page['entities']] == ['light.device_0010']
+    print("   ✅ Area filter")
+
+
+def test_entity_store_area_refresh():
+    """Test the store follows area moves that leave the states unchanged"""
+    print("\n🏠 Testing Entity Store area refresh")
+
+    class FakeClient:
+        def __init__(self):
+            self.areas = {'light.lamp': 'kitchen'}
+            self.area_reads = 0
+
+        async def get_states_version(self):
+            return 1
+
+        async def get_states(self):
+            return [{'entity_id': 'light.lamp', 'state': 'on', 'attributes': {}}]
+
+        async def get_entity_areas(self):
+            self.area_reads += 1
+            return dict(self.areas)
+
+    async def areas_of(store, client):
+        snapshot = await store.refresh(client)
+        return snapshot, sorted(snapshot.by_area)
+
+    async def run():
+        client = FakeClient()
+        cached = EntityStore()
+        first, areas = await areas_of(cached, client)
+        assert areas == ['kitchen']
+        client.areas['light.lamp'] = 'office'
+        again, areas = await areas_of(cached, client)
+        assert again is first and areas == ['kitchen'] and client.area_reads == 1
+
+        store = EntityStore(areas_ttl=0)
+        first, areas = await areas_of(store, client)
+        client.areas['light.lamp'] = 'bedroom'
+        moved, areas = await areas_of(store, client)
+        assert moved is not first and areas == ['bedroom'], areas
+        same, _ = await areas_of(store, client)
+        assert same is moved, "unchanged areas should not rebuild the snapshot"
+        return moved.version
+
+    version = asyncio.run(run())
+    print(f"   ✅ Area move picked up, snapshot version {version}")
+
+
 if __name__ == "__main__":
     print("Starting Entity Discovery Test...")
     
     try:
         asyncio.run(test_entity_discovery())
+        test_entity_store_queries()
+        test_entity_store_area_refresh()
         print("\n🚀 Test completed successfully!")
         print("The AI add-on can now see and use your HA entities!")
         
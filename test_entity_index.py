@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Test the entity retrieval index.
+This script checks that queries retrieve the relevant entities, also from
+long requests full of filler words, that the index follows entity additions, renames and removals without
+re-indexing on state changes, that retrieved entities reach the backend
+after the conversation history, and measures build time, search latency
+and memory at 12,000 entities with float32 and int8 vectors.
+"""
+
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+from entity_index import EntityIndex, MIN_SCORE, format_entities, vectorize
+from entity_store import EntitySnapshot
+from ai_backend_manager import AIBackend, AIBackendManager, AIResponse
+
+ROOMS = ['kitchen', 'bedroom', 'garage', 'office', 'porch', 'hallway', 'bathroom', 'attic']
+KINDS = [('sensor', 'temperature'), ('sensor', 'humidity'), ('binary_sensor', 'motion'),
+         ('binary_sensor', 'door'), ('light', None), ('switch', None)]
+
+
+def make_states(count):
+    states, areas = [], {}
+    for i in range(count):
+        room = ROOMS[i % len(ROOMS)]
+        domain, device_class = KINDS[(i // len(ROOMS)) % len(KINDS)]
+        name = f"{room} {device_class or domain} {i}"
+        entity_id = f"{domain}.{name.replace(' ', '_')}"
+        attributes = {'friendly_name': name.title()}
+        if device_class:
+            attributes['device_class'] = device_class
+        states.append({'entity_id': entity_id, 'state': 'on', 'attributes': attributes})
+        areas[entity_id] = room
+    return states, areas
+
+
+def test_relevant_entities():
+    """Test queries retrieve entities by name, area and device class"""
+    print("🔎 Testing entity retrieval")
+    snapshot = EntitySnapshot(*make_states(96), version=1)
+    index = EntityIndex()
+    assert index.sync(snapshot.records) == (96, 0)
+
+    hits = [entity_id for entity_id, _ in index.search('kitchen temperature', 2)]
+    assert all(e.startswith('sensor.kitchen_temperature') for e in hits), hits
+    # Trigrams match partial words
+    hits = [entity_id for entity_id, _ in index.search('garage temp', 2)]
+    assert hits[0].startswith('sensor.garage_temperature'), hits
+    assert index.search('zzz qqq', 3) == []
+
+    text = format_entities([snapshot.get(hits[0])])
+    assert text.splitlines()[1].startswith(f"- {hits[0]} (") and text.endswith(': on')
+    print(f"✅ 'garage temp' -> {hits[0]}")
+
+
+def test_incremental_updates():
+    """Test only changed entities are re-indexed"""
+    print("\n♻️ Testing incremental updates")
+    states, areas = make_states(200)
+    index = EntityIndex(quantize=True)
+    index.sync(EntitySnapshot(states, areas, 1).records)
+
+    for state in states:
+        state['state'] = 'off'
+    assert index.sync(EntitySnapshot(states, areas, 2).records) == (0, 0)
+
+    renamed = states[0]['entity_id']
+    states[0]['attributes']['friendly_name'] = 'Wine Cellar Sensor'
+    removed = states.pop()['entity_id']
+    states.append({'entity_id': 'sensor.pool_ph', 'state': '7.2',
+                   'attributes': {'friendly_name': 'Pool pH'}})
+    assert index.sync(EntitySnapshot(states, areas, 3).records) == (2, 1)
+
+    assert removed not in index and len(index) == 200
+    assert index.search('wine cellar', 1)[0][0] == renamed
+    assert index.search('pool ph', 1)[0][0] == 'sensor.pool_ph'
+    assert index.updates == 202 and index.removals == 1
+    print("✅ 2 entities re-indexed and 1 removed; state changes ignored")
+
+
+def test_long_requests():
+    """Test filler words of long requests do not drown the entity terms"""
+    print("\n📝 Testing long automation requests at 2,000 entities")
+    states, areas = make_states(1800)
+    for i in range(200):
+        states.append({'entity_id': f'sensor.washing_machine_power_{i}', 'state': '5',
+                       'attributes': {'friendly_name': f'Washing Machine Power {i}',
+                                      'device_class': 'power'}})
+    index = EntityIndex()
+    index.sync(EntitySnapshot(states, areas, 1).records)
+
+    kitchen = ("Create an automation that turns on the kitchen lights when motion is "
+               "detected in the kitchen after sunset, and turns them off again after "
+               "five minutes without motion")
+    garage = ("Can you let me know whenever the garage door has been left open for "
+              "more than ten minutes at night?")
+    assert index.query_terms(kitchen) == ['kitchen', 'lights', 'motion']
+    assert index.query_terms(garage) == ['garage', 'door']
+
+    hits = [entity_id for entity_id, _ in index.search(kitchen, 8)]
+    assert len(hits) == 8 and any(e.startswith('light.kitchen_light') for e in hits), hits
+    assert all(e.startswith(('light.kitchen_light', 'binary_sensor.kitchen_motion'))
+               for e in hits), hits
+    hits = [entity_id for entity_id, _ in index.search(garage, 8)]
+    assert len(hits) == 8 and all(e.startswith('binary_sensor.garage_door') for e in hits), hits
+
+    # Scored as a whole, the request matches nothing above the threshold
+    vectors = index._vectors[:len(index)]
+    assert float((vectors @ vectorize(garage)).max()) < MIN_SCORE
+    print(f"✅ Long requests reduced to {index.query_terms(kitchen)} and "
+          f"{index.query_terms(garage)}")
+
+
+class EchoBackend(AIBackend):
+    """Backend recording the context it receives."""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.contexts = []
+
+    async def generate_response(self, prompt, context=None, priority=None):
+        self.contexts.append(list(context or []))
+        return AIResponse(content=f'echo {prompt}', backend='echo')
+
+    def is_available(self):
+        return True
+
+    def get_status(self):
+        return {'available': True}
+
+
+def test_entities_reach_backend():
+    """Test retrieved entities follow the history and are not remembered"""
+    print("\n📨 Testing entity context in prompts")
+
+    async def run():
+        manager = AIBackendManager({'ai_backend': 'echo', 'ai_cache_size': 0,
+                                    'ai_system_prompt': 'Be brief.'})
+        manager.backends['echo'] = backend = EchoBackend({})
+        manager.current_backend = 'echo'
+        entities = [{'role': 'system', 'content': '- light.porch (Porch): off'}]
+        await manager.generate_response('hello', session='s')
+        await manager.generate_response('is the porch light on?', session='s',
+                                        extra_context=entities)
+        await manager.close()
+        return backend.contexts[-1], manager.memory.messages('s')
+
+    context, history = asyncio.run(run())
+    assert [m['content'] for m in context] == ['Be brief.', 'hello', 'echo hello',
+                                                '- light.porch (Porch): off']
+    assert all('light.porch' not in m['content'] for m in history)
+    print("✅ Prefix, history, then retrieved entities")
+
+
+def test_scale():
+    """Test latency and memory at 12,000 entities"""
+    print("\n📏 Testing 12,000 entities")
+    snapshot = EntitySnapshot(*make_states(12000), version=1)
+    queries = ['kitchen temperature', 'is the garage door open', 'bedroom lights',
+               'attic humidity', 'motion in the hallway']
+    results = {}
+    for quantize in (False, True):
+        index = EntityIndex(quantize=quantize)
+        started = time.perf_counter()
+        index.sync(snapshot.records)
+        build = time.perf_counter() - started
+        hits = {}
+        for _ in range(20):
+            for query in queries:
+                hits[query] = [e for e, _ in index.search(query, 8)]
+        results[quantize] = (build, index.get_stats(), hits)
+
+    (build, floats, float_hits), (_, ints, int_hits) = results[False], results[True]
+    assert ints['memory_kb'] < floats['memory_kb'] / 3.5
+    # Hundreds of entities of one kind tie, so compare kinds rather than ids
+    for query in queries:
+        kinds = [{e.rsplit('_', 1)[0] for e in hits[query]} for hits in (float_hits, int_hits)]
+        assert len(int_hits[query]) == 8 and kinds[0] == kinds[1], (query, kinds)
+    assert all(e.startswith('sensor.kitchen_temperature') for e in float_hits['kitchen temperature'])
+    assert floats['search']['p95_ms'] < 50 and ints['search']['p95_ms'] < 50
+    print(f"✅ float32: {floats['memory_kb'] / 1024:.1f} MB, search p95 {floats['search']['p95_ms']} ms; "
+          f"int8: {ints['memory_kb'] / 1024:.1f} MB, p95 {ints['search']['p95_ms']} ms; "
+          f"built in {build:.2f} s")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Entity Index Tests...")
+    test_relevant_entities()
+    test_incremental_updates()
+    test_long_requests()
+    test_entities_reach_backend()
+    test_scale()
+    print("\n🎉 All entity index tests passed!")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test the Hailo autoregressive decode loop.
+This script checks top-k/top-p sampling, runs generation against a
+synthetic infer model to verify streaming, stop conditions, binding and
+KV cache reuse across turns, and reports decode tokens per second.
+"""
+
+import sys
+import asyncio
+import threading
+from pathlib import Path
+
+import numpy as np
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+from hailo_decoder import HailoDecoder, SamplingParams, SyntheticInferModel, sample_token
+from hailo_tokenizer import ByteTokenizer
+from ai_backend_manager import HailoBackend
+
+REPLY = "The kitchen lights are on. ✓"
+
+
+class SyntheticHailoBackend(HailoBackend):
+    """Hailo backend running on the synthetic infer model."""
+
+    def __init__(self, config, reply=REPLY, **model_options):
+        super().__init__(config)
+        self.infer_model = SyntheticInferModel(self.tokenizer, reply, **model_options)
+        self.seq_len = self._model_seq_len()
+        self.max_context_length = self.infer_model.context_len
+        self.decoder = self._create_decoder()
+
+    def is_available(self):
+        return True
+
+
+def test_sampling():
+    """Test greedy, top-k and top-p token selection"""
+    print("🎲 Testing sampling")
+    rng = np.random.default_rng(0)
+    logits = np.array([1.0, 4.0, 3.9, 0.5, 3.8], dtype=np.float32)
+
+    assert sample_token(logits, SamplingParams(temperature=0), rng) == 1
+    picks = {sample_token(logits, SamplingParams(temperature=1.0, top_k=2, top_p=1.0), rng)
+             for _ in range(500)}
+    assert picks == {1, 2}, picks
+
+    peaked = np.array([0.0, 10.0, 0.0, 0.0], dtype=np.float32)
+    picks = {sample_token(peaked, SamplingParams(temperature=1.0, top_k=0, top_p=0.5), rng)
+             for _ in range(200)}
+    assert picks == {1}, "top-p keeps only the dominant token"
+
+    flat = np.zeros(8, dtype=np.float32)
+    counts = np.bincount([sample_token(flat, SamplingParams(temperature=1.0, top_k=0, top_p=1.0), rng)
+                          for _ in range(4000)], minlength=8)
+    assert counts.min() > 350, counts
+    print("✅ Sampling respects temperature, top-k and top-p")
+
+
+def test_generation_stops():
+    """Test EOS and max_tokens stop generation"""
+    print("\n🛑 Testing stop conditions")
+    tokenizer = ByteTokenizer()
+    model = SyntheticInferModel(tokenizer, REPLY, seq_len=16)
+    decoder = HailoDecoder(model, tokenizer, 16, model.context_len)
+    params = SamplingParams(temperature=0)
+
+    streamed = []
+    result = decoder.generate('user: lights?\nassistant:', 256, params, streamed.append)
+    assert result.stop_reason == 'eos'
+    assert tokenizer.decode(result.tokens) == ''.join(streamed) == REPLY
+
+    result = decoder.generate('user: lights?\nassistant:', 5, params)
+    assert result.stop_reason == 'max_tokens' and len(result.tokens) == 5
+
+    stop = threading.Event()
+    stop.set()
+    result = decoder.generate('user: lights?\nassistant:', 256, params, stop=stop)
+    assert result.stop_reason == 'cancelled' and not result.tokens
+    assert model.bindings_created == 1, "bindings are created once"
+    print(f"✅ Stopped on eos, max_tokens and cancel with {model.infer_calls} infer calls")
+
+
+def test_kv_cache_reuse():
+    """Test a follow-up turn only prefills the new tokens"""
+    print("\n♻️ Testing KV cache reuse across turns")
+    backend = SyntheticHailoBackend({'ai_model': 'test', 'model_path': '/nonexistent',
+                                     'temperature': 0.0}, seq_len=32, context_len=2048)
+    model = backend.infer_model
+    history = [{'role': 'system', 'content': 'You help with Home Assistant. ' * 20}]
+
+    async def run():
+        first = await backend.generate_response('turn on the lights', history)
+        processed = model.tokens_processed
+        history.extend([{'role': 'user', 'content': 'turn on the lights'},
+                         {'role': 'assistant', 'content': first.content}])
+        second = await backend.generate_response('and the fan', history)
+        return first, second, processed, model.tokens_processed - processed
+
+    first, second, first_processed, second_processed = asyncio.run(run())
+    stats = backend.decoder.get_stats()
+    assert first.content == second.content == REPLY and not first.error
+    assert first.usage['completion_tokens'] == len(REPLY.encode('utf-8'))
+    assert stats['tokens_reused'] > 600, stats
+    assert second_processed < first_processed / 2, (first_processed, second_processed)
+    assert model.bindings_created == 1
+    print(f"✅ Second turn processed {second_processed} tokens instead of "
+          f"{first_processed} ({stats['tokens_reused']} reused)")
+
+
+def test_streaming_throughput():
+    """Test streamed chunks and report decode tokens per second"""
+    print("\n⚡ Testing streaming throughput")
+    reply = "Motion detected in the hallway, turning on the lights. " * 4
+    backend = SyntheticHailoBackend({'ai_model': 'test', 'model_path': '/nonexistent',
+                                     'max_tokens': 1024}, reply=reply, step_delay=0.0005)
+
+    async def run():
+        return [chunk async for chunk in backend.stream_response('what happened?')]
+
+    chunks = asyncio.run(run())
+    text = ''.join(chunk.text for chunk in chunks)
+    assert text == reply
+    assert len(chunks) > 100, "text should arrive token by token"
+    assert chunks[-1].usage['completion_tokens'] == len(reply)
+    stats = backend.decoder.get_stats()
+    assert stats['last_tokens_per_second'] > 0
+    print(f"✅ {len(chunks) - 1} chunks at {stats['last_tokens_per_second']:,.0f} tok/s, "
+          f"{stats['decode_step_ms']} ms per step")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Decoder Tests...")
+    test_sampling()
+    test_generation_stops()
+    test_kv_cache_reuse()
+    test_streaming_throughput()
+    print("\n🎉 All decoder tests passed!")
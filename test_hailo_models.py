@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Test the Hailo multi-model cache.
+This script creates HEF placeholder files, loads them through a simulated
+loader, and checks LRU eviction within the memory budget, also with
+concurrent loads, hot switching
+of the Hailo backend, background preloading of the next likely model and
+the reported load and switch timings.
+"""
+
+import sys
+import time
+import asyncio
+import threading
+import tempfile
+from pathlib import Path
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+from hailo_models import HailoModelManager
+from hailo_decoder import SyntheticInferModel
+from hailo_tokenizer import ByteTokenizer
+from ai_backend_manager import HailoBackend
+
+MB = 1024 * 1024
+
+
+class SimulatedLoader:
+    """Loader with parse and configure costs, replying with the model name."""
+
+    def __init__(self, parse_delay=0.02, configure_delay=0.03):
+        self.parse_delay = parse_delay
+        self.configure_delay = configure_delay
+        self.parsed = []
+        self.released = []
+
+    def parse(self, path):
+        time.sleep(self.parse_delay)
+        self.parsed.append(Path(path).stem)
+        return Path(path).stem
+
+    def configure(self, hef):
+        time.sleep(self.configure_delay)
+        return SyntheticInferModel(ByteTokenizer(), f"This is {hef}.", seq_len=32)
+
+    def release(self, infer_model):
+        self.released.append(infer_model)
+
+
+def write_models(directory, sizes):
+    for name, size in sizes.items():
+        with open(Path(directory) / f'{name}.hef', 'wb') as f:
+            f.truncate(size)
+
+
+class SimulatedHailoBackend(HailoBackend):
+    """Hailo backend whose models come from the simulated loader."""
+
+    def __init__(self, config, loader):
+        super().__init__(config)
+        self.models = HailoModelManager(self.model_path, loader, self._build_runtime,
+                                        self.model_memory, self.preload_models)
+        self._activate(self.models.switch(self.model))
+
+    def is_available(self):
+        return True
+
+
+def test_lru_within_budget():
+    """Test resident models stay within the budget, evicting the LRU"""
+    print("🗄️ Testing LRU eviction within the memory budget")
+    with tempfile.TemporaryDirectory() as directory:
+        write_models(directory, {'a': 40 * MB, 'b': 40 * MB, 'c': 40 * MB})
+        loader = SimulatedLoader(0, 0)
+        manager = HailoModelManager(directory, loader, memory_budget=100 * MB)
+
+        manager.switch('a')
+        manager.get('b')
+        manager.switch('a')
+        manager.get('c')
+
+        stats = manager.get_stats()
+        assert stats['resident'] == ['a', 'c'], stats['resident']
+        assert stats['used_mb'] <= stats['budget_mb']
+        assert stats['models']['b']['evictions'] == 1 and len(loader.released) == 1
+        assert stats['models']['a']['hits'] == 1, "second switch to a is a cache hit"
+
+        try:
+            manager.switch('missing')
+            assert False, "missing models must raise"
+        except FileNotFoundError:
+            pass
+        assert manager.active == 'a'
+        manager.close()
+    print(f"✅ Resident {stats['resident']} using {stats['used_mb']} of {stats['budget_mb']} MB")
+
+
+def test_concurrent_loads_within_budget():
+    """Test two models loading at once cannot both take the free room"""
+    print("\n🧮 Testing concurrent loads against the memory budget")
+    with tempfile.TemporaryDirectory() as directory:
+        write_models(directory, {'a': 40 * MB, 'b': 40 * MB, 'c': 40 * MB})
+        loader = SimulatedLoader(0.05, 0)
+        manager = HailoModelManager(directory, loader, memory_budget=100 * MB)
+        manager.switch('a')
+
+        peak = []
+        parse = loader.parse
+
+        def parse_and_measure(path):
+            hef = parse(path)
+            peak.append(manager.used_memory)
+            return hef
+
+        loader.parse = parse_and_measure
+        threads = [threading.Thread(target=manager.get, args=(name,)) for name in 'bc']
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = manager.get_stats()
+        assert max(peak) <= 100 * MB, [used / MB for used in peak]
+        assert stats['used_mb'] <= stats['budget_mb'] and stats['loading_mb'] == 0
+        assert len(stats['resident']) == 2 and 'a' in stats['resident'], stats['resident']
+        manager.close()
+    print(f"✅ Peak {max(peak) / MB:.0f} MB of 100 MB; resident {stats['resident']}")
+
+
+def test_hot_swap_and_preload():
+    """Test switching the backend model without a restart, with preloading"""
+    print("\n🔁 Testing hot swap and preloading")
+    with tempfile.TemporaryDirectory() as directory:
+        write_models(directory, {'small': 1 * MB, 'large': 2 * MB, 'other': 1 * MB})
+        loader = SimulatedLoader()
+        backend = SimulatedHailoBackend({'ai_model': 'small', 'model_path': directory,
+                                         'temperature': 0.0, 'hailo_models': ['large']},
+                                        loader)
+
+        async def run():
+            first = await backend.generate_response('who are you?')
+            # 'large' was preloaded after the first switch
+            for _ in range(100):
+                if backend.models.is_resident('large'):
+                    break
+                await asyncio.sleep(0.01)
+            started = time.perf_counter()
+            assert await backend.switch_model('large')
+            warm_switch = time.perf_counter() - started
+            second = await backend.generate_response('who are you?')
+            assert not await backend.switch_model('missing')
+            return first, second, warm_switch
+
+        first, second, warm_switch = asyncio.run(run())
+        stats = backend.models.get_stats()['models']
+        asyncio.run(backend.close())
+
+    assert first.content == 'This is small.' and second.content == 'This is large.'
+    assert backend.model == 'large'
+    assert stats['large']['preloads'] == 1 and stats['large']['hits'] == 1
+    assert loader.parsed.count('large') == 1, "a resident model is not parsed again"
+    cold = stats['small']['parse_ms'] + stats['small']['configure_ms']
+    assert warm_switch * 1000 < cold / 2
+    print(f"✅ Cold load {cold:.0f} ms (parse {stats['small']['parse_ms']} ms, configure "
+          f"{stats['small']['configure_ms']} ms); warm switch {warm_switch * 1000:.2f} ms")
+
+
+def test_predicts_next_model():
+    """Test the most frequent next model is preloaded after a switch"""
+    print("\n🔮 Testing next model prediction")
+    with tempfile.TemporaryDirectory() as directory:
+        write_models(directory, {'chat': MB, 'code': MB, 'vision': MB})
+        manager = HailoModelManager(directory, SimulatedLoader(0, 0), memory_budget=2 * MB)
+        for name in ['chat', 'code', 'chat', 'code', 'chat', 'vision', 'chat']:
+            manager.switch(name)
+
+        assert manager.predict_next('chat') == 'code'
+        for _ in range(100):
+            if manager.is_resident('code'):
+                break
+            time.sleep(0.01)
+        assert manager.get_stats()['resident'] == ['chat', 'code']
+        manager.close()
+    print("✅ 'code' preloaded after switching to 'chat'")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Model Cache Tests...")
+    test_lru_within_budget()
+    test_concurrent_loads_within_budget()
+    test_hot_swap_and_preload()
+    test_predicts_next_model()
+    print("\n🎉 All model cache tests passed!")
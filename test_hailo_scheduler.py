@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Test micro-batching of Hailo device calls.
+This script checks that requests arriving together share a batch, that
+results reach the right callers and that priority classes are served
+first, also through the Hailo backend, then compares throughput and latency of batched and unbatched
+generation under synthetic load on a simulated device.
+"""
+
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+from hailo_scheduler import BatchScheduler
+from hailo_decoder import HailoDecoder, SamplingParams, SyntheticInferModel
+from hailo_tokenizer import ByteTokenizer
+from metrics import LatencyStats
+from ai_backend_manager import HailoBackend
+
+REPLY = "Turning on the hallway lights for five minutes."
+
+
+def test_batches_and_scatter():
+    """Test concurrent requests share a batch and get their own results"""
+    print("📦 Testing batch collection and scatter")
+    batches = []
+
+    def run_batch(requests):
+        batches.append(list(requests))
+        return [request * 10 for request in requests]
+
+    scheduler = BatchScheduler(run_batch, max_batch_size=4, batch_window=0.05)
+    with ThreadPoolExecutor(6) as pool:
+        results = list(pool.map(scheduler.run, range(6)))
+    scheduler.close()
+
+    assert results == [i * 10 for i in range(6)]
+    assert max(len(batch) for batch in batches) == 4
+    assert len(batches) <= 3, batches
+    stats = scheduler.get_stats()
+    assert stats['requests'] == 6 and stats['avg_batch_size'] >= 2
+    print(f"✅ 6 requests in {stats['batches']} batches")
+
+
+def test_priorities_and_errors():
+    """Test higher priority classes are batched first and errors propagate"""
+    print("\n🚦 Testing priority classes and errors")
+    order = []
+    release = threading.Event()
+
+    def run_batch(requests):
+        if requests == ['block']:
+            release.wait(1)
+        if 'fail' in requests:
+            raise RuntimeError('device error')
+        if 'short' in requests:
+            return []
+        order.extend(requests)
+        return requests
+
+    scheduler = BatchScheduler(run_batch, max_batch_size=1, batch_window=0,
+                               priorities=('interactive', 'background'))
+    blocker = scheduler.submit('block')
+    time.sleep(0.05)
+    futures = [scheduler.submit('slow', 'background'),
+               scheduler.submit('fast', 'interactive')]
+    release.set()
+    for future in [blocker] + futures:
+        future.result(1)
+    assert order == ['block', 'fast', 'slow'], order
+
+    try:
+        scheduler.run('fail')
+        assert False, "errors must reach the caller"
+    except RuntimeError as e:
+        assert str(e) == 'device error'
+    try:
+        # A result missing from the batch fails its caller instead of hanging
+        scheduler.submit('short').result(1)
+        assert False, "requests without a result must fail"
+    except RuntimeError as e:
+        assert 'returned 0 results' in str(e)
+    stats = scheduler.get_stats()
+    scheduler.close()
+    assert stats['errors'] == 2 and stats['per_class']['background'] == 1
+    print("✅ Interactive served before background; errors raised to callers")
+
+
+class SyntheticHailoBackend(HailoBackend):
+    """Hailo backend on a synthetic device, one request per device call."""
+
+    def __init__(self, config, **model_options):
+        super().__init__(config)
+        self.infer_model = SyntheticInferModel(self.tokenizer, REPLY, **model_options)
+        self.seq_len = self._model_seq_len()
+        self.max_context_length = self.infer_model.context_len
+        self.decoder = self._create_decoder()
+
+    def is_available(self):
+        return True
+
+
+def test_backend_priorities():
+    """Test the backend schedules device calls in the request's class"""
+    print("\n🚥 Testing priority classes through the Hailo backend")
+    backend = SyntheticHailoBackend({'ai_model': 'test', 'model_path': '/nonexistent',
+                                     'temperature': 0.0, 'hailo_batch_size': 1},
+                                    seq_len=16, context_len=256, step_delay=0.002)
+    finished = []
+
+    async def generate(name, priority):
+        response = await backend.generate_response(f'query {name}', priority=priority)
+        assert response.content == REPLY and not response.error
+        finished.append(name)
+
+    async def run():
+        # The background job holds the device; both others queue behind it
+        first = asyncio.create_task(generate('background-1', 'background'))
+        await asyncio.sleep(0.02)
+        await asyncio.gather(first, generate('background-2', 'background'),
+                             generate('interactive', 'interactive'))
+
+    try:
+        asyncio.run(run())
+        stats = backend.decoder.get_stats()['batching']
+    finally:
+        backend.decoder.close()
+    assert finished == ['background-1', 'interactive', 'background-2'], finished
+    assert stats['per_class']['interactive'] > 0 and stats['per_class']['background'] > 0
+    print(f"✅ Finished in order {finished}; device calls per class {stats['per_class']}")
+
+
+def run_load(batch_size, clients=8, step_delay=0.002):
+    """Generate concurrently and return tokens/s and latency stats."""
+    tokenizer = ByteTokenizer()
+    model = SyntheticInferModel(tokenizer, REPLY, seq_len=64, context_len=256,
+                                batch_size=8, step_delay=step_delay)
+    decoder = HailoDecoder(model, tokenizer, 64, 256, batch_size=batch_size,
+                           batch_window=0.001)
+    latency = LatencyStats()
+    params = SamplingParams(temperature=0)
+
+    def client(i):
+        started = time.perf_counter()
+        result = decoder.generate(f'user: query {i}\nassistant:', 64, params)
+        latency.record(time.perf_counter() - started)
+        return result
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        results = list(pool.map(client, range(clients)))
+    elapsed = time.perf_counter() - started
+    decoder.close()
+
+    for result in results:
+        assert tokenizer.decode(result.tokens) == REPLY
+    tokens = sum(len(result.tokens) for result in results)
+    return tokens / elapsed, latency.summary(), decoder.get_stats()['batching'], model
+
+
+def test_batched_throughput():
+    """Compare batched and unbatched generation on a simulated device"""
+    print("\n⚡ Testing throughput under synthetic load")
+    single_rate, single_latency, _, single_model = run_load(batch_size=1)
+    batched_rate, batched_latency, batching, batched_model = run_load(batch_size=8)
+
+    assert batched_model.infer_calls < single_model.infer_calls / 2
+    assert batched_rate > single_rate * 2, (single_rate, batched_rate)
+    assert batching['avg_batch_size'] > 2
+    print(f"✅ batch 1: {single_rate:,.0f} tok/s, p95 {single_latency['p95_ms']} ms, "
+          f"{single_model.infer_calls} device calls")
+    print(f"✅ batch 8: {batched_rate:,.0f} tok/s, p95 {batched_latency['p95_ms']} ms, "
+          f"{batched_model.infer_calls} device calls, "
+          f"avg batch {batching['avg_batch_size']}")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Batch Scheduler Tests...")
+    test_batches_and_scatter()
+    test_priorities_and_errors()
+    test_backend_priorities()
+    test_batched_throughput()
+    print("\n🎉 All batch scheduler tests passed!")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test the Hailo model tokenizer and input tensor preparation.
+This script builds small tokenizer.json files, checks deterministic
+round trips, buffer filling and incremental decoding, and reports encode and
+decode throughput in tokens per second.
+"""
+
+import sys
+import json
+import time
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+from hailo_tokenizer import ByteTokenizer, IncrementalDetokenizer, _bytes_to_unicode, load_tokenizer
+
+TEXT = "Turn on the kitchen lights when motion is detected after sunset. Ünïcode ✓"
+
+
+def write_byte_level(directory):
+    """A GPT-2 style byte-level BPE tokenizer.json."""
+    symbols = list(_bytes_to_unicode().values())
+    merges = [('Ġ', 't'), ('h', 'e'), ('Ġt', 'he'), ('i', 'n'), ('Ġ', 'l'), ('o', 'n')]
+    vocab = {symbol: i for i, symbol in enumerate(symbols)}
+    for left, right in merges:
+        vocab[left + right] = len(vocab)
+    data = {
+        'model': {'type': 'BPE', 'vocab': vocab, 'merges': [f'{a} {b}' for a, b in merges]},
+        'added_tokens': [{'id': len(vocab), 'content': '<|endoftext|>', 'special': True}],
+        'pre_tokenizer': {'type': 'ByteLevel'},
+        'decoder': {'type': 'ByteLevel'}
+    }
+    (Path(directory) / 'tokenizer.json').write_text(json.dumps(data))
+
+
+def write_metaspace(directory):
+    """A SentencePiece-style BPE tokenizer.json with byte fallback."""
+    vocab = {'<unk>': 0, '<s>': 1, '</s>': 2}
+    for b in range(256):
+        vocab[f'<0x{b:02X}>'] = len(vocab)
+    for symbol in '▁abcdefghijklmnopqrstuvwxyzT.':
+        vocab.setdefault(symbol, len(vocab))
+    merges = [('▁', 't'), ('h', 'e'), ('▁t', 'he'), ('i', 'n')]
+    for left, right in merges:
+        vocab[left + right] = len(vocab)
+    data = {
+        'model': {'type': 'BPE', 'vocab': vocab, 'merges': [[a, b] for a, b in merges]},
+        'added_tokens': [{'id': 1, 'content': '<s>', 'special': True},
+                         {'id': 2, 'content': '</s>', 'special': True}]
+    }
+    (Path(directory) / 'tokenizer.json').write_text(json.dumps(data))
+
+
+def test_tokenizers_round_trip():
+    """Test BPE and byte tokenizers encode deterministically and reversibly"""
+    print("🔤 Testing tokenizer round trips")
+    with tempfile.TemporaryDirectory() as byte_dir, tempfile.TemporaryDirectory() as meta_dir:
+        write_byte_level(byte_dir)
+        write_metaspace(meta_dir)
+        tokenizers = [load_tokenizer(byte_dir), load_tokenizer(meta_dir), ByteTokenizer()]
+
+    for tokenizer in tokenizers:
+        ids = tokenizer.encode(TEXT)
+        assert ids == tokenizer.encode(TEXT), "encoding must be deterministic"
+        assert tokenizer.decode(ids) == TEXT, (tokenizer.name, tokenizer.decode(ids))
+        assert tokenizer.eos_id is not None
+        print(f"✅ {tokenizer.name}: {len(ids)} tokens")
+
+    byte_level, metaspace, _ = tokenizers
+    assert len(byte_level.encode(' the')) == 1, "merges should apply"
+    assert metaspace.encode('the') == [metaspace.vocab['▁the']]
+    assert load_tokenizer('/nonexistent').name == 'bytes'
+
+
+def test_input_buffers_and_decoding():
+    """Test encoding into reused int32 buffers and incremental decoding"""
+    print("\n🧮 Testing input buffers and incremental decoding")
+    tokenizer = ByteTokenizer()
+    buffer = np.zeros(16, dtype=np.int32)
+
+    assert tokenizer.encode_into('short', buffer) == 6
+    assert buffer[0] == tokenizer.bos_id and buffer[6] == tokenizer.pad_id
+
+    tokenizer.encode_into('a much longer input than sixteen bytes', buffer)
+    assert tokenizer.decode(buffer) == 'an sixteen bytes', "keeps the newest tokens"
+
+    ids = tokenizer.encode('lights on')
+    logits = np.full((len(ids), tokenizer.vocab_size), -1.0, dtype=np.float32)
+    logits[np.arange(len(ids)), ids] = 5.0
+    assert tokenizer.decode(tokenizer.decode_logits(logits)) == 'lights on'
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_byte_level(directory)
+        tokenizers = [load_tokenizer(directory), tokenizer]
+    for tok in tokenizers:
+        detokenizer = IncrementalDetokenizer(tok)
+        deltas = [detokenizer.push(i) for i in tok.encode(TEXT)]
+        assert ''.join(deltas) == TEXT
+        assert not any('\ufffd' in d for d in deltas), "partial characters are held back"
+    print("✅ Buffer filled and text decoded token by token")
+
+
+def test_tokenizer_throughput():
+    """Benchmark encode and decode tokens per second"""
+    print("\n⚡ Benchmarking tokenizers")
+    text = ' '.join([TEXT] * 200)
+    with tempfile.TemporaryDirectory() as directory:
+        write_byte_level(directory)
+        tokenizers = [load_tokenizer(directory), ByteTokenizer()]
+    buffer = np.zeros(32768, dtype=np.int32)
+
+    for tokenizer in tokenizers:
+        started = time.perf_counter()
+        for _ in range(10):
+            count = tokenizer.encode_into(text, buffer, add_bos=False)
+        encode_rate = count * 10 / (time.perf_counter() - started)
+
+        ids = buffer[:count].tolist()
+        started = time.perf_counter()
+        for _ in range(10):
+            decoded = tokenizer.decode(ids)
+        decode_rate = count * 10 / (time.perf_counter() - started)
+
+        assert decoded == text
+        print(f"✅ {tokenizer.name}: encode {encode_rate:,.0f} tok/s, "
+              f"decode {decode_rate:,.0f} tok/s")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Tokenizer Tests...")
+    test_tokenizers_round_trip()
+    test_input_buffers_and_decoding()
+    test_tokenizer_throughput()
+    print("\n🎉 All tokenizer tests passed!")
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Test the inference job queue.
+This script checks priority ordering, per-class concurrency limits,
+deadlines and cancellation, including of a routed stream mid-response,
+then floods a simulated backend with
+background batches and measures interactive latency with and without
+class limits.
+"""
+
+import gc
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+from inference_queue import InferenceQueue, DeadlineExceeded, parse_limits
+from ai_backend_manager import AIBackend, AIBackendManager, AIResponse, StreamChunk
+from metrics import LatencyStats
+
+
+class SharedDeviceBackend(AIBackend):
+    """Backend with a fixed number of device slots and service time."""
+
+    def __init__(self, config, slots=2, service_time=0.02):
+        super().__init__(config)
+        self.service_time = service_time
+        self.slots = slots
+        self._device = None
+
+    async def generate_response(self, prompt, context=None, priority=None):
+        if self._device is None:
+            self._device = asyncio.Semaphore(self.slots)
+        async with self._device:
+            await asyncio.sleep(self.service_time)
+        return AIResponse(content=f'done: {prompt}', backend='device')
+
+    def is_available(self):
+        return True
+
+    def get_status(self):
+        return {'available': True}
+
+
+def test_priority_and_limits():
+    """Test classes are limited per backend and higher classes go first"""
+    print("🚦 Testing priority classes and limits")
+    assert parse_limits('interactive=3,hailo.background=2')['hailo'] == {'background': 2}
+
+    async def run():
+        queue = InferenceQueue('interactive=1,background=1')
+        order = []
+        gate = asyncio.Event()
+
+        async def job(name):
+            order.append(name)
+            await gate.wait()
+            return name
+
+        first = asyncio.ensure_future(queue.run('x', lambda: job('bg-1'), 'background'))
+        await asyncio.sleep(0)
+        queued = [asyncio.ensure_future(queue.run('x', lambda n=n: job(n), c))
+                  for n, c in [('bg-2', 'background'), ('int-1', 'interactive'),
+                               ('int-2', 'interactive')]]
+        other = asyncio.ensure_future(queue.run('y', lambda: job('other'), 'background'))
+        await asyncio.sleep(0.01)
+        running = list(order)
+        stats = queue.get_stats()['backends']['x']
+        gate.set()
+        await asyncio.gather(first, other, *queued)
+        return running, order, stats
+
+    running, order, stats = asyncio.run(run())
+    assert running == ['bg-1', 'int-1', 'other'], running
+    assert order.index('int-2') < order.index('bg-2'), order
+    assert stats['background']['queued'] == 1 and stats['interactive']['queued'] == 1
+    print(f"✅ Start order {order}")
+
+
+def test_deadlines_and_cancel():
+    """Test deadlines while queued and running, and cancellation by id"""
+    print("\n⏱️ Testing deadlines and cancellation")
+
+    async def run():
+        queue = InferenceQueue('interactive=1')
+        blocker = asyncio.ensure_future(queue.run('x', lambda: asyncio.sleep(0.2), job_id='blocker'))
+        await asyncio.sleep(0)
+
+        outcomes = []
+        try:
+            await queue.run('x', lambda: asyncio.sleep(0), deadline=time.monotonic() + 0.02)
+        except DeadlineExceeded:
+            outcomes.append('expired queued')
+
+        waiting = asyncio.ensure_future(queue.run('x', lambda: asyncio.sleep(0), job_id='q'))
+        await asyncio.sleep(0)
+        assert queue.cancel('q') and queue.cancel('blocker')
+        for task, label in ((waiting, 'cancelled queued'), (blocker, 'cancelled running')):
+            try:
+                await task
+            except asyncio.CancelledError:
+                outcomes.append(label)
+
+        try:
+            await queue.run('x', lambda: asyncio.sleep(1), deadline=time.monotonic() + 0.02)
+        except DeadlineExceeded:
+            outcomes.append('expired running')
+        result = await queue.run('x', lambda: asyncio.sleep(0, 'ok'))
+        return outcomes, result, queue.get_stats()['backends']['x']['interactive']
+
+    outcomes, result, stats = asyncio.run(run())
+    assert outcomes == ['expired queued', 'cancelled queued', 'cancelled running',
+                        'expired running'], outcomes
+    assert result == 'ok' and stats['running'] == 0
+    assert stats['expired'] == 2 and stats['cancelled'] == 2
+    print("✅ Deadlines enforced and jobs cancelled while queued and running")
+
+
+class SlowStreamBackend(AIBackend):
+    """Backend streaming one chunk every few milliseconds."""
+
+    def __init__(self, config, chunks=100, interval=0.01):
+        super().__init__(config)
+        self.chunks = chunks
+        self.interval = interval
+        self.priorities = []
+        self.closed = asyncio.Event()
+
+    async def generate_response(self, prompt, context=None, priority=None):
+        return AIResponse(content='unused', backend='slow')
+
+    async def stream_response(self, prompt, context=None, priority=None):
+        self.priorities.append(priority)
+        try:
+            for i in range(self.chunks):
+                await asyncio.sleep(self.interval)
+                yield StreamChunk(text=f'{i} ')
+            yield StreamChunk(model='slow')
+        finally:
+            self.closed.set()
+
+    def is_available(self):
+        return True
+
+    def get_status(self):
+        return {'available': True}
+
+
+def test_cancel_mid_stream():
+    """Test cancelling a query by id stops its routed stream mid-response"""
+    print("\n✂️ Testing cancellation of a streaming query")
+
+    async def run():
+        manager = AIBackendManager({'ai_backend': 'slow', 'ai_cache_size': 0})
+        backend = SlowStreamBackend({})
+        manager.backends['slow'] = backend
+        manager.current_backend = 'slow'
+
+        tokens = []
+        task = asyncio.ensure_future(manager.stream_response(
+            'tell me a story', tokens.append, use_context=False, job_id='q1'))
+        while len(tokens) < 3:
+            await asyncio.sleep(0.005)
+
+        # Later chunks are read by the caller, not the router's first-token
+        # attempt, and must still be cancelled
+        assert manager.cancel('q1')
+        try:
+            await asyncio.wait_for(task, 0.5)
+            outcome = 'finished'
+        except asyncio.CancelledError:
+            outcome = 'cancelled'
+        await asyncio.wait_for(backend.closed.wait(), 0.5)
+        stats = manager.get_job_stats()['backends']['slow']['interactive']
+        await manager.close()
+        return outcome, len(tokens), backend.priorities, stats
+
+    outcome, received, priorities, stats = asyncio.run(run())
+    assert outcome == 'cancelled' and received < 20, (outcome, received)
+    assert stats['cancelled'] == 1 and stats['running'] == 0, stats
+    assert priorities == ['interactive'], priorities
+    print(f"✅ Stream cancelled after {received} chunks")
+
+
+def measure_interactive(limits, interactive=20, batches=4, batch_size=10):
+    """Interactive latency while background batches saturate the backend."""
+    # A full collection of garbage left by earlier tests would skew the timings
+    gc.collect()
+
+    async def run():
+        manager = AIBackendManager({'ai_backend': 'device', 'ai_cache_size': 0,
+                                    'ai_class_limits': limits, 'conversation_recent': 0})
+        manager.backends['device'] = SharedDeviceBackend({})
+        manager.current_backend = 'device'
+
+        background = [asyncio.ensure_future(manager.generate_batch(
+            [f'automation {b}-{i}' for i in range(batch_size)])) for b in range(batches)]
+        await asyncio.sleep(0.01)
+
+        latency = LatencyStats()
+
+        async def ask(i):
+            started = asyncio.get_running_loop().time()
+            response = await manager.generate_response(f'chat {i}', use_context=False)
+            assert not response.error, response.error
+            latency.record(asyncio.get_running_loop().time() - started)
+
+        tasks = []
+        for i in range(interactive):
+            tasks.append(asyncio.ensure_future(ask(i)))
+            await asyncio.sleep(0.015)
+        await asyncio.gather(*tasks)
+        results = await asyncio.gather(*background)
+        await manager.close()
+        assert all(not r.error for batch in results for r in batch)
+        return latency.summary(), manager.get_job_stats()['backends']['device']
+
+    return asyncio.run(run())
+
+
+def test_interactive_latency_under_load():
+    """Test interactive p95 stays low while background work saturates"""
+    print("\n📈 Testing interactive latency under background load")
+    unlimited, _ = measure_interactive('interactive=8,background=8')
+    limited, stats = measure_interactive('interactive=2,background=1')
+
+    assert stats['background']['completed'] == 40
+    assert limited['p95_ms'] < unlimited['p95_ms'] / 2, (limited, unlimited)
+    assert limited['p95_ms'] < 100
+    print(f"✅ Interactive p95 {limited['p95_ms']} ms with class limits vs "
+          f"{unlimited['p95_ms']} ms without; background p95 "
+          f"{stats['background']['latency']['p95_ms']} ms")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Inference Queue Tests...")
+    test_priority_and_limits()
+    test_deadlines_and_cancel()
+    test_cancel_mid_stream()
+    test_interactive_latency_under_load()
+    print("\n🎉 All inference queue tests passed!")
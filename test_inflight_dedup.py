@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Test in-flight deduplication of identical AI requests.
+This script checks that identical concurrent requests share one backend
+generation, that every streaming subscriber receives the same text, late
+ones included, that requests differing in context or mode are not
+shared, and that a shared generation is only cancelled once nobody is
+waiting for it, also when a request is cancelled by its job id.
+"""
+
+import sys
+import asyncio
+from pathlib import Path
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+from ai_backend_manager import AIBackend, AIBackendManager, AIResponse, StreamChunk
+from inflight_requests import InflightRequests
+
+
+class CountingBackend(AIBackend):
+    """Backend streaming a reply slowly and counting its calls."""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.calls = 0
+
+    async def generate_response(self, prompt, context=None, priority=None):
+        self.calls += 1
+        await asyncio.sleep(0.1)
+        return AIResponse(content=f'Answer to {prompt}', backend='counting')
+
+    async def stream_response(self, prompt, context=None, priority=None):
+        self.calls += 1
+        for word in ('The', ' porch', ' light', ' is', ' on.'):
+            await asyncio.sleep(0.02)
+            yield StreamChunk(text=word)
+
+    def is_available(self):
+        return True
+
+    def get_status(self):
+        return {'available': True}
+
+
+def manager_with_backend(**config):
+    manager = AIBackendManager({'ai_backend': 'counting', 'ai_cache_size': 0, **config})
+    backend = CountingBackend({})
+    manager.backends['counting'] = backend
+    manager.current_backend = 'counting'
+    return manager, backend
+
+
+def test_streams_shared():
+    """Test concurrent identical streams share one generation"""
+    print("🔗 Testing shared streams")
+
+    async def run():
+        manager, backend = manager_with_backend()
+        streams = [[] for _ in range(3)]
+
+        async def ask(chunks, delay):
+            await asyncio.sleep(delay)
+            return await manager.stream_response('Is the porch light on?', chunks.append,
+                                                 use_context=False)
+
+        # The last request joins after two words were streamed
+        responses = await asyncio.gather(*(ask(chunks, delay) for chunks, delay
+                                           in zip(streams, (0, 0, 0.05))))
+        stats = manager.inflight.get_stats()
+        await manager.close()
+        return backend.calls, streams, responses, stats
+
+    calls, streams, responses, stats = asyncio.run(run())
+    assert calls == 1, calls
+    assert all(''.join(chunks) == 'The porch light is on.' for chunks in streams), streams
+    assert streams[0] == streams[1] and len(streams[2]) < len(streams[0])
+    assert all(response.content == 'The porch light is on.' for response in responses)
+    assert [response.shared for response in responses] == [False, True, True]
+    assert stats['started'] == 1 and stats['joined'] == 2 and stats['running'] == 0
+    print(f"✅ 3 requests, 1 generation; late joiner got {len(streams[2])} chunks")
+
+
+def test_only_identical_requests_shared():
+    """Test context, mode and the dedup setting separate generations"""
+    print("\n🧩 Testing which requests are shared")
+
+    async def run():
+        manager, backend = manager_with_backend()
+        porch = [{'role': 'system', 'content': 'light.porch: on'}]
+        garage = [{'role': 'system', 'content': 'light.garage: off'}]
+        await asyncio.gather(
+            manager.generate_response('Is it on?', use_context=False, extra_context=porch),
+            manager.generate_response('Is it on?', use_context=False, extra_context=porch),
+            manager.generate_response('Is it on?', use_context=False, extra_context=garage),
+            manager.stream_response('Is it on?', lambda text: None, use_context=False,
+                                    extra_context=porch))
+        shared_calls = backend.calls
+        await manager.close()
+
+        manager, backend = manager_with_backend(ai_dedup=False)
+        await asyncio.gather(*(manager.generate_response('Is it on?', use_context=False)
+                               for _ in range(3)))
+        await manager.close()
+        return shared_calls, backend.calls
+
+    shared_calls, unshared_calls = asyncio.run(run())
+    assert shared_calls == 3, shared_calls
+    assert unshared_calls == 3, unshared_calls
+    print("✅ Different context or streaming mode is generated separately")
+
+
+def test_cancellation():
+    """Test a shared generation outlives all but its last waiter"""
+    print("\n✂️ Testing cancellation of waiters")
+
+    async def run():
+        inflight = InflightRequests()
+        started = asyncio.Event()
+        cancelled = []
+
+        async def generate(publish):
+            started.set()
+            try:
+                await asyncio.sleep(0.2)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return 'done'
+
+        first = asyncio.ensure_future(inflight.run('key', generate))
+        await started.wait()
+        second = asyncio.ensure_future(inflight.run('key', generate))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        result = await second
+        kept = (result, list(cancelled))
+
+        alone = asyncio.ensure_future(inflight.run('other', generate))
+        await asyncio.sleep(0.01)
+        alone.cancel()
+        await asyncio.sleep(0.01)
+        return kept, cancelled, inflight.get_stats()
+
+    (result, cancelled_early), cancelled, stats = asyncio.run(run())
+    assert result == ('done', True) and not cancelled_early
+    assert cancelled == [True] and stats['cancelled'] == 1 and stats['running'] == 0
+    print("✅ Generation kept for the remaining waiter, cancelled when none was left")
+
+
+def test_cancel_by_job_id():
+    """Test cancelling one request's job id leaves a shared stream running"""
+    print("\n🆔 Testing cancellation of a shared stream by job id")
+
+    async def run():
+        manager, backend = manager_with_backend()
+        chunks = {'a': [], 'b': []}
+        requests = {job_id: asyncio.ensure_future(manager.stream_response(
+            'Is the porch light on?', chunks[job_id].append, use_context=False,
+            job_id=job_id)) for job_id in chunks}
+        await asyncio.sleep(0.05)
+        assert manager.cancel('a')
+        response = await requests['b']
+        try:
+            await requests['a']
+            outcome = 'finished'
+        except asyncio.CancelledError:
+            outcome = 'cancelled'
+        stats = manager.inflight.get_stats()
+        await manager.close()
+        return outcome, response, backend.calls, stats
+
+    outcome, response, calls, stats = asyncio.run(run())
+    assert outcome == 'cancelled' and calls == 1
+    assert response.content == 'The porch light is on.' and response.shared
+    assert stats['cancelled'] == 0 and stats['running'] == 0, stats
+    print("✅ Cancelled request detached; the other got the full answer")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal In-flight Deduplication Tests...")
+    test_streams_shared()
+    test_only_identical_requests_shared()
+    test_cancellation()
+    test_cancel_by_job_id()
+    print("\n🎉 All in-flight deduplication tests passed!")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test the compiled intent classifier.
+This script checks Aho-Corasick matching with word boundaries and
+inflections, that the automation manager scores templates from the
+shared classifier, that classification takes microseconds, and that
+automation recommendations reach the client before a slow response
+finishes generating.
+"""
+
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+from intent_classifier import IntentClassifier, PatternMatcher
+from automation_manager import AutomationManager
+from ai_backend_manager import AIBackend, AIResponse
+
+
+def test_pattern_matcher():
+    """Test overlapping keywords, word boundaries and inflections"""
+    print("🔤 Testing the keyword automaton")
+    matcher = PatternMatcher([('he', 'he'), ('she', 'she'), ('his', 'his'), ('hers', 'hers')])
+    found = [(m.pattern, m.start) for m in matcher.find('Ushers: she, his and HERS he')]
+    assert found == [('she', 8), ('his', 13), ('hers', 21), ('he', 26)], found
+
+    matcher = PatternMatcher([('if', 'if'), ('door', 'door'), ('light', 'light'),
+                              ('turn on', 'turn on'), ('schedule', 'schedule')])
+    assert matcher.labels('notify me about the indoor wifi') == {}
+    assert matcher.labels('spotlights of a flight') == {}
+    assert set(matcher.labels('Turn   ON the porch lights if a door opened')) == {
+        'turn on', 'light', 'if', 'door'}
+    assert set(matcher.labels('scheduling, scheduled and schedules')) == {'schedule'}
+    assert matcher.labels('schedul') == {}
+    print("✅ Whole words and inflections only")
+
+
+def test_recommendations_use_classifier():
+    """Test template scores come from the shared classifier"""
+    print("\n🧭 Testing automation scoring")
+    manager = AutomationManager()
+    intent = manager.intents.classify('Turn on the lights when motion is detected')
+    assert intent.is_automation
+    assert intent.categories == {'lighting': 2}
+    assert intent.templates['motion_light'] == 4
+
+    suggestions = manager.suggest_automations_for_query('save energy when away')
+    assert suggestions[0]['name'] == 'Energy Saver Mode' and suggestions[0]['match_score'] == 3
+    recommendations = asyncio.run(manager.get_automation_recommendations(
+        'notify me when a device goes offline'))
+    assert recommendations[0]['id'] == 'device_offline_notification', recommendations[0]['id']
+    assert not manager.intents.classify('what is the cpu usage?').is_automation
+    print(f"✅ {suggestions[0]['name']} and {recommendations[0]['name']} ranked first")
+
+
+def test_classification_speed():
+    """Test classification takes microseconds"""
+    print("\n⚡ Testing classification speed")
+    classifier = IntentClassifier(AutomationManager().automation_templates)
+    query = ("Could you set up an automation that turns on the hallway lights when "
+             "motion is detected after sunset and notifies me if the garage door opens?")
+    for _ in range(2000):
+        classifier.classify(query)
+    stats = classifier.get_stats()
+    assert stats['classifications'] == 2000 and stats['automation_queries'] == 2000
+    assert stats['latency_us']['p95'] < 500, stats
+    print(f"✅ {stats['keywords']} keywords, {len(query)} characters: "
+          f"avg {stats['latency_us']['avg']} µs, p95 {stats['latency_us']['p95']} µs")
+
+
+class SlowBackend(AIBackend):
+    """Backend taking a while to answer."""
+
+    async def generate_response(self, prompt, context=None, priority=None):
+        await asyncio.sleep(0.2)
+        return AIResponse(content='Here is how to set that up.', backend='slow')
+
+    def is_available(self):
+        return True
+
+    def get_status(self):
+        return {'available': True}
+
+
+def test_recommendations_pushed_early():
+    """Test recommendations are pushed while the response is generated"""
+    print("\n📬 Testing early automation recommendations")
+    from hailo_terminal import HailoTerminal
+
+    async def run():
+        terminal = HailoTerminal()
+        manager = terminal.ai_backend_manager
+        manager.backends['slow'] = SlowBackend({})
+        manager.current_backend = 'slow'
+        pushed = []
+        started = time.monotonic()
+        payload = await terminal.process_ai_query(
+            'Turn on the porch light when motion is detected', session='s',
+            on_recommendations=lambda recs: pushed.append((time.monotonic() - started, recs)))
+        elapsed = time.monotonic() - started
+        other = await terminal.process_ai_query('What is the CPU usage?', session='s',
+                                                on_recommendations=pushed.append)
+        await manager.close()
+        return payload, pushed, elapsed, other
+
+    payload, pushed, elapsed, other = asyncio.run(run())
+    assert len(pushed) == 1, "only automation queries get recommendations"
+    at, recommendations = pushed[0]
+    assert at < 0.1 and elapsed >= 0.2, (at, elapsed)
+    assert recommendations[0]['id'] == 'motion_light'
+    assert payload['automation_suggestions'] == recommendations
+    assert payload['is_automation_query'] and not other['is_automation_query']
+    print(f"✅ Recommendations after {at * 1000:.1f} ms, response after {elapsed * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Intent Classifier Tests...")
+    test_pattern_matcher()
+    test_recommendations_use_classifier()
+    test_classification_speed()
+    test_recommendations_pushed_early()
+    print("\n🎉 All intent classifier tests passed!")
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test the offline mock LLM server and the Socket.IO load generator.
+This script points the OpenAI, Anthropic, Ollama and custom backends at
+the mock server, checks streamed and plain replies, the token rate and
+injected errors, then drives the async terminal server with the load
+generator and checks the reported throughput and latency percentiles.
+"""
+
+import os
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# Add the source and scripts directories to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/scripts"))
+
+from aiohttp.test_utils import TestServer
+
+from ai_backend_manager import AIBackendManager
+from mock_llm_server import Latency, MockLLMServer, MockProfile
+from load_generator import percentile, run_load
+
+
+def manager_for(url, backend):
+    return AIBackendManager({'ai_backend': backend, 'ai_cache_size': 0,
+                             'openai_api_key': 'k', 'anthropic_api_key': 'k',
+                             'openai_api_url': f'{url}/v1/chat/completions',
+                             'anthropic_api_url': f'{url}/v1/messages',
+                             'custom_api_url': url, 'ai_model': 'mock-7b',
+                             'ai_system_prompt': 'Be brief.', 'max_tokens': 12})
+
+
+def test_backends_against_mock():
+    """Test every HTTP backend streams and completes from the mock server"""
+    print("🧪 Testing backends against the mock server")
+
+    async def run():
+        mock = MockLLMServer(MockProfile(tokens_per_second=400, reply_tokens=20))
+        server = TestServer(mock.app)
+        await server.start_server()
+        url = f'http://127.0.0.1:{server.port}'
+        results = {}
+        for name in ('openai', 'anthropic', 'ollama', 'custom'):
+            manager = manager_for(url, name)
+            chunks = []
+            started = time.monotonic()
+            streamed = await manager.stream_response('porch light', chunks.append,
+                                                     use_context=False)
+            elapsed = time.monotonic() - started
+            plain = await manager.generate_response('porch light', use_context=False)
+            results[name] = (streamed, plain, chunks, elapsed)
+            await manager.close()
+        await server.close()
+        return results, mock.get_stats()
+
+    results, stats = asyncio.run(run())
+    for name, (streamed, plain, chunks, elapsed) in results.items():
+        assert not streamed.error and not plain.error, (name, streamed.error, plain.error)
+        assert streamed.content == plain.content, name
+        assert len(streamed.content.split()) == 12, "max_tokens caps the reply"
+        if name != 'custom':
+            assert len(chunks) >= 12 and elapsed >= 11 / 400, (name, len(chunks), elapsed)
+        print(f"✅ {name}: {len(chunks)} chunks in {elapsed * 1000:.0f} ms")
+    assert results['anthropic'][0].usage['output_tokens'] == 12
+    assert results['openai'][0].usage['completion_tokens'] == 12
+    # Ollama evaluated the system prompt once and reused its context
+    assert stats['requests']['ollama'] == 3
+    assert stats['requests']['openai'] == 4 and stats['streams'] == 4
+
+
+def test_latency_and_errors():
+    """Test latency distributions and injected errors"""
+    print("\n🎲 Testing latency distributions and error injection")
+    latency = Latency('lognormal:100,0.5', seed=1)
+    samples = [latency.sample() for _ in range(4000)]
+    assert 0.09 < percentile(samples, 50) < 0.11
+    assert Latency('25').sample() == 0.025
+    assert 0.01 <= Latency('uniform:10-20').sample() <= 0.02
+    try:
+        Latency('weibull:1')
+        assert False, "unknown distributions are rejected"
+    except ValueError:
+        pass
+
+    async def run():
+        mock = MockLLMServer(MockProfile(tokens_per_second=0, error_rate=1.0,
+                                         error_statuses=(503,)))
+        server = TestServer(mock.app)
+        await server.start_server()
+        url = f'http://127.0.0.1:{server.port}'
+        errors = {}
+        for name in ('openai', 'anthropic', 'ollama'):
+            manager = manager_for(url, name)
+            response = await manager.stream_response('hi', lambda text: None,
+                                                     use_context=False)
+            errors[name] = response.error
+            await manager.close()
+
+        mock.profile.error_rate = 0.0
+        mock.profile.stream_error_rate = 1.0
+        manager = manager_for(url, 'anthropic')
+        broken = await manager.stream_response('hi', lambda text: None, use_context=False)
+        await manager.close()
+        await server.close()
+        return errors, broken, mock.get_stats()
+
+    errors, broken, stats = asyncio.run(run())
+    assert all(error and '503' in error for error in errors.values()), errors
+    assert broken.error == 'Injected stream error'
+    assert stats['errors'] >= 3 and stats['stream_errors'] == 1
+    print(f"✅ p50 {percentile(samples, 50) * 1000:.0f} ms; injected: {errors['openai']}")
+
+
+def test_load_generator():
+    """Test the load generator drives the async terminal server"""
+    print("\n🚦 Testing the load generator")
+
+    async def run():
+        mock = MockLLMServer(MockProfile(tokens_per_second=200, reply_tokens=10,
+                                         latency=Latency('constant:20')))
+        llm = TestServer(mock.app)
+        await llm.start_server()
+        url = f'http://127.0.0.1:{llm.port}'
+
+        env = {'AI_BACKEND': 'openai', 'OPENAI_API_KEY': 'k',
+               'OPENAI_API_URL': f'{url}/v1/chat/completions',
+               'AI_CACHE_SIZE': '0', 'AI_WORKERS': '4'}
+        saved = {key: os.environ.get(key) for key in env}
+        os.environ.update(env)
+        try:
+            from hailo_terminal import HailoTerminal
+            from async_server import AsyncTerminalServer
+            terminal = HailoTerminal()
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+        server = TestServer(AsyncTerminalServer(terminal).app)
+        await server.start_server()
+        result = await run_load(f'http://127.0.0.1:{server.port}', qps=20, duration=1.5,
+                                connections=4, timeout=10)
+        await server.close()
+        await llm.close()
+        return result.to_dict(), mock.get_stats()
+
+    report, stats = asyncio.run(run())
+    assert report['sent'] == 30 and report['completed'] == 30, report
+    assert report['errors'] == 0 and report['timeouts'] == 0
+    # Conversation summaries add unstreamed requests
+    assert stats['streams'] == 30 and stats['requests']['openai'] >= 30
+    latency, ttft = report['latency'], report['ttft']
+    assert latency['count'] == ttft['count'] == 30
+    # 20 ms to the first token and 9 more tokens at 200 tokens/s
+    assert ttft['p50_ms'] >= 20 and latency['p50_ms'] >= 60
+    assert ttft['p50_ms'] < latency['p50_ms'] <= latency['p99_ms']
+    assert report['achieved_qps'] > 10
+    print(f"✅ {report['achieved_qps']} qps, latency p50 {latency['p50_ms']} ms / "
+          f"p99 {latency['p99_ms']} ms, ttft p50 {ttft['p50_ms']} ms")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Mock LLM Server Tests...")
+    test_backends_against_mock()
+    test_latency_and_errors()
+    test_load_generator()
+    print("\n🎉 All mock LLM server tests passed!")
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Test the shared prompt prefix.
+This script checks prefix versioning and invalidation by home changes,
+then measures prompt evaluation time before and after prefix reuse on
+the Hailo decoder (KV cache snapshots) and on a mock Ollama server
+(context tokens and keep_alive).
+"""
+
+import sys
+import asyncio
+from pathlib import Path
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from prompt_prefix import PromptPrefix, describe_home
+from entity_store import EntitySnapshot
+from hailo_decoder import SyntheticInferModel
+from ai_backend_manager import AIBackendManager, HailoBackend
+
+SYSTEM_PROMPT = "You help with the house. " * 24
+
+
+def home(states, version):
+    areas = {'light.kitchen': 'kitchen', 'sensor.kitchen_temp': 'kitchen',
+             'light.porch': 'outside'}
+    return EntitySnapshot([{'entity_id': entity_id, 'state': state,
+                            'attributes': {}}
+                           for entity_id, state in states.items()], areas, version)
+
+
+def test_prefix_versions():
+    """Test the prefix only changes when the entities do"""
+    print("🏠 Testing prefix versioning")
+    prefix = PromptPrefix('Be brief.')
+    changes = []
+    prefix.subscribe(lambda p: changes.append(p.version))
+
+    first = describe_home(home({'light.kitchen': 'on', 'light.porch': 'off'}, 1))
+    assert prefix.set_home_context(first)
+    key = prefix.key
+
+    # A state change gives the same description
+    same = describe_home(home({'light.kitchen': 'off', 'light.porch': 'on'}, 2))
+    assert same == first and not prefix.set_home_context(same)
+
+    added = describe_home(home({'light.kitchen': 'on', 'light.porch': 'off',
+                                'sensor.kitchen_temp': '21'}, 3))
+    assert prefix.set_home_context(added)
+    assert prefix.key != key and changes == [2, 3], changes
+    assert 'kitchen: light.kitchen, sensor.kitchen_temp' in prefix.text
+    assert prefix.message()['content'].startswith('Be brief.')
+    print(f"✅ Version {prefix.version} after one entity change and one state change")
+
+
+class SyntheticHailoBackend(HailoBackend):
+    """Hailo backend running on the synthetic infer model."""
+
+    def __init__(self, config, **model_options):
+        super().__init__(config)
+        self.infer_model = SyntheticInferModel(self.tokenizer, "Done.", **model_options)
+        self.seq_len = self._model_seq_len()
+        self.max_context_length = self.infer_model.context_len
+        self.decoder = self._create_decoder()
+
+    def is_available(self):
+        return True
+
+
+def test_hailo_prefix_snapshot():
+    """Test a row holding another prompt gets the prefix KV cache restored"""
+    print("\n🧠 Testing Hailo prefix KV snapshots")
+    backend = SyntheticHailoBackend({'temperature': 0.0, 'max_tokens': 16},
+                                    seq_len=32, context_len=2048, step_delay=0.002)
+    model = backend.infer_model
+    prefix = PromptPrefix(SYSTEM_PROMPT)
+    backend.set_prompt_prefix(prefix)
+
+    async def ask(prompt, context):
+        before = model.tokens_processed
+        response = await backend.generate_response(prompt, context)
+        assert not response.error, response.error
+        return model.tokens_processed - before
+
+    async def run():
+        cold = await ask('is the porch light on?', [prefix.message()])
+        # Without the prefix: the only row now holds another prompt
+        await ask('tell me a joke', None)
+        warm = await ask('what is the kitchen temperature?', [prefix.message()])
+
+        prefix.set_home_context('kitchen: light.kitchen')
+        backend.set_prompt_prefix(prefix)
+        await ask('tell me a joke', None)
+        changed = await ask('is the porch light on?', [prefix.message()])
+        return cold, warm, changed
+
+    cold, warm, changed = asyncio.run(run())
+    stats = backend.prefix_stats.to_dict()
+    decoder = backend.decoder.get_stats()
+    asyncio.run(backend.close())
+
+    assert warm < 60 < cold, (cold, warm)
+    assert changed > cold, "a changed prefix is prefilled again"
+    assert decoder['prefix_restores'] == 1
+    assert stats['cold']['count'] == 2 and stats['warm']['count'] == 1
+    assert stats['warm']['avg_ms'] < stats['cold']['avg_ms'] / 2, stats
+    print(f"✅ Prefill {cold} tokens in {stats['cold']['avg_ms']} ms cold, "
+          f"{warm} tokens in {stats['warm']['avg_ms']} ms with the prefix restored")
+
+
+def test_ollama_context_reuse():
+    """Test Ollama evaluates the prefix once and reuses its context tokens"""
+    print("\n🦙 Testing Ollama prefix context reuse")
+    bodies = []
+
+    async def generate(request):
+        body = await request.json()
+        bodies.append(body)
+        # Evaluation time grows with the tokens evaluated (one per word)
+        evaluated = len(body['prompt'].split())
+        context = list(body.get('context', [])) + list(range(evaluated)) + [7]
+        return web.json_response({'response': 'ok', 'done': True, 'context': context,
+                                  'eval_count': 1, 'prompt_eval_count': evaluated,
+                                  'prompt_eval_duration': evaluated * 1_000_000})
+
+    async def run():
+        app = web.Application()
+        app.router.add_post('/api/generate', generate)
+        server = TestServer(app)
+        await server.start_server()
+        manager = AIBackendManager({'ai_backend': 'ollama', 'ai_cache_size': 0,
+                                    'ai_system_prompt': SYSTEM_PROMPT,
+                                    'custom_api_url': f'http://127.0.0.1:{server.port}'})
+
+        for query in ('porch light?', 'kitchen temperature?'):
+            response = await manager.generate_response(query, use_context=False)
+            assert not response.error, response.error
+        assert manager.set_home_context('kitchen: light.kitchen')
+        await manager.generate_response('porch light?', use_context=False)
+
+        stats = manager.get_prefix_stats()
+        await manager.close()
+        await server.close()
+        return stats
+
+    stats = asyncio.run(run())
+    prefix_tokens = len(("system: " + SYSTEM_PROMPT).split())
+    primes = [body for body in bodies if body['options']['num_predict'] == 1]
+    queries = [body for body in bodies if body['options']['num_predict'] != 1]
+
+    assert len(primes) == 2 and len(queries) == 3, "prefix evaluated once per version"
+    assert all(body['keep_alive'] == '30m' for body in bodies)
+    assert queries[0]['context'] == list(range(prefix_tokens))
+    assert queries[1]['context'] == queries[0]['context'] and queries[1]['raw']
+    assert all('house' not in body['prompt'] for body in queries)
+    assert queries[2]['context'] != queries[0]['context']
+
+    ollama = stats['backends']['ollama']
+    assert ollama['cold']['count'] == 2 and ollama['warm']['count'] == 3
+    assert ollama['warm']['avg_ms'] < ollama['cold']['avg_ms'] / 4, ollama
+    print(f"✅ Prompt evaluation {ollama['cold']['avg_ms']} ms with the prefix, "
+          f"{ollama['warm']['avg_ms']} ms reusing its context (version {stats['version']})")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Prompt Prefix Tests...")
+    test_prefix_versions()
+    test_hailo_prefix_snapshot()
+    test_ollama_context_reuse()
+    print("\n🎉 All prompt prefix tests passed!")
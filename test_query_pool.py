@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test the bounded AI query worker pool.
+This script checks worker limits, per-client fairness, queue position
+updates, rejection when the queue is full and that a query raising
+CancelledError does not take its worker down.
+"""
+
+import sys
+import asyncio
+from pathlib import Path
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+from query_pool import AIQueryPool, QueueFullError
+
+
+def test_fair_dispatch_and_limits():
+    """Test that workers are bounded and clients are served round-robin"""
+    print("⚖️  Testing fair dispatch")
+    order = []
+    running = []
+    peak = []
+
+    async def run():
+        pool = AIQueryPool(workers=1, max_queue=16, max_per_client=8)
+        release = asyncio.Event()
+
+        def job(name):
+            async def work():
+                running.append(name)
+                peak.append(len(running))
+                await release.wait()
+                order.append(name)
+                running.remove(name)
+            return work
+
+        # Client A floods the queue before client B submits once
+        for i in range(4):
+            await pool.submit('a', job(f'a{i}'))
+        await pool.submit('b', job('b0'))
+
+        await asyncio.sleep(0.01)
+        release.set()
+        while pool.get_stats()['completed'] < 5:
+            await asyncio.sleep(0.01)
+        stats = pool.get_stats()
+        await pool.stop()
+        return stats
+
+    stats = asyncio.run(run())
+    assert max(peak) == 1, "only one query may run with one worker"
+    assert order.index('b0') <= 2, f"client b starved: {order}"
+    assert stats['wait_time']['count'] == 5
+    print(f"✅ Dispatch order {order}")
+
+
+def test_positions_and_rejection():
+    """Test queue position notifications and backpressure"""
+    print("\n📋 Testing queue positions and rejection")
+    positions = {}
+
+    async def run():
+        pool = AIQueryPool(workers=1, max_queue=2, max_per_client=2)
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+
+        def tracker(name):
+            async def on_position(position):
+                positions.setdefault(name, []).append(position)
+            return on_position
+
+        await pool.submit('a', work, tracker('first'))
+        await asyncio.sleep(0.01)  # first is now running
+        await pool.submit('a', work, tracker('second'))
+        await pool.submit('b', work, tracker('third'))
+
+        try:
+            await pool.submit('c', work)
+            raise AssertionError("queue should be full")
+        except QueueFullError as e:
+            assert e.retry_after >= 1
+
+        release.set()
+        while pool.get_stats()['completed'] < 3:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.01)
+        stats = pool.get_stats()
+        await pool.stop()
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats['rejected'] == 1
+    assert positions['second'][0] == 1 and positions['third'] == [2, 1]
+    print(f"✅ Positions {positions}, stats: rejected={stats['rejected']}")
+
+
+def test_stray_cancellation_keeps_worker():
+    """Test a query cancelled from inside does not stop its worker"""
+    print("\n🧯 Testing stray cancellations")
+    served = []
+
+    async def run():
+        pool = AIQueryPool(workers=1, max_queue=8, max_per_client=8)
+
+        async def cancelled_inside():
+            inner = asyncio.ensure_future(asyncio.sleep(5))
+            inner.cancel()
+            await inner
+
+        async def work():
+            served.append('next')
+
+        await pool.submit('a', cancelled_inside)
+        await pool.submit('a', work)
+        for _ in range(100):
+            if served:
+                break
+            await asyncio.sleep(0.01)
+        stats = pool.get_stats()
+        await pool.stop()
+        return stats
+
+    stats = asyncio.run(run())
+    assert served == ['next'], "the only worker must survive"
+    assert stats['failed'] == 1 and stats['completed'] == 1, stats
+    print(f"✅ Worker kept serving: completed={stats['completed']}, failed={stats['failed']}")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Query Pool Tests...")
+    test_fair_dispatch_and_limits()
+    test_positions_and_rejection()
+    test_stray_cancellation_keeps_worker()
+    print("\n🎉 All query pool tests passed!")
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Test versioned response caching, fast serialisation and compression.
+This script exercises the ETag/304 flow and precompressed bodies used by
+the heavy JSON endpoints, and the ETag/304 flow of the entity discovery,
+entities by domain and backends routes.
+"""
+
+import sys
+import gzip
+import asyncio
+import itertools
+from pathlib import Path
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from response_cache import ResponseCache
+from serialization import JSONSerializer, choose_encoding
+
+
+def test_etag_and_not_modified():
+    """Test that a current ETag is answered with 304 without rebuilding"""
+    print("🔁 Testing ETag / 304 flow")
+    cache = ResponseCache()
+    builds = []
+
+    async def build():
+        builds.append(1)
+        return {'entities': [{'entity_id': 'light.kitchen'}]}
+
+    async def run():
+        status, etag, entry = await cache.respond('entities', 1, build)
+        assert status == 200 and entry.etag == etag
+
+        status, etag2, entry = await cache.respond('entities', 1, build, etag)
+        assert status == 304 and etag2 == etag and entry is None
+
+        status, _, _ = await cache.respond('entities', 1, build)
+        assert status == 200
+
+        status, etag3, _ = await cache.respond('entities', 2, build, etag)
+        assert status == 200 and etag3 != etag
+
+    asyncio.run(run())
+    assert len(builds) == 2, "payload should only be built once per version"
+    print(f"✅ Built {len(builds)} times for 2 versions, stats: {cache.get_stats()}")
+
+
+def test_precompressed_bodies():
+    """Test that compressed variants are negotiated and reused"""
+    print("\n🗜️  Testing negotiated compression")
+    cache = ResponseCache()
+    entities = [{'entity_id': f'sensor.s{i}', 'state': str(i)} for i in range(500)]
+
+    async def build():
+        return {'entities': entities}
+
+    _, _, entry = asyncio.run(cache.respond('sensors', 1, build))
+
+    body, encoding = cache.encoded_body(entry, 'gzip, deflate')
+    assert encoding == 'gzip'
+    assert gzip.decompress(body) == entry.body
+    assert len(body) < len(entry.body)
+
+    again, _ = cache.encoded_body(entry, 'gzip')
+    assert again is body, "compressed body should be cached on the entry"
+
+    identity, encoding = cache.encoded_body(entry, 'gzip;q=0')
+    assert encoding is None and identity is entry.body
+
+    # Each coding is its own representation with its own strong ETag
+    etags = {coding: cache.encoded_etag(entry.etag, coding) for coding in (None, 'gzip', 'br')}
+    assert etags[None] == entry.etag and len(set(etags.values())) == 3
+    assert etags['gzip'] == f'{entry.etag[:-1]}-gzip"'
+    status, etag, _ = asyncio.run(cache.respond('sensors', 1, build, f'"x", W/{etags["gzip"]}'))
+    assert status == 304 and etag == etags['gzip']
+    status, _, _ = asyncio.run(cache.respond('sensors', 2, build, etags['gzip']))
+    assert status == 200
+    print(f"✅ {len(entry.body)} bytes -> {len(body)} bytes gzip, ETag {etags['gzip']}")
+
+
+def test_serializer_round_trip():
+    """Test both serializer implementations produce equivalent JSON"""
+    print("\n⚡ Testing JSON serializers")
+    payload = {'entity_id': 'light.kitchen', 'attributes': {'brightness': 255},
+               'values': [1, 2.5, None, True], 'name': 'Küche'}
+    for preference in ('json', 'auto'):
+        serializer = JSONSerializer(preference)
+        assert serializer.loads(serializer.dumps(payload)) == payload
+        assert serializer.loads(serializer.dumps_bytes(payload)) == payload
+        print(f"✅ {serializer.name} round trip ok")
+
+    assert choose_encoding(None) is None
+    assert choose_encoding('identity') is None
+    assert choose_encoding('*') in ('br', 'gzip')
+
+
+def stub_home_assistant(states):
+    """Home Assistant REST API serving a mutable list of states."""
+    app = web.Application()
+
+    async def get_states(request):
+        return web.json_response(states)
+
+    async def empty_list(request):
+        return web.json_response([])
+
+    app.router.add_get('/api/states', get_states)
+    app.router.add_get('/api/config/config_entries', empty_list)
+    app.router.add_get('/api/config/area_registry', empty_list)
+    return app
+
+
+def test_conditional_routes():
+    """Test the cached routes send ETags, 304s and new ETags on data changes"""
+    print("\n🏷️  Testing conditional entity and backend routes")
+    states = [{'entity_id': f'light.room_{i}', 'state': 'off', 'attributes': {},
+               'last_updated': '2024-01-01T00:00:00'} for i in range(20)]
+
+    async def run():
+        ha = TestServer(stub_home_assistant(states))
+        await ha.start_server()
+        from hailo_terminal import HailoTerminal
+        from async_server import AsyncTerminalServer
+        terminal = HailoTerminal({'ai_backend': 'custom', 'custom_api_url': 'http://127.0.0.1:9/',
+                                  'ha_url': str(ha.make_url('')), 'ha_token': 't',
+                                  'enable_monitoring': False})
+        terminal.ha_client.states_ttl = 0
+        client = TestClient(TestServer(AsyncTerminalServer(terminal).app))
+        await client.start_server()
+
+        minutes = itertools.count(1)
+
+        async def light_changed():
+            states[0]['state'] = 'on'
+            states[0]['last_updated'] = f'2024-01-01T00:{next(minutes):02d}:00'
+
+        async def switch_backend():
+            await client.post('/api/switch_backend', json={'backend': 'custom'})
+
+        async def revalidate(path, change):
+            stats = terminal.response_cache.get_stats
+            response = await client.get(path)
+            first = (response.status, response.headers.get('ETag'))
+            misses = stats()['misses']
+
+            response = await client.get(path, headers={'If-None-Match': first[1]})
+            repeat = (response.status, response.headers.get('ETag'), await response.read())
+            rebuilt = stats()['misses'] - misses
+
+            await change()
+            response = await client.get(path, headers={'If-None-Match': first[1]})
+            after = (response.status, response.headers.get('ETag'))
+            return first, repeat, rebuilt, after
+
+        results = {}
+        try:
+            for path, change in (('/api/entities/discovery', light_changed),
+                                 ('/api/entities/by-domain/light', light_changed),
+                                 ('/api/backends', switch_backend)):
+                results[path] = await revalidate(path, change)
+            for coding in ('identity', 'gzip'):
+                response = await client.get('/api/entities/discovery',
+                                            headers={'Accept-Encoding': coding})
+                results[coding] = (response.headers.get('Content-Encoding'),
+                                   response.headers.get('ETag'))
+        finally:
+            await client.close()
+            await ha.close()
+        return results
+
+    results = asyncio.run(run())
+    identity, compressed = results.pop('identity'), results.pop('gzip')
+    assert identity[0] is None and compressed[0] == 'gzip', (identity, compressed)
+    assert compressed[1] == f'{identity[1][:-1]}-gzip"', (identity, compressed)
+    for path, (first, repeat, rebuilt, after) in results.items():
+        status, etag = first
+        assert status == 200 and etag, (path, first)
+        assert repeat == (304, etag, b'') and rebuilt == 0, (path, repeat, rebuilt)
+        assert after[0] == 200 and after[1] not in (None, etag), (path, after)
+        print(f"✅ {path}: {etag} revalidated with a 304, {after[1]} after a change")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Response Cache Tests...")
+    test_etag_and_not_modified()
+    test_precompressed_bodies()
+    test_serializer_round_trip()
+    test_conditional_routes()
+    print("\n🎉 All response cache tests passed!")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test token streaming from the AI backends.
+This script runs a local HTTP server speaking the OpenAI, Anthropic and
+Ollama streaming formats and checks that each backend yields the chunks
+and that the manager reports time to first token.
+"""
+
+import sys
+import json
+import asyncio
+from pathlib import Path
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from ai_backend_manager import AIBackendManager
+
+TOKENS = ['Turn ', 'on ', 'the ', 'porch ', 'light']
+
+
+def sse(event, data):
+    prefix = f'event: {event}\n' if event else ''
+    return f'{prefix}data: {json.dumps(data) if not isinstance(data, str) else data}\n\n'.encode()
+
+
+async def openai_handler(request):
+    body = await request.json()
+    assert body['stream'] is True
+    response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+    await response.prepare(request)
+    for token in TOKENS:
+        await response.write(sse(None, {'model': 'gpt-test', 'choices': [{'delta': {'content': token}}]}))
+        await asyncio.sleep(0.005)
+    await response.write(sse(None, {'choices': [], 'usage': {'completion_tokens': 5}}))
+    await response.write(sse(None, '[DONE]'))
+    return response
+
+
+async def anthropic_handler(request):
+    response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+    await response.prepare(request)
+    await response.write(sse('message_start', {'message': {'model': 'claude-test', 'usage': {'input_tokens': 3}}}))
+    for token in TOKENS:
+        await response.write(sse('content_block_delta', {'delta': {'type': 'text_delta', 'text': token}}))
+    await response.write(sse('message_delta', {'usage': {'output_tokens': 5}}))
+    await response.write(sse('message_stop', {}))
+    return response
+
+
+async def ollama_handler(request):
+    response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+    await response.prepare(request)
+    for token in TOKENS:
+        await response.write((json.dumps({'response': token, 'done': False}) + '\n').encode())
+    await response.write((json.dumps({'response': '', 'done': True, 'eval_count': 5,
+                                      'prompt_eval_count': 3}) + '\n').encode())
+    return response
+
+
+async def custom_handler(request):
+    return web.json_response({'response': ''.join(TOKENS)})
+
+
+def test_backend_streams():
+    """Test every HTTP backend streams the same text"""
+    print("🌊 Testing backend token streams")
+
+    async def run():
+        app = web.Application()
+        app.router.add_post('/openai', openai_handler)
+        app.router.add_post('/anthropic', anthropic_handler)
+        app.router.add_post('/api/generate', ollama_handler)
+        app.router.add_post('/custom', custom_handler)
+        server = TestServer(app)
+        await server.start_server()
+        url = f'http://127.0.0.1:{server.port}'
+
+        manager = AIBackendManager({'ai_backend': 'openai', 'openai_api_key': 'k',
+                                    'anthropic_api_key': 'k', 'custom_api_url': url})
+        manager.backends['openai'].base_url = f'{url}/openai'
+        manager.backends['anthropic'].base_url = f'{url}/anthropic'
+        manager.backends['custom'].api_url = f'{url}/custom'
+
+        results = {}
+        for name in ('openai', 'anthropic', 'ollama', 'custom'):
+            chunks = []
+            manager.current_backend = name
+            response = await manager.stream_response('porch light', chunks.append,
+                                                     use_context=False)
+            results[name] = (chunks, response)
+
+        await manager.close()
+        await server.close()
+        return results, manager.get_streaming_stats()
+
+    results, stats = asyncio.run(run())
+    for name, (chunks, response) in results.items():
+        assert response.error is None, f"{name}: {response.error}"
+        assert response.content == ''.join(TOKENS), f"{name}: {response.content!r}"
+        assert response.ttft is not None
+        print(f"✅ {name}: {len(chunks)} chunks, ttft {response.ttft * 1000:.1f} ms")
+
+    assert len(results['openai'][0]) == len(TOKENS)
+    assert results['anthropic'][1].usage == {'input_tokens': 3, 'output_tokens': 5}
+    assert results['ollama'][1].usage['completion_tokens'] == 5
+    assert set(stats) == {'openai', 'anthropic', 'ollama', 'custom'}
+
+
+def test_stream_error():
+    """Test an HTTP error ends the stream with an error response"""
+    print("\n💥 Testing stream errors")
+
+    async def run():
+        async def rate_limited(request):
+            return web.Response(status=429, text='slow down')
+
+        app = web.Application()
+        app.router.add_post('/openai', rate_limited)
+        server = TestServer(app)
+        await server.start_server()
+        manager = AIBackendManager({'ai_backend': 'openai', 'openai_api_key': 'k'})
+        manager.backends['openai'].base_url = f'http://127.0.0.1:{server.port}/openai'
+        response = await manager.stream_response('hi', lambda text: None)
+        await manager.close()
+        await server.close()
+        return response, manager.conversation_history
+
+    response, history = asyncio.run(run())
+    assert response.error.startswith('HTTP 429')
+    assert history == [], "failed responses must not enter the history"
+    print(f"✅ {response.error}")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Streaming Tests...")
+    test_backend_streams()
+    test_stream_error()
+    print("\n🎉 All streaming tests passed!")
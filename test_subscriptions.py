@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Test topic subscriptions and per-client backpressure.
+This script checks topic routing, single serialisation per publish, that
+a slow client only receives the newest resource frames and that AI
+responses are never dropped on overflow.
+"""
+
+import sys
+import asyncio
+from pathlib import Path
+
+# Add the source directory to Python path
+sys.path.insert(0, str(Path(__file__).parent / "addons/hailo-terminal/src"))
+
+from subscriptions import SubscriptionHub, TokenRelay, is_valid_topic
+from serialization import JSONSerializer
+
+
+def test_topic_routing():
+    """Test that frames only reach subscribers of a topic"""
+    print("📡 Testing topic routing")
+    received = {}
+
+    async def transport(sid, event, data, on_ack):
+        received.setdefault(sid, []).append((event, data))
+        on_ack()
+
+    async def run():
+        hub = SubscriptionHub(transport)
+        hub.connect('a', ['resources'])
+        hub.connect('b', ['entities:light'])
+
+        assert hub.publish('resources', 'resource_update', {'cpu': 1}) == 1
+        assert hub.publish('entities:light', 'entity_update', {'count': 2}) == 1
+        assert hub.publish('entities:switch', 'entity_update', {}) == 0
+
+        try:
+            hub.subscribe('a', ['bogus'])
+            raise AssertionError("invalid topic accepted")
+        except ValueError:
+            pass
+
+        hub.unsubscribe('a', ['resources'])
+        assert hub.publish('resources', 'resource_update', {'cpu': 2}) == 0
+        await asyncio.sleep(0.01)
+        await hub.close()
+
+    asyncio.run(run())
+    assert [event for event, _ in received['a']] == ['resource_update']
+    assert [event for event, _ in received['b']] == ['entity_update']
+    assert is_valid_topic('metrics:cpu_percent') and not is_valid_topic('metrics:')
+    print(f"✅ Routed {sum(len(v) for v in received.values())} frames")
+
+
+def test_slow_client_backpressure():
+    """Test that a slow client gets coalesced frames without delaying others"""
+    print("\n🐢 Testing slow client backpressure")
+    serializer = JSONSerializer('json')
+    received = {'fast': [], 'slow': []}
+    pending_acks = []
+
+    async def transport(sid, event, data, on_ack):
+        received[sid].append(serializer.loads(serializer.dumps([event, data])))
+        if sid == 'fast':
+            on_ack()
+        else:
+            pending_acks.append(on_ack)
+
+    async def run():
+        hub = SubscriptionHub(transport, window=1)
+        hub.connect('fast')
+        hub.connect('slow')
+
+        for i in range(50):
+            hub.publish('resources', 'resource_update', {'frame': i}, latest=True)
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+
+        stats = hub.get_stats()['channels']
+        assert stats['slow']['queued'] <= 1, "slow client queue must stay bounded"
+
+        # The slow client catches up and only sees the newest frame next
+        pending_acks.pop(0)()
+        await asyncio.sleep(0.01)
+        await hub.close()
+        return stats
+
+    stats = asyncio.run(run())
+    assert len(received['fast']) == 50
+    frames = [frame[1]['frame'] for frame in received['slow']]
+    assert len(frames) == 2 and frames[-1] == 49, frames
+    assert stats['slow']['dropped'] >= 47
+    print(f"✅ Fast client got 50 frames, slow client got "
+          f"{len(received['slow'])} ({stats['slow']['dropped']} dropped)")
+
+
+def test_overflow_keeps_ai_responses():
+    """Test that overflow drops entity frames, never AI responses"""
+    print("\n🌊 Testing queue overflow during an AI stream")
+    serializer = JSONSerializer('json')
+    received = {'behind': [], 'stuck': []}
+    disconnected = []
+
+    async def transport(sid, event, data, on_ack):
+        received[sid].append(tuple(serializer.loads(serializer.dumps([event, data]))))
+
+    async def disconnect(sid):
+        disconnected.append(sid)
+
+    async def run():
+        hub = SubscriptionHub(transport, max_frames=4, window=1, disconnect=disconnect)
+        for sid in received:
+            hub.connect(sid, ['entities:light', f'ai:{sid}'])
+        await asyncio.sleep(0.01)
+
+        # Entity updates flood both queues while an answer is produced
+        for i in range(10):
+            hub.publish('entities:light', 'entity_update', {'update': i})
+        assert hub.publish('ai:behind', 'ai_response', {'response': 'done'}, droppable=False) == 1
+        for i in range(10, 20):
+            hub.publish('entities:light', 'entity_update', {'update': i})
+        queued = hub.get_stats()['channels']['behind']['queued']
+
+        # A client whose queue is full of undroppable answers is disconnected
+        for i in range(5):
+            hub.publish('ai:stuck', 'ai_response', {'response': i}, droppable=False)
+        await asyncio.sleep(0.01)
+        stats = hub.get_stats()
+
+        await hub.close()
+        return queued, stats
+
+    queued, stats = asyncio.run(run())
+    # The answer survived ten more droppable frames and was sent first
+    assert queued == 4, queued
+    assert received['behind'] == [('ai_response', {'response': 'done'})], received['behind']
+    assert stats['channels']['behind']['dropped'] == 17
+    assert disconnected == ['stuck'] and stats['overflow_disconnects'] == 1
+    assert 'stuck' not in stats['channels']
+    print(f"✅ AI response kept through overflow, {disconnected} disconnected")
+
+
+def test_token_stream_overflow():
+    """Test that a slow client loses streamed tokens but not the answer"""
+    print("\n🌊 Testing queue overflow during a token stream")
+    serializer = JSONSerializer('json')
+    received = []
+    pending_acks = []
+
+    async def transport(sid, event, data, on_ack):
+        received.append(serializer.loads(serializer.dumps([event, data])))
+        pending_acks.append(on_ack)
+
+    async def run():
+        hub = SubscriptionHub(transport, max_frames=4, window=1)
+        hub.connect('slow', ['ai:slow'])
+        relay = TokenRelay(hub, 'ai:slow', 'q1', interval=0)
+        for i in range(40):
+            relay(f'{i} ')
+            await asyncio.sleep(0)
+        text = ''.join(f'{i} ' for i in range(40))
+        hub.publish('ai:slow', 'ai_response', {'query_id': 'q1', 'response': text},
+                    droppable=False)
+
+        # The client acknowledges everything it is sent from now on
+        while pending_acks:
+            pending_acks.pop(0)()
+            await asyncio.sleep(0.01)
+        stats = hub.get_stats()['channels']['slow']
+        await hub.close()
+        return relay, stats
+
+    relay, stats = asyncio.run(run())
+    events = [event for event, _ in received]
+    assert events[-1] == 'ai_response' and events.count('ai_response') == 1, events
+    assert received[-1][1]['response'].startswith('0 1 2 ')
+    assert stats['dropped'] > 0 and len(events) < relay.frames + 1
+    print(f"✅ {relay.frames} token frames, {stats['dropped']} dropped, answer delivered")
+
+
+if __name__ == "__main__":
+    print("Starting Hailo AI Terminal Subscription Tests...")
+    test_topic_routing()
+    test_slow_client_backpressure()
+    test_overflow_keeps_ai_responses()
+    test_token_stream_overflow()
+    print("\n🎉 All subscription tests passed!")